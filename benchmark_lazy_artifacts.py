@@ -0,0 +1,152 @@
+#!/usr/bin/env python3
+"""
+Benchmark de materialización diferida de artefactos (boletas)
+Ejecutar con: python benchmark_lazy_artifacts.py [--documentos 100000] [--items 3] [--lecturas 0.05]
+
+Compara, para el volumen indicado:
+- Modo normal: bytes en disco de XML + ZIP y CPU para generarlos y comprimirlos
+- Modo diferido: bytes del payload canónico + firma y CPU para regenerar XML/ZIP
+  cuando se descargan, envían o auditan (con y sin caché)
+"""
+
+import sys
+import os
+import time
+import hashlib
+import argparse
+
+import django
+
+# Configurar Django
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'sunat_api.settings')
+django.setup()
+
+from comprobantes.utils import generate_ubl_xml, build_zip_bytes
+from comprobantes.lazy_artifacts import (
+    MaterializedCache,
+    canonical_payload,
+    extract_signature,
+    render_xml,
+)
+
+
+def build_boleta(numero, num_items):
+    """Datos de prueba de una boleta con la cantidad de items indicada"""
+    return {
+        'serie': 'B001',
+        'numero': str(numero),
+        'tipoDocumento': '03',
+        'moneda': 'PEN',
+        'fechaEmision': '2025-07-13',
+        'horaEmision': '10:00:00',
+        'totalGravado': 100.00 * num_items,
+        'totalIGV': 18.00 * num_items,
+        'totalImportePagar': 118.00 * num_items,
+        'emisor': {
+            'ruc': '20607599727',
+            'razonSocial': 'INSTITUTO INTERNACIONAL DE SOFTWARE S.A.C.',
+            'ubigeo': '140101',
+            'direccion': '8 DE OCTUBRE N 123 - LAMBAYEQUE',
+            'codigoPais': 'PE'
+        },
+        'cliente': {
+            'numeroDoc': '12345678',
+            'razonSocial': 'CLIENTE DE PRUEBA',
+            'tipoDoc': '1'
+        },
+        'items': [
+            {
+                'id': i,
+                'cantidad': 1,
+                'descripcion': f'PRODUCTO DE PRUEBA {i}',
+                'valorUnitario': 100.00,
+                'valorTotal': 100.00,
+                'codigoProducto': str(i),
+            }
+            for i in range(1, num_items + 1)
+        ]
+    }
+
+
+def human(num_bytes):
+    for unit in ('B', 'KB', 'MB', 'GB', 'TB'):
+        if num_bytes < 1024:
+            return f'{num_bytes:,.1f} {unit}'
+        num_bytes /= 1024
+    return f'{num_bytes:,.1f} PB'
+
+
+def run_benchmark(args):
+    muestra = [build_boleta(numero, args.items) for numero in range(1, args.muestra + 1)]
+
+    # Modo normal: generar XML + ZIP y guardar ambos
+    cpu_start = time.process_time()
+    eager_bytes = 0
+    payloads = []
+    for data in muestra:
+        xml_bytes = generate_ubl_xml(data).encode('utf-8')
+        zip_bytes = build_zip_bytes(f"20607599727-03-B001-{data['numero']}.xml", xml_bytes)
+        eager_bytes += len(xml_bytes) + len(zip_bytes)
+        payloads.append((canonical_payload(data), extract_signature(xml_bytes),
+                         hashlib.sha256(xml_bytes).hexdigest()))
+    cpu_eager = (time.process_time() - cpu_start) / len(muestra)
+
+    lazy_bytes = sum(len(payload.encode('utf-8')) + len(signature.encode('utf-8')) + 64
+                     for payload, signature, _ in payloads) / len(muestra)
+    eager_bytes /= len(muestra)
+
+    # Modo diferido: regenerar y verificar el digest
+    cpu_start = time.process_time()
+    for payload, signature, digest in payloads:
+        assert hashlib.sha256(render_xml(payload, signature)).hexdigest() == digest
+    cpu_xml = (time.process_time() - cpu_start) / len(muestra)
+
+    cpu_start = time.process_time()
+    for index, (payload, signature, _) in enumerate(payloads):
+        build_zip_bytes(f'{index}.xml', render_xml(payload, signature), date_time=(2025, 7, 13, 10, 0, 0))
+    cpu_zip = (time.process_time() - cpu_start) / len(muestra)
+
+    # Lecturas repetidas con caché LRU
+    cache = MaterializedCache(args.cache_mb * 1024 * 1024)
+    cpu_start = time.process_time()
+    for _ in range(3):
+        for index, (payload, signature, _) in enumerate(payloads):
+            if cache.get(index) is None:
+                cache.put(index, render_xml(payload, signature))
+    cpu_cached = (time.process_time() - cpu_start) / (3 * len(muestra))
+
+    lecturas = args.documentos * args.lecturas
+
+    print('🧪 BENCHMARK DE MATERIALIZACIÓN DIFERIDA')
+    print('=' * 72)
+    print(f'Documentos: {args.documentos:,} boletas de {args.items} items '
+          f'(muestra de {len(muestra)}), lecturas: {args.lecturas:.0%}')
+    print()
+    print(f"{'':<28} {'Por documento':>18} {'Total':>22}")
+    print('-' * 72)
+    print(f"{'Disco modo normal':<28} {human(eager_bytes):>18} {human(eager_bytes * args.documentos):>22}")
+    print(f"{'Disco modo diferido':<28} {human(lazy_bytes):>18} {human(lazy_bytes * args.documentos):>22}")
+    print(f"{'CPU generar XML+ZIP':<28} {cpu_eager * 1000:>16.3f}ms {cpu_eager * args.documentos:>20.1f}s")
+    print(f"{'CPU regenerar XML':<28} {cpu_xml * 1000:>16.3f}ms {cpu_xml * lecturas:>20.1f}s")
+    print(f"{'CPU regenerar XML+ZIP':<28} {cpu_zip * 1000:>16.3f}ms {cpu_zip * lecturas:>20.1f}s")
+    print(f"{'CPU lectura con caché':<28} {cpu_cached * 1000:>16.3f}ms {cpu_cached * lecturas:>20.1f}s")
+    print()
+    print(f'ℹ️  Ahorro de disco: {human((eager_bytes - lazy_bytes) * args.documentos)} '
+          f'({1 - lazy_bytes / eager_bytes:.0%}). El modo diferido conviene cuando pocas boletas '
+          f'se descargan o envían individualmente (p. ej. solo van en resúmenes diarios).')
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Benchmark de materialización diferida de artefactos')
+    parser.add_argument('--documentos', type=int, default=100000,
+                        help='Volumen de boletas a proyectar')
+    parser.add_argument('--items', type=int, default=3,
+                        help='Items por boleta')
+    parser.add_argument('--lecturas', type=float, default=0.05,
+                        help='Fracción de boletas cuyo XML/ZIP se llega a leer')
+    parser.add_argument('--muestra', type=int, default=500,
+                        help='Boletas realmente generadas para medir')
+    parser.add_argument('--cache-mb', type=int, default=32,
+                        help='Tamaño de la caché LRU en MB')
+    run_benchmark(parser.parse_args())
@@ -0,0 +1,140 @@
+#!/usr/bin/env python3
+"""
+Benchmark de envío a SUNAT contra el stub local de billService (sin red)
+Ejecutar con: python benchmark_sunat_stub.py [--envios 2000] [--hilos 32] [--latencia lognormal:0.3:0.5]
+
+Levanta el stub en el mismo proceso y envía comprobantes de prueba con:
+- SUNATSoapClient desde un pool de hilos (como los workers actuales)
+- AsyncSUNATSoapClient con N llamadas en vuelo (si httpx está instalado)
+y reporta throughput, percentiles de latencia y resultados por clase de falla.
+"""
+
+import sys
+import os
+import time
+import asyncio
+import argparse
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+
+import django
+
+# Configurar Django
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'sunat_api.settings')
+django.setup()
+
+from comprobantes.utils import build_zip_bytes
+from comprobantes.soap_client import SUNATSoapClient
+from comprobantes.sunat_faults import classify_response
+from comprobantes.sunat_stub import start_stub_server
+
+
+# El stub rechaza documentos sin ds:Signature; la firma no se verifica, basta el elemento
+DOCUMENT_TEMPLATE = (
+    '<?xml version="1.0" encoding="UTF-8"?>'
+    '<Invoice xmlns:ext="urn:oasis:names:specification:ubl:schema:xsd:CommonExtensionComponents-2" '
+    'xmlns:ds="http://www.w3.org/2000/09/xmldsig#"><ext:UBLExtensions><ext:UBLExtension><ext:ExtensionContent>'
+    '<ds:Signature Id="SignatureSP"/></ext:ExtensionContent></ext:UBLExtension></ext:UBLExtensions>'
+    '<ID>F001-{numero}</ID></Invoice>'
+)
+
+
+def build_documents(count):
+    """ZIPs de prueba con nombres válidos para sendBill"""
+    documents = []
+    for numero in range(1, count + 1):
+        name = f'20000000001-01-F001-{numero:08d}'
+        xml_content = DOCUMENT_TEMPLATE.format(numero=numero)
+        documents.append((f'{name}.xml', f'{name}.zip', build_zip_bytes(f'{name}.xml', xml_content.encode('utf-8'))))
+    return documents
+
+
+def percentile(values, fraction):
+    ordered = sorted(values)
+    return ordered[min(int(len(ordered) * fraction), len(ordered) - 1)] if ordered else 0.0
+
+
+def report(label, elapsed, results):
+    latencies = [latency for latency, _ in results]
+    outcomes = Counter(classify_response(response) or 'ok' for _, response in results)
+    print(f"{label:<22} {len(results) / elapsed:>9.1f}/s "
+          f"{percentile(latencies, 0.5) * 1000:>8.0f} {percentile(latencies, 0.95) * 1000:>8.0f} "
+          f"{percentile(latencies, 0.99) * 1000:>8.0f}ms   {dict(outcomes)}")
+
+
+def run_threads(client, documents, threads):
+    def send(document):
+        started = time.perf_counter()
+        response = client.send_bill(document[0], document[1], zip_content=document[2])
+        return time.perf_counter() - started, response
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=threads) as executor:
+        results = list(executor.map(send, documents))
+    return time.perf_counter() - started, results
+
+
+def run_async(client, documents, concurrency):
+    from comprobantes.async_soap_client import AsyncSUNATSoapClient
+
+    async def send_all():
+        async with AsyncSUNATSoapClient(client, max_concurrency=concurrency) as async_client:
+            async def send(document):
+                started = time.perf_counter()
+                response = await async_client.send_bill(document[0], document[1], document[2])
+                return time.perf_counter() - started, response
+            return await asyncio.gather(*(send(document) for document in documents))
+
+    started = time.perf_counter()
+    results = asyncio.run(send_all())
+    return time.perf_counter() - started, results
+
+
+def run_benchmark(args):
+    server = start_stub_server(
+        latency=args.latencia,
+        fault_rate=args.fallas,
+        reject_rate=args.rechazos,
+        seed=args.semilla,
+    )
+    client = SUNATSoapClient(url=server.url)
+    documents = build_documents(args.envios)
+
+    print('🧪 BENCHMARK DE ENVÍO CONTRA STUB DE SUNAT')
+    print('=' * 96)
+    print(f'Envíos: {args.envios:,} | latencia {args.latencia} | fallas {args.fallas:.0%} | '
+          f'rechazos {args.rechazos:.0%} | stub en {server.url}')
+    print()
+    print(f"{'Modo':<22} {'Throughput':>11} {'p50':>8} {'p95':>8} {'p99':>10}   Resultados")
+    print('-' * 96)
+
+    elapsed, results = run_threads(client, documents, args.hilos)
+    report(f'Hilos ({args.hilos})', elapsed, results)
+
+    try:
+        elapsed, results = run_async(client, documents, args.concurrencia)
+        report(f'Async ({args.concurrencia} en vuelo)', elapsed, results)
+    except ImportError as e:
+        print(f'⚠️  Cliente asíncrono no disponible: {str(e)}')
+
+    server.shutdown()
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Benchmark de envío contra el stub local de SUNAT')
+    parser.add_argument('--envios', type=int, default=2000,
+                        help='Comprobantes a enviar en cada modo')
+    parser.add_argument('--hilos', type=int, default=32,
+                        help='Hilos del modo síncrono')
+    parser.add_argument('--concurrencia', type=int, default=200,
+                        help='Llamadas en vuelo del modo asíncrono')
+    parser.add_argument('--latencia', default='lognormal:0.3:0.5',
+                        help='Distribución de latencia del stub (ver comando sunat_stub)')
+    parser.add_argument('--fallas', type=float, default=0.0,
+                        help='Probabilidad de falla transitoria del stub')
+    parser.add_argument('--rechazos', type=float, default=0.0,
+                        help='Probabilidad de rechazo del stub')
+    parser.add_argument('--semilla', type=int, default=None,
+                        help='Semilla del stub')
+    run_benchmark(parser.parse_args())
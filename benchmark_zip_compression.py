@@ -0,0 +1,182 @@
+#!/usr/bin/env python3
+"""
+Benchmark de políticas de compresión ZIP para el envío a SUNAT
+Ejecutar con: python benchmark_zip_compression.py [--bandwidth-mbps 10] [--rtt-ms 40] [--url URL]
+
+Reporta por cada tamaño de documento y política:
+- Ratio de compresión (tamaño ZIP / tamaño XML)
+- Tiempo de CPU de la compresión
+- Latencia estimada de envío (CPU + base64 + transferencia + RTT), o la latencia
+  real si se indica --url (por ejemplo, un billService de pruebas)
+"""
+
+import sys
+import os
+import time
+import base64
+import zipfile
+import argparse
+from io import BytesIO
+
+import django
+
+# Configurar Django
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'sunat_api.settings')
+django.setup()
+
+from django.conf import settings
+from comprobantes.utils import generate_ubl_xml, get_zip_compresslevel
+
+# Tamaños objetivo de documento (bytes)
+DOCUMENT_SIZES = [
+    ('8 KB', 8 * 1024),
+    ('256 KB', 256 * 1024),
+    ('5 MB', 5 * 1024 * 1024),
+]
+
+FIXED_LEVELS = [1, 6, 9]
+
+
+def build_test_data(num_items):
+    """Datos de prueba con la cantidad de items indicada"""
+    return {
+        'serie': 'F001',
+        'numero': '1',
+        'tipoDocumento': '01',
+        'moneda': 'PEN',
+        'fechaEmision': '2025-07-13',
+        'horaEmision': '00:00:00',
+        'totalGravado': 100.00 * num_items,
+        'totalIGV': 18.00 * num_items,
+        'totalImportePagar': 118.00 * num_items,
+        'emisor': {
+            'ruc': '20607599727',
+            'razonSocial': 'INSTITUTO INTERNACIONAL DE SOFTWARE S.A.C.',
+            'ubigeo': '140101',
+            'direccion': '8 DE OCTUBRE N 123 - LAMBAYEQUE',
+            'codigoPais': 'PE'
+        },
+        'cliente': {
+            'numeroDoc': '20605145648',
+            'razonSocial': 'AGROINVERSIONES Y SERVICIOS AJINOR S.R.L.',
+            'tipoDoc': '6'
+        },
+        'items': [
+            {
+                'id': i,
+                'cantidad': 1,
+                'descripcion': f'PRODUCTO DE PRUEBA {i}',
+                'valorUnitario': 100.00,
+                'valorTotal': 100.00,
+                'codigoProducto': str(i),
+            }
+            for i in range(1, num_items + 1)
+        ]
+    }
+
+
+def build_xml_of_size(target_size):
+    """Genera un XML UBL de aproximadamente el tamaño indicado"""
+    one_item = len(generate_ubl_xml(build_test_data(1)).encode('utf-8'))
+    two_items = len(generate_ubl_xml(build_test_data(2)).encode('utf-8'))
+    per_item = max(two_items - one_item, 1)
+    num_items = max(1, (target_size - one_item) // per_item + 1)
+    return generate_ubl_xml(build_test_data(num_items)).encode('utf-8')
+
+
+def compress(xml_bytes, level):
+    """Comprime el XML en memoria igual que create_zip_file"""
+    buffer = BytesIO()
+    with zipfile.ZipFile(buffer, 'w', zipfile.ZIP_DEFLATED, compresslevel=level) as zipf:
+        zipf.writestr('20607599727-01-F001-00000001.xml', xml_bytes)
+    return buffer.getvalue()
+
+
+def measure(xml_bytes, level, repeats):
+    """Mide tamaño comprimido, CPU de compresión y CPU de codificación base64"""
+    cpu_start = time.process_time()
+    for _ in range(repeats):
+        zip_bytes = compress(xml_bytes, level)
+    cpu_zip = (time.process_time() - cpu_start) / repeats
+
+    cpu_start = time.process_time()
+    for _ in range(repeats):
+        base64.b64encode(zip_bytes)
+    cpu_b64 = (time.process_time() - cpu_start) / repeats
+
+    return zip_bytes, cpu_zip, cpu_b64
+
+
+def send_latency(url, zip_bytes):
+    """Latencia real de un POST SOAP con el ZIP codificado"""
+    import requests
+
+    envelope = (
+        '<?xml version="1.0" encoding="UTF-8"?>'
+        '<soapenv:Envelope xmlns:soapenv="http://schemas.xmlsoap.org/soap/envelope/" '
+        'xmlns:ser="http://service.sunat.gob.pe"><soapenv:Body><ser:sendBill>'
+        '<fileName>20607599727-01-F001-00000001.zip</fileName>'
+        f'<contentFile>{base64.b64encode(zip_bytes).decode("ascii")}</contentFile>'
+        '</ser:sendBill></soapenv:Body></soapenv:Envelope>'
+    ).encode('utf-8')
+
+    start = time.perf_counter()
+    requests.post(url, data=envelope, headers={
+        'Content-Type': 'text/xml; charset=utf-8',
+        'SOAPAction': 'urn:sendBill'
+    }, timeout=60)
+    return time.perf_counter() - start
+
+
+def run_benchmark(args):
+    policies = [(f'fixed-{level}', lambda size, level=level: level) for level in FIXED_LEVELS]
+    policies.append(('size', get_zip_compresslevel))
+
+    bytes_per_second = args.bandwidth_mbps * 1_000_000 / 8
+
+    print('🧪 BENCHMARK DE COMPRESIÓN ZIP')
+    print('=' * 96)
+    print(f"Política configurada: {settings.SUNAT_CONFIG.get('ZIP_COMPRESSION', {}).get('POLICY', 'fixed')}")
+    if args.url:
+        print(f'Latencia medida contra: {args.url}')
+    else:
+        print(f'Latencia estimada con {args.bandwidth_mbps} Mbps y RTT de {args.rtt_ms} ms')
+    print()
+    print(f"{'Documento':<10} {'Política':<9} {'Nivel':>5} {'XML':>10} {'ZIP':>10} "
+          f"{'Ratio':>7} {'CPU zip':>10} {'CPU b64':>9} {'Envío':>10}")
+    print('-' * 96)
+
+    for label, target_size in DOCUMENT_SIZES:
+        xml_bytes = build_xml_of_size(target_size)
+        repeats = args.repeats if len(xml_bytes) < 1024 * 1024 else max(1, args.repeats // 10)
+
+        for policy_name, level_for in policies:
+            level = level_for(len(xml_bytes))
+            zip_bytes, cpu_zip, cpu_b64 = measure(xml_bytes, level, repeats)
+            payload_size = len(zip_bytes) * 4 / 3
+
+            if args.url:
+                latency = cpu_zip + send_latency(args.url, zip_bytes)
+            else:
+                latency = cpu_zip + cpu_b64 + payload_size / bytes_per_second + args.rtt_ms / 1000
+
+            print(f"{label:<10} {policy_name:<9} {str(level):>5} {len(xml_bytes):>10,} {len(zip_bytes):>10,} "
+                  f"{len(zip_bytes) / len(xml_bytes):>7.3f} {cpu_zip * 1000:>8.2f}ms {cpu_b64 * 1000:>7.2f}ms "
+                  f"{latency * 1000:>8.1f}ms")
+        print()
+
+    print('ℹ️  Nodos limitados por CPU: preferir niveles bajos. Nodos limitados por ancho de banda: niveles altos.')
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Benchmark de políticas de compresión ZIP')
+    parser.add_argument('--bandwidth-mbps', type=float, default=10.0,
+                        help='Ancho de banda de subida hacia SUNAT (Mbps)')
+    parser.add_argument('--rtt-ms', type=float, default=40.0,
+                        help='Tiempo de ida y vuelta hacia SUNAT (ms)')
+    parser.add_argument('--repeats', type=int, default=20,
+                        help='Repeticiones por medición')
+    parser.add_argument('--url', default=None,
+                        help='URL de un billService para medir la latencia real de envío')
+    run_benchmark(parser.parse_args())
@@ -1,6 +1,6 @@
 from django.contrib import admin
 from .models import Comprobante, DetalleComprobante
-from django.conf import settings
+from .artifacts import has_artifact, save_artifact, read_artifact
 
 
 class DetalleComprobanteInline(admin.TabularInline):
@@ -33,7 +33,7 @@ class ComprobanteAdmin(admin.ModelAdmin):
     
     fieldsets = (
         ('Información del Comprobante', {
-            'fields': ('tipo_comprobante', 'ruc_emisor', 'serie', 'numero')
+            'fields': ('tipo_comprobante', 'ruc_emisor', 'serie', 'numero', 'fecha_emision')
         }),
         ('Información del Cliente', {
             'fields': ('ruc_cliente', 'nombre_cliente', 'direccion_cliente')
@@ -58,7 +58,6 @@ class ComprobanteAdmin(admin.ModelAdmin):
     def regenerar_xml(self, request, queryset):
         """Acción para regenerar archivos XML"""
         from .utils import generate_ubl_xml, validate_xml_structure
-        import os
         
         for comprobante in queryset:
             try:
@@ -91,13 +90,7 @@ class ComprobanteAdmin(admin.ModelAdmin):
                 validation = validate_xml_structure(xml_content)
                 if validation['success']:
                     # Guardar archivo
-                    xml_filename = comprobante.get_xml_filename()
-                    xml_path = os.path.join(settings.SUNAT_CONFIG['XML_OUTPUT_DIR'], xml_filename)
-                    
-                    with open(xml_path, 'w', encoding='utf-8') as f:
-                        f.write(xml_content)
-                    
-                    comprobante.xml_file = f'xml/{xml_filename}'
+                    save_artifact(comprobante, 'xml', xml_content.encode('utf-8'))
                     comprobante.estado = 'GENERADO'
                     comprobante.errores = None
                     comprobante.save()
@@ -117,22 +110,17 @@ class ComprobanteAdmin(admin.ModelAdmin):
     
     def regenerar_zip(self, request, queryset):
         """Acción para regenerar archivos ZIP"""
-        from .utils import create_zip_file
-        import os
+        from .utils import build_zip_bytes
         
         for comprobante in queryset:
             try:
-                if comprobante.xml_file:
-                    xml_path = os.path.join(settings.MEDIA_ROOT, str(comprobante.xml_file))
-                    zip_filename = comprobante.get_zip_filename()
-                    zip_path = os.path.join(settings.SUNAT_CONFIG['ZIP_OUTPUT_DIR'], zip_filename)
+                if has_artifact(comprobante, 'xml'):
+                    xml_content = read_artifact(comprobante, 'xml')
+                    zip_content = build_zip_bytes(comprobante.get_xml_filename(), xml_content)
                     
-                    if create_zip_file(xml_path, zip_path):
-                        comprobante.zip_file = f'zip/{zip_filename}'
-                        comprobante.save()
-                        self.message_user(request, f'ZIP regenerado para {comprobante}')
-                    else:
-                        self.message_user(request, f'Error al crear ZIP para {comprobante}', level='ERROR')
+                    save_artifact(comprobante, 'zip', zip_content)
+                    comprobante.save()
+                    self.message_user(request, f'ZIP regenerado para {comprobante}')
                 else:
                     self.message_user(request, f'No hay archivo XML para {comprobante}', level='WARNING')
                     
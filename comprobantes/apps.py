@@ -4,4 +4,7 @@ from django.apps import AppConfig
 class ComprobantesConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'comprobantes'
-    verbose_name = 'Comprobantes Electrónicos SUNAT' 
\ No newline at end of file
+    verbose_name = 'Comprobantes Electrónicos SUNAT'
+    
+    def ready(self):
+        from . import signals  # noqa: F401
@@ -0,0 +1,210 @@
+# comprobantes/artifacts.py
+
+import io
+import os
+import hashlib
+import zipfile
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.utils import timezone
+
+from .storage import get_artifact_storage
+
+# Prefijo (relativo a la raíz del almacenamiento de artefactos) por tipo de artefacto
+ARTIFACT_DIRS = {
+    'xml': 'xml',
+    'zip': 'zip',
+    'cdr_zip': 'cdr',
+    'cdr_xml': 'cdr',
+}
+
+# Campo del modelo Comprobante que guarda la ruta de cada tipo de artefacto
+ARTIFACT_FIELDS = {
+    'xml': 'xml_file',
+    'zip': 'zip_file',
+    'cdr_zip': 'cdr_zip_path',
+    'cdr_xml': 'cdr_xml_path',
+}
+
+
+def get_artifact_layout():
+    """Retorna el layout configurado para los artefactos: 'flat' o 'sharded'"""
+    return settings.SUNAT_CONFIG.get('ARTIFACT_LAYOUT', 'flat')
+
+
+def get_artifact_store():
+    """Retorna el almacén configurado: 'files' (un archivo por nombre) o 'cas' (por contenido)"""
+    return settings.SUNAT_CONFIG.get('ARTIFACT_STORE', 'files')
+
+
+def shard_prefix(nombre_archivo):
+    """Prefijo corto de hash para repartir archivos dentro de un mes"""
+    length = settings.SUNAT_CONFIG.get('ARTIFACT_SHARD_PREFIX_LENGTH', 2)
+    return hashlib.sha1(nombre_archivo.encode('utf-8')).hexdigest()[:length]
+
+
+def get_artifact_subdir(comprobante, layout=None):
+    """
+    Subdirectorio del comprobante dentro del directorio de salida.
+
+    Layout 'sharded': ruc/yyyy/mm/hh (hh = prefijo de hash del nombre de archivo).
+    Se calcula solo con datos del comprobante, sin listar directorios.
+    """
+    layout = layout or get_artifact_layout()
+    if layout != 'sharded':
+        return ''
+
+    fecha = timezone.localtime(comprobante.fecha_creacion) if timezone.is_aware(comprobante.fecha_creacion) \
+        else comprobante.fecha_creacion
+
+    return os.path.join(
+        comprobante.ruc_emisor,
+        f'{fecha.year:04d}',
+        f'{fecha.month:02d}',
+        shard_prefix(comprobante.nombre_archivo)
+    )
+
+
+def get_artifact_filename(comprobante, kind):
+    """Nombre de archivo del artefacto según estándar SUNAT"""
+    if kind == 'xml':
+        return comprobante.get_xml_filename()
+    if kind == 'zip':
+        return comprobante.get_zip_filename()
+    if kind == 'cdr_zip':
+        return f"R-{comprobante.nombre_archivo}.zip"
+    if kind == 'cdr_xml':
+        return comprobante.get_cdr_filename()
+    raise ValueError(f'Tipo de artefacto no soportado: {kind}')
+
+
+def get_artifact_name(comprobante, kind, layout=None):
+    """Nombre del artefacto en el almacenamiento (valor que se guarda en xml_file/zip_file)"""
+    prefix = ARTIFACT_DIRS[kind]
+    subdir = get_artifact_subdir(comprobante, layout)
+    return '/'.join(part for part in [prefix, subdir.replace(os.sep, '/'), get_artifact_filename(comprobante, kind)] if part)
+
+
+def get_stored_artifact_name(comprobante, kind):
+    """
+    Nombre del artefacto ya guardado, a partir del campo del modelo.
+    Si el campo está vacío se asume el nombre del layout actual.
+    """
+    field = getattr(comprobante, ARTIFACT_FIELDS[kind])
+    if field:
+        return str(field)
+    return get_artifact_name(comprobante, kind)
+
+
+def save_artifact(comprobante, kind, content):
+    """
+    Guarda el contenido (bytes) del artefacto y actualiza el campo del comprobante.
+    No llama a save(): el llamador persiste el comprobante.
+
+    Con ARTIFACT_STORE = 'cas' el contenido se guarda una sola vez por hash SHA-256
+    y el comprobante apunta al blob a través de una ArtifactReference.
+    """
+    if get_artifact_store() == 'cas':
+        from .blobstore import store_artifact
+
+        blob = store_artifact(comprobante, kind, content, get_artifact_filename(comprobante, kind))
+        name = blob.name
+    else:
+        name = get_artifact_storage().save(get_artifact_name(comprobante, kind), ContentFile(content))
+
+    setattr(comprobante, ARTIFACT_FIELDS[kind], name)
+    if kind == 'xml':
+        comprobante.xml_sha256 = hashlib.sha256(content).hexdigest()
+    return name
+
+
+def has_artifact(comprobante, kind):
+    """Indica si el comprobante tiene el artefacto guardado o regenerable bajo demanda"""
+    if getattr(comprobante, ARTIFACT_FIELDS[kind]):
+        return True
+    if kind == 'cdr_xml':
+        # El XML del CDR se extrae del ZIP guardado cuando se solicita
+        return bool(comprobante.cdr_zip_path)
+    if kind in ('xml', 'zip'):
+        from .models import LazyArtifact
+
+        return LazyArtifact.objects.filter(comprobante_id=comprobante.id).exists()
+    return False
+
+
+def read_artifact(comprobante, kind):
+    """Lee el contenido del artefacto guardado del comprobante (archivo, blob o pack)"""
+    with open_artifact(comprobante, kind) as f:
+        return f.read()
+
+
+def open_artifact(comprobante, kind):
+    """
+    Abre el artefacto guardado para lectura binaria.
+    Los artefactos empaquetados se leen desde el pack mensual mediante mmap, sin copiarlos,
+    y los de comprobantes diferidos se regeneran desde su payload.
+    Lanza FileNotFoundError si el artefacto no existe.
+    """
+    from .packs import parse_locator, read_from_pack, PackSliceReader
+
+    name = getattr(comprobante, ARTIFACT_FIELDS[kind])
+    if not name:
+        from .lazy_artifacts import LAZY_KINDS, materialize_artifact
+
+        content = materialize_artifact(comprobante, kind) if kind in LAZY_KINDS else None
+        if content is None and kind == 'cdr_xml' and comprobante.cdr_zip_path:
+            content = extract_cdr_xml(comprobante)
+        if content is not None:
+            return io.BytesIO(content)
+
+    if parse_locator(name) is not None:
+        view = read_from_pack(name)
+        if view is None:
+            raise FileNotFoundError(f'Artefacto no encontrado en pack: {name}')
+        return io.BufferedReader(PackSliceReader(view))
+
+    return get_artifact_storage().open(get_stored_artifact_name(comprobante, kind), 'rb')
+
+
+def extract_cdr_xml(comprobante):
+    """
+    XML del CDR extraído del ZIP guardado (el CDR se guarda una sola vez, como ZIP).
+    Lanza FileNotFoundError si el ZIP no contiene el XML.
+    """
+    from .utils import find_cdr_member
+
+    with open_artifact(comprobante, 'cdr_zip') as source:
+        with zipfile.ZipFile(source) as zip_file:
+            member = find_cdr_member(zip_file, comprobante.nombre_archivo)
+            if member is None:
+                raise FileNotFoundError(f'CDR sin XML: {comprobante.cdr_zip_path}')
+            return zip_file.read(member)
+
+
+def parse_nombre_archivo(filename):
+    """
+    Descompone un nombre RUC-TIPO-SERIE-NUMERO(.ext) en sus partes.
+    Retorna None si el nombre no sigue el estándar SUNAT.
+    """
+    nombre = os.path.splitext(os.path.basename(filename))[0]
+    partes = nombre.split('-')
+    if len(partes) != 4:
+        return None
+
+    ruc_emisor, tipo_comprobante, serie, numero = partes
+    return {
+        'ruc_emisor': ruc_emisor,
+        'tipo_comprobante': tipo_comprobante,
+        'serie': serie,
+        'numero': numero,
+    }
+
+
+def find_comprobante_by_filename(filename):
+    """Busca el comprobante correspondiente a un nombre de archivo SUNAT"""
+    from .models import Comprobante
+
+    lookup = parse_nombre_archivo(filename)
+    if lookup is None:
+        return None
+    return Comprobante.objects.filter(**lookup).order_by('-id').first()
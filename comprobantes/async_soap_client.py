@@ -0,0 +1,179 @@
+# comprobantes/async_soap_client.py
+
+import os
+import asyncio
+import logging
+from django.conf import settings
+
+from .soap_client import SUNATSoapClient, Base64Body
+from .resilience import CircuitOpenError, get_endpoint_guard, is_caller_timeout
+from .sunat_faults import classify_exception, classify_http_result, is_endpoint_failure
+
+# Cliente HTTP asíncrono opcional (HTTP/2 requiere además el paquete h2)
+try:
+    import httpx
+    HTTPX_AVAILABLE = True
+except ImportError:
+    HTTPX_AVAILABLE = False
+
+try:
+    import h2  # noqa: F401
+    HTTP2_AVAILABLE = True
+except ImportError:
+    HTTP2_AVAILABLE = False
+
+logger = logging.getLogger(__name__)
+
+
+def get_async_config():
+    return settings.SUNAT_CONFIG.get('ASYNC_CLIENT', {})
+
+
+class AsyncSUNATSoapClient:
+    """
+    Cliente SOAP asíncrono para SUNAT con la misma semántica que SUNATSoapClient.
+
+    Un solo proceso mantiene cientos de llamadas en vuelo sobre conexiones keep-alive
+    (opcionalmente HTTP/2). La concurrencia se limita con un semáforo y cada llamada
+    acepta su propio timeout. Los sobres y el procesamiento de respuestas se delegan
+    en SUNATSoapClient, por lo que ambos clientes producen los mismos resultados.
+
+    Uso:
+        async with AsyncSUNATSoapClient() as client:
+            results = await asyncio.gather(*(client.send_bill(x, z, zip_content=c) for x, z, c in docs))
+    """
+
+    def __init__(self, soap_client=None, max_concurrency=None, timeout=None, http2=None):
+        if not HTTPX_AVAILABLE:
+            raise ImportError('httpx es requerido para AsyncSUNATSoapClient (pip install httpx)')
+
+        config = get_async_config()
+        self.soap_client = soap_client or SUNATSoapClient()
+        self.max_concurrency = max_concurrency or config.get('MAX_CONCURRENCY', 100)
+        self.timeout = timeout or config.get('TIMEOUT', 30)
+
+        http2 = config.get('HTTP2', False) if http2 is None else http2
+        if http2 and not HTTP2_AVAILABLE:
+            logger.warning("HTTP/2 solicitado pero el paquete h2 no está instalado; se usará HTTP/1.1")
+            http2 = False
+
+        self.client = httpx.AsyncClient(
+            http2=http2,
+            timeout=self.timeout,
+            limits=httpx.Limits(
+                max_connections=config.get('MAX_CONNECTIONS', self.max_concurrency),
+                max_keepalive_connections=config.get('MAX_CONNECTIONS', self.max_concurrency),
+            ),
+        )
+        self.semaphore = asyncio.Semaphore(self.max_concurrency)
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        await self.aclose()
+
+    async def aclose(self):
+        await self.client.aclose()
+
+    @property
+    def url(self):
+        return self.soap_client.url
+
+    async def post(self, soap_envelope, headers, timeout=None, soap_client=None, deadline=None):
+        """
+        POST del sobre SOAP respetando el límite de llamadas concurrentes del cliente, el
+        límite de tasa del emisor y el circuito/limitador adaptativo del endpoint
+        (compartidos con SUNATSoapClient). soap_client indica el emisor (credenciales y URL).
+
+        Con deadline, las esperas y el timeout de la llamada se recortan a lo que queda del
+        plazo; sin tiempo suficiente se lanza DeadlineExceeded sin tomar turno ni cupo.
+        """
+        soap_client = soap_client or self.soap_client
+        if deadline is not None:
+            deadline.check()
+        if isinstance(soap_envelope, Base64Body):
+            # httpx trataría el cuerpo como iterable síncrono; Content-Length ya viene en headers
+            soap_envelope = soap_envelope.aiter()
+        async with self.semaphore:
+            if deadline is not None:
+                deadline.check()
+            if soap_client.rate_limiter is not None:
+                await soap_client.rate_limiter.aacquire(deadline)
+            guard = get_endpoint_guard(soap_client.url)
+            started = await guard.aacquire(deadline)
+            ok = None
+            call_timeout = None
+            try:
+                call_timeout = timeout or self.timeout
+                if deadline is not None:
+                    # Recalculado tras las esperas de tasa y cupo
+                    deadline.check()
+                    call_timeout = deadline.cap(call_timeout)
+                response = await self.client.post(
+                    soap_client.url,
+                    content=soap_envelope,
+                    headers=headers,
+                    timeout=call_timeout,
+                )
+                ok = not is_endpoint_failure(classify_http_result(response.status_code, response.content))
+                return response
+            except Exception as e:
+                # Un timeout más corto que el del cliente lo puso el llamador: no es falla del endpoint
+                shortened = call_timeout is not None and call_timeout < self.timeout
+                if not is_caller_timeout(e, httpx.TimeoutException, shortened):
+                    ok = not is_endpoint_failure(classify_exception(e))
+                raise
+            finally:
+                guard.release(started, ok)
+
+    async def _send_file(self, method, zip_filename, zip_content, timeout, soap_client, deadline=None):
+        soap_client = soap_client or self.soap_client
+        soap_envelope, headers = soap_client.build_file_request(method, zip_filename, zip_content)
+        response = await self.post(soap_envelope, headers, timeout, soap_client, deadline)
+        return soap_client.handle_http_response(
+            response.status_code, response.content, os.path.splitext(zip_filename)[0]
+        )
+
+    async def send_bill(self, xml_filename, zip_filename, zip_content, timeout=None, soap_client=None,
+                        deadline=None):
+        """Envía un comprobante con sendBill (soap_client: cliente del emisor, por defecto el del constructor)"""
+        try:
+            logger.info(f"Enviando comprobante a SUNAT (async): {zip_filename}")
+            return await self._send_file('sendBill', zip_filename, zip_content, timeout, soap_client, deadline)
+        except Exception as e:
+            logger.error(f"Error enviando a SUNAT: {str(e) or type(e).__name__}")
+            return {
+                'success': False,
+                'error': str(e) or type(e).__name__,
+                'fault_class': classify_exception(e),
+                'circuit_open': isinstance(e, CircuitOpenError)
+            }
+
+    async def send_summary(self, xml_filename, zip_filename, zip_content, timeout=None, soap_client=None,
+                           deadline=None):
+        """Envía un resumen con sendSummary"""
+        try:
+            return await self._send_file('sendSummary', zip_filename, zip_content, timeout, soap_client, deadline)
+        except Exception as e:
+            return {
+                'success': False,
+                'error': str(e) or type(e).__name__,
+                'fault_class': classify_exception(e),
+                'circuit_open': isinstance(e, CircuitOpenError)
+            }
+
+    async def get_status(self, ticket, timeout=None, soap_client=None, deadline=None):
+        """Consulta el estado de un ticket con getStatus"""
+        try:
+            soap_client = soap_client or self.soap_client
+            soap_envelope, headers = soap_client.build_status_request(ticket)
+            response = await self.post(soap_envelope, headers, timeout, soap_client, deadline)
+            return soap_client.handle_http_response(response.status_code, response.content, ticket)
+        except Exception as e:
+            return {
+                'success': False,
+                'error': str(e) or type(e).__name__,
+                'fault_class': classify_exception(e),
+                'circuit_open': isinstance(e, CircuitOpenError)
+            }
@@ -0,0 +1,106 @@
+# comprobantes/blobstore.py
+
+import hashlib
+import logging
+from django.core.files.base import ContentFile
+from django.db import transaction
+from django.db.models import F
+
+from .models import ArtifactBlob, ArtifactReference
+from .storage import get_artifact_storage
+
+logger = logging.getLogger(__name__)
+
+
+def get_blob_name(sha256):
+    """Nombre del contenido de un blob en el almacenamiento de artefactos"""
+    return f'blobs/{sha256[:2]}/{sha256[2:4]}/{sha256}'
+
+
+def write_blob_file(sha256, content):
+    """
+    Escribe el contenido del blob si no existe en el almacenamiento (o quedó con otro tamaño).
+    El backend escribe de forma atómica, por lo que la operación es idempotente.
+    """
+    storage = get_artifact_storage()
+    name = get_blob_name(sha256)
+    if not storage.exists(name) or storage.size(name) != len(content):
+        storage.save(name, ContentFile(content))
+    return name
+
+
+def put_blob(content):
+    """
+    Guarda el contenido y retorna su ArtifactBlob. Contenido repetido no ocupa disco extra.
+
+    El archivo se escribe (o se verifica) con la fila del blob bloqueada: delete_blob toma el
+    mismo bloqueo, así que la recolección no puede borrar el archivo entre la verificación y
+    el alta de la referencia. Llamarla dentro de la transacción que enlaza el blob
+    (store_artifact) para mantener el bloqueo hasta que el refcount se incrementa.
+    """
+    sha256 = hashlib.sha256(content).hexdigest()
+    with transaction.atomic():
+        ArtifactBlob.objects.get_or_create(sha256=sha256, defaults={'size': len(content)})
+        blob = ArtifactBlob.objects.select_for_update().get(sha256=sha256)
+        write_blob_file(sha256, content)
+    return blob
+
+
+def link_blob(comprobante, kind, blob, filename):
+    """
+    Apunta la referencia (comprobante, kind) al blob indicado, ajustando los refcount.
+    Si la referencia ya apunta al mismo blob no se modifica nada.
+    """
+    with transaction.atomic():
+        reference = ArtifactReference.objects.select_for_update().filter(
+            comprobante=comprobante, kind=kind
+        ).first()
+
+        if reference is not None and reference.blob_id == blob.sha256:
+            return reference
+
+        previous_blob_id = reference.blob_id if reference is not None else None
+
+        if reference is None:
+            reference = ArtifactReference(comprobante=comprobante, kind=kind)
+        reference.blob = blob
+        reference.filename = filename
+        reference.save()
+
+        ArtifactBlob.objects.filter(sha256=blob.sha256).update(refcount=F('refcount') + 1)
+        if previous_blob_id:
+            ArtifactBlob.objects.filter(sha256=previous_blob_id, refcount__gt=0).update(
+                refcount=F('refcount') - 1
+            )
+
+    return reference
+
+
+def store_artifact(comprobante, kind, content, filename):
+    """Guarda un artefacto en el almacén direccionado por contenido y retorna el blob"""
+    with transaction.atomic():
+        blob = put_blob(content)
+        link_blob(comprobante, kind, blob, filename)
+    logger.info(f"Artefacto {kind} de {comprobante} guardado en blob {blob.sha256[:12]}")
+    return blob
+
+
+def release_reference(reference):
+    """Descuenta la referencia de su blob (usado al eliminar referencias)"""
+    ArtifactBlob.objects.filter(sha256=reference.blob_id, refcount__gt=0).update(
+        refcount=F('refcount') - 1
+    )
+
+
+def delete_blob(sha256):
+    """
+    Elimina un blob sin referencias. La fila se bloquea y se borra (solo si sigue con
+    refcount 0) y el archivo se elimina antes de liberar el bloqueo: un put_blob concurrente
+    espera y vuelve a escribir el archivo, en lugar de enlazar un blob sin contenido.
+    """
+    with transaction.atomic():
+        if not ArtifactBlob.objects.select_for_update().filter(sha256=sha256, refcount=0).exists():
+            return False
+        ArtifactBlob.objects.filter(sha256=sha256, refcount=0).delete()
+        get_artifact_storage().delete(get_blob_name(sha256))
+    return True
@@ -0,0 +1,283 @@
+# comprobantes/daily_summaries.py
+
+import logging
+from datetime import timedelta
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.db import transaction
+from django.db.models import F, Q
+from django.utils import timezone
+
+from .models import Comprobante, CorrelativoDiario, ResumenDiario, SUNATConfiguration
+from .storage import get_artifact_storage
+from .utils import build_zip_bytes, escape_xml, firmar_xml_content
+
+logger = logging.getLogger(__name__)
+
+SUMMARY_NS = 'urn:sunat:names:specification:ubl:peru:schema:xsd:SummaryDocuments-1'
+SAC_NS = 'urn:sunat:names:specification:ubl:peru:schema:xsd:SunatAggregateComponents-1'
+CAC_NS = 'urn:oasis:names:specification:ubl:schema:xsd:CommonAggregateComponents-2'
+CBC_NS = 'urn:oasis:names:specification:ubl:schema:xsd:CommonBasicComponents-2'
+EXT_NS = 'urn:oasis:names:specification:ubl:schema:xsd:CommonExtensionComponents-2'
+DS_NS = 'http://www.w3.org/2000/09/xmldsig#'
+
+# SUNAT admite correlativos de hasta 5 dígitos por emisor, tipo (RC/RA) y día de generación
+MAX_CORRELATIVO = 99999
+
+# Campos del comprobante que necesita una línea del resumen (el XML de la boleta no se lee)
+LINE_FIELDS = ('id', 'ruc_emisor', 'tipo_comprobante', 'serie', 'numero', 'ruc_cliente',
+               'total_gravado', 'total_igv', 'total', 'estado')
+
+
+def get_summary_config():
+    return settings.SUNAT_CONFIG.get('DAILY_SUMMARY', {})
+
+
+def is_summary_enabled():
+    return get_summary_config().get('ENABLED', True)
+
+
+def summary_document_filter():
+    """
+    Boletas: se informan en el resumen diario. Las notas de crédito/débito que las modifican
+    (serie B) quedan fuera hasta que se guarde el comprobante al que se refieren
+    (cac:BillingReference); se envían una por una con sendBill.
+    """
+    return Q(tipo_comprobante='03')
+
+
+def boleta_note_filter():
+    """Notas de crédito/débito de boletas (serie B)"""
+    return Q(tipo_comprobante__in=['07', '08'], serie__startswith='B')
+
+
+def is_summary_document(comprobante):
+    return comprobante.tipo_comprobante == '03'
+
+
+def summary_candidates(fecha=None, ruc_emisor=None, hasta=None):
+    """
+    Boletas GENERADO sin resumen asignado (o asignado a un resumen que quedó en PREPARANDO más
+    de CLAIM_TIMEOUT segundos), emitidas (fecha_emision) el día fecha o, sin fecha, hasta el
+    día hasta inclusive (por defecto hoy). Se buscan por el índice estado + tipo + fecha.
+    """
+    stale_before = timezone.now() - timedelta(seconds=get_summary_config().get('CLAIM_TIMEOUT', 600))
+    queryset = Comprobante.objects.filter(summary_document_filter(), estado='GENERADO').filter(
+        Q(resumen__isnull=True) | Q(resumen__estado='PREPARANDO', resumen__fecha_creacion__lt=stale_before)
+    )
+    if fecha is not None:
+        queryset = queryset.filter(fecha_emision=fecha)
+    else:
+        queryset = queryset.filter(fecha_emision__lte=hasta or timezone.localdate())
+    if ruc_emisor:
+        queryset = queryset.filter(ruc_emisor=ruc_emisor)
+    return queryset
+
+
+def group_summary_candidates(queryset, max_lines=None):
+    """
+    Agrupa los candidatos por emisor y fecha de emisión en listas de hasta max_lines ids.
+    Las filas se recorren por cursor ordenadas por emisor y fecha, de modo que en memoria
+    solo está el grupo en curso. Retorna [(ruc_emisor, fecha, [ids]), ...].
+    """
+    max_lines = max_lines or get_summary_config().get('MAX_LINES', 500)
+    groups = []
+    key = None
+    ids = []
+    rows = queryset.order_by('ruc_emisor', 'fecha_emision', 'id').values_list('ruc_emisor', 'fecha_emision', 'id')
+    for ruc_emisor, fecha_emision, comprobante_id in rows.iterator(chunk_size=2000):
+        row_key = (ruc_emisor, fecha_emision)
+        if row_key != key or len(ids) >= max_lines:
+            if ids:
+                groups.append((*key, ids))
+            key, ids = row_key, []
+        ids.append(comprobante_id)
+    if ids:
+        groups.append((*key, ids))
+    return groups
+
+
+def next_correlativo(ruc_emisor, tipo, fecha):
+    """
+    Siguiente correlativo del emisor para documentos tipo (RC o RA) generados el día fecha.
+    Llamarla dentro de la transacción que crea el documento: la fila del contador queda
+    bloqueada hasta el commit, así dos procesos no obtienen el mismo número. Lanza ValueError
+    si el emisor ya usó los MAX_CORRELATIVO del día.
+    """
+    CorrelativoDiario.objects.get_or_create(ruc_emisor=ruc_emisor, tipo=tipo, fecha=fecha)
+    counter = CorrelativoDiario.objects.select_for_update().get(ruc_emisor=ruc_emisor, tipo=tipo, fecha=fecha)
+    if counter.ultimo >= MAX_CORRELATIVO:
+        raise ValueError(f'{ruc_emisor} agotó los correlativos {tipo} del {fecha:%Y-%m-%d} ({MAX_CORRELATIVO})')
+    CorrelativoDiario.objects.filter(id=counter.id).update(ultimo=F('ultimo') + 1)
+    return counter.ultimo + 1
+
+
+def document_name(ruc_emisor, tipo, documento):
+    """
+    Nombre RUC-TIPO-AAAAMMDD-correlativo del resumen o la baja, con la fecha de generación del
+    documento y el siguiente correlativo del emisor para ese día (ver next_correlativo)
+    """
+    generated = timezone.localdate(documento.fecha_creacion)
+    return f"{ruc_emisor}-{tipo}-{generated:%Y%m%d}-{next_correlativo(ruc_emisor, tipo, generated)}"
+
+
+def claim_summary(ruc_emisor, fecha, comprobante_ids):
+    """
+    Crea el resumen y le asigna los comprobantes que siguen disponibles con un UPDATE
+    condicional (dos procesos no pueden informar el mismo comprobante), en una transacción
+    con su correlativo. Retorna (resumen, comprobantes asignados, solo con los campos de LINE_FIELDS).
+    """
+    with transaction.atomic():
+        resumen = ResumenDiario.objects.create(ruc_emisor=ruc_emisor, fecha_emision=fecha)
+        claimed = summary_candidates(fecha, ruc_emisor).filter(id__in=comprobante_ids).update(resumen=resumen)
+        comprobantes = list(
+            Comprobante.objects.filter(resumen=resumen, estado='GENERADO').only(*LINE_FIELDS).order_by('id')
+        )
+        # El correlativo se toma al final (el contador del emisor queda bloqueado lo menos posible)
+        # y solo si hay algo que enviar: un resumen vacío no gasta un número
+        if comprobantes:
+            resumen.nombre_archivo = document_name(ruc_emisor, 'RC', resumen)
+        resumen.total_comprobantes = len(comprobantes)
+        resumen.save(update_fields=['nombre_archivo', 'total_comprobantes'])
+    logger.info(f"Resumen {resumen.nombre_archivo}: {claimed} comprobantes asignados")
+    return resumen, comprobantes
+
+
+def get_razon_social(ruc_emisor):
+    """Nombre del emisor para el resumen: el de su SUNATConfiguration activa, si la hay"""
+    configuration = SUNATConfiguration.objects.filter(
+        ruc_emisor=ruc_emisor, is_active=True
+    ).order_by('-id').only('name').first()
+    return configuration.name if configuration is not None else ''
+
+
+def customer_document(ruc_cliente):
+    """(tipo de documento del catálogo 06, número) del cliente de una boleta"""
+    numero = (ruc_cliente or '').strip()
+    if len(numero) == 11 and numero.isdigit():
+        return '6', numero
+    if len(numero) == 8 and numero.isdigit():
+        return '1', numero
+    return '0', numero or '-'
+
+
+def build_summary_line(line_id, comprobante, condition_code='1', moneda='PEN'):
+    """
+    SummaryDocumentsLine de un comprobante. condition_code (catálogo 19): 1 adicionar,
+    2 modificar, 3 anular
+    """
+    tipo_doc, numero_doc = customer_document(comprobante.ruc_cliente)
+    return f'''
+  <sac:SummaryDocumentsLine>
+    <cbc:LineID>{line_id}</cbc:LineID>
+    <cbc:DocumentTypeCode>{comprobante.tipo_comprobante}</cbc:DocumentTypeCode>
+    <cbc:ID>{escape_xml(comprobante.serie)}-{escape_xml(comprobante.numero)}</cbc:ID>
+    <cac:AccountingCustomerParty>
+      <cbc:CustomerAssignedAccountID>{escape_xml(numero_doc)}</cbc:CustomerAssignedAccountID>
+      <cbc:AdditionalAccountID>{tipo_doc}</cbc:AdditionalAccountID>
+    </cac:AccountingCustomerParty>
+    <cac:Status>
+      <cbc:ConditionCode>{condition_code}</cbc:ConditionCode>
+    </cac:Status>
+    <sac:TotalAmount currencyID="{moneda}">{comprobante.total:.2f}</sac:TotalAmount>
+    <sac:BillingPayment>
+      <cbc:PaidAmount currencyID="{moneda}">{comprobante.total_gravado:.2f}</cbc:PaidAmount>
+      <cbc:InstructionID>01</cbc:InstructionID>
+    </sac:BillingPayment>
+    <cac:TaxTotal>
+      <cbc:TaxAmount currencyID="{moneda}">{comprobante.total_igv:.2f}</cbc:TaxAmount>
+      <cac:TaxSubtotal>
+        <cbc:TaxAmount currencyID="{moneda}">{comprobante.total_igv:.2f}</cbc:TaxAmount>
+        <cac:TaxCategory>
+          <cac:TaxScheme>
+            <cbc:ID>1000</cbc:ID>
+            <cbc:Name>IGV</cbc:Name>
+            <cbc:TaxTypeCode>VAT</cbc:TaxTypeCode>
+          </cac:TaxScheme>
+        </cac:TaxCategory>
+      </cac:TaxSubtotal>
+    </cac:TaxTotal>
+  </sac:SummaryDocumentsLine>'''
+
+
+def build_summary_header(root, namespace, customization_id, documento, razon_social='', issue_date=None):
+    """
+    Apertura y cabecera de un resumen (SummaryDocuments o VoidedDocuments) sin firmar. documento
+    es el ResumenDiario o ComunicacionBaja: ReferenceDate es la fecha de emisión de los
+    comprobantes e IssueDate la de generación del documento.
+    """
+    issue_date = issue_date or timezone.localdate(documento.fecha_creacion)
+    ruc = documento.ruc_emisor
+    razon_social = escape_xml(razon_social)
+    return f'''<?xml version="1.0" encoding="UTF-8"?>
+<{root} xmlns="{namespace}" xmlns:cac="{CAC_NS}" xmlns:cbc="{CBC_NS}" xmlns:ds="{DS_NS}" xmlns:ext="{EXT_NS}" xmlns:sac="{SAC_NS}">
+  <ext:UBLExtensions>
+    <ext:UBLExtension>
+      <ext:ExtensionContent/>
+    </ext:UBLExtension>
+  </ext:UBLExtensions>
+  <cbc:UBLVersionID>2.0</cbc:UBLVersionID>
+  <cbc:CustomizationID>{customization_id}</cbc:CustomizationID>
+  <cbc:ID>{documento.identificador}</cbc:ID>
+  <cbc:ReferenceDate>{documento.fecha_emision:%Y-%m-%d}</cbc:ReferenceDate>
+  <cbc:IssueDate>{issue_date:%Y-%m-%d}</cbc:IssueDate>
+  <cac:Signature>
+    <cbc:ID>{documento.identificador}</cbc:ID>
+    <cac:SignatoryParty>
+      <cac:PartyIdentification>
+        <cbc:ID>{ruc}</cbc:ID>
+      </cac:PartyIdentification>
+      <cac:PartyName>
+        <cbc:Name>{razon_social}</cbc:Name>
+      </cac:PartyName>
+    </cac:SignatoryParty>
+    <cac:DigitalSignatureAttachment>
+      <cac:ExternalReference>
+        <cbc:URI>#SignatureSP</cbc:URI>
+      </cac:ExternalReference>
+    </cac:DigitalSignatureAttachment>
+  </cac:Signature>
+  <cac:AccountingSupplierParty>
+    <cbc:CustomerAssignedAccountID>{ruc}</cbc:CustomerAssignedAccountID>
+    <cbc:AdditionalAccountID>6</cbc:AdditionalAccountID>
+    <cac:Party>
+      <cac:PartyLegalEntity>
+        <cbc:RegistrationName>{razon_social}</cbc:RegistrationName>
+      </cac:PartyLegalEntity>
+    </cac:Party>
+  </cac:AccountingSupplierParty>'''
+
+
+def build_summary_xml(resumen, comprobantes, razon_social='', issue_date=None, condition_code=None):
+    """
+    XML SummaryDocuments (UBL 2.0, personalización 1.1) del resumen, sin firmar: una línea
+    por comprobante con la condición del resumen (1 adicionar, 3 anular) salvo que se indique otra
+    """
+    condition_code = condition_code or resumen.condicion
+    parts = [build_summary_header('SummaryDocuments', SUMMARY_NS, '1.1', resumen, razon_social, issue_date)]
+    parts.extend(
+        build_summary_line(line_id, comprobante, condition_code)
+        for line_id, comprobante in enumerate(comprobantes, 1)
+    )
+    parts.append('''
+</SummaryDocuments>''')
+    return ''.join(parts)
+
+
+def build_summary_zip(resumen, comprobantes, razon_social=''):
+    """
+    XML del resumen firmado con el certificado configurado y su ZIP. Retorna (xml, contenido
+    del ZIP); lanza SigningError si no se puede firmar.
+    """
+    xml_content = firmar_xml_content(build_summary_xml(resumen, comprobantes, razon_social))
+    return xml_content, build_zip_bytes(resumen.get_xml_filename(), xml_content)
+
+
+def save_summary_cdr(resumen, cdr_zip_content, folder='resumenes'):
+    """
+    Guarda una sola vez el CDR del resumen (o de la comunicación de baja, en folder='bajas');
+    los comprobantes de un resumen apuntan a la misma ruta en cdr_zip_path (el XML se extrae
+    del ZIP al descargarlo, ver artifacts.extract_cdr_xml)
+    """
+    name = f"cdr/{folder}/{resumen.ruc_emisor}/R-{resumen.get_zip_filename()}"
+    return get_artifact_storage().save(name, ContentFile(cdr_zip_content))
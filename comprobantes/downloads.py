@@ -0,0 +1,229 @@
+# comprobantes/downloads.py
+
+import io
+import re
+import zlib
+import hashlib
+from django.conf import settings
+from django.core.files.storage import FileSystemStorage
+from django.http import FileResponse, HttpResponse, StreamingHttpResponse
+from django.utils.cache import get_conditional_response, patch_vary_headers
+
+from .artifacts import ARTIFACT_FIELDS, open_artifact
+from .storage import get_artifact_storage
+from .packs import parse_locator
+
+ACCEPTS_GZIP = re.compile(r'\bgzip\b')
+RANGE_HEADER = re.compile(r'^bytes=(\d*)-(\d*)$')
+
+# Tamaño de bloque al hashear y transmitir artefactos
+BLOCK_SIZE = 64 * 1024
+
+
+def get_download_config():
+    return settings.SUNAT_CONFIG.get('XML_DOWNLOAD', {})
+
+
+def file_sha256(f):
+    """SHA-256 (hex) de un archivo abierto, leído por bloques desde la posición actual"""
+    digest = hashlib.sha256()
+    for block in iter(lambda: f.read(BLOCK_SIZE), b''):
+        digest.update(block)
+    return digest.hexdigest()
+
+
+def get_xml_digest(comprobante):
+    """
+    SHA-256 del XML del comprobante (ETag fuerte).
+    Comprobantes anteriores a xml_sha256 lo calculan una vez y lo guardan.
+    """
+    if comprobante.xml_sha256:
+        return comprobante.xml_sha256
+
+    with open_artifact(comprobante, 'xml') as f:
+        digest = file_sha256(f)
+    type(comprobante).objects.filter(id=comprobante.id).update(xml_sha256=digest)
+    comprobante.xml_sha256 = digest
+    return digest
+
+
+def get_local_name(comprobante, kind):
+    """
+    Nombre del artefacto si es un archivo suelto en disco local (servible por el proxy),
+    o None si vive en un pack, en un backend remoto o se regenera bajo demanda.
+    """
+    name = getattr(comprobante, ARTIFACT_FIELDS[kind])
+    if not name or parse_locator(name) is not None:
+        return None
+    if not isinstance(get_artifact_storage(), FileSystemStorage):
+        return None
+    return str(name)
+
+
+def sendfile_response(name, content_type):
+    """
+    Respuesta vacía que delega el envío del archivo al proxy (nginx o apache).
+    Content-Type va explícito porque los blobs por contenido no tienen extensión.
+    """
+    config = get_download_config()
+    backend = config.get('SENDFILE')
+    response = HttpResponse(content_type=content_type)
+
+    if backend == 'nginx':
+        response['X-Accel-Redirect'] = config.get('SENDFILE_PREFIX', '/protected-media/').rstrip('/') + '/' + name
+    elif backend == 'apache':
+        response['X-Sendfile'] = get_artifact_storage().path(name)
+    else:
+        raise ValueError(f'Backend de sendfile no soportado: {backend}')
+    return response
+
+
+def parse_range(header, size):
+    """
+    Interpreta una cabecera Range de un solo rango.
+    Retorna (inicio, fin inclusivo), None si la cabecera no aplica (se responde completo),
+    o lanza ValueError si el rango no se puede satisfacer.
+    """
+    match = RANGE_HEADER.match(header.strip())
+    if not match:
+        return None
+
+    start, end = match.groups()
+    if not start and not end:
+        return None
+    if size == 0:
+        # Ningún rango (tampoco un sufijo) se puede satisfacer en un archivo vacío
+        raise ValueError('Archivo vacío')
+    if not start:
+        # Sufijo: los últimos N bytes
+        length = int(end)
+        if length == 0:
+            raise ValueError('Rango vacío')
+        return max(size - length, 0), size - 1
+
+    start = int(start)
+    end = min(int(end), size - 1) if end else size - 1
+    if start >= size or start > end:
+        raise ValueError('Rango fuera del archivo')
+    return start, end
+
+
+def iter_file_range(f, start, length):
+    """Transmite length bytes de f desde start por bloques y cierra el archivo al terminar"""
+    try:
+        f.seek(start)
+        while length > 0:
+            block = f.read(min(BLOCK_SIZE, length))
+            if not block:
+                break
+            length -= len(block)
+            yield block
+    finally:
+        f.close()
+
+
+def iter_gzip(f):
+    """Comprime f en formato gzip por bloques (sin cargarlo completo) y cierra el archivo al terminar"""
+    try:
+        compressor = zlib.compressobj(6, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+        for block in iter(lambda: f.read(BLOCK_SIZE), b''):
+            compressed = compressor.compress(block)
+            if compressed:
+                yield compressed
+        yield compressor.flush()
+    finally:
+        f.close()
+
+
+def artifact_download_response(request, comprobante, kind, filename, content_type):
+    """
+    Respuesta de descarga de un artefacto con ETag fuerte (digest del contenido),
+    If-None-Match -> 304, Range -> 206, gzip negociado y offload opcional al proxy.
+    El contenido se transmite por bloques desde el archivo o el slice del pack, sin cargarlo en memoria.
+    """
+    source = None
+    if kind == 'xml':
+        digest = get_xml_digest(comprobante)
+    else:
+        # Sin digest guardado: se calcula sobre el mismo archivo que luego se transmite
+        source = open_artifact(comprobante, kind)
+        digest = file_sha256(source)
+        source.seek(0)
+
+    try:
+        return _artifact_response(request, comprobante, kind, filename, content_type, digest, source)
+    except BaseException:
+        if source is not None:
+            source.close()
+        raise
+
+
+def _artifact_response(request, comprobante, kind, filename, content_type, digest, source):
+    """artifact_download_response con el digest calculado; toma posesión de source (archivo abierto o None)"""
+    etag = f'"{digest}"'
+
+    config = get_download_config()
+    range_header = request.META.get('HTTP_RANGE')
+    if_range = request.META.get('HTTP_IF_RANGE')
+    if range_header and if_range and if_range.strip() != etag:
+        range_header = None
+
+    local_name = get_local_name(comprobante, kind) if config.get('SENDFILE') else None
+    use_gzip = (
+        not range_header
+        and local_name is None
+        and config.get('GZIP', True)
+        and ACCEPTS_GZIP.search(request.META.get('HTTP_ACCEPT_ENCODING', ''))
+    )
+    if use_gzip:
+        # Cada representación tiene su propio ETag fuerte
+        etag = f'"{digest}-gzip"'
+
+    not_modified = get_conditional_response(request, etag=etag)
+    if not_modified is not None or local_name is not None:
+        if source is not None:
+            source.close()
+    if not_modified is not None:
+        not_modified['ETag'] = etag
+        patch_vary_headers(not_modified, ('Accept-Encoding',))
+        return not_modified
+
+    if local_name is not None:
+        # El proxy resuelve Range y compresión; Python no transmite el archivo
+        response = sendfile_response(local_name, content_type)
+    else:
+        if source is None:
+            source = open_artifact(comprobante, kind)
+        size = source.seek(0, io.SEEK_END)
+        source.seek(0)
+
+        byte_range = None
+        if range_header:
+            try:
+                byte_range = parse_range(range_header, size)
+            except ValueError:
+                source.close()
+                response = HttpResponse(status=416, content_type=content_type)
+                response['Content-Range'] = f'bytes */{size}'
+                return response
+
+        if byte_range is not None:
+            start, end = byte_range
+            response = StreamingHttpResponse(iter_file_range(source, start, end - start + 1),
+                                             status=206, content_type=content_type)
+            response['Content-Range'] = f'bytes {start}-{end}/{size}'
+            response['Content-Length'] = str(end - start + 1)
+        elif use_gzip:
+            response = StreamingHttpResponse(iter_gzip(source), content_type=content_type)
+            response['Content-Encoding'] = 'gzip'
+        else:
+            response = FileResponse(source, content_type=content_type)
+            response['Content-Length'] = str(size)
+
+    response['ETag'] = etag
+    response['Accept-Ranges'] = 'bytes'
+    # El contenido de un nombre puede cambiar si se regenera: el cliente revalida con el ETag
+    response['Cache-Control'] = 'private, no-cache'
+    response['Content-Disposition'] = f'attachment; filename="{filename}"'
+    patch_vary_headers(response, ('Accept-Encoding',))
+    return response
@@ -0,0 +1,133 @@
+# comprobantes/exports.py
+
+import logging
+import zipfile
+from contextlib import ExitStack
+from django.utils import timezone
+
+from .artifacts import open_artifact
+
+logger = logging.getLogger(__name__)
+
+CHUNK_SIZE = 64 * 1024
+
+
+class ZipStreamBuffer:
+    """
+    Destino no posicionable para zipfile: acumula lo escrito hasta que el generador lo entrega.
+    Sin seek(), zipfile escribe descriptores de datos después de cada entrada y nunca retrocede.
+    """
+
+    def __init__(self):
+        self.chunks = []
+        self.position = 0
+
+    def write(self, data):
+        self.chunks.append(bytes(data))
+        self.position += len(data)
+        return len(data)
+
+    def tell(self):
+        return self.position
+
+    def flush(self):
+        pass
+
+    def drain(self):
+        data = b''.join(self.chunks)
+        self.chunks.clear()
+        return data
+
+
+def comprobante_date_time(comprobante):
+    """Fecha de las entradas comprimidas al vuelo (la de creación del comprobante)"""
+    fecha = comprobante.fecha_creacion
+    if timezone.is_aware(fecha):
+        fecha = timezone.localtime(fecha)
+    return fecha.timetuple()[:6]
+
+
+def stream_member(zf, buffer, arcname, source, date_time):
+    """Comprime y escribe un archivo por bloques, entregando lo escrito después de cada bloque"""
+    info = zipfile.ZipInfo(arcname, date_time=date_time)
+    info.compress_type = zipfile.ZIP_DEFLATED
+    info.external_attr = 0o600 << 16
+    with zf.open(info, 'w') as target:
+        while True:
+            chunk = source.read(CHUNK_SIZE)
+            if not chunk:
+                break
+            target.write(chunk)
+            yield buffer.drain()
+    yield buffer.drain()
+
+
+def open_zip_member(stack, comprobante, zip_kind, member_name):
+    """
+    Abre para lectura el XML dentro del ZIP guardado (el archivo se registra en stack).
+    Retorna (miembro, ZipInfo) o None si el ZIP o el miembro no se pueden leer.
+    """
+    try:
+        source = stack.enter_context(open_artifact(comprobante, zip_kind))
+        source_zip = stack.enter_context(zipfile.ZipFile(source))
+        info = source_zip.getinfo(member_name)
+        return stack.enter_context(source_zip.open(info)), info
+    except KeyError:
+        return None
+    except (FileNotFoundError, zipfile.BadZipFile, NotImplementedError, RuntimeError) as e:
+        logger.warning(f"No se pudo leer {zip_kind} de {comprobante}: {str(e)}")
+        return None
+
+
+def export_entries(zf, buffer, comprobante, arcname, zip_kind, xml_kind, member_name):
+    """
+    Escribe el XML de un artefacto: leído por bloques desde su ZIP si existe,
+    o desde el XML guardado/regenerado. En ambos casos se comprime al vuelo con ZipFile.open().
+    """
+    if getattr(comprobante, 'zip_file' if zip_kind == 'zip' else 'cdr_zip_path'):
+        with ExitStack() as stack:
+            opened = open_zip_member(stack, comprobante, zip_kind, member_name)
+            if opened is not None:
+                member, info = opened
+                yield from stream_member(zf, buffer, arcname, member, info.date_time)
+                return True
+
+    try:
+        with open_artifact(comprobante, xml_kind) as source:
+            yield from stream_member(zf, buffer, arcname, source, comprobante_date_time(comprobante))
+        return True
+    except FileNotFoundError:
+        return False
+
+
+def stream_export_zip(queryset, incluir=('xml', 'cdr')):
+    """
+    Genera un ZIP con los XML y CDR de los comprobantes, bloque a bloque.
+    La memoria usada es constante: cada entrada se entrega a medida que se lee.
+    Los artefactos faltantes se listan en faltantes.txt al final del archivo.
+    """
+    buffer = ZipStreamBuffer()
+    missing = []
+
+    with zipfile.ZipFile(buffer, 'w', zipfile.ZIP_DEFLATED, allowZip64=True) as zf:
+        for comprobante in queryset.iterator(chunk_size=500):
+            nombre = comprobante.nombre_archivo
+
+            if 'xml' in incluir:
+                found = yield from export_entries(
+                    zf, buffer, comprobante, f'xml/{nombre}.xml', 'zip', 'xml', f'{nombre}.xml'
+                )
+                if not found:
+                    missing.append(f'{nombre}.xml')
+
+            if 'cdr' in incluir and (comprobante.cdr_zip_path or comprobante.cdr_xml_path):
+                found = yield from export_entries(
+                    zf, buffer, comprobante, f'cdr/R-{nombre}.xml', 'cdr_zip', 'cdr_xml', f'R-{nombre}.xml'
+                )
+                if not found:
+                    missing.append(f'R-{nombre}.xml')
+
+        if missing:
+            zf.writestr('faltantes.txt', '\n'.join(missing) + '\n')
+
+    yield buffer.drain()
@@ -0,0 +1,116 @@
+# comprobantes/http_sessions.py
+
+import os
+import threading
+import logging
+from urllib.parse import urlsplit
+from django.conf import settings
+import requests
+from requests.adapters import HTTPAdapter
+
+logger = logging.getLogger(__name__)
+
+
+def get_pool_config():
+    return settings.SUNAT_CONFIG.get('HTTP_POOL', {})
+
+
+def get_endpoint_key(url):
+    """Clave del pool: esquema + host + puerto del servicio"""
+    parts = urlsplit(url)
+    return f'{parts.scheme}://{parts.netloc}'
+
+
+class EndpointSessions:
+    """
+    Conexiones keep-alive hacia un endpoint SUNAT, compartidas por todos los hilos del proceso.
+
+    El HTTPAdapter (pool de urllib3, seguro entre hilos) es único por endpoint; cada hilo usa
+    su propia requests.Session montada sobre ese adapter, para no compartir cookies ni estado.
+    Las conexiones TLS se mantienen abiertas y se reutilizan, evitando un handshake por llamada.
+    """
+
+    def __init__(self, endpoint, pool_maxsize, pool_block):
+        self.endpoint = endpoint
+        self.adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_maxsize,
+                                   pool_block=pool_block, max_retries=0)
+        self.local = threading.local()
+
+    def get_session(self):
+        session = getattr(self.local, 'session', None)
+        if session is None:
+            session = requests.Session()
+            session.mount(self.endpoint, self.adapter)
+            self.local.session = session
+        return session
+
+    def stats(self):
+        """Conexiones abiertas vs. peticiones realizadas en el pool del endpoint"""
+        pools = self.adapter.poolmanager.pools
+        connections = requests_count = 0
+        for key in pools.keys():
+            pool = pools.get(key)
+            if pool is None:
+                continue
+            connections += pool.num_connections
+            requests_count += pool.num_requests
+        return {
+            'endpoint': self.endpoint,
+            'requests': requests_count,
+            'connections': connections,
+            'reused': max(requests_count - connections, 0),
+            'reuse_ratio': round(1 - connections / requests_count, 3) if requests_count else None,
+        }
+
+    def close(self):
+        self.adapter.close()
+
+
+_endpoints = {}
+_endpoints_pid = None
+_endpoints_lock = threading.Lock()
+
+
+def get_endpoint_sessions(url):
+    """
+    Pool de conexiones del proceso actual para el endpoint de la URL.
+    Después de un fork (p. ej. workers de gunicorn) se crean pools nuevos: los sockets
+    heredados del proceso padre no se comparten.
+    """
+    global _endpoints_pid
+    endpoint = get_endpoint_key(url)
+    pid = os.getpid()
+
+    if _endpoints_pid == pid:
+        sessions = _endpoints.get(endpoint)
+        if sessions is not None:
+            return sessions
+
+    with _endpoints_lock:
+        if _endpoints_pid != pid:
+            _endpoints.clear()
+            _endpoints_pid = pid
+
+        sessions = _endpoints.get(endpoint)
+        if sessions is None:
+            config = get_pool_config()
+            sessions = EndpointSessions(
+                endpoint,
+                pool_maxsize=config.get('POOL_MAXSIZE', 10),
+                pool_block=config.get('POOL_BLOCK', False),
+            )
+            _endpoints[endpoint] = sessions
+            logger.info(f"Pool HTTP creado para {endpoint} (pid {pid})")
+        return sessions
+
+
+def get_session(url):
+    """requests.Session del hilo actual con conexiones keep-alive hacia el endpoint de la URL"""
+    return get_endpoint_sessions(url).get_session()
+
+
+def get_connection_stats():
+    """Métricas de reutilización de conexiones de todos los endpoints del proceso"""
+    if _endpoints_pid != os.getpid():
+        return []
+    return [sessions.stats() for sessions in list(_endpoints.values())]
@@ -0,0 +1,188 @@
+# comprobantes/lazy_artifacts.py
+
+import re
+import json
+import hashlib
+import logging
+import threading
+from collections import OrderedDict
+from datetime import date, time
+from decimal import Decimal
+from django.conf import settings
+from django.utils import timezone
+
+from .utils import generate_ubl_xml, build_zip_bytes
+
+logger = logging.getLogger(__name__)
+
+# Artefactos que pueden regenerarse desde el payload
+LAZY_KINDS = ('xml', 'zip')
+
+SIGNATURE_PATTERN = re.compile(rb'<ds:Signature\b.*?</ds:Signature>', re.DOTALL)
+
+
+def get_lazy_config():
+    return settings.SUNAT_CONFIG.get('LAZY_ARTIFACTS', {})
+
+
+def is_lazy_enabled(tipo_comprobante):
+    """Indica si los artefactos de este tipo de comprobante se materializan bajo demanda"""
+    return tipo_comprobante in get_lazy_config().get('TIPOS', [])
+
+
+def _json_default(value):
+    if isinstance(value, Decimal):
+        return str(value)
+    if isinstance(value, (date, time)):
+        return value.isoformat()
+    raise TypeError(f'Tipo no serializable en el payload: {type(value).__name__}')
+
+
+def canonical_payload(data):
+    """JSON canónico (claves ordenadas, sin espacios) de los datos validados del comprobante"""
+    return json.dumps(data, sort_keys=True, separators=(',', ':'), ensure_ascii=False, default=_json_default)
+
+
+def extract_signature(xml_bytes):
+    """Bloque <ds:Signature> del XML firmado, o cadena vacía si no está firmado"""
+    match = SIGNATURE_PATTERN.search(xml_bytes)
+    return match.group(0).decode('utf-8') if match else ''
+
+
+def render_xml(payload, signature):
+    """Regenera el XML firmado a partir del payload canónico y la firma guardada"""
+    xml_bytes = generate_ubl_xml(json.loads(payload)).encode('utf-8')
+    if signature:
+        signature_bytes = signature.encode('utf-8')
+        xml_bytes = SIGNATURE_PATTERN.sub(lambda _: signature_bytes, xml_bytes, count=1)
+    return xml_bytes
+
+
+def zip_date_time(comprobante):
+    """Fecha fija de la entrada del ZIP para que el ZIP regenerado sea siempre idéntico"""
+    fecha = comprobante.fecha_creacion
+    if timezone.is_aware(fecha):
+        fecha = timezone.localtime(fecha)
+    return fecha.timetuple()[:6]
+
+
+class MaterializedCache:
+    """Caché LRU en memoria de artefactos regenerados, acotada por tamaño total en bytes"""
+
+    def __init__(self, max_bytes):
+        self.max_bytes = max_bytes
+        self.entries = OrderedDict()
+        self.total_bytes = 0
+        self.lock = threading.Lock()
+
+    def get(self, key):
+        with self.lock:
+            content = self.entries.get(key)
+            if content is not None:
+                self.entries.move_to_end(key)
+            return content
+
+    def put(self, key, content):
+        if len(content) > self.max_bytes:
+            return
+        with self.lock:
+            previous = self.entries.pop(key, None)
+            if previous is not None:
+                self.total_bytes -= len(previous)
+            self.entries[key] = content
+            self.total_bytes += len(content)
+            while self.total_bytes > self.max_bytes:
+                _, evicted = self.entries.popitem(last=False)
+                self.total_bytes -= len(evicted)
+
+    def discard(self, comprobante_id):
+        with self.lock:
+            for key in [k for k in self.entries if k[0] == comprobante_id]:
+                self.total_bytes -= len(self.entries.pop(key))
+
+
+_cache = None
+
+
+def get_cache():
+    global _cache
+    if _cache is None:
+        _cache = MaterializedCache(get_lazy_config().get('CACHE_MAX_BYTES', 32 * 1024 * 1024))
+    return _cache
+
+
+def persist_lazy_artifact(comprobante, data, xml_bytes):
+    """
+    Guarda el payload canónico y la firma en lugar del XML/ZIP.
+
+    Antes de descartar el XML se verifica que la regeneración sea idéntica byte a byte;
+    si no lo es retorna None y el llamador debe guardar los artefactos normalmente.
+    No llama a save() del comprobante: el llamador lo persiste.
+    """
+    from .models import LazyArtifact
+
+    payload = canonical_payload(data)
+    signature = extract_signature(xml_bytes)
+    xml_sha256 = hashlib.sha256(xml_bytes).hexdigest()
+
+    if hashlib.sha256(render_xml(payload, signature)).hexdigest() != xml_sha256:
+        logger.warning(f"La regeneración de {comprobante} no es idéntica; se guardarán los artefactos")
+        return None
+
+    lazy, _ = LazyArtifact.objects.update_or_create(
+        comprobante=comprobante,
+        defaults={
+            'payload': payload,
+            'signature': signature,
+            'xml_sha256': xml_sha256,
+            'xml_size': len(xml_bytes),
+        }
+    )
+    comprobante.xml_file = None
+    comprobante.zip_file = None
+    comprobante.xml_sha256 = xml_sha256
+    get_cache().discard(comprobante.id)
+    return lazy
+
+
+def discard_lazy_artifact(comprobante):
+    """Elimina el payload diferido cuando el comprobante vuelve a guardar sus artefactos"""
+    from .models import LazyArtifact
+
+    LazyArtifact.objects.filter(comprobante=comprobante).delete()
+    get_cache().discard(comprobante.id)
+
+
+def materialize_artifact(comprobante, kind):
+    """
+    Regenera el XML o ZIP de un comprobante diferido.
+    Retorna None si el comprobante no tiene payload diferido.
+    Lanza ValueError si el XML regenerado no coincide con el digest guardado.
+    """
+    from .models import LazyArtifact
+
+    try:
+        lazy = comprobante.lazy_artifact
+    except LazyArtifact.DoesNotExist:
+        return None
+
+    cache = get_cache()
+    key = (comprobante.id, kind, lazy.xml_sha256)
+    content = cache.get(key)
+    if content is not None:
+        return content
+
+    xml_bytes = cache.get((comprobante.id, 'xml', lazy.xml_sha256))
+    if xml_bytes is None:
+        xml_bytes = render_xml(lazy.payload, lazy.signature)
+        if hashlib.sha256(xml_bytes).hexdigest() != lazy.xml_sha256:
+            logger.error(f"XML regenerado de {comprobante} no coincide con el digest {lazy.xml_sha256}")
+            raise ValueError(f'El XML regenerado de {comprobante} no coincide con el original')
+        cache.put((comprobante.id, 'xml', lazy.xml_sha256), xml_bytes)
+
+    if kind == 'xml':
+        return xml_bytes
+
+    content = build_zip_bytes(comprobante.get_xml_filename(), xml_bytes, date_time=zip_date_time(comprobante))
+    cache.put(key, content)
+    return content
@@ -0,0 +1,53 @@
+# comprobantes/management/commands/audit_lazy_artifacts.py
+
+import hashlib
+from django.core.management.base import BaseCommand
+
+from comprobantes.models import LazyArtifact
+from comprobantes.lazy_artifacts import render_xml
+
+
+class Command(BaseCommand):
+    """Verifica que los comprobantes diferidos sigan regenerando su XML original"""
+
+    help = 'Regenera el XML de los comprobantes diferidos y lo compara con el digest guardado'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--tipo', default=None,
+                            help='Auditar solo este tipo de comprobante (p. ej. 03)')
+        parser.add_argument('--batch-size', type=int, default=500,
+                            help='Comprobantes por lote')
+        parser.add_argument('--desde-id', type=int, default=0,
+                            help='Reanudar a partir de este ID de artefacto diferido')
+
+    def handle(self, *args, **options):
+        queryset = LazyArtifact.objects.select_related('comprobante').order_by('id')
+        if options['tipo']:
+            queryset = queryset.filter(comprobante__tipo_comprobante=options['tipo'])
+
+        checked = mismatched = 0
+        last_id = options['desde_id']
+        while True:
+            batch = list(queryset.filter(id__gt=last_id)[:options['batch_size']])
+            if not batch:
+                break
+
+            for lazy in batch:
+                checked += 1
+                try:
+                    xml_bytes = render_xml(lazy.payload, lazy.signature)
+                    ok = hashlib.sha256(xml_bytes).hexdigest() == lazy.xml_sha256
+                except Exception as e:
+                    self.stderr.write(f'❌ Error regenerando {lazy.comprobante}: {str(e)}')
+                    ok = False
+                if not ok:
+                    mismatched += 1
+                    self.stderr.write(f'⚠️  XML regenerado distinto al original: {lazy.comprobante} (ID {lazy.comprobante_id})')
+
+            last_id = batch[-1].id
+            self.stdout.write(f'🔍 Auditados hasta ID {last_id} ({checked} comprobantes, {mismatched} diferencias)')
+
+        if mismatched:
+            self.stdout.write(self.style.ERROR(f'❌ {mismatched} de {checked} comprobantes no regeneran su XML original'))
+        else:
+            self.stdout.write(self.style.SUCCESS(f'✅ {checked} comprobantes diferidos verificados'))
@@ -0,0 +1,56 @@
+# comprobantes/management/commands/gc_artifact_blobs.py
+
+from datetime import timedelta
+from django.core.management.base import BaseCommand
+from django.db.models import Count
+from django.utils import timezone
+
+from comprobantes.models import ArtifactBlob
+from comprobantes.blobstore import delete_blob
+
+
+class Command(BaseCommand):
+    """Elimina los blobs de artefactos que ya no tienen referencias"""
+
+    help = 'Recolección de basura del almacén de artefactos por contenido (refcount = 0)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--grace-minutes', type=int, default=60,
+                            help='No eliminar blobs creados hace menos de estos minutos')
+        parser.add_argument('--reconcile', action='store_true',
+                            help='Recalcular los refcount a partir de las referencias antes de limpiar')
+        parser.add_argument('--dry-run', action='store_true',
+                            help='Mostrar los blobs a eliminar sin borrarlos')
+
+    def handle(self, *args, **options):
+        if options['reconcile']:
+            self.reconcile_refcounts()
+
+        cutoff = timezone.now() - timedelta(minutes=options['grace_minutes'])
+        candidates = ArtifactBlob.objects.filter(refcount=0, created_at__lt=cutoff).values_list('sha256', 'size')
+
+        deleted = 0
+        freed = 0
+        for sha256, size in candidates.iterator():
+            if options['dry_run']:
+                self.stdout.write(f'   {sha256} ({size} bytes)')
+                deleted += 1
+                freed += size
+            elif delete_blob(sha256):
+                deleted += 1
+                freed += size
+
+        action = 'a eliminar' if options['dry_run'] else 'eliminados'
+        self.stdout.write(self.style.SUCCESS(f'✅ Blobs {action}: {deleted} ({freed:,} bytes)'))
+
+    def reconcile_refcounts(self):
+        """Corrige los refcount que no coinciden con la cantidad real de referencias"""
+        fixed = 0
+        blobs = ArtifactBlob.objects.annotate(actual=Count('references')).values_list('sha256', 'refcount', 'actual')
+
+        for sha256, refcount, actual in blobs.iterator():
+            if refcount != actual:
+                ArtifactBlob.objects.filter(sha256=sha256).update(refcount=actual)
+                fixed += 1
+
+        self.stdout.write(f'🔧 Refcount corregidos: {fixed}')
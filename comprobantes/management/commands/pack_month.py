@@ -0,0 +1,100 @@
+# comprobantes/management/commands/pack_month.py
+
+from datetime import datetime
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from comprobantes.models import Comprobante, ArtifactReference
+from comprobantes.artifacts import (
+    ARTIFACT_FIELDS,
+    get_artifact_filename,
+    get_stored_artifact_name,
+    read_artifact,
+)
+from comprobantes.storage import get_artifact_storage
+from comprobantes.packs import get_pack_name, make_locator, parse_locator, write_pack
+
+
+class Command(BaseCommand):
+    """Empaqueta los artefactos de un mes cerrado en un único archivo pack"""
+
+    help = 'Empaqueta XML, ZIP y CDR de un mes cerrado en un pack append-only con índice ordenado'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--year', type=int, required=True)
+        parser.add_argument('--month', type=int, required=True)
+        parser.add_argument('--batch-size', type=int, default=1000,
+                            help='Comprobantes por lote escrito al pack')
+        parser.add_argument('--keep-files', action='store_true',
+                            help='No eliminar los archivos sueltos ni las referencias a blobs después de empaquetar')
+        parser.add_argument('--force', action='store_true',
+                            help='Permitir empaquetar el mes en curso')
+
+    def handle(self, *args, **options):
+        year, month = options['year'], options['month']
+        if not 1 <= month <= 12:
+            raise CommandError('El mes debe estar entre 1 y 12')
+
+        start = timezone.make_aware(datetime(year, month, 1))
+        end = timezone.make_aware(datetime(year + month // 12, month % 12 + 1, 1))
+        if end > timezone.now() and not options['force']:
+            raise CommandError(f'El mes {year:04d}-{month:02d} aún no está cerrado (use --force)')
+
+        pack_name = get_pack_name(year, month)
+        queryset = Comprobante.objects.filter(
+            fecha_creacion__gte=start, fecha_creacion__lt=end
+        ).order_by('id')
+
+        packed = 0
+        last_id = 0
+        while True:
+            batch = list(queryset.filter(id__gt=last_id)[:options['batch_size']])
+            if not batch:
+                break
+            packed += self.pack_batch(year, month, pack_name, batch, options['keep_files'])
+            last_id = batch[-1].id
+            self.stdout.write(f'📦 Procesados hasta ID {last_id} ({packed} artefactos empaquetados)')
+
+        self.stdout.write(self.style.SUCCESS(f'✅ Pack {pack_name} actualizado: {packed} artefactos nuevos'))
+
+    def pack_batch(self, year, month, pack_name, batch, keep_files):
+        """Escribe un lote al pack y recién después apunta los comprobantes al pack"""
+        pending = []
+        for comprobante in batch:
+            for kind, field_name in ARTIFACT_FIELDS.items():
+                name = getattr(comprobante, field_name)
+                if not name or parse_locator(name) is not None:
+                    continue
+                try:
+                    content = read_artifact(comprobante, kind)
+                except FileNotFoundError:
+                    self.stderr.write(f'⚠️  Artefacto no encontrado: {name}')
+                    continue
+                pending.append((comprobante, kind, field_name, get_artifact_filename(comprobante, kind), content))
+
+        if not pending:
+            return 0
+
+        # 1. Datos durables en el pack y nuevo índice publicado
+        try:
+            write_pack(year, month, ((key, content) for _, _, _, key, content in pending))
+        except ValueError as e:
+            # Dos comprobantes con el mismo nombre de archivo: no se apunta ninguno al pack
+            raise CommandError(f'No se pudo empaquetar el lote: {e}')
+
+        # 2. Los comprobantes apuntan al pack
+        for comprobante, kind, field_name, key, _ in pending:
+            loose_name = get_stored_artifact_name(comprobante, kind)
+            Comprobante.objects.filter(id=comprobante.id).update(**{field_name: make_locator(pack_name, key)})
+
+            # 3. Liberar el archivo suelto (o la referencia al blob, que luego limpia gc_artifact_blobs)
+            if keep_files:
+                continue
+            if settings.SUNAT_CONFIG.get('ARTIFACT_STORE', 'files') == 'cas':
+                for reference in ArtifactReference.objects.filter(comprobante=comprobante, kind=kind):
+                    reference.delete()
+            else:
+                get_artifact_storage().delete(loose_name)
+
+        return len(pending)
@@ -0,0 +1,56 @@
+# comprobantes/management/commands/poll_tickets.py
+
+import signal
+import threading
+
+from django.core.management.base import BaseCommand
+
+from comprobantes.sunat_integration import SUNATIntegration
+from comprobantes.ticket_polling import next_due_in
+
+
+class Command(BaseCommand):
+    """Programador de consultas de tickets: consulta solo los tickets vencidos y duerme hasta el próximo"""
+
+    help = 'Consulta los tickets pendientes (resúmenes y lotes) según su próxima consulta programada'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--once', action='store_true',
+                            help='Consultar los tickets vencidos una vez y terminar')
+        parser.add_argument('--batch-size', type=int, default=None,
+                            help='Tickets tomados por lote (por defecto TICKET_POLLING BATCH_SIZE)')
+        parser.add_argument('--workers', type=int, default=None,
+                            help='Consultas en paralelo (por defecto TICKET_POLLING WORKERS)')
+        parser.add_argument('--max-sleep', type=float, default=60.0,
+                            help='Espera máxima entre rondas, para detectar tickets nuevos')
+
+    def handle(self, *args, **options):
+        stop_event = threading.Event()
+
+        def stop(signum, frame):
+            stop_event.set()
+
+        signal.signal(signal.SIGINT, stop)
+        signal.signal(signal.SIGTERM, stop)
+
+        integration = SUNATIntegration()
+        while not stop_event.is_set():
+            summary = integration.check_pending_tickets(
+                batch_size=options['batch_size'], max_workers=options['workers']
+            )
+            if summary['total_checked']:
+                estados = {}
+                for result in summary['results']:
+                    estado = result.get('estado') or 'ERROR'
+                    estados[estado] = estados.get(estado, 0) + 1
+                self.stdout.write(f"🎫 Tickets consultados: {summary['total_checked']} {estados}")
+            if options['once']:
+                break
+
+            wait = next_due_in()
+            if wait is None or wait > options['max_sleep']:
+                wait = options['max_sleep']
+            stop_event.wait(wait)
+
+        self.stdout.write(self.style.SUCCESS('✅ Programador de tickets detenido' if not options['once']
+                                             else '✅ Consulta de tickets terminada'))
@@ -0,0 +1,84 @@
+# comprobantes/management/commands/reconcile_cdr.py
+
+from datetime import datetime
+from django.core.management.base import BaseCommand, CommandError
+
+from comprobantes.models import ResumenDiario
+from comprobantes.sunat_integration import SUNATIntegration
+
+
+def estado_list(value):
+    return [estado.strip().upper() for estado in value.split(',') if estado.strip()]
+
+
+class Command(BaseCommand):
+    """Recupera con getStatusCdr el CDR de comprobantes cuyo envío quedó sin respuesta"""
+
+    help = 'Consulta el CDR (getStatusCdr) de comprobantes ENVIANDO/ENVIADO/ERROR/GENERADO sin constancia y lo guarda'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--estados', type=estado_list, default=['ENVIANDO', 'ENVIADO', 'ERROR', 'GENERADO'],
+                            help='Estados a revisar, separados por coma (GENERADO: solo con un sendBill previo; '
+                                 'ENVIANDO: solo pasado CDR_RECONCILE SENDING_GRACE)')
+        parser.add_argument('--ruc', default=None,
+                            help='Revisar solo los comprobantes de este emisor')
+        parser.add_argument('--desde', default=None,
+                            help='Revisar solo comprobantes creados desde esta fecha (AAAA-MM-DD)')
+        parser.add_argument('--limit', type=int, default=None,
+                            help='Cantidad máxima de comprobantes a consultar')
+        parser.add_argument('--workers', type=int, default=None,
+                            help='Consultas en paralelo (por defecto CDR_RECONCILE WORKERS)')
+        parser.add_argument('--dry-run', action='store_true',
+                            help='Mostrar cuántos comprobantes se consultarían sin consultar')
+        parser.add_argument('--resumen', type=int, default=None,
+                            help='Conciliar este resumen SIN_RESPUESTA ya verificado en SUNAT (sin consultar CDR)')
+        parser.add_argument('--ticket', default=None,
+                            help='Con --resumen: ticket que SUNAT asignó al resumen; sin él, SUNAT no lo registró '
+                                 'y sus boletas vuelven a GENERADO')
+
+    def handle(self, *args, **options):
+        if options['resumen']:
+            result = SUNATIntegration().reconcile_summary(options['resumen'], options['ticket'])
+            if not result['success']:
+                raise CommandError(result['error'])
+            self.stdout.write(self.style.SUCCESS(f"✅ Resumen {result['resumen']}: {result['estado']}"))
+            return
+        if options['ticket']:
+            raise CommandError('--ticket requiere --resumen')
+
+        desde = None
+        if options['desde']:
+            try:
+                desde = datetime.strptime(options['desde'], '%Y-%m-%d')
+            except ValueError:
+                raise CommandError('--desde debe tener el formato AAAA-MM-DD')
+
+        integration = SUNATIntegration()
+        queryset = integration.reconcile_candidates(options['estados'], options['ruc'], desde)
+
+        if options['dry_run']:
+            total = queryset.count()
+            if options['limit']:
+                total = min(total, options['limit'])
+            self.stdout.write(self.style.SUCCESS(f'✅ Comprobantes a consultar: {total}'))
+            return
+
+        summary = integration.reconcile_cdrs(queryset, max_workers=options['workers'], limit=options['limit'])
+        for result in summary['results']:
+            if result['outcome'] == 'failed':
+                self.stdout.write(self.style.WARNING(
+                    f"   ⚠️  {result['comprobante_id']}: {result.get('error') or result.get('status_code')}"
+                ))
+            elif options['verbosity'] > 1:
+                self.stdout.write(f"   {result['comprobante_id']}: {result['estado_anterior']} -> {result['estado']}")
+
+        self.stdout.write(self.style.SUCCESS(
+            f"✅ Consultados: {summary['checked']} | CDR recuperados: {summary['recovered']} | "
+            f"no recibidos por SUNAT: {summary['not_found']} | sin respuesta: {summary['failed']}"
+        ))
+        unanswered = ResumenDiario.objects.filter(estado='SIN_RESPUESTA').values_list('id', 'nombre_archivo')
+        for resumen_id, nombre_archivo in unanswered:
+            self.stdout.write(self.style.WARNING(
+                f"   ⚠️  Resumen {nombre_archivo} sin respuesta de SUNAT: verificarlo y conciliarlo con "
+                f"--resumen {resumen_id} [--ticket <ticket>]"
+            ))
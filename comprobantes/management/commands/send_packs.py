@@ -0,0 +1,65 @@
+# comprobantes/management/commands/send_packs.py
+
+from django.core.management.base import BaseCommand
+
+from comprobantes.sunat_integration import SUNATIntegration
+from comprobantes.sunat_packs import get_pack_config, group_pack_candidates, pack_candidates
+
+
+class Command(BaseCommand):
+    """Agrupa los comprobantes GENERADO por emisor y los envía en lotes con sendPack"""
+
+    help = 'Envía comprobantes pendientes en lotes (sendPack) y/o consulta los tickets de lotes enviados'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--ruc', default=None,
+                            help='Enviar solo los comprobantes de este emisor')
+        parser.add_argument('--max-documentos', type=int, default=None,
+                            help='Comprobantes por lote (por defecto SEND_PACK MAX_DOCUMENTS)')
+        parser.add_argument('--max-bytes', type=int, default=None,
+                            help='Tamaño máximo del ZIP del lote (por defecto SEND_PACK MAX_BYTES)')
+        parser.add_argument('--consultar', action='store_true',
+                            help='Consultar además los tickets de los lotes pendientes')
+        parser.add_argument('--solo-consultar', action='store_true',
+                            help='Solo consultar los lotes pendientes, sin enviar nuevos')
+        parser.add_argument('--dry-run', action='store_true',
+                            help='Mostrar los lotes que se armarían sin enviarlos')
+
+    def handle(self, *args, **options):
+        integration = SUNATIntegration()
+
+        if options['dry_run']:
+            max_documents = options['max_documentos'] or get_pack_config().get('MAX_DOCUMENTS', 500)
+            groups = group_pack_candidates(pack_candidates(options['ruc']), max_documents)
+            for ruc, ids in groups:
+                self.stdout.write(f'   {ruc}: {len(ids)} comprobantes')
+            self.stdout.write(self.style.SUCCESS(f'✅ Lotes a enviar: {len(groups)}'))
+            return
+
+        if not options['solo_consultar']:
+            summary = integration.send_pending_packs(
+                ruc_emisor=options['ruc'],
+                max_documents=options['max_documentos'],
+                max_bytes=options['max_bytes'],
+            )
+            for result in summary['results']:
+                if result.get('success'):
+                    self.stdout.write(f"   📦 {result['pack']}: {len(result['comprobante_ids'])} comprobantes, "
+                                      f"ticket {result['ticket']}")
+                else:
+                    self.stdout.write(self.style.WARNING(
+                        f"   ⚠️  {result.get('pack') or result.get('ruc_emisor')}: {result.get('error')}"
+                    ))
+            self.stdout.write(self.style.SUCCESS(
+                f"✅ Lotes enviados: {summary['successful']}/{summary['total_packs']} "
+                f"({summary['comprobantes_sent']} comprobantes)"
+            ))
+
+        if options['consultar'] or options['solo_consultar']:
+            from comprobantes.models import SUNATPack
+
+            pending = SUNATPack.objects.filter(estado='ENVIADO_PENDIENTE').values_list('id', flat=True)
+            for pack_id in pending:
+                result = integration.check_pack_status(pack_id)
+                self.stdout.write(f"   🎫 {result.get('pack', pack_id)}: {result.get('estado')} "
+                                  f"{result.get('comprobantes_por_estado') or result.get('error') or ''}")
@@ -0,0 +1,58 @@
+# comprobantes/management/commands/send_summaries.py
+
+from datetime import date
+
+from django.core.management.base import BaseCommand, CommandError
+
+from comprobantes.daily_summaries import get_summary_config, group_summary_candidates, summary_candidates
+from comprobantes.sunat_integration import SUNATIntegration
+
+
+class Command(BaseCommand):
+    """Agrupa las boletas por emisor y fecha de emisión y las informa en resúmenes diarios (RC)"""
+
+    help = 'Envía los resúmenes diarios (sendSummary) de boletas pendientes; programar una vez al día'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--fecha', default=None,
+                            help='Fecha de emisión AAAA-MM-DD (por defecto, todas las pendientes hasta hoy)')
+        parser.add_argument('--ruc', default=None,
+                            help='Enviar solo los comprobantes de este emisor')
+        parser.add_argument('--max-lineas', type=int, default=None,
+                            help='Comprobantes por resumen (por defecto DAILY_SUMMARY MAX_LINES)')
+        parser.add_argument('--dry-run', action='store_true',
+                            help='Mostrar los resúmenes que se armarían sin enviarlos')
+
+    def handle(self, *args, **options):
+        fecha = None
+        if options['fecha']:
+            try:
+                fecha = date.fromisoformat(options['fecha'])
+            except ValueError:
+                raise CommandError(f"Fecha inválida: {options['fecha']} (formato AAAA-MM-DD)")
+
+        if options['dry_run']:
+            max_lines = options['max_lineas'] or get_summary_config().get('MAX_LINES', 500)
+            groups = group_summary_candidates(summary_candidates(fecha, options['ruc']), max_lines)
+            for ruc, fecha_emision, ids in groups:
+                self.stdout.write(f'   {ruc} {fecha_emision}: {len(ids)} comprobantes')
+            self.stdout.write(self.style.SUCCESS(f'✅ Resúmenes a enviar: {len(groups)}'))
+            return
+
+        summary = SUNATIntegration().send_daily_summaries(
+            fecha=fecha,
+            ruc_emisor=options['ruc'],
+            max_lines=options['max_lineas'],
+        )
+        for result in summary['results']:
+            if result.get('success'):
+                self.stdout.write(f"   🧾 {result['resumen']} ({result['fecha_emision']}): "
+                                  f"{len(result['comprobante_ids'])} comprobantes, ticket {result['ticket']}")
+            else:
+                self.stdout.write(self.style.WARNING(
+                    f"   ⚠️  {result.get('resumen') or result.get('ruc_emisor')}: {result.get('error')}"
+                ))
+        self.stdout.write(self.style.SUCCESS(
+            f"✅ Resúmenes enviados: {summary['successful']}/{summary['total_summaries']} "
+            f"({summary['comprobantes_sent']} comprobantes); los tickets los consulta poll_tickets"
+        ))
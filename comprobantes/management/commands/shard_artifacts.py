@@ -0,0 +1,106 @@
+# comprobantes/management/commands/shard_artifacts.py
+
+from concurrent.futures import ThreadPoolExecutor
+from django.core.management.base import BaseCommand
+from django.db import connection
+
+from comprobantes.models import Comprobante
+from comprobantes.artifacts import get_artifact_name
+from comprobantes.storage import get_artifact_storage
+
+
+class Command(BaseCommand):
+    """Mueve los XML/ZIP existentes al layout particionado ruc/yyyy/mm/hash"""
+
+    help = 'Migra los artefactos XML/ZIP al layout particionado (reanudable y en paralelo)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, default=8,
+                            help='Cantidad de hilos que mueven archivos en paralelo')
+        parser.add_argument('--batch-size', type=int, default=500,
+                            help='Comprobantes por lote')
+        parser.add_argument('--desde-id', type=int, default=0,
+                            help='Reanudar a partir de este ID de comprobante')
+        parser.add_argument('--dry-run', action='store_true',
+                            help='Mostrar los movimientos sin ejecutarlos')
+
+    def handle(self, *args, **options):
+        self.dry_run = options['dry_run']
+        last_id = options['desde_id']
+        moved = skipped = failed = 0
+
+        queryset = Comprobante.objects.exclude(xml_file__isnull=True, zip_file__isnull=True).only(
+            'id', 'ruc_emisor', 'tipo_comprobante', 'serie', 'numero', 'fecha_creacion', 'xml_file', 'zip_file'
+        ).order_by('id')
+
+        with ThreadPoolExecutor(max_workers=options['workers']) as executor:
+            while True:
+                batch = list(queryset.filter(id__gt=last_id)[:options['batch_size']])
+                if not batch:
+                    break
+
+                for result in executor.map(self.migrate_comprobante, batch):
+                    moved += result['moved']
+                    skipped += result['skipped']
+                    failed += result['failed']
+
+                last_id = batch[-1].id
+                self.stdout.write(f'📦 Procesados hasta ID {last_id} '
+                                  f'(movidos: {moved}, sin cambios: {skipped}, errores: {failed})')
+
+        self.stdout.write(self.style.SUCCESS(
+            f'✅ Migración finalizada. Movidos: {moved}, sin cambios: {skipped}, errores: {failed}'
+        ))
+
+    def migrate_comprobante(self, comprobante):
+        """Mueve los artefactos de un comprobante y actualiza sus rutas"""
+        result = {'moved': 0, 'skipped': 0, 'failed': 0}
+        updates = {}
+
+        try:
+            for kind, field_name in (('xml', 'xml_file'), ('zip', 'zip_file')):
+                current = getattr(comprobante, field_name)
+                if not current:
+                    continue
+
+                target = get_artifact_name(comprobante, kind, layout='sharded')
+                # Blobs por contenido y artefactos empaquetados no usan este layout
+                if str(current) == target or not str(current).startswith(f'{kind}/'):
+                    result['skipped'] += 1
+                    continue
+
+                if self.move_file(str(current), target):
+                    updates[field_name] = target
+                    result['moved'] += 1
+                else:
+                    result['failed'] += 1
+
+            if updates and not self.dry_run:
+                # update() evita tocar fecha_actualizacion y otros campos
+                Comprobante.objects.filter(id=comprobante.id).update(**updates)
+
+        except Exception as e:
+            self.stderr.write(f'❌ Error migrando comprobante {comprobante.id}: {str(e)}')
+            result['failed'] += 1
+        finally:
+            connection.close()
+
+        return result
+
+    def move_file(self, current_name, target_name):
+        """Mueve un artefacto dentro del almacenamiento. Idempotente para poder reanudar."""
+        storage = get_artifact_storage()
+
+        if self.dry_run:
+            self.stdout.write(f'   {current_name} -> {target_name}')
+            return True
+
+        if not storage.exists(current_name):
+            # Una ejecución anterior pudo mover el archivo sin llegar a actualizar la base de datos
+            if storage.exists(target_name):
+                return True
+            self.stderr.write(f'⚠️  Archivo no encontrado: {current_name}')
+            return False
+
+        storage.move(current_name, target_name)
+        return True
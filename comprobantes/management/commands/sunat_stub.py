@@ -0,0 +1,73 @@
+# comprobantes/management/commands/sunat_stub.py
+
+from django.core.management.base import BaseCommand, CommandError
+
+from comprobantes.sunat_stub import StubServer, SUNATStub, parse_distribution
+
+
+def code_list(value):
+    return [code.strip() for code in value.split(',') if code.strip()]
+
+
+class Command(BaseCommand):
+    """Levanta un billService de SUNAT simulado para pruebas de integración y carga sin red"""
+
+    help = 'Inicia el stub local de billService (sendBill, sendSummary, sendPack, getStatus, getStatusCdr)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--host', default='127.0.0.1')
+        parser.add_argument('--port', type=int, default=8901)
+        parser.add_argument('--latency', default='fixed:0',
+                            help="Latencia por petición: 'fixed:0.2', 'uniform:0.1:0.5', "
+                                 "'lognormal:<mediana>:<sigma>' o 'exp:<media>'")
+        parser.add_argument('--fault-rate', type=float, default=0.0,
+                            help='Probabilidad de SOAP Fault transitorio (0-1)')
+        parser.add_argument('--fault-codes', type=code_list, default=['0100'],
+                            help='Códigos de las fallas transitorias, separados por coma')
+        parser.add_argument('--http-error-rate', type=float, default=0.0,
+                            help='Probabilidad de HTTP 503 sin sobre SOAP (0-1)')
+        parser.add_argument('--reject-rate', type=float, default=0.0,
+                            help='Probabilidad de rechazo del comprobante (0-1)')
+        parser.add_argument('--reject-codes', type=code_list, default=['2017'],
+                            help='Códigos de rechazo, separados por coma')
+        parser.add_argument('--reject-in-cdr', action='store_true',
+                            help='Los rechazos de sendBill llegan como CDR con el código en lugar de SOAP Fault')
+        parser.add_argument('--lost-rate', type=float, default=0.0,
+                            help='Probabilidad de procesar un sendBill, sendSummary o sendPack y responder HTTP 504 '
+                                 '(respuesta perdida)')
+        parser.add_argument('--ticket-delay', default='fixed:2',
+                            help='Tiempo hasta que getStatus resuelve un ticket (misma sintaxis que --latency)')
+        parser.add_argument('--seed', type=int, default=None,
+                            help='Semilla para reproducir la misma secuencia de fallas')
+
+    def handle(self, *args, **options):
+        for name in ('latency', 'ticket_delay'):
+            try:
+                parse_distribution(options[name])
+            except ValueError as e:
+                raise CommandError(str(e))
+
+        stub = SUNATStub(
+            latency=options['latency'],
+            fault_rate=options['fault_rate'],
+            fault_codes=options['fault_codes'],
+            http_error_rate=options['http_error_rate'],
+            reject_rate=options['reject_rate'],
+            reject_codes=options['reject_codes'],
+            ticket_delay=options['ticket_delay'],
+            seed=options['seed'],
+            lost_rate=options['lost_rate'],
+            reject_in_cdr=options['reject_in_cdr'],
+        )
+        server = StubServer((options['host'], options['port']), stub)
+
+        self.stdout.write(self.style.SUCCESS(f'🧪 Stub de SUNAT escuchando en {server.url}'))
+        self.stdout.write(f'   Configure SUNAT_BILL_SERVICE_URL={server.url} para usarlo')
+        self.stdout.write(f'   (y SUNAT_CONSULT_SERVICE_URL={server.url} para getStatusCdr)')
+        self.stdout.write(f'   Contadores en http://{options["host"]}:{server.server_address[1]}/stats')
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            self.stdout.write('🛑 Stub detenido')
+        finally:
+            server.server_close()
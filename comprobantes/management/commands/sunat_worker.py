@@ -0,0 +1,48 @@
+# comprobantes/management/commands/sunat_worker.py
+
+import signal
+import threading
+
+from django.core.management.base import BaseCommand
+
+from comprobantes.submission_queue import get_worker_id, run_worker
+
+
+class Command(BaseCommand):
+    """Worker de la cola de trabajos SUNAT (outbox): toma los trabajos encolados por la API y los ejecuta"""
+
+    help = 'Procesa los trabajos SUNAT encolados (envíos, reintentos y consulta de tickets)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, default=None,
+                            help='Trabajos en paralelo (por defecto SUBMISSION_QUEUE WORKERS)')
+        parser.add_argument('--poll-interval', type=float, default=None,
+                            help='Segundos entre consultas a la cola cuando está vacía')
+        parser.add_argument('--once', action='store_true',
+                            help='Terminar cuando no queden trabajos disponibles')
+
+    def handle(self, *args, **options):
+        stop_event = threading.Event()
+
+        def stop(signum, frame):
+            self.stdout.write('⏹️  Deteniendo: se terminan los trabajos en curso...')
+            stop_event.set()
+
+        signal.signal(signal.SIGINT, stop)
+        signal.signal(signal.SIGTERM, stop)
+
+        def on_result(job, estado):
+            if options['verbosity'] >= 2:
+                self.stdout.write(f'   {job}: {estado}')
+
+        self.stdout.write(f'🚀 Worker SUNAT {get_worker_id()} iniciado')
+        summary = run_worker(
+            max_workers=options['workers'],
+            poll_interval=options['poll_interval'],
+            once=options['once'],
+            stop_event=stop_event,
+            on_result=on_result,
+        )
+        total = sum(summary.values())
+        detail = ', '.join(f'{estado}: {count}' for estado, count in sorted(summary.items()))
+        self.stdout.write(self.style.SUCCESS(f'✅ Trabajos procesados: {total}' + (f' ({detail})' if detail else '')))
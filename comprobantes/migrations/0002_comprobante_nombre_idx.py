@@ -0,0 +1,20 @@
+# Generated by Django 4.2.7 on 2026-10-18 23:45
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("comprobantes", "0001_initial"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="comprobante",
+            index=models.Index(
+                fields=["ruc_emisor", "tipo_comprobante", "serie", "numero"],
+                name="comprobante_nombre_idx",
+            ),
+        ),
+    ]
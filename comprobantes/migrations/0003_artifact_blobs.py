@@ -0,0 +1,94 @@
+# Generated by Django 4.2.7 on 2026-10-18 23:47
+
+from django.db import migrations, models
+import django.db.models.deletion
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("comprobantes", "0002_comprobante_nombre_idx"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="ArtifactBlob",
+            fields=[
+                (
+                    "sha256",
+                    models.CharField(max_length=64, primary_key=True, serialize=False),
+                ),
+                ("size", models.BigIntegerField()),
+                (
+                    "refcount",
+                    models.PositiveIntegerField(
+                        default=0,
+                        help_text="Cantidad de referencias que apuntan a este blob",
+                    ),
+                ),
+                ("created_at", models.DateTimeField(default=django.utils.timezone.now)),
+            ],
+            options={
+                "verbose_name": "Blob de Artefacto",
+                "verbose_name_plural": "Blobs de Artefactos",
+                "db_table": "artifact_blobs",
+            },
+        ),
+        migrations.CreateModel(
+            name="ArtifactReference",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "kind",
+                    models.CharField(
+                        choices=[
+                            ("xml", "XML"),
+                            ("zip", "ZIP"),
+                            ("cdr_zip", "CDR ZIP"),
+                            ("cdr_xml", "CDR XML"),
+                        ],
+                        max_length=10,
+                    ),
+                ),
+                (
+                    "filename",
+                    models.CharField(
+                        help_text="Nombre del archivo según estándar SUNAT",
+                        max_length=200,
+                    ),
+                ),
+                ("created_at", models.DateTimeField(default=django.utils.timezone.now)),
+                (
+                    "blob",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.PROTECT,
+                        related_name="references",
+                        to="comprobantes.artifactblob",
+                    ),
+                ),
+                (
+                    "comprobante",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="artifact_refs",
+                        to="comprobantes.comprobante",
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "Referencia de Artefacto",
+                "verbose_name_plural": "Referencias de Artefactos",
+                "db_table": "artifact_references",
+                "unique_together": {("comprobante", "kind")},
+            },
+        ),
+    ]
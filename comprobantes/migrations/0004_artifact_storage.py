@@ -0,0 +1,34 @@
+# Generated by Django 4.2.7 on 2026-10-18 23:51
+
+import comprobantes.storage
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("comprobantes", "0003_artifact_blobs"),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name="comprobante",
+            name="xml_file",
+            field=models.FileField(
+                blank=True,
+                null=True,
+                storage=comprobantes.storage.get_artifact_storage,
+                upload_to="xml/",
+            ),
+        ),
+        migrations.AlterField(
+            model_name="comprobante",
+            name="zip_file",
+            field=models.FileField(
+                blank=True,
+                null=True,
+                storage=comprobantes.storage.get_artifact_storage,
+                upload_to="zip/",
+            ),
+        ),
+    ]
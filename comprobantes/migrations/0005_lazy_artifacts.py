@@ -0,0 +1,62 @@
+# Generated by Django 4.2.7 on 2026-10-18 23:55
+
+from django.db import migrations, models
+import django.db.models.deletion
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("comprobantes", "0004_artifact_storage"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="LazyArtifact",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "payload",
+                    models.TextField(
+                        help_text="JSON canónico de los datos validados del comprobante"
+                    ),
+                ),
+                (
+                    "signature",
+                    models.TextField(
+                        blank=True, help_text="Bloque <ds:Signature> del XML firmado"
+                    ),
+                ),
+                (
+                    "xml_sha256",
+                    models.CharField(
+                        help_text="SHA-256 del XML firmado original", max_length=64
+                    ),
+                ),
+                ("xml_size", models.PositiveIntegerField()),
+                ("created_at", models.DateTimeField(default=django.utils.timezone.now)),
+                (
+                    "comprobante",
+                    models.OneToOneField(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="lazy_artifact",
+                        to="comprobantes.comprobante",
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "Artefacto Diferido",
+                "verbose_name_plural": "Artefactos Diferidos",
+                "db_table": "lazy_artifacts",
+            },
+        ),
+    ]
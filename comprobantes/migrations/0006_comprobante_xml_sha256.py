@@ -0,0 +1,23 @@
+# Generated by Django 4.2.7 on 2026-10-18 23:57
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("comprobantes", "0005_lazy_artifacts"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="comprobante",
+            name="xml_sha256",
+            field=models.CharField(
+                blank=True,
+                help_text="SHA-256 del XML guardado (ETag de descarga)",
+                max_length=64,
+                null=True,
+            ),
+        ),
+    ]
@@ -0,0 +1,20 @@
+# Generated by Django 4.2.7 on 2026-10-18 23:59
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("comprobantes", "0006_comprobante_xml_sha256"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="comprobante",
+            index=models.Index(
+                fields=["ruc_emisor", "fecha_creacion"],
+                name="comprobante_emisor_fecha_idx",
+            ),
+        ),
+    ]
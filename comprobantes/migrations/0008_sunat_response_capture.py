@@ -0,0 +1,18 @@
+# Generated by Django 4.2.7 on 2026-10-19 00:21
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("comprobantes", "0007_comprobante_emisor_fecha_idx"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="sunatresponse",
+            name="soap_capture",
+            field=models.BinaryField(blank=True, null=True),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 4.2.7 on 2026-10-19 00:27
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("comprobantes", "0008_sunat_response_capture"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="sunatconfiguration",
+            name="rate_limit",
+            field=models.FloatField(blank=True, null=True),
+        ),
+    ]
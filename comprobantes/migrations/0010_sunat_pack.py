@@ -0,0 +1,76 @@
+# Generated by Django 4.2.7 on 2026-10-19 00:32
+
+from django.db import migrations, models
+import django.db.models.deletion
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("comprobantes", "0009_sunat_configuration_rate_limit"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="SUNATPack",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("ruc_emisor", models.CharField(max_length=11)),
+                ("nombre_archivo", models.CharField(blank=True, max_length=100)),
+                (
+                    "estado",
+                    models.CharField(
+                        choices=[
+                            ("PREPARANDO", "Preparando"),
+                            ("ENVIADO_PENDIENTE", "Enviado - Pendiente de Respuesta"),
+                            ("PROCESADO", "Procesado por SUNAT"),
+                            ("ERROR", "Error"),
+                        ],
+                        default="PREPARANDO",
+                        max_length=20,
+                    ),
+                ),
+                ("ticket", models.CharField(blank=True, max_length=100, null=True)),
+                ("total_comprobantes", models.PositiveIntegerField(default=0)),
+                ("errores", models.TextField(blank=True, null=True)),
+                (
+                    "fecha_creacion",
+                    models.DateTimeField(default=django.utils.timezone.now),
+                ),
+                ("fecha_envio", models.DateTimeField(blank=True, null=True)),
+                ("fecha_respuesta", models.DateTimeField(blank=True, null=True)),
+            ],
+            options={
+                "verbose_name": "Lote SUNAT",
+                "verbose_name_plural": "Lotes SUNAT",
+                "db_table": "sunat_packs",
+                "indexes": [
+                    models.Index(
+                        fields=["estado", "fecha_creacion"],
+                        name="sunat_pack_estado_idx",
+                    )
+                ],
+            },
+        ),
+        migrations.AddField(
+            model_name="comprobante",
+            name="pack",
+            field=models.ForeignKey(
+                blank=True,
+                help_text="Lote (sendPack) en el que se envió",
+                null=True,
+                on_delete=django.db.models.deletion.SET_NULL,
+                related_name="comprobantes",
+                to="comprobantes.sunatpack",
+            ),
+        ),
+    ]
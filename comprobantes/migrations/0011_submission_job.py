@@ -0,0 +1,90 @@
+# Generated by Django 4.2.7 on 2026-10-19 00:40
+
+from django.db import migrations, models
+import django.db.models.deletion
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("comprobantes", "0010_sunat_pack"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="SubmissionJob",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "tipo",
+                    models.CharField(
+                        choices=[
+                            ("ENVIAR", "Enviar comprobante"),
+                            ("REINTENTAR", "Reintentar comprobante con error"),
+                            ("CONSULTAR_TICKETS", "Consultar tickets pendientes"),
+                        ],
+                        max_length=20,
+                    ),
+                ),
+                (
+                    "estado",
+                    models.CharField(
+                        choices=[
+                            ("PENDIENTE", "Pendiente"),
+                            ("PROCESANDO", "Procesando"),
+                            ("COMPLETADO", "Completado"),
+                            ("FALLIDO", "Fallido"),
+                        ],
+                        default="PENDIENTE",
+                        max_length=20,
+                    ),
+                ),
+                ("intentos", models.PositiveIntegerField(default=0)),
+                ("max_intentos", models.PositiveIntegerField(default=5)),
+                (
+                    "disponible_desde",
+                    models.DateTimeField(default=django.utils.timezone.now),
+                ),
+                ("worker", models.CharField(blank=True, max_length=100, null=True)),
+                ("bloqueado_hasta", models.DateTimeField(blank=True, null=True)),
+                ("resultado", models.TextField(blank=True, null=True)),
+                ("ultimo_error", models.TextField(blank=True, null=True)),
+                (
+                    "fecha_creacion",
+                    models.DateTimeField(default=django.utils.timezone.now),
+                ),
+                ("fecha_actualizacion", models.DateTimeField(auto_now=True)),
+                ("fecha_completado", models.DateTimeField(blank=True, null=True)),
+                (
+                    "comprobante",
+                    models.ForeignKey(
+                        blank=True,
+                        null=True,
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="submission_jobs",
+                        to="comprobantes.comprobante",
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "Trabajo SUNAT",
+                "verbose_name_plural": "Trabajos SUNAT",
+                "db_table": "submission_jobs",
+                "indexes": [
+                    models.Index(
+                        fields=["estado", "disponible_desde"],
+                        name="submission_job_cola_idx",
+                    )
+                ],
+            },
+        ),
+    ]
@@ -0,0 +1,85 @@
+# Generated by Django 4.2.7 on 2026-10-19 00:45
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("comprobantes", "0011_submission_job"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="comprobante",
+            name="next_poll_at",
+            field=models.DateTimeField(
+                blank=True, help_text="Próxima consulta del ticket en SUNAT", null=True
+            ),
+        ),
+        migrations.AddField(
+            model_name="comprobante",
+            name="poll_attempts",
+            field=models.PositiveIntegerField(
+                default=0, help_text="Consultas del ticket sin resultado"
+            ),
+        ),
+        migrations.AddField(
+            model_name="sunatpack",
+            name="next_poll_at",
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name="sunatpack",
+            name="poll_attempts",
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AlterField(
+            model_name="comprobante",
+            name="estado",
+            field=models.CharField(
+                choices=[
+                    ("PENDIENTE", "Pendiente"),
+                    ("VALIDADO", "Validado"),
+                    ("GENERADO", "Generado"),
+                    ("ERROR", "Error"),
+                    ("ERROR_VALIDACION", "Error de Validación"),
+                    ("ENVIADO", "Enviado a SUNAT"),
+                    ("ENVIADO_PENDIENTE", "Enviado - Pendiente de Respuesta"),
+                    ("PROCESANDO", "Procesando en SUNAT"),
+                    ("ACEPTADO", "Aceptado por SUNAT"),
+                    ("RECHAZADO", "Rechazado por SUNAT"),
+                    ("TICKET_VENCIDO", "Ticket sin respuesta de SUNAT"),
+                ],
+                default="PENDIENTE",
+                max_length=20,
+            ),
+        ),
+        migrations.AlterField(
+            model_name="sunatpack",
+            name="estado",
+            field=models.CharField(
+                choices=[
+                    ("PREPARANDO", "Preparando"),
+                    ("ENVIADO_PENDIENTE", "Enviado - Pendiente de Respuesta"),
+                    ("PROCESADO", "Procesado por SUNAT"),
+                    ("ERROR", "Error"),
+                    ("TICKET_VENCIDO", "Ticket sin respuesta de SUNAT"),
+                ],
+                default="PREPARANDO",
+                max_length=20,
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="comprobante",
+            index=models.Index(
+                fields=["estado", "next_poll_at"], name="comprobante_ticket_poll_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="sunatpack",
+            index=models.Index(
+                fields=["estado", "next_poll_at"], name="sunat_pack_poll_idx"
+            ),
+        ),
+    ]
@@ -0,0 +1,108 @@
+# Generated by Django 4.2.7 on 2026-10-19 00:51
+
+from django.db import migrations, models
+import django.db.models.deletion
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("comprobantes", "0012_ticket_polling"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="ResumenDiario",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("ruc_emisor", models.CharField(max_length=11)),
+                (
+                    "fecha_emision",
+                    models.DateField(
+                        help_text="Fecha de emisión de los comprobantes (ReferenceDate)"
+                    ),
+                ),
+                ("nombre_archivo", models.CharField(blank=True, max_length=100)),
+                (
+                    "estado",
+                    models.CharField(
+                        choices=[
+                            ("PREPARANDO", "Preparando"),
+                            ("ENVIADO_PENDIENTE", "Enviado - Pendiente de Respuesta"),
+                            ("ACEPTADO", "Aceptado por SUNAT"),
+                            ("RECHAZADO", "Rechazado por SUNAT"),
+                            ("ERROR", "Error"),
+                            ("TICKET_VENCIDO", "Ticket sin respuesta de SUNAT"),
+                        ],
+                        default="PREPARANDO",
+                        max_length=20,
+                    ),
+                ),
+                ("ticket", models.CharField(blank=True, max_length=100, null=True)),
+                ("total_comprobantes", models.PositiveIntegerField(default=0)),
+                ("errores", models.TextField(blank=True, null=True)),
+                (
+                    "cdr_zip_path",
+                    models.CharField(
+                        blank=True,
+                        help_text="CDR del resumen, compartido por sus comprobantes",
+                        max_length=500,
+                        null=True,
+                    ),
+                ),
+                (
+                    "fecha_creacion",
+                    models.DateTimeField(default=django.utils.timezone.now),
+                ),
+                ("fecha_envio", models.DateTimeField(blank=True, null=True)),
+                ("fecha_respuesta", models.DateTimeField(blank=True, null=True)),
+                ("next_poll_at", models.DateTimeField(blank=True, null=True)),
+                ("poll_attempts", models.PositiveIntegerField(default=0)),
+            ],
+            options={
+                "verbose_name": "Resumen Diario",
+                "verbose_name_plural": "Resúmenes Diarios",
+                "db_table": "resumenes_diarios",
+            },
+        ),
+        migrations.AddIndex(
+            model_name="comprobante",
+            index=models.Index(
+                fields=["estado", "tipo_comprobante", "fecha_creacion"],
+                name="comprobante_resumen_idx",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="resumendiario",
+            index=models.Index(
+                fields=["ruc_emisor", "fecha_emision"], name="resumen_diario_fecha_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="resumendiario",
+            index=models.Index(
+                fields=["estado", "next_poll_at"], name="resumen_diario_poll_idx"
+            ),
+        ),
+        migrations.AddField(
+            model_name="comprobante",
+            name="resumen",
+            field=models.ForeignKey(
+                blank=True,
+                help_text="Resumen diario (RC) en el que se informó",
+                null=True,
+                on_delete=django.db.models.deletion.SET_NULL,
+                related_name="comprobantes",
+                to="comprobantes.resumendiario",
+            ),
+        ),
+    ]
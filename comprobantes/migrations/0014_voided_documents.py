@@ -0,0 +1,129 @@
+# Generated by Django 4.2.7 on 2026-10-19 00:55
+
+from django.db import migrations, models
+import django.db.models.deletion
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("comprobantes", "0013_daily_summaries"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="comprobante",
+            name="motivo_baja",
+            field=models.CharField(blank=True, max_length=100, null=True),
+        ),
+        migrations.AddField(
+            model_name="resumendiario",
+            name="condicion",
+            field=models.CharField(
+                choices=[("1", "Adicionar"), ("3", "Anular")], default="1", max_length=1
+            ),
+        ),
+        migrations.AlterField(
+            model_name="comprobante",
+            name="estado",
+            field=models.CharField(
+                choices=[
+                    ("PENDIENTE", "Pendiente"),
+                    ("VALIDADO", "Validado"),
+                    ("GENERADO", "Generado"),
+                    ("ERROR", "Error"),
+                    ("ERROR_VALIDACION", "Error de Validación"),
+                    ("ENVIADO", "Enviado a SUNAT"),
+                    ("ENVIADO_PENDIENTE", "Enviado - Pendiente de Respuesta"),
+                    ("PROCESANDO", "Procesando en SUNAT"),
+                    ("ACEPTADO", "Aceptado por SUNAT"),
+                    ("RECHAZADO", "Rechazado por SUNAT"),
+                    ("TICKET_VENCIDO", "Ticket sin respuesta de SUNAT"),
+                    ("BAJA_PENDIENTE", "Baja enviada - Pendiente de Respuesta"),
+                    ("ANULADO", "Anulado (baja aceptada por SUNAT)"),
+                ],
+                default="PENDIENTE",
+                max_length=20,
+            ),
+        ),
+        migrations.CreateModel(
+            name="ComunicacionBaja",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("ruc_emisor", models.CharField(max_length=11)),
+                (
+                    "fecha_emision",
+                    models.DateField(
+                        help_text="Fecha de emisión de los comprobantes (ReferenceDate)"
+                    ),
+                ),
+                ("nombre_archivo", models.CharField(blank=True, max_length=100)),
+                (
+                    "estado",
+                    models.CharField(
+                        choices=[
+                            ("PREPARANDO", "Preparando"),
+                            ("ENVIADO_PENDIENTE", "Enviado - Pendiente de Respuesta"),
+                            ("ACEPTADO", "Aceptado por SUNAT"),
+                            ("RECHAZADO", "Rechazado por SUNAT"),
+                            ("ERROR", "Error"),
+                            ("TICKET_VENCIDO", "Ticket sin respuesta de SUNAT"),
+                        ],
+                        default="PREPARANDO",
+                        max_length=20,
+                    ),
+                ),
+                ("ticket", models.CharField(blank=True, max_length=100, null=True)),
+                ("total_comprobantes", models.PositiveIntegerField(default=0)),
+                ("errores", models.TextField(blank=True, null=True)),
+                (
+                    "cdr_zip_path",
+                    models.CharField(blank=True, max_length=500, null=True),
+                ),
+                (
+                    "fecha_creacion",
+                    models.DateTimeField(default=django.utils.timezone.now),
+                ),
+                ("fecha_envio", models.DateTimeField(blank=True, null=True)),
+                ("fecha_respuesta", models.DateTimeField(blank=True, null=True)),
+                ("next_poll_at", models.DateTimeField(blank=True, null=True)),
+                ("poll_attempts", models.PositiveIntegerField(default=0)),
+            ],
+            options={
+                "verbose_name": "Comunicación de Baja",
+                "verbose_name_plural": "Comunicaciones de Baja",
+                "db_table": "comunicaciones_baja",
+                "indexes": [
+                    models.Index(
+                        fields=["ruc_emisor", "fecha_emision"],
+                        name="comunicacion_baja_fecha_idx",
+                    ),
+                    models.Index(
+                        fields=["estado", "next_poll_at"],
+                        name="comunicacion_baja_poll_idx",
+                    ),
+                ],
+            },
+        ),
+        migrations.AddField(
+            model_name="comprobante",
+            name="baja",
+            field=models.ForeignKey(
+                blank=True,
+                help_text="Comunicación de baja (RA) que lo anula",
+                null=True,
+                on_delete=django.db.models.deletion.SET_NULL,
+                related_name="comprobantes",
+                to="comprobantes.comunicacionbaja",
+            ),
+        ),
+    ]
@@ -0,0 +1,37 @@
+# Generated by Django 4.2.7 on 2026-10-19 01:20
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("comprobantes", "0014_voided_documents"),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name="comprobante",
+            name="estado",
+            field=models.CharField(
+                choices=[
+                    ("PENDIENTE", "Pendiente"),
+                    ("VALIDADO", "Validado"),
+                    ("GENERADO", "Generado"),
+                    ("ERROR", "Error"),
+                    ("ERROR_VALIDACION", "Error de Validación"),
+                    ("ENVIANDO", "Enviando a SUNAT (sendBill en curso)"),
+                    ("ENVIADO", "Enviado a SUNAT"),
+                    ("ENVIADO_PENDIENTE", "Enviado - Pendiente de Respuesta"),
+                    ("PROCESANDO", "Procesando en SUNAT"),
+                    ("ACEPTADO", "Aceptado por SUNAT"),
+                    ("RECHAZADO", "Rechazado por SUNAT"),
+                    ("TICKET_VENCIDO", "Ticket sin respuesta de SUNAT"),
+                    ("BAJA_PENDIENTE", "Baja enviada - Pendiente de Respuesta"),
+                    ("ANULADO", "Anulado (baja aceptada por SUNAT)"),
+                ],
+                default="PENDIENTE",
+                max_length=20,
+            ),
+        ),
+    ]
@@ -0,0 +1,31 @@
+# Generated by Django 4.2.7 on 2026-10-19 01:21
+
+from django.db import migrations, models
+
+
+def set_active_keys(apps, schema_editor):
+    """Clave activa de los trabajos pendientes o en proceso (el más antiguo de cada tipo y comprobante)"""
+    SubmissionJob = apps.get_model("comprobantes", "SubmissionJob")
+    seen = set()
+    active = SubmissionJob.objects.filter(estado__in=["PENDIENTE", "PROCESANDO"]).order_by("id")
+    for job in active.only("id", "tipo", "comprobante_id"):
+        key = f"{job.tipo}:{job.comprobante_id or '-'}"
+        if key not in seen:
+            seen.add(key)
+            SubmissionJob.objects.filter(id=job.id).update(clave_activa=key)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("comprobantes", "0015_sending_claim"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="submissionjob",
+            name="clave_activa",
+            field=models.CharField(blank=True, max_length=40, null=True, unique=True),
+        ),
+        migrations.RunPython(set_active_keys, migrations.RunPython.noop),
+    ]
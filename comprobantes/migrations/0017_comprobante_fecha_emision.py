@@ -0,0 +1,47 @@
+# Generated by Django 4.2.7 on 2026-10-19 01:24
+
+from django.db import migrations, models
+import django.utils.timezone
+
+
+def set_fecha_emision(apps, schema_editor):
+    """Los comprobantes existentes toman como fecha de emisión el día local en que se crearon"""
+    Comprobante = apps.get_model("comprobantes", "Comprobante")
+    rows = Comprobante.objects.values_list("id", "fecha_creacion").order_by("id")
+    for comprobante_id, fecha_creacion in rows.iterator(chunk_size=2000):
+        fecha = (
+            django.utils.timezone.localdate(fecha_creacion)
+            if django.utils.timezone.is_aware(fecha_creacion)
+            else fecha_creacion.date()
+        )
+        Comprobante.objects.filter(id=comprobante_id).update(fecha_emision=fecha)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("comprobantes", "0016_submission_job_active_key"),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name="comprobante",
+            name="comprobante_resumen_idx",
+        ),
+        migrations.AddField(
+            model_name="comprobante",
+            name="fecha_emision",
+            field=models.DateField(
+                default=django.utils.timezone.localdate,
+                help_text="Fecha de emisión del comprobante (fechaEmision)",
+            ),
+        ),
+        migrations.RunPython(set_fecha_emision, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name="comprobante",
+            index=models.Index(
+                fields=["estado", "tipo_comprobante", "fecha_emision"],
+                name="comprobante_resumen_idx",
+            ),
+        ),
+    ]
@@ -0,0 +1,30 @@
+# Generated by Django 4.2.7 on 2026-10-19 01:45
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("comprobantes", "0017_comprobante_fecha_emision"),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name="resumendiario",
+            name="estado",
+            field=models.CharField(
+                choices=[
+                    ("PREPARANDO", "Preparando"),
+                    ("ENVIADO_PENDIENTE", "Enviado - Pendiente de Respuesta"),
+                    ("SIN_RESPUESTA", "Enviado sin respuesta de SUNAT"),
+                    ("ACEPTADO", "Aceptado por SUNAT"),
+                    ("RECHAZADO", "Rechazado por SUNAT"),
+                    ("ERROR", "Error"),
+                    ("TICKET_VENCIDO", "Ticket sin respuesta de SUNAT"),
+                ],
+                default="PREPARANDO",
+                max_length=20,
+            ),
+        ),
+    ]
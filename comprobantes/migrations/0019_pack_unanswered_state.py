@@ -0,0 +1,29 @@
+# Generated by Django 4.2.7 on 2026-10-19 01:46
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("comprobantes", "0018_summary_unanswered_state"),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name="sunatpack",
+            name="estado",
+            field=models.CharField(
+                choices=[
+                    ("PREPARANDO", "Preparando"),
+                    ("ENVIADO_PENDIENTE", "Enviado - Pendiente de Respuesta"),
+                    ("SIN_RESPUESTA", "Enviado sin respuesta de SUNAT"),
+                    ("PROCESADO", "Procesado por SUNAT"),
+                    ("ERROR", "Error"),
+                    ("TICKET_VENCIDO", "Ticket sin respuesta de SUNAT"),
+                ],
+                default="PREPARANDO",
+                max_length=20,
+            ),
+        ),
+    ]
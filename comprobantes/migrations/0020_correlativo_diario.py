@@ -0,0 +1,77 @@
+# Generated by Django 4.2.7 on 2026-10-19 01:47
+
+from datetime import datetime
+
+from django.db import migrations, models
+
+
+def seed_counters(apps, schema_editor):
+    """
+    Los contadores parten del mayor correlativo ya usado por emisor, tipo y día (los nombres
+    anteriores usaban el id), para que los documentos nuevos de hoy no repitan un nombre
+    """
+    CorrelativoDiario = apps.get_model("comprobantes", "CorrelativoDiario")
+    ultimos = {}
+    for model_name in ("ResumenDiario", "ComunicacionBaja"):
+        names = apps.get_model("comprobantes", model_name).objects.exclude(nombre_archivo="")
+        for nombre_archivo in names.values_list("nombre_archivo", flat=True).iterator():
+            try:
+                ruc_emisor, tipo, fecha, correlativo = nombre_archivo.split("-")
+                key = (ruc_emisor, tipo, datetime.strptime(fecha, "%Y%m%d").date())
+                ultimos[key] = max(ultimos.get(key, 0), int(correlativo))
+            except ValueError:
+                continue
+    CorrelativoDiario.objects.bulk_create(
+        [
+            CorrelativoDiario(ruc_emisor=ruc_emisor, tipo=tipo, fecha=fecha, ultimo=ultimo)
+            for (ruc_emisor, tipo, fecha), ultimo in ultimos.items()
+        ],
+        batch_size=500,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("comprobantes", "0019_pack_unanswered_state"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="CorrelativoDiario",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("ruc_emisor", models.CharField(max_length=11)),
+                (
+                    "tipo",
+                    models.CharField(
+                        choices=[
+                            ("RC", "Resumen diario"),
+                            ("RA", "Comunicación de baja"),
+                        ],
+                        max_length=2,
+                    ),
+                ),
+                (
+                    "fecha",
+                    models.DateField(help_text="Fecha de generación de los documentos"),
+                ),
+                ("ultimo", models.PositiveIntegerField(default=0)),
+            ],
+            options={
+                "verbose_name": "Correlativo Diario",
+                "verbose_name_plural": "Correlativos Diarios",
+                "db_table": "correlativos_diarios",
+                "unique_together": {("ruc_emisor", "tipo", "fecha")},
+            },
+        ),
+        migrations.RunPython(seed_counters, migrations.RunPython.noop),
+    ]
@@ -1,6 +1,8 @@
 from django.db import models
 from django.utils import timezone
 
+from .storage import get_artifact_storage
+
 
 class Comprobante(models.Model):
     """Modelo para almacenar los comprobantes electrónicos generados"""
@@ -18,11 +20,15 @@ class Comprobante(models.Model):
         ('GENERADO', 'Generado'),
         ('ERROR', 'Error'),
         ('ERROR_VALIDACION', 'Error de Validación'),
+        ('ENVIANDO', 'Enviando a SUNAT (sendBill en curso)'),
         ('ENVIADO', 'Enviado a SUNAT'),
         ('ENVIADO_PENDIENTE', 'Enviado - Pendiente de Respuesta'),
         ('PROCESANDO', 'Procesando en SUNAT'),
         ('ACEPTADO', 'Aceptado por SUNAT'),
         ('RECHAZADO', 'Rechazado por SUNAT'),
+        ('TICKET_VENCIDO', 'Ticket sin respuesta de SUNAT'),
+        ('BAJA_PENDIENTE', 'Baja enviada - Pendiente de Respuesta'),
+        ('ANULADO', 'Anulado (baja aceptada por SUNAT)'),
     ]
     
     # Datos del comprobante
@@ -42,12 +48,16 @@ class Comprobante(models.Model):
     total = models.DecimalField(max_digits=15, decimal_places=2)
     
     # Archivos
-    xml_file = models.FileField(upload_to='xml/', blank=True, null=True)
-    zip_file = models.FileField(upload_to='zip/', blank=True, null=True)
+    xml_file = models.FileField(upload_to='xml/', storage=get_artifact_storage, blank=True, null=True)
+    zip_file = models.FileField(upload_to='zip/', storage=get_artifact_storage, blank=True, null=True)
+    xml_sha256 = models.CharField(max_length=64, blank=True, null=True,
+                                  help_text="SHA-256 del XML guardado (ETag de descarga)")
     
     # Estado y metadatos
     estado = models.CharField(max_length=20, choices=ESTADO_CHOICES, default='PENDIENTE')
     errores = models.TextField(blank=True, null=True)
+    fecha_emision = models.DateField(default=timezone.localdate,
+                                     help_text="Fecha de emisión del comprobante (fechaEmision)")
     fecha_creacion = models.DateTimeField(default=timezone.now)
     fecha_actualizacion = models.DateTimeField(auto_now=True)
     
@@ -62,6 +72,17 @@ class Comprobante(models.Model):
                                            help_text="Fecha de envío a SUNAT")
     fecha_respuesta_sunat = models.DateTimeField(blank=True, null=True,
                                                 help_text="Fecha de respuesta de SUNAT")
+    pack = models.ForeignKey('SUNATPack', on_delete=models.SET_NULL, blank=True, null=True,
+                             related_name='comprobantes', help_text="Lote (sendPack) en el que se envió")
+    resumen = models.ForeignKey('ResumenDiario', on_delete=models.SET_NULL, blank=True, null=True,
+                                related_name='comprobantes', help_text="Resumen diario (RC) en el que se informó")
+    baja = models.ForeignKey('ComunicacionBaja', on_delete=models.SET_NULL, blank=True, null=True,
+                             related_name='comprobantes', help_text="Comunicación de baja (RA) que lo anula")
+    motivo_baja = models.CharField(max_length=100, blank=True, null=True)
+    # Consulta del ticket con backoff (ver ticket_polling)
+    next_poll_at = models.DateTimeField(blank=True, null=True,
+                                        help_text="Próxima consulta del ticket en SUNAT")
+    poll_attempts = models.PositiveIntegerField(default=0, help_text="Consultas del ticket sin resultado")
     
     class Meta:
         db_table = 'comprobantes'
@@ -69,6 +90,17 @@ class Comprobante(models.Model):
         verbose_name_plural = 'Comprobantes Electrónicos'
         # Comentar esto temporalmente para evitar errores
         # unique_together = ['tipo_comprobante', 'ruc_emisor', 'serie', 'numero']
+        indexes = [
+            # Resolución de artefactos por nombre de archivo (RUC-TIPO-SERIE-NUMERO)
+            models.Index(fields=['ruc_emisor', 'tipo_comprobante', 'serie', 'numero'],
+                         name='comprobante_nombre_idx'),
+            # Exportación y empaquetado por emisor y rango de fechas
+            models.Index(fields=['ruc_emisor', 'fecha_creacion'], name='comprobante_emisor_fecha_idx'),
+            # Tickets pendientes cuya próxima consulta ya venció
+            models.Index(fields=['estado', 'next_poll_at'], name='comprobante_ticket_poll_idx'),
+            # Boletas GENERADO por fecha de emisión, para armar los resúmenes diarios
+            models.Index(fields=['estado', 'tipo_comprobante', 'fecha_emision'], name='comprobante_resumen_idx'),
+        ]
     
     def __str__(self):
         return f"{self.get_tipo_comprobante_display()} - {self.ruc_emisor}-{self.serie}-{self.numero}"
@@ -92,7 +124,8 @@ class Comprobante(models.Model):
     
     def is_sent_to_sunat(self):
         """Verifica si el comprobante fue enviado a SUNAT"""
-        return self.estado in ['ENVIADO', 'ENVIADO_PENDIENTE', 'PROCESANDO', 'ACEPTADO', 'RECHAZADO']
+        return self.estado in ['ENVIANDO', 'ENVIADO', 'ENVIADO_PENDIENTE', 'PROCESANDO', 'ACEPTADO', 'RECHAZADO',
+                               'TICKET_VENCIDO', 'BAJA_PENDIENTE', 'ANULADO']
     
     def is_accepted_by_sunat(self):
         """Verifica si el comprobante fue aceptado por SUNAT"""
@@ -100,7 +133,8 @@ class Comprobante(models.Model):
     
     def can_be_sent_to_sunat(self):
         """Verifica si el comprobante puede ser enviado a SUNAT"""
-        return self.estado == 'GENERADO' and self.xml_file and self.zip_file
+        from .artifacts import has_artifact
+        return self.estado == 'GENERADO' and has_artifact(self, 'xml') and has_artifact(self, 'zip')
 
 
 class DetalleComprobante(models.Model):
@@ -123,14 +157,255 @@ class DetalleComprobante(models.Model):
 
 # Modelos SUNAT simplificados para evitar errores de importación
 
+class SUNATPack(models.Model):
+    """Lote de comprobantes de un emisor enviado en un solo ZIP con sendPack"""
+    
+    ESTADO_CHOICES = [
+        ('PREPARANDO', 'Preparando'),
+        ('ENVIADO_PENDIENTE', 'Enviado - Pendiente de Respuesta'),
+        # sendPack sin respuesta: cada comprobante se concilia con getStatusCdr (reconcile_cdr)
+        ('SIN_RESPUESTA', 'Enviado sin respuesta de SUNAT'),
+        ('PROCESADO', 'Procesado por SUNAT'),
+        ('ERROR', 'Error'),
+        ('TICKET_VENCIDO', 'Ticket sin respuesta de SUNAT'),
+    ]
+    
+    ruc_emisor = models.CharField(max_length=11)
+    nombre_archivo = models.CharField(max_length=100, blank=True)
+    estado = models.CharField(max_length=20, choices=ESTADO_CHOICES, default='PREPARANDO')
+    ticket = models.CharField(max_length=100, blank=True, null=True)
+    total_comprobantes = models.PositiveIntegerField(default=0)
+    errores = models.TextField(blank=True, null=True)
+    fecha_creacion = models.DateTimeField(default=timezone.now)
+    fecha_envio = models.DateTimeField(blank=True, null=True)
+    fecha_respuesta = models.DateTimeField(blank=True, null=True)
+    next_poll_at = models.DateTimeField(blank=True, null=True)
+    poll_attempts = models.PositiveIntegerField(default=0)
+    
+    class Meta:
+        db_table = 'sunat_packs'
+        verbose_name = 'Lote SUNAT'
+        verbose_name_plural = 'Lotes SUNAT'
+        indexes = [
+            models.Index(fields=['estado', 'fecha_creacion'], name='sunat_pack_estado_idx'),
+            models.Index(fields=['estado', 'next_poll_at'], name='sunat_pack_poll_idx'),
+        ]
+    
+    def __str__(self):
+        return f"{self.nombre_archivo or self.ruc_emisor} ({self.total_comprobantes} comprobantes)"
+    
+    def get_zip_filename(self):
+        """Nombre del ZIP del lote: RUC-LT-AAAAMMDD-correlativo.zip"""
+        return f"{self.nombre_archivo}.zip"
+
+
+class ResumenDiario(models.Model):
+    """
+    Resumen diario (RC, SummaryDocuments) de las boletas de un emisor y sus notas para una
+    fecha de emisión, enviado con sendSummary. El CDR del ticket aplica a todos sus comprobantes.
+    """
+    
+    CONDICION_CHOICES = [
+        ('1', 'Adicionar'),
+        ('3', 'Anular'),
+    ]
+    
+    ESTADO_CHOICES = [
+        ('PREPARANDO', 'Preparando'),
+        ('ENVIADO_PENDIENTE', 'Enviado - Pendiente de Respuesta'),
+        # sendSummary sin respuesta: SUNAT pudo haber emitido un ticket, se verifica antes de reenviar
+        ('SIN_RESPUESTA', 'Enviado sin respuesta de SUNAT'),
+        ('ACEPTADO', 'Aceptado por SUNAT'),
+        ('RECHAZADO', 'Rechazado por SUNAT'),
+        ('ERROR', 'Error'),
+        ('TICKET_VENCIDO', 'Ticket sin respuesta de SUNAT'),
+    ]
+    
+    ruc_emisor = models.CharField(max_length=11)
+    fecha_emision = models.DateField(help_text="Fecha de emisión de los comprobantes (ReferenceDate)")
+    # Estado de las líneas (catálogo 19): 1 informa los comprobantes, 3 los anula (baja de boletas)
+    condicion = models.CharField(max_length=1, choices=CONDICION_CHOICES, default='1')
+    nombre_archivo = models.CharField(max_length=100, blank=True)
+    estado = models.CharField(max_length=20, choices=ESTADO_CHOICES, default='PREPARANDO')
+    ticket = models.CharField(max_length=100, blank=True, null=True)
+    total_comprobantes = models.PositiveIntegerField(default=0)
+    errores = models.TextField(blank=True, null=True)
+    cdr_zip_path = models.CharField(max_length=500, blank=True, null=True,
+                                    help_text="CDR del resumen, compartido por sus comprobantes")
+    fecha_creacion = models.DateTimeField(default=timezone.now)
+    fecha_envio = models.DateTimeField(blank=True, null=True)
+    fecha_respuesta = models.DateTimeField(blank=True, null=True)
+    next_poll_at = models.DateTimeField(blank=True, null=True)
+    poll_attempts = models.PositiveIntegerField(default=0)
+    
+    class Meta:
+        db_table = 'resumenes_diarios'
+        verbose_name = 'Resumen Diario'
+        verbose_name_plural = 'Resúmenes Diarios'
+        indexes = [
+            models.Index(fields=['ruc_emisor', 'fecha_emision'], name='resumen_diario_fecha_idx'),
+            models.Index(fields=['estado', 'next_poll_at'], name='resumen_diario_poll_idx'),
+        ]
+    
+    def __str__(self):
+        return f"{self.nombre_archivo or self.ruc_emisor} ({self.total_comprobantes} comprobantes)"
+    
+    @property
+    def identificador(self):
+        """ID del resumen en el XML: RC-AAAAMMDD-correlativo"""
+        return self.nombre_archivo.split('-', 1)[1]
+    
+    def get_xml_filename(self):
+        """Nombre del XML del resumen: RUC-RC-AAAAMMDD-correlativo.xml"""
+        return f"{self.nombre_archivo}.xml"
+    
+    def get_zip_filename(self):
+        return f"{self.nombre_archivo}.zip"
+
+
+class ComunicacionBaja(models.Model):
+    """
+    Comunicación de baja (RA, VoidedDocuments) de facturas y sus notas de un emisor para una
+    fecha de emisión, enviada con sendSummary. Si SUNAT la acepta, sus comprobantes quedan ANULADO.
+    """
+    
+    ESTADO_CHOICES = [
+        ('PREPARANDO', 'Preparando'),
+        ('ENVIADO_PENDIENTE', 'Enviado - Pendiente de Respuesta'),
+        ('ACEPTADO', 'Aceptado por SUNAT'),
+        ('RECHAZADO', 'Rechazado por SUNAT'),
+        ('ERROR', 'Error'),
+        ('TICKET_VENCIDO', 'Ticket sin respuesta de SUNAT'),
+    ]
+    
+    ruc_emisor = models.CharField(max_length=11)
+    fecha_emision = models.DateField(help_text="Fecha de emisión de los comprobantes (ReferenceDate)")
+    nombre_archivo = models.CharField(max_length=100, blank=True)
+    estado = models.CharField(max_length=20, choices=ESTADO_CHOICES, default='PREPARANDO')
+    ticket = models.CharField(max_length=100, blank=True, null=True)
+    total_comprobantes = models.PositiveIntegerField(default=0)
+    errores = models.TextField(blank=True, null=True)
+    cdr_zip_path = models.CharField(max_length=500, blank=True, null=True)
+    fecha_creacion = models.DateTimeField(default=timezone.now)
+    fecha_envio = models.DateTimeField(blank=True, null=True)
+    fecha_respuesta = models.DateTimeField(blank=True, null=True)
+    next_poll_at = models.DateTimeField(blank=True, null=True)
+    poll_attempts = models.PositiveIntegerField(default=0)
+    
+    class Meta:
+        db_table = 'comunicaciones_baja'
+        verbose_name = 'Comunicación de Baja'
+        verbose_name_plural = 'Comunicaciones de Baja'
+        indexes = [
+            models.Index(fields=['ruc_emisor', 'fecha_emision'], name='comunicacion_baja_fecha_idx'),
+            models.Index(fields=['estado', 'next_poll_at'], name='comunicacion_baja_poll_idx'),
+        ]
+    
+    def __str__(self):
+        return f"{self.nombre_archivo or self.ruc_emisor} ({self.total_comprobantes} comprobantes)"
+    
+    @property
+    def identificador(self):
+        """ID de la comunicación en el XML: RA-AAAAMMDD-correlativo"""
+        return self.nombre_archivo.split('-', 1)[1]
+    
+    def get_xml_filename(self):
+        """Nombre del XML de la comunicación: RUC-RA-AAAAMMDD-correlativo.xml"""
+        return f"{self.nombre_archivo}.xml"
+    
+    def get_zip_filename(self):
+        return f"{self.nombre_archivo}.zip"
+
+
+class CorrelativoDiario(models.Model):
+    """
+    Último correlativo de los resúmenes (RC) o comunicaciones de baja (RA) de un emisor
+    generados en un día: SUNAT numera RUC-RC-AAAAMMDD-correlativo por emisor y fecha de
+    generación, con hasta 5 dígitos
+    """
+    
+    TIPO_CHOICES = [
+        ('RC', 'Resumen diario'),
+        ('RA', 'Comunicación de baja'),
+    ]
+    
+    ruc_emisor = models.CharField(max_length=11)
+    tipo = models.CharField(max_length=2, choices=TIPO_CHOICES)
+    fecha = models.DateField(help_text="Fecha de generación de los documentos")
+    ultimo = models.PositiveIntegerField(default=0)
+    
+    class Meta:
+        db_table = 'correlativos_diarios'
+        verbose_name = 'Correlativo Diario'
+        verbose_name_plural = 'Correlativos Diarios'
+        unique_together = ['ruc_emisor', 'tipo', 'fecha']
+    
+    def __str__(self):
+        return f"{self.ruc_emisor}-{self.tipo}-{self.fecha:%Y%m%d}: {self.ultimo}"
+
+
+class SubmissionJob(models.Model):
+    """
+    Trabajo pendiente para SUNAT (outbox): las vistas lo encolan y el comando sunat_worker
+    lo toma, lo ejecuta y registra el resultado de cada intento
+    """
+    
+    TIPO_CHOICES = [
+        ('ENVIAR', 'Enviar comprobante'),
+        ('REINTENTAR', 'Reintentar comprobante con error'),
+        ('CONSULTAR_TICKETS', 'Consultar tickets pendientes'),
+    ]
+    
+    ESTADO_CHOICES = [
+        ('PENDIENTE', 'Pendiente'),
+        ('PROCESANDO', 'Procesando'),
+        ('COMPLETADO', 'Completado'),
+        ('FALLIDO', 'Fallido'),
+    ]
+    
+    tipo = models.CharField(max_length=20, choices=TIPO_CHOICES)
+    comprobante = models.ForeignKey(
+        Comprobante, on_delete=models.CASCADE, related_name='submission_jobs', blank=True, null=True
+    )
+    estado = models.CharField(max_length=20, choices=ESTADO_CHOICES, default='PENDIENTE')
+    intentos = models.PositiveIntegerField(default=0)
+    max_intentos = models.PositiveIntegerField(default=5)
+    # No se toma antes de esta fecha (backoff entre intentos)
+    disponible_desde = models.DateTimeField(default=timezone.now)
+    # Worker que lo tomó y hasta cuándo; vencido el plazo, otro worker puede retomarlo
+    worker = models.CharField(max_length=100, blank=True, null=True)
+    bloqueado_hasta = models.DateTimeField(blank=True, null=True)
+    resultado = models.TextField(blank=True, null=True)  # JSON del último intento
+    ultimo_error = models.TextField(blank=True, null=True)
+    # '<tipo>:<comprobante>' mientras está activo (PENDIENTE o PROCESANDO), NULL al terminar:
+    # el índice único impide encolar dos trabajos activos iguales (ver enqueue_job)
+    clave_activa = models.CharField(max_length=40, blank=True, null=True, unique=True)
+    fecha_creacion = models.DateTimeField(default=timezone.now)
+    fecha_actualizacion = models.DateTimeField(auto_now=True)
+    fecha_completado = models.DateTimeField(blank=True, null=True)
+    
+    class Meta:
+        db_table = 'submission_jobs'
+        verbose_name = 'Trabajo SUNAT'
+        verbose_name_plural = 'Trabajos SUNAT'
+        indexes = [
+            models.Index(fields=['estado', 'disponible_desde'], name='submission_job_cola_idx'),
+        ]
+    
+    def __str__(self):
+        return f"{self.get_tipo_display()} #{self.id} ({self.estado})"
+
+
 class SUNATResponse(models.Model):
     """Modelo para almacenar las respuestas de SUNAT"""
     
     comprobante = models.ForeignKey(Comprobante, on_delete=models.CASCADE, related_name='sunat_responses')
     soap_method = models.CharField(max_length=20)
     success = models.BooleanField(default=False)
-    response_data = models.TextField(blank=True, null=True)  # Simplificado
-    soap_response = models.TextField(blank=True, null=True)
+    response_data = models.TextField(blank=True, null=True)  # JSON compacto del resultado
+    soap_response = models.TextField(blank=True, null=True)  # Legado: ya no se guarda el sobre crudo
+    # Sobre SOAP crudo comprimido con gzip, solo si SUNAT_SOAP_CAPTURE lo habilita
+    soap_capture = models.BinaryField(blank=True, null=True)
     ticket = models.CharField(max_length=100, blank=True, null=True)
     response_code = models.CharField(max_length=10, blank=True, null=True)
     response_description = models.TextField(blank=True, null=True)
@@ -159,6 +434,8 @@ class SUNATConfiguration(models.Model):
     environment = models.CharField(max_length=20, default='beta')
     beta_url = models.URLField(default="https://e-beta.sunat.gob.pe/ol-ti-itcpfegem-beta/billService")
     production_url = models.URLField(default="https://e-factura.sunat.gob.pe/ol-ti-itcpfegem/billService")
+    # Peticiones por segundo hacia SUNAT para este emisor (vacío: CLIENT_REGISTRY['RATE_LIMIT'])
+    rate_limit = models.FloatField(blank=True, null=True)
     is_active = models.BooleanField(default=True)
     created_at = models.DateTimeField(default=timezone.now)
     
@@ -188,4 +465,74 @@ class SUNATLog(models.Model):
         ordering = ['-timestamp']
     
     def __str__(self):
-        return f"[{self.level}] {self.operation} - {self.timestamp.strftime('%d/%m/%Y %H:%M:%S')}"
\ No newline at end of file
+        return f"[{self.level}] {self.operation} - {self.timestamp.strftime('%d/%m/%Y %H:%M:%S')}"
+
+class ArtifactBlob(models.Model):
+    """Contenido de un artefacto (XML, ZIP, CDR) direccionado por su hash SHA-256"""
+    
+    sha256 = models.CharField(max_length=64, primary_key=True)
+    size = models.BigIntegerField()
+    refcount = models.PositiveIntegerField(default=0,
+                                           help_text="Cantidad de referencias que apuntan a este blob")
+    created_at = models.DateTimeField(default=timezone.now)
+    
+    class Meta:
+        db_table = 'artifact_blobs'
+        verbose_name = 'Blob de Artefacto'
+        verbose_name_plural = 'Blobs de Artefactos'
+    
+    def __str__(self):
+        return f"{self.sha256[:12]} ({self.size} bytes, {self.refcount} refs)"
+    
+    @property
+    def name(self):
+        """Ruta relativa a MEDIA_ROOT del contenido del blob"""
+        return f"blobs/{self.sha256[:2]}/{self.sha256[2:4]}/{self.sha256}"
+
+
+class ArtifactReference(models.Model):
+    """Referencia de un comprobante a un blob de artefacto"""
+    
+    KIND_CHOICES = [
+        ('xml', 'XML'),
+        ('zip', 'ZIP'),
+        ('cdr_zip', 'CDR ZIP'),
+        ('cdr_xml', 'CDR XML'),
+    ]
+    
+    comprobante = models.ForeignKey(Comprobante, on_delete=models.CASCADE, related_name='artifact_refs')
+    kind = models.CharField(max_length=10, choices=KIND_CHOICES)
+    blob = models.ForeignKey(ArtifactBlob, on_delete=models.PROTECT, related_name='references')
+    filename = models.CharField(max_length=200, help_text="Nombre del archivo según estándar SUNAT")
+    created_at = models.DateTimeField(default=timezone.now)
+    
+    class Meta:
+        db_table = 'artifact_references'
+        verbose_name = 'Referencia de Artefacto'
+        verbose_name_plural = 'Referencias de Artefactos'
+        unique_together = ['comprobante', 'kind']
+    
+    def __str__(self):
+        return f"{self.filename} -> {self.blob_id[:12]}"
+
+
+class LazyArtifact(models.Model):
+    """
+    Payload canónico y firma de un comprobante cuyo XML/ZIP no se guarda:
+    se regenera bajo demanda y se verifica contra xml_sha256.
+    """
+    
+    comprobante = models.OneToOneField(Comprobante, on_delete=models.CASCADE, related_name='lazy_artifact')
+    payload = models.TextField(help_text="JSON canónico de los datos validados del comprobante")
+    signature = models.TextField(blank=True, help_text="Bloque <ds:Signature> del XML firmado")
+    xml_sha256 = models.CharField(max_length=64, help_text="SHA-256 del XML firmado original")
+    xml_size = models.PositiveIntegerField()
+    created_at = models.DateTimeField(default=timezone.now)
+    
+    class Meta:
+        db_table = 'lazy_artifacts'
+        verbose_name = 'Artefacto Diferido'
+        verbose_name_plural = 'Artefactos Diferidos'
+    
+    def __str__(self):
+        return f"{self.comprobante} ({self.xml_sha256[:12]})"
@@ -0,0 +1,262 @@
+# comprobantes/packs.py
+
+import io
+import os
+import hashlib
+import mmap
+import struct
+import threading
+from django.conf import settings
+
+# Formato del archivo pack: cabecera PACK_MAGIC y registros append-only
+#   [longitud de clave (H)][clave][longitud de datos (Q)][datos]
+# Formato del índice: cabecera INDEX_HEADER y registros de tamaño fijo ordenados por clave
+#   [clave (64 bytes, rellenada con \0)][offset de datos (Q)][longitud (Q)]
+PACK_MAGIC = b'SPACK001'
+INDEX_MAGIC = b'SPACKIDX'
+INDEX_VERSION = 1
+INDEX_HEADER = struct.Struct('<8sII')
+INDEX_RECORD = struct.Struct('<64sQQ')
+RECORD_HEADER_KEY = struct.Struct('<H')
+RECORD_HEADER_LENGTH = struct.Struct('<Q')
+
+# Separador entre el nombre del pack y la clave en las rutas guardadas en el modelo
+LOCATOR_SEPARATOR = '#'
+
+
+def get_packs_dir():
+    """Directorio donde se guardan los packs mensuales"""
+    return settings.SUNAT_CONFIG.get('PACKS_DIR', os.path.join(settings.MEDIA_ROOT, 'packs'))
+
+
+def get_pack_name(year, month):
+    """Nombre del pack mensual, relativo a MEDIA_ROOT"""
+    return f'packs/{year:04d}-{month:02d}.pack'
+
+
+def get_pack_paths(year, month):
+    """Rutas absolutas del pack y de su índice"""
+    pack_path = os.path.join(get_packs_dir(), f'{year:04d}-{month:02d}.pack')
+    return pack_path, pack_path[:-len('.pack')] + '.idx'
+
+
+def make_locator(pack_name, key):
+    """Ruta que se guarda en el comprobante para un artefacto empaquetado"""
+    return f'{pack_name}{LOCATOR_SEPARATOR}{key}'
+
+
+def parse_locator(name):
+    """
+    Retorna (ruta absoluta del pack, clave) si la ruta apunta a un pack, o None
+    """
+    name = str(name or '')
+    if LOCATOR_SEPARATOR not in name or not name.startswith('packs/'):
+        return None
+    pack_name, key = name.split(LOCATOR_SEPARATOR, 1)
+    return os.path.join(get_packs_dir(), os.path.basename(pack_name)), key
+
+
+class PackIndex:
+    """Índice ordenado de un pack, leído mediante mmap con búsqueda binaria"""
+
+    def __init__(self, pack_path):
+        self.pack_path = pack_path
+        self.index_path = pack_path[:-len('.pack')] + '.idx'
+        self.mtime = os.path.getmtime(self.index_path)
+        self.lock = threading.Lock()
+        self.closed = False
+
+        with open(self.index_path, 'rb') as f:
+            self.index_map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        with open(self.pack_path, 'rb') as f:
+            self.pack_map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+        magic, version, self.count = INDEX_HEADER.unpack_from(self.index_map, 0)
+        if magic != INDEX_MAGIC or version != INDEX_VERSION:
+            raise ValueError(f'Índice de pack inválido: {self.index_path}')
+
+    def _record(self, position):
+        return INDEX_RECORD.unpack_from(self.index_map, INDEX_HEADER.size + position * INDEX_RECORD.size)
+
+    def lookup(self, key):
+        """Retorna (offset, longitud) de la clave o None si no está en el pack"""
+        encoded = key.encode('utf-8').ljust(INDEX_RECORD.size - 16, b'\0')
+        low, high = 0, self.count
+        while low < high:
+            middle = (low + high) // 2
+            record_key, offset, length = self._record(middle)
+            if record_key < encoded:
+                low = middle + 1
+            elif record_key > encoded:
+                high = middle
+            else:
+                return offset, length
+        return None
+
+    def entries(self):
+        """Lista (clave, offset, longitud) en orden"""
+        with self.lock:
+            if not self.closed:
+                records = [self._record(position) for position in range(self.count)]
+                return [(key.rstrip(b'\0').decode('utf-8'), offset, length) for key, offset, length in records]
+        # El índice se recargó mientras se usaba esta instancia
+        return get_pack_index(self.pack_path).entries()
+
+    def read(self, key):
+        """Slice sin copia (memoryview sobre el mmap) del contenido de la clave"""
+        with self.lock:
+            if not self.closed:
+                location = self.lookup(key)
+                if location is None:
+                    return None
+                offset, length = location
+                return memoryview(self.pack_map)[offset:offset + length]
+        return get_pack_index(self.pack_path).read(key)
+
+    def close(self):
+        """
+        Cierra los mmap. Retorna False (y no cierra nada) si todavía hay slices del pack en uso,
+        por ejemplo descargas en curso; se reintenta en la siguiente recarga.
+        """
+        with self.lock:
+            if self.closed:
+                return True
+            try:
+                self.pack_map.close()
+            except BufferError:
+                return False
+            self.index_map.close()
+            self.closed = True
+            return True
+
+
+_indexes = {}
+_retired_indexes = []
+_indexes_lock = threading.Lock()
+
+
+def get_pack_index(pack_path):
+    """
+    Índice cacheado por proceso. Se recarga si el índice fue reescrito; los mmap del índice
+    anterior se cierran cuando ya no quedan slices suyos en uso.
+    """
+    with _indexes_lock:
+        index = _indexes.get(pack_path)
+        if index is not None and index.mtime == os.path.getmtime(index.index_path):
+            return index
+        if index is not None:
+            _retired_indexes.append(index)
+        _retired_indexes[:] = [retired for retired in _retired_indexes if not retired.close()]
+        index = PackIndex(pack_path)
+        _indexes[pack_path] = index
+        return index
+
+
+def read_from_pack(locator):
+    """Lee un artefacto empaquetado. Retorna un memoryview o None si no existe."""
+    parsed = parse_locator(locator)
+    if parsed is None:
+        return None
+    pack_path, key = parsed
+    try:
+        return get_pack_index(pack_path).read(key)
+    except FileNotFoundError:
+        return None
+
+
+class PackSliceReader(io.RawIOBase):
+    """Archivo de solo lectura sobre un slice del pack, para responder sin copiar el contenido completo"""
+
+    def __init__(self, view):
+        self.view = view
+        self.position = 0
+
+    def readable(self):
+        return True
+
+    def seekable(self):
+        return True
+
+    def seek(self, offset, whence=io.SEEK_SET):
+        if whence == io.SEEK_SET:
+            self.position = offset
+        elif whence == io.SEEK_CUR:
+            self.position += offset
+        else:
+            self.position = len(self.view) + offset
+        return self.position
+
+    def tell(self):
+        return self.position
+
+    def readinto(self, buffer):
+        chunk = self.view[self.position:self.position + len(buffer)]
+        size = len(chunk)
+        buffer[:size] = chunk
+        self.position += size
+        return size
+
+
+def write_pack(year, month, artifacts):
+    """
+    Agrega artefactos al pack del mes y reescribe su índice.
+
+    artifacts: iterable de (clave, contenido en bytes). El pack es append-only: los
+    datos se escriben y sincronizan antes de publicar el nuevo índice, por lo que
+    una interrupción nunca deja el índice apuntando a datos incompletos.
+    Una clave que ya está en el pack con el mismo contenido se omite (reanudar un
+    empaquetado interrumpido); con otro contenido se lanza ValueError sin publicar el índice.
+    Retorna la cantidad de entradas nuevas.
+    """
+    pack_path, index_path = get_pack_paths(year, month)
+    os.makedirs(os.path.dirname(pack_path), exist_ok=True)
+
+    entries = {}
+    existing = None
+    if os.path.exists(index_path) and os.path.exists(pack_path):
+        existing = get_pack_index(pack_path)
+        for key, offset, length in existing.entries():
+            entries[key] = (offset, length)
+    # Hash del contenido de las claves escritas en esta llamada (aún no están en el índice)
+    added_digests = {}
+
+    added = 0
+    with open(pack_path, 'ab') as pack:
+        if pack.tell() == 0:
+            pack.write(PACK_MAGIC)
+
+        for key, content in artifacts:
+            encoded_key = key.encode('utf-8')
+            if len(encoded_key) > INDEX_RECORD.size - 16:
+                raise ValueError(f'Clave demasiado larga para el índice: {key}')
+            if key in added_digests:
+                if added_digests[key] != hashlib.sha256(content).digest():
+                    raise ValueError(f'Clave duplicada con distinto contenido: {key}')
+                continue
+            if key in entries:
+                if bytes(existing.read(key)) != bytes(content):
+                    raise ValueError(f'La clave {key} ya está en el pack con distinto contenido')
+                continue
+
+            pack.write(RECORD_HEADER_KEY.pack(len(encoded_key)))
+            pack.write(encoded_key)
+            pack.write(RECORD_HEADER_LENGTH.pack(len(content)))
+            entries[key] = (pack.tell(), len(content))
+            added_digests[key] = hashlib.sha256(content).digest()
+            pack.write(content)
+            added += 1
+
+        pack.flush()
+        os.fsync(pack.fileno())
+
+    temp_index_path = index_path + '.tmp'
+    with open(temp_index_path, 'wb') as index:
+        index.write(INDEX_HEADER.pack(INDEX_MAGIC, INDEX_VERSION, len(entries)))
+        for key in sorted(entries, key=lambda k: k.encode('utf-8')):
+            offset, length = entries[key]
+            index.write(INDEX_RECORD.pack(key.encode('utf-8'), offset, length))
+        index.flush()
+        os.fsync(index.fileno())
+    os.replace(temp_index_path, index_path)
+
+    return added
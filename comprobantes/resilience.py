@@ -0,0 +1,488 @@
+# comprobantes/resilience.py
+
+import os
+import time
+import random
+import asyncio
+import logging
+import threading
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+
+def get_retry_config():
+    return settings.SUNAT_CONFIG.get('RETRY', {})
+
+
+def get_timeout_config():
+    return settings.SUNAT_CONFIG.get('TIMEOUTS', {})
+
+
+class DeadlineExceeded(TimeoutError):
+    """No queda tiempo del plazo del llamador para hacer (o esperar) la llamada"""
+
+
+class Deadline:
+    """
+    Plazo total de una operación, fijado por quien la inicia (vista, comando, job) y pasado
+    hacia abajo. Cada capa toma de lo que queda sus esperas y los timeouts de conexión y
+    lectura de cada llamada, de modo que nada retiene al llamador más allá del plazo.
+    """
+
+    def __init__(self, seconds):
+        self.seconds = seconds
+        self.expires_at = time.monotonic() + seconds
+
+    @classmethod
+    def coerce(cls, value, default=None):
+        """Deadline a partir de un Deadline, una cantidad de segundos o None (usa default)"""
+        if isinstance(value, cls):
+            return value
+        if value is None:
+            value = default
+        return None if value is None else cls(float(value))
+
+    def remaining(self):
+        return max(self.expires_at - time.monotonic(), 0.0)
+
+    def expired(self):
+        return self.remaining() <= 0
+
+    def exhausted(self):
+        """Lo que queda no alcanza para una llamada más (MIN_BUDGET)"""
+        return self.remaining() < get_timeout_config().get('MIN_BUDGET', 0.5)
+
+    def check(self):
+        if self.exhausted():
+            raise DeadlineExceeded(f"Plazo de {self.seconds:g}s agotado")
+
+    def cap(self, seconds):
+        """seconds recortado a lo que queda del plazo"""
+        return min(seconds, self.remaining())
+
+
+def request_timeouts(deadline=None):
+    """
+    (connect, read) para requests: los configurados, recortados al plazo restante si hay uno.
+    Lanza DeadlineExceeded si el plazo ya no alcanza para la llamada.
+    """
+    config = get_timeout_config()
+    connect = config.get('CONNECT', 5.0)
+    read = config.get('READ', 30.0)
+    if deadline is None:
+        return connect, read
+    deadline.check()
+    return deadline.cap(connect), deadline.cap(read)
+
+
+def is_caller_timeout(exc, timeout_types, shortened):
+    """
+    La llamada se cortó por el plazo del llamador y no por el endpoint: DeadlineExceeded, o un
+    timeout del cliente HTTP (timeout_types) cuando sus timeouts venían recortados (shortened).
+    """
+    return isinstance(exc, DeadlineExceeded) or (shortened and isinstance(exc, timeout_types))
+
+
+class RetryPolicy:
+    """
+    Reintentos con backoff exponencial y jitter completo dentro de un plazo total.
+
+    La espera antes del intento n+1 es aleatoria entre 0 y min(max_delay, base_delay * 2**n),
+    lo que evita que muchos envíos fallidos a la vez reintenten sincronizados. Si la espera
+    excede el plazo restante (el de la política o el Deadline del llamador, el menor) no se
+    reintenta y se retorna el último resultado.
+    """
+
+    def __init__(self, max_attempts=None, base_delay=None, max_delay=None, deadline=None):
+        config = get_retry_config()
+        self.max_attempts = max_attempts or config.get('MAX_ATTEMPTS', 4)
+        self.base_delay = config.get('BASE_DELAY', 0.5) if base_delay is None else base_delay
+        self.max_delay = config.get('MAX_DELAY', 8.0) if max_delay is None else max_delay
+        self.deadline = config.get('DEADLINE', 60.0) if deadline is None else deadline
+
+    def backoff(self, attempt):
+        """Espera (segundos) después del intento número `attempt` (desde 1)"""
+        return random.uniform(0, min(self.max_delay, self.base_delay * 2 ** (attempt - 1)))
+
+    def next_delay(self, attempt, started, deadline=None):
+        """Espera antes del siguiente intento, o None si no quedan intentos o tiempo"""
+        if attempt >= self.max_attempts:
+            return None
+        delay = self.backoff(attempt)
+        if time.monotonic() + delay - started >= self.deadline:
+            return None
+        # Tras la espera debe quedar tiempo para al menos una llamada
+        if deadline is not None and delay + get_timeout_config().get('MIN_BUDGET', 0.5) >= deadline.remaining():
+            return None
+        return delay
+
+    def call(self, func, should_retry, deadline=None):
+        """
+        Ejecuta func() hasta que should_retry(resultado) sea falso o se agoten intentos/plazo.
+        Retorna (resultado, intentos).
+        """
+        started = time.monotonic()
+        attempt = 0
+        while True:
+            attempt += 1
+            result = func()
+            if not should_retry(result):
+                return result, attempt
+            delay = self.next_delay(attempt, started, deadline)
+            if delay is None:
+                return result, attempt
+            logger.warning(f"Falla transitoria (intento {attempt}/{self.max_attempts}); reintento en {delay:.2f}s")
+            time.sleep(delay)
+
+    async def acall(self, func, should_retry, deadline=None):
+        """Versión asíncrona de call(): func es una función que retorna un awaitable"""
+        started = time.monotonic()
+        attempt = 0
+        while True:
+            attempt += 1
+            result = await func()
+            if not should_retry(result):
+                return result, attempt
+            delay = self.next_delay(attempt, started, deadline)
+            if delay is None:
+                return result, attempt
+            logger.warning(f"Falla transitoria (intento {attempt}/{self.max_attempts}); reintento en {delay:.2f}s")
+            await asyncio.sleep(delay)
+
+
+class CircuitOpenError(Exception):
+    """El circuito del endpoint está abierto: no se envía la petición"""
+
+    def __init__(self, endpoint, retry_in):
+        super().__init__(f"Circuito abierto para {endpoint}; se reintentará en {retry_in:.0f}s")
+        self.endpoint = endpoint
+        self.retry_in = retry_in
+
+
+class ConcurrencyLimitError(Exception):
+    """No se obtuvo un cupo de concurrencia hacia el endpoint dentro del tiempo de espera"""
+
+
+class RateLimitError(Exception):
+    """El cliente excedió su límite de peticiones por segundo y la espera superaría el máximo"""
+
+
+class TokenBucket:
+    """
+    Límite de tasa de un cliente (peticiones por segundo con ráfaga), compartido por sus hilos.
+    Cada llamada reserva un permiso; si no hay, espera lo necesario para que se repongan.
+    Las reservas pueden dejar el balance en negativo, por lo que las esperas se encolan en orden.
+    """
+
+    def __init__(self, rate, burst=None, max_wait=10.0):
+        self.rate = float(rate)
+        self.burst = float(burst or max(self.rate, 1))
+        self.max_wait = max_wait
+        self.tokens = self.burst
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+        self.throttled = 0
+        self.rejected = 0
+
+    def reserve(self, deadline=None):
+        """
+        Toma un permiso y retorna los segundos a esperar antes de usarlo; lanza RateLimitError
+        si la espera supera max_wait o lo que queda del plazo del llamador
+        """
+        max_wait = self.max_wait if deadline is None else deadline.cap(self.max_wait)
+        with self.lock:
+            now = time.monotonic()
+            self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+            wait = 0.0 if self.tokens >= 1 else (1 - self.tokens) / self.rate
+            if wait > max_wait:
+                self.rejected += 1
+                raise RateLimitError(f"Límite de {self.rate:g} peticiones/s excedido (espera {wait:.1f}s)")
+            self.tokens -= 1
+            if wait:
+                self.throttled += 1
+            return wait
+
+    def acquire(self, deadline=None):
+        wait = self.reserve(deadline)
+        if wait:
+            time.sleep(wait)
+
+    async def aacquire(self, deadline=None):
+        wait = self.reserve(deadline)
+        if wait:
+            await asyncio.sleep(wait)
+
+    def stats(self):
+        with self.lock:
+            return {
+                'rate': self.rate,
+                'burst': self.burst,
+                'throttled': self.throttled,
+                'rejected': self.rejected,
+            }
+
+
+class CircuitBreaker:
+    """
+    Circuito por endpoint: cerrado -> abierto tras N fallas transitorias consecutivas;
+    abierto rechaza de inmediato durante reset_timeout; luego semiabierto deja pasar
+    unas pocas llamadas de prueba que lo cierran (éxito) o lo vuelven a abrir (falla).
+    """
+
+    CLOSED = 'closed'
+    OPEN = 'open'
+    HALF_OPEN = 'half_open'
+
+    def __init__(self, failure_threshold=5, reset_timeout=30.0, half_open_max_calls=1):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.half_open_max_calls = half_open_max_calls
+        self.state = self.CLOSED
+        self.consecutive_failures = 0
+        self.opened_at = None
+        self.half_open_calls = 0
+        self.times_opened = 0
+
+    def open_for(self, now):
+        """Segundos que faltan para el semiabierto si el circuito está abierto, o None"""
+        if self.state == self.OPEN and self.opened_at + self.reset_timeout > now:
+            return self.opened_at + self.reset_timeout - now
+        return None
+
+    def before_call(self, now):
+        """Retorna None si la llamada puede hacerse, o los segundos que faltan para reintentar"""
+        if self.state == self.OPEN:
+            retry_in = self.opened_at + self.reset_timeout - now
+            if retry_in > 0:
+                return retry_in
+            self.state = self.HALF_OPEN
+            self.half_open_calls = 0
+        if self.state == self.HALF_OPEN:
+            if self.half_open_calls >= self.half_open_max_calls:
+                return self.reset_timeout
+            self.half_open_calls += 1
+        return None
+
+    def on_success(self):
+        self.consecutive_failures = 0
+        if self.state != self.CLOSED:
+            logger.info("Circuito cerrado: el endpoint volvió a responder")
+        self.state = self.CLOSED
+
+    def on_failure(self, now):
+        self.consecutive_failures += 1
+        if self.state == self.HALF_OPEN or self.consecutive_failures >= self.failure_threshold:
+            if self.state != self.OPEN:
+                self.times_opened += 1
+                logger.warning(f"Circuito abierto tras {self.consecutive_failures} fallas consecutivas")
+            self.state = self.OPEN
+            self.opened_at = now
+
+    def on_abandoned(self):
+        """La llamada no dice nada del endpoint: solo libera su turno de prueba si lo tenía"""
+        if self.state == self.HALF_OPEN and self.half_open_calls > 0:
+            self.half_open_calls -= 1
+
+
+class AIMDLimiter:
+    """
+    Límite adaptativo de llamadas en vuelo (aumento aditivo, disminución multiplicativa).
+    Cada éxito rápido suma 1/límite (≈ +1 por ronda completa de llamadas); una falla
+    transitoria o una latencia sobre el umbral multiplica el límite por backoff_ratio,
+    como máximo una vez por cooldown para no desplomarlo con una ráfaga de timeouts.
+    """
+
+    def __init__(self, initial=10, minimum=1, maximum=50, latency_threshold=5.0,
+                 backoff_ratio=0.5, cooldown=1.0):
+        self.limit = float(initial)
+        self.minimum = minimum
+        self.maximum = maximum
+        self.latency_threshold = latency_threshold
+        self.backoff_ratio = backoff_ratio
+        self.cooldown = cooldown
+        self.in_flight = 0
+        self.last_decrease = None
+
+    def has_capacity(self):
+        return self.in_flight < int(self.limit)
+
+    def on_result(self, ok, latency, now):
+        if ok and latency < self.latency_threshold:
+            # Solo crece si el límite actual se está usando
+            if self.in_flight + 1 >= self.limit / 2:
+                self.limit = min(self.maximum, self.limit + 1 / self.limit)
+        elif self.last_decrease is None or now - self.last_decrease >= self.cooldown:
+            self.limit = max(self.minimum, self.limit * self.backoff_ratio)
+            self.last_decrease = now
+
+
+class EndpointGuard:
+    """
+    Circuito + limitador de concurrencia de un endpoint SUNAT, compartido por los hilos del proceso.
+    Uso: started = guard.acquire(); ... guard.release(started, ok) (aacquire() en código asíncrono).
+    ok=None indica una llamada cortada por el llamador (plazo agotado o timeout recortado por él):
+    libera el cupo sin contar como éxito ni como falla del endpoint.
+    """
+
+    def __init__(self, endpoint, breaker_config, limiter_config):
+        self.endpoint = endpoint
+        self.breaker = CircuitBreaker(
+            failure_threshold=breaker_config.get('FAILURE_THRESHOLD', 5),
+            reset_timeout=breaker_config.get('RESET_TIMEOUT', 30.0),
+            half_open_max_calls=breaker_config.get('HALF_OPEN_MAX_CALLS', 1),
+        )
+        self.limiter = AIMDLimiter(
+            initial=limiter_config.get('INITIAL', 10),
+            minimum=limiter_config.get('MIN', 1),
+            maximum=limiter_config.get('MAX', 50),
+            latency_threshold=limiter_config.get('LATENCY_THRESHOLD', 5.0),
+            backoff_ratio=limiter_config.get('BACKOFF_RATIO', 0.5),
+            cooldown=limiter_config.get('COOLDOWN', 1.0),
+        )
+        self.queue_timeout = limiter_config.get('QUEUE_TIMEOUT', 10.0)
+        self.condition = threading.Condition()
+        self.successes = 0
+        self.failures = 0
+        self.rejected = 0
+        self.abandoned = 0
+        self.latency_ewma = None
+
+    def _try_acquire(self, now):
+        """Retorna True si tomó un cupo, False si debe esperar; lanza CircuitOpenError"""
+        # Con el circuito abierto se falla de inmediato, sin esperar cupo
+        retry_in = self.breaker.open_for(now)
+        if retry_in is None:
+            if not self.limiter.has_capacity():
+                return False
+            retry_in = self.breaker.before_call(now)
+        if retry_in is not None:
+            self.rejected += 1
+            raise CircuitOpenError(self.endpoint, retry_in)
+        self.limiter.in_flight += 1
+        return True
+
+    def _timeout(self):
+        self.rejected += 1
+        raise ConcurrencyLimitError(
+            f"Sin cupo de concurrencia hacia {self.endpoint} (límite {int(self.limiter.limit)})"
+        )
+
+    def wait_until(self, deadline=None):
+        """Instante límite de la espera de cupo: queue_timeout, sin pasar el plazo del llamador"""
+        wait_until = time.monotonic() + self.queue_timeout
+        if deadline is not None:
+            wait_until = min(wait_until, deadline.expires_at)
+        return wait_until
+
+    def acquire(self, deadline=None):
+        """Espera un cupo (hasta queue_timeout o el plazo) y retorna el instante de inicio de la llamada"""
+        wait_until = self.wait_until(deadline)
+        with self.condition:
+            while True:
+                now = time.monotonic()
+                if self._try_acquire(now):
+                    return now
+                if now >= wait_until:
+                    self._timeout()
+                self.condition.wait(wait_until - now)
+
+    async def aacquire(self, deadline=None):
+        """Versión asíncrona de acquire(): espera sin bloquear el event loop"""
+        wait_until = self.wait_until(deadline)
+        delay = 0.005
+        while True:
+            with self.condition:
+                now = time.monotonic()
+                if self._try_acquire(now):
+                    return now
+                if now >= wait_until:
+                    self._timeout()
+            await asyncio.sleep(min(delay, max(wait_until - now, 0)))
+            delay = min(delay * 2, 0.1)
+
+    def release(self, started, ok):
+        """Registra el resultado de la llamada (ok=False solo para fallas transitorias, None si la cortó el llamador)"""
+        now = time.monotonic()
+        latency = now - started
+        with self.condition:
+            self.limiter.in_flight -= 1
+            if ok is None:
+                self.abandoned += 1
+                self.breaker.on_abandoned()
+                self.condition.notify_all()
+                return
+            self.limiter.on_result(ok, latency, now)
+            if ok:
+                self.successes += 1
+                self.breaker.on_success()
+            else:
+                self.failures += 1
+                self.breaker.on_failure(now)
+            self.latency_ewma = latency if self.latency_ewma is None else 0.8 * self.latency_ewma + 0.2 * latency
+            self.condition.notify_all()
+
+    def stats(self):
+        with self.condition:
+            now = time.monotonic()
+            retry_in = None
+            if self.breaker.state == CircuitBreaker.OPEN:
+                retry_in = round(max(self.breaker.opened_at + self.breaker.reset_timeout - now, 0), 1)
+            return {
+                'endpoint': self.endpoint,
+                'circuit': {
+                    'state': self.breaker.state,
+                    'consecutive_failures': self.breaker.consecutive_failures,
+                    'times_opened': self.breaker.times_opened,
+                    'retry_in': retry_in,
+                },
+                'concurrency': {
+                    'limit': int(self.limiter.limit),
+                    'in_flight': self.limiter.in_flight,
+                    'min': self.limiter.minimum,
+                    'max': self.limiter.maximum,
+                },
+                'calls': {
+                    'successes': self.successes,
+                    'failures': self.failures,
+                    'rejected': self.rejected,
+                    'abandoned': self.abandoned,
+                    'latency_avg': round(self.latency_ewma, 3) if self.latency_ewma is not None else None,
+                },
+            }
+
+
+_guards = {}
+_guards_pid = None
+_guards_lock = threading.Lock()
+
+
+def get_endpoint_guard(url):
+    """Circuito y limitador del proceso actual para el endpoint de la URL (nuevos después de un fork)"""
+    from .http_sessions import get_endpoint_key
+
+    global _guards_pid
+    endpoint = get_endpoint_key(url)
+    pid = os.getpid()
+
+    with _guards_lock:
+        if _guards_pid != pid:
+            _guards.clear()
+            _guards_pid = pid
+        guard = _guards.get(endpoint)
+        if guard is None:
+            guard = EndpointGuard(
+                endpoint,
+                settings.SUNAT_CONFIG.get('CIRCUIT_BREAKER', {}),
+                settings.SUNAT_CONFIG.get('CONCURRENCY_LIMIT', {}),
+            )
+            _guards[endpoint] = guard
+        return guard
+
+
+def get_guard_stats():
+    """Estado de circuitos y limitadores de todos los endpoints del proceso"""
+    if _guards_pid != os.getpid():
+        return []
+    return [guard.stats() for guard in list(_guards.values())]
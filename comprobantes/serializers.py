@@ -25,7 +25,7 @@ class ComprobanteSerializer(serializers.ModelSerializer):
             'id', 'tipo_comprobante', 'ruc_emisor', 'serie', 'numero',
             'ruc_cliente', 'nombre_cliente', 'direccion_cliente',
             'total_gravado', 'total_igv', 'total', 'estado',
-            'xml_file', 'zip_file', 'errores', 'fecha_creacion',
+            'xml_file', 'zip_file', 'errores', 'fecha_emision', 'fecha_creacion',
             'detalles'
         ]
         read_only_fields = ['id', 'estado', 'xml_file', 'zip_file', 'errores', 'fecha_creacion']
@@ -0,0 +1,23 @@
+# comprobantes/signals.py
+
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .models import ArtifactReference, SUNATConfiguration
+
+
+@receiver(post_delete, sender=ArtifactReference)
+def release_artifact_blob(sender, instance, **kwargs):
+    """Descuenta el refcount del blob cuando se elimina una referencia (incluye borrados en cascada)"""
+    from .blobstore import release_reference
+
+    release_reference(instance)
+
+
+@receiver(post_save, sender=SUNATConfiguration)
+@receiver(post_delete, sender=SUNATConfiguration)
+def invalidate_sunat_client(sender, instance, **kwargs):
+    """Revalida el cliente SOAP del emisor cuando su configuración cambia o se elimina"""
+    from .sunat_clients import invalidate_clients
+
+    invalidate_clients(configuration_id=instance.pk, ruc_emisor=instance.ruc_emisor)
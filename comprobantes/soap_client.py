@@ -4,23 +4,201 @@ import os
 import base64
 import zipfile
 from io import BytesIO
+from contextlib import contextmanager
 from datetime import datetime
 import xml.etree.ElementTree as ET
+from xml.sax.saxutils import escape
 from django.conf import settings
-import requests
 import logging
+import requests
+
+from .http_sessions import get_session
+from .utils import build_zip_bytes, find_cdr_member
+from .resilience import CircuitOpenError, get_endpoint_guard, is_caller_timeout, request_timeouts
+from .sunat_faults import parse_fault_code, classify_exception, classify_http_result, is_endpoint_failure
 
 logger = logging.getLogger(__name__)
 
+# Marcador para partir el sobre SOAP renderizado en prefijo y sufijo
+ENVELOPE_PLACEHOLDER = '\x00'
+
+
+# Elementos de la respuesta SOAP que interesan; el resto del sobre se descarta al leerlo
+RESPONSE_ELEMENTS = frozenset([
+    'sendBillResponse', 'sendSummaryResponse', 'sendPackResponse', 'getStatusResponse', 'getStatusCdrResponse',
+])
+CAPTURED_ELEMENTS = frozenset([
+    'faultcode', 'faultstring', 'applicationResponse', 'ticket', 'content', 'statusCode', 'statusMessage',
+])
+
+# getStatusCdr sin CDR: SUNAT no tiene el comprobante (0011) o no tiene su constancia (0125)
+CDR_NOT_FOUND_CODES = frozenset(['0011', '0125'])
+PARSE_CHUNK_SIZE = 64 * 1024
+
+# Campos del CDR (ApplicationResponse) por etiqueta; se toma la primera aparición de cada uno
+CAC_NS = 'urn:oasis:names:specification:ubl:schema:xsd:CommonAggregateComponents-2'
+CBC_NS = 'urn:oasis:names:specification:ubl:schema:xsd:CommonBasicComponents-2'
+CDR_ID_TAG = f'{{{CBC_NS}}}ID'
+CDR_FIELDS = {
+    CDR_ID_TAG: 'cdr_id',
+    f'{{{CAC_NS}}}DocumentReference': 'referenced_document',
+    f'{{{CBC_NS}}}ResponseCode': 'response_code',
+    f'{{{CBC_NS}}}Description': 'description',
+    f'{{{CBC_NS}}}ResponseDate': 'response_date',
+    f'{{{CBC_NS}}}ResponseTime': 'response_time',
+    f'{{{CBC_NS}}}Note': 'notes',
+}
+
+# Caracteres del cuerpo incluidos en el mensaje de error de respuestas HTTP sin SOAP Fault
+ERROR_BODY_PREVIEW = 500
+
+
+def get_capture_mode():
+    """Captura de sobres crudos para depuración: 'off', 'errors' o 'all'"""
+    return settings.SUNAT_CONFIG.get('SOAP_CAPTURE', 'off')
+
+
+def parse_soap_envelope(data):
+    """
+    Recorre el sobre SOAP una sola vez (XMLPullParser) y extrae solo el Fault o el
+    elemento de respuesta con su applicationResponse/ticket/content/statusCode.
+    Cada elemento se libera al cerrarse y la lectura termina al cerrar el Fault o la respuesta.
+    """
+    if isinstance(data, str):
+        data = data.encode('utf-8')
+    
+    parser = ET.XMLPullParser(events=('start', 'end'))
+    parsed = {}
+    for offset in range(0, max(len(data), 1), PARSE_CHUNK_SIZE):
+        parser.feed(data[offset:offset + PARSE_CHUNK_SIZE])
+        for event, elem in parser.read_events():
+            name = elem.tag.rsplit('}', 1)[-1]
+            if event == 'start':
+                if name == 'Fault':
+                    parsed['fault'] = True
+                elif name in RESPONSE_ELEMENTS:
+                    parsed['response'] = name
+                continue
+            
+            if name in CAPTURED_ELEMENTS and name not in parsed:
+                parsed[name] = elem.text
+            elem.clear()
+            if name == 'Fault' or name in RESPONSE_ELEMENTS:
+                return parsed
+    parser.close()
+    return parsed
+
+
+class Base64Body:
+    """
+    Cuerpo de una petición sendBill/sendSummary: prefijo + ZIP en base64 + sufijo.
+
+    El ZIP (bytes o archivo abierto) se codifica por bloques a medida que se envía, por lo
+    que nunca existe en memoria una copia completa del base64 ni del sobre. La longitud
+    total se conoce de antemano, así que la petición lleva Content-Length (sin chunked).
+    Es de un solo uso: cada intento de envío necesita un cuerpo nuevo.
+    """
+
+    # Múltiplo de 3: cada bloque se codifica sin relleno intermedio
+    CHUNK_SIZE = 3 * 64 * 1024
+
+    def __init__(self, prefix, source, suffix):
+        self.prefix = prefix
+        self.suffix = suffix
+        if isinstance(source, (bytes, bytearray, memoryview)):
+            self.source = memoryview(source)
+            self.source_size = len(self.source)
+        else:
+            self.source = source
+            position = source.tell()
+            self.source_size = source.seek(0, os.SEEK_END) - position
+            source.seek(position)
+        self.length = len(prefix) + 4 * ((self.source_size + 2) // 3) + len(suffix)
+        self._chunks = None
+        self._pending = b''
+
+    def __len__(self):
+        return self.length
+
+    def _source_chunks(self):
+        if isinstance(self.source, memoryview):
+            for offset in range(0, self.source_size, self.CHUNK_SIZE):
+                yield self.source[offset:offset + self.CHUNK_SIZE]
+        else:
+            while True:
+                chunk = self.source.read(self.CHUNK_SIZE)
+                if not chunk:
+                    break
+                yield chunk
+
+    def __iter__(self):
+        yield self.prefix
+        for chunk in self._source_chunks():
+            yield base64.b64encode(chunk)
+        yield self.suffix
+
+    async def aiter(self):
+        """Iterador asíncrono del cuerpo (para clientes HTTP asíncronos)"""
+        for chunk in self:
+            yield chunk
+
+    def read(self, size=-1):
+        """Lectura tipo archivo, para transportes que consumen el cuerpo con read()"""
+        if self._chunks is None:
+            self._chunks = iter(self)
+        if size is None or size < 0:
+            data = self._pending + b''.join(self._chunks)
+            self._pending = b''
+            return data
+        while len(self._pending) < size:
+            chunk = next(self._chunks, None)
+            if chunk is None:
+                break
+            self._pending += chunk
+        data, self._pending = self._pending[:size], self._pending[size:]
+        return data
+
+
 class SUNATSoapClient:
-    """Cliente SOAP para envío de comprobantes electrónicos a SUNAT"""
+    """
+    Cliente SOAP para envío de comprobantes electrónicos a SUNAT.
+
+    Sin argumentos usa el endpoint configurado y las credenciales de pruebas (MODDATOS).
+    Los clientes por emisor (credenciales, URL, pool de conexiones y límite de tasa propios)
+    se obtienen de comprobantes.sunat_clients.get_soap_client().
+    """
     
-    def __init__(self):
-        self.beta_url = "https://e-beta.sunat.gob.pe/ol-ti-itcpfegem-beta/billService"
-        self.prod_url = "https://e-factura.sunat.gob.pe/ol-ti-itcpfegem/billService"
-        self.test_ruc = "20000000001"  # RUC de pruebas SUNAT
-        self.test_usuario = "MODDATOS"
-        self.test_password = "MODDATOS"
+    def __init__(self, ruc=None, usuario=None, password=None, url=None, sessions=None, rate_limiter=None,
+                 consult_url=None):
+        # Endpoint de billService (configurable, p. ej. para apuntar al stub local)
+        self.url = url or settings.SUNAT_CONFIG.get(
+            'BILL_SERVICE_URL', "https://e-beta.sunat.gob.pe/ol-ti-itcpfegem-beta/billService"
+        )
+        # Endpoint de billConsultService (consulta de CDR con getStatusCdr)
+        self.consult_url = consult_url or settings.SUNAT_CONFIG.get(
+            'CONSULT_SERVICE_URL', "https://e-factura.sunat.gob.pe/ol-it-wsconscpegem/billConsultService"
+        )
+        self.ruc = ruc or "20000000001"  # RUC de pruebas SUNAT
+        self.usuario = usuario or "MODDATOS"
+        self.password = password or "MODDATOS"
+        # Pool de conexiones propio (None: el pool compartido del proceso para el endpoint)
+        self.sessions = sessions
+        # Límite de peticiones por segundo del cliente (None: sin límite)
+        self.rate_limiter = rate_limiter
+        # Cabecera WS-Security y sobres pre-renderizados por método
+        self.security_header = self.render_security_header()
+        self._envelope_templates = {}
+    
+    def render_security_header(self):
+        """Cabecera WS-Security con las credenciales del cliente (usuario SOL = RUC + usuario)"""
+        return f'''<soapenv:Header>
+        <wsse:Security>
+            <wsse:UsernameToken>
+                <wsse:Username>{escape(self.ruc + self.usuario)}</wsse:Username>
+                <wsse:Password>{escape(self.password)}</wsse:Password>
+            </wsse:UsernameToken>
+        </wsse:Security>
+    </soapenv:Header>'''
         
     def get_soap_envelope(self, method, content):
         """Genera el sobre SOAP según especificaciones SUNAT"""
@@ -28,14 +206,7 @@ class SUNATSoapClient:
 <soapenv:Envelope xmlns:soapenv="http://schemas.xmlsoap.org/soap/envelope/" 
                   xmlns:ser="http://service.sunat.gob.pe" 
                   xmlns:wsse="http://docs.oasis-open.org/wss/2004/01/oasis-200401-wss-wssecurity-secext-1.0.xsd">
-    <soapenv:Header>
-        <wsse:Security>
-            <wsse:UsernameToken>
-                <wsse:Username>{self.test_ruc}{self.test_usuario}</wsse:Username>
-                <wsse:Password>{self.test_password}</wsse:Password>
-            </wsse:UsernameToken>
-        </wsse:Security>
-    </soapenv:Header>
+    {self.security_header}
     <soapenv:Body>
         <ser:{method}>
             {content}
@@ -43,305 +214,363 @@ class SUNATSoapClient:
     </soapenv:Body>
 </soapenv:Envelope>'''
 
-    def send_bill(self, xml_filename, zip_filename):
+    def get_session(self, url=None):
+        """
+        requests.Session del hilo actual: el pool propio del cliente para billService o,
+        para otros endpoints (o clientes sin pool propio), el compartido del proceso
+        """
+        url = url or self.url
+        if self.sessions is not None and url == self.url:
+            return self.sessions.get_session()
+        return get_session(url)
+
+    def post(self, soap_envelope, headers, url=None, deadline=None):
         """
-        Envía factura a SUNAT usando el método sendBill
+        POST del sobre SOAP (a billService, o al servicio indicado en url) reutilizando las
+        conexiones keep-alive del cliente. Respeta el límite de tasa del cliente y pasa por
+        el circuito y el limitador de concurrencia del endpoint: con SUNAT degradado las
+        llamadas se rechazan de inmediato en lugar de acumular timeouts.
+
+        Los timeouts de conexión y lectura (TIMEOUTS) y las esperas de tasa y cupo se recortan
+        a lo que queda del Deadline del llamador; sin tiempo suficiente se lanza DeadlineExceeded.
+        Un plazo agotado o un timeout recortado por él no cuenta como falla del endpoint.
         """
+        url = url or self.url
+        # El plazo se valida antes de tomar turno de tasa o cupo: un plazo agotado no es una falla del endpoint
+        request_timeouts(deadline)
+        if self.rate_limiter is not None:
+            self.rate_limiter.acquire(deadline)
+        guard = get_endpoint_guard(url)
+        started = guard.acquire(deadline)
+        ok = None
+        timeouts = None
         try:
-            # Leer archivo ZIP
-            zip_path = os.path.join(settings.SUNAT_CONFIG['ZIP_OUTPUT_DIR'], zip_filename)
-            if not os.path.exists(zip_path):
-                raise Exception(f"Archivo ZIP no encontrado: {zip_path}")
-            
-            with open(zip_path, 'rb') as f:
-                zip_content = f.read()
-            
-            # Codificar en base64
-            zip_base64 = base64.b64encode(zip_content).decode('utf-8')
-            
-            # Extraer nombre del archivo sin extensión
-            zip_name = os.path.splitext(zip_filename)[0]
-            
-            # Crear contenido SOAP
-            soap_content = f'''
-            <fileName>{zip_filename}</fileName>
-            <contentFile>{zip_base64}</contentFile>
-            '''
-            
-            # Generar sobre SOAP
-            soap_envelope = self.get_soap_envelope('sendBill', soap_content)
-            
-            # Headers HTTP
-            headers = {
-                'Content-Type': 'text/xml; charset=utf-8',
-                'SOAPAction': 'urn:sendBill',
-                'User-Agent': 'Mozilla/5.0 (compatible; SUNAT-Client/1.0)'
-            }
-            
-            logger.info(f"Enviando comprobante a SUNAT: {zip_filename}")
-            
-            # Enviar a SUNAT Beta (ambiente de pruebas)
-            response = requests.post(
-                self.beta_url,
-                data=soap_envelope.encode('utf-8'),
+            # Recalculados tras las esperas de tasa y cupo
+            timeouts = request_timeouts(deadline)
+            response = self.get_session(url).post(
+                url,
+                data=soap_envelope,
                 headers=headers,
-                timeout=30,
+                timeout=timeouts,
                 verify=True
             )
-            
-            logger.info(f"Respuesta SUNAT - Status: {response.status_code}")
-            
-            if response.status_code == 200:
-                return self.process_soap_response(response.text, zip_name)
-            else:
-                return {
-                    'success': False,
-                    'error': f'Error HTTP {response.status_code}: {response.text}',
-                    'soap_response': response.text
-                }
+            ok = not is_endpoint_failure(classify_http_result(response.status_code, response.content))
+            return response
+        except Exception as e:
+            # Los timeouts recortados por el plazo del llamador no dicen nada del endpoint
+            shortened = timeouts is not None and timeouts != request_timeouts()
+            if not is_caller_timeout(e, requests.exceptions.Timeout, shortened):
+                ok = not is_endpoint_failure(classify_exception(e))
+            raise
+        finally:
+            guard.release(started, ok)
+
+    def get_envelope_template(self, method):
+        """
+        Prefijo y sufijo (bytes) del sobre SOAP de un método.
+        Se renderizan una sola vez por cliente, con la cabecera WS-Security ya incluida.
+        """
+        template = self._envelope_templates.get(method)
+        if template is None:
+            prefix, suffix = self.get_soap_envelope(method, ENVELOPE_PLACEHOLDER).split(ENVELOPE_PLACEHOLDER)
+            template = (prefix.encode('utf-8'), suffix.encode('utf-8'))
+            self._envelope_templates[method] = template
+        return template
+
+    @contextmanager
+    def open_zip(self, zip_filename, zip_path=None, zip_content=None):
+        """Fuente del ZIP a enviar: el contenido recibido o el archivo abierto (sin leerlo completo)"""
+        if zip_content is not None:
+            yield zip_content
+            return
+        if zip_path is None:
+            zip_path = os.path.join(settings.SUNAT_CONFIG['ZIP_OUTPUT_DIR'], zip_filename)
+        if not os.path.exists(zip_path):
+            raise Exception(f"Archivo ZIP no encontrado: {zip_path}")
+        with open(zip_path, 'rb') as f:
+            yield f
+
+    def build_file_request(self, method, zip_filename, zip_source):
+        """
+        Cuerpo y cabeceras HTTP de sendBill/sendSummary para el ZIP indicado (bytes o archivo).
+        El base64 se genera por bloques durante el envío (ver Base64Body).
+        """
+        prefix, suffix = self.get_envelope_template(method)
+        body = Base64Body(
+            prefix + b'<fileName>' + zip_filename.encode('utf-8') + b'</fileName><contentFile>',
+            zip_source,
+            b'</contentFile>' + suffix
+        )
+        
+        headers = {
+            'Content-Type': 'text/xml; charset=utf-8',
+            'Content-Length': str(len(body)),
+            'SOAPAction': f'urn:{method}',
+            'User-Agent': 'Mozilla/5.0 (compatible; SUNAT-Client/1.0)'
+        }
+        return body, headers
+
+    def build_status_request(self, ticket):
+        """Sobre SOAP y cabeceras HTTP de getStatus"""
+        soap_content = f'''
+            <ticket>{ticket}</ticket>
+            '''
+        
+        headers = {
+            'Content-Type': 'text/xml; charset=utf-8',
+            'SOAPAction': 'urn:getStatus'
+        }
+        return self.get_soap_envelope('getStatus', soap_content).encode('utf-8'), headers
+
+    def build_status_cdr_request(self, ruc, tipo, serie, numero):
+        """Sobre SOAP y cabeceras HTTP de getStatusCdr (billConsultService)"""
+        soap_content = (
+            f'<rucComprobante>{escape(ruc)}</rucComprobante>'
+            f'<tipoComprobante>{escape(tipo)}</tipoComprobante>'
+            f'<serieComprobante>{escape(serie)}</serieComprobante>'
+            f'<numeroComprobante>{escape(str(numero))}</numeroComprobante>'
+        )
+        
+        headers = {
+            'Content-Type': 'text/xml; charset=utf-8',
+            'SOAPAction': 'urn:getStatusCdr'
+        }
+        return self.get_soap_envelope('getStatusCdr', soap_content).encode('utf-8'), headers
+
+    def handle_http_response(self, status_code, content, document_name):
+        """
+        Convierte la respuesta HTTP de SUNAT (cuerpo en bytes o texto) en el resultado del cliente.
+        El sobre crudo solo se adjunta ('soap_response') si la captura de depuración está activa.
+        """
+        logger.info(f"Respuesta SUNAT - Status: {status_code}")
+        
+        result = self.process_soap_response(content, document_name)
+        if status_code != 200 and 'fault_code' not in result:
+            # SUNAT responde los SOAP Fault con HTTP 500; sin Fault se reporta el error HTTP
+            body = content.decode('utf-8', 'replace') if isinstance(content, bytes) else content
+            result = {
+                'success': False,
+                'error': f'Error HTTP {status_code}: {body[:ERROR_BODY_PREVIEW]}'
+            }
+        if status_code != 200:
+            result['http_status'] = status_code
+        
+        if get_capture_mode() != 'off':
+            result['soap_response'] = content
+        return result
+
+    def send_bill(self, xml_filename, zip_filename, zip_path=None, zip_content=None, deadline=None):
+        """
+        Envía factura a SUNAT usando el método sendBill (dentro del Deadline opcional del llamador)
+        """
+        try:
+            # El ZIP se lee por bloques durante el envío si no se recibió su contenido
+            with self.open_zip(zip_filename, zip_path, zip_content) as zip_source:
+                soap_envelope, headers = self.build_file_request('sendBill', zip_filename, zip_source)
+                
+                logger.info(f"Enviando comprobante a SUNAT: {zip_filename}")
+                
+                # Enviar a SUNAT Beta (ambiente de pruebas)
+                response = self.post(soap_envelope, headers, deadline=deadline)
+            return self.handle_http_response(response.status_code, response.content, os.path.splitext(zip_filename)[0])
                 
         except Exception as e:
             logger.error(f"Error enviando a SUNAT: {str(e)}")
             return {
                 'success': False,
                 'error': str(e),
-                'soap_response': None
+                'fault_class': classify_exception(e),
+                'circuit_open': isinstance(e, CircuitOpenError)
             }
 
-    def send_summary(self, xml_filename, zip_filename):
+    def send_summary(self, xml_filename, zip_filename, zip_path=None, zip_content=None, deadline=None):
         """
         Envía resumen diario usando el método sendSummary
         """
         try:
-            # Leer archivo ZIP
-            zip_path = os.path.join(settings.SUNAT_CONFIG['ZIP_OUTPUT_DIR'], zip_filename)
-            with open(zip_path, 'rb') as f:
-                zip_content = f.read()
-            
-            zip_base64 = base64.b64encode(zip_content).decode('utf-8')
-            
-            soap_content = f'''
-            <fileName>{zip_filename}</fileName>
-            <contentFile>{zip_base64}</contentFile>
-            '''
-            
-            soap_envelope = self.get_soap_envelope('sendSummary', soap_content)
-            
-            headers = {
-                'Content-Type': 'text/xml; charset=utf-8',
-                'SOAPAction': 'urn:sendSummary'
+            # El ZIP se lee por bloques durante el envío si no se recibió su contenido
+            with self.open_zip(zip_filename, zip_path, zip_content) as zip_source:
+                soap_envelope, headers = self.build_file_request('sendSummary', zip_filename, zip_source)
+                response = self.post(soap_envelope, headers, deadline=deadline)
+            return self.handle_http_response(response.status_code, response.content, os.path.splitext(zip_filename)[0])
+                
+        except Exception as e:
+            return {
+                'success': False,
+                'error': str(e),
+                'fault_class': classify_exception(e),
+                'circuit_open': isinstance(e, CircuitOpenError)
             }
-            
-            response = requests.post(
-                self.beta_url,
-                data=soap_envelope.encode('utf-8'),
-                headers=headers,
-                timeout=30
-            )
-            
-            if response.status_code == 200:
-                return self.process_soap_response(response.text, os.path.splitext(zip_filename)[0])
-            else:
-                return {
-                    'success': False,
-                    'error': f'Error HTTP {response.status_code}: {response.text}'
-                }
+
+    def send_pack(self, zip_filename, zip_path=None, zip_content=None, deadline=None):
+        """
+        Envía un lote de comprobantes (varios XML en un solo ZIP) usando el método sendPack.
+        SUNAT lo procesa de forma asíncrona: la respuesta trae un ticket para getStatus.
+        """
+        try:
+            with self.open_zip(zip_filename, zip_path, zip_content) as zip_source:
+                soap_envelope, headers = self.build_file_request('sendPack', zip_filename, zip_source)
+                
+                logger.info(f"Enviando lote a SUNAT: {zip_filename}")
+                response = self.post(soap_envelope, headers, deadline=deadline)
+            return self.handle_http_response(response.status_code, response.content, os.path.splitext(zip_filename)[0])
                 
         except Exception as e:
+            logger.error(f"Error enviando lote a SUNAT: {str(e)}")
             return {
                 'success': False,
-                'error': str(e)
+                'error': str(e),
+                'fault_class': classify_exception(e),
+                'circuit_open': isinstance(e, CircuitOpenError)
             }
 
-    def get_status(self, ticket):
+    def get_status(self, ticket, deadline=None):
         """
         Consulta el estado de un comprobante usando getStatus
         """
         try:
-            soap_content = f'''
-            <ticket>{ticket}</ticket>
-            '''
-            
-            soap_envelope = self.get_soap_envelope('getStatus', soap_content)
-            
-            headers = {
-                'Content-Type': 'text/xml; charset=utf-8',
-                'SOAPAction': 'urn:getStatus'
+            soap_envelope, headers = self.build_status_request(ticket)
+            response = self.post(soap_envelope, headers, deadline=deadline)
+            return self.handle_http_response(response.status_code, response.content, ticket)
+                
+        except Exception as e:
+            return {
+                'success': False,
+                'error': str(e),
+                'fault_class': classify_exception(e),
+                'circuit_open': isinstance(e, CircuitOpenError)
             }
-            
-            response = requests.post(
-                self.beta_url,
-                data=soap_envelope.encode('utf-8'),
-                headers=headers,
-                timeout=30
-            )
-            
-            if response.status_code == 200:
-                return self.process_soap_response(response.text, ticket)
-            else:
-                return {
-                    'success': False,
-                    'error': f'Error HTTP {response.status_code}: {response.text}'
-                }
+
+    def get_status_cdr(self, ruc, tipo, serie, numero, deadline=None):
+        """
+        Consulta el CDR de un comprobante ya enviado (getStatusCdr). Es de solo lectura: sirve
+        para recuperar la constancia cuando la respuesta de sendBill se perdió, sin reenviar.
+        Con CDR, el resultado trae 'cdr_received' y 'cdr_info' igual que sendBill; sin CDR,
+        'status_code' indica si SUNAT no tiene el comprobante (ver CDR_NOT_FOUND_CODES).
+        """
+        document_name = f"{ruc}-{tipo}-{serie}-{numero}"
+        try:
+            soap_envelope, headers = self.build_status_cdr_request(ruc, tipo, serie, numero)
+            response = self.post(soap_envelope, headers, url=self.consult_url, deadline=deadline)
+            return self.handle_http_response(response.status_code, response.content, document_name)
                 
         except Exception as e:
             return {
                 'success': False,
-                'error': str(e)
+                'error': str(e),
+                'fault_class': classify_exception(e),
+                'circuit_open': isinstance(e, CircuitOpenError)
             }
 
     def process_soap_response(self, soap_response, document_name):
         """
-        Procesa la respuesta SOAP de SUNAT
+        Procesa la respuesta SOAP de SUNAT (bytes o texto) en una sola pasada
         """
         try:
-            # Parsear XML de respuesta
-            root = ET.fromstring(soap_response)
-            
-            # Namespaces SOAP
-            namespaces = {
-                'soap': 'http://schemas.xmlsoap.org/soap/envelope/',
-                'ser': 'http://service.sunat.gob.pe'
+            parsed = parse_soap_envelope(soap_response)
+        except ET.ParseError as e:
+            return {
+                'success': False,
+                'error': f'Error parseando respuesta SOAP: {str(e)}'
             }
-            
-            # Buscar faults (errores)
-            fault = root.find('.//soap:Fault', namespaces)
-            if fault is not None:
-                fault_code = fault.find('faultcode')
-                fault_string = fault.find('faultstring')
+        
+        try:
+            # Fault (error)
+            if parsed.get('fault'):
+                fault_code = parsed.get('faultcode')
+                fault_string = parsed.get('faultstring')
                 
                 return {
                     'success': False,
-                    'error': f"SOAP Fault - Code: {fault_code.text if fault_code is not None else 'Unknown'}, "
-                            f"Message: {fault_string.text if fault_string is not None else 'Unknown'}",
-                    'soap_response': soap_response
+                    'error': f"SOAP Fault - Code: {fault_code or 'Unknown'}, "
+                            f"Message: {fault_string or 'Unknown'}",
+                    'fault_code': parse_fault_code(fault_code, fault_string),
+                    'fault_string': fault_string
                 }
             
-            # Buscar respuesta exitosa
-            response_elements = [
-                './/ser:sendBillResponse',
-                './/ser:sendSummaryResponse', 
-                './/ser:getStatusResponse'
-            ]
-            
-            for response_path in response_elements:
-                response_elem = root.find(response_path, namespaces)
-                if response_elem is not None:
-                    return self.parse_successful_response(response_elem, document_name, soap_response)
+            if parsed.get('response'):
+                return self.parse_successful_response(parsed, document_name)
             
             # Si no se encuentra respuesta conocida
             return {
                 'success': False,
-                'error': 'Formato de respuesta SOAP no reconocido',
-                'soap_response': soap_response
+                'error': 'Formato de respuesta SOAP no reconocido'
             }
             
-        except ET.ParseError as e:
-            return {
-                'success': False,
-                'error': f'Error parseando respuesta SOAP: {str(e)}',
-                'soap_response': soap_response
-            }
         except Exception as e:
             return {
                 'success': False,
-                'error': f'Error procesando respuesta: {str(e)}',
-                'soap_response': soap_response
+                'error': f'Error procesando respuesta: {str(e)}'
             }
 
-    def parse_successful_response(self, response_elem, document_name, soap_response):
+    def parse_successful_response(self, parsed, document_name):
         """
-        Parsea una respuesta exitosa de SUNAT
+        Arma el resultado de una respuesta exitosa de SUNAT a partir de los campos extraídos
         """
         try:
             result = {
                 'success': True,
                 'document_name': document_name,
-                'timestamp': datetime.now().isoformat(),
-                'soap_response': soap_response
+                'timestamp': datetime.now().isoformat()
             }
             
-            # Buscar ticket (para sendSummary)
-            ticket_elem = response_elem.find('ticket')
-            if ticket_elem is not None:
-                result['ticket'] = ticket_elem.text
-                result['message'] = f'Resumen enviado exitosamente. Ticket: {ticket_elem.text}'
+            # Ticket (para sendSummary/sendPack)
+            if parsed.get('ticket') is not None:
+                result['ticket'] = parsed['ticket']
+                result['message'] = f"Resumen enviado exitosamente. Ticket: {parsed['ticket']}"
                 return result
             
-            # Buscar applicationResponse (CDR)
-            app_response = response_elem.find('applicationResponse')
-            if app_response is not None:
-                cdr_content = app_response.text
-                if cdr_content:
-                    # Procesar CDR
-                    cdr_result = self.process_cdr(cdr_content, document_name)
-                    result.update(cdr_result)
-                    return result
-            
-            # Buscar content (para getStatus)
-            content_elem = response_elem.find('content')
-            if content_elem is not None:
-                content = content_elem.text
-                if content:
-                    cdr_result = self.process_cdr(content, document_name)
-                    result.update(cdr_result)
-                    return result
+            # statusCode/statusMessage (getStatus, getStatusCdr)
+            if parsed.get('statusCode') is not None:
+                result['status_code'] = parsed['statusCode']
+            if parsed.get('statusMessage') is not None:
+                result['status_message'] = parsed['statusMessage']
+            
+            # applicationResponse (CDR de sendBill) o content (getStatus, getStatusCdr)
+            cdr_content = parsed.get('applicationResponse') or parsed.get('content')
+            if cdr_content:
+                cdr_result = self.process_cdr(cdr_content, document_name)
+                result.update(cdr_result)
+                return result
             
-            # Respuesta exitosa genérica
-            result['message'] = 'Comprobante procesado exitosamente por SUNAT'
+            # Respuesta exitosa genérica (o el mensaje de estado de SUNAT, si lo hay)
+            result['message'] = parsed.get('statusMessage') or 'Comprobante procesado exitosamente por SUNAT'
             return result
             
         except Exception as e:
             return {
                 'success': False,
-                'error': f'Error parseando respuesta exitosa: {str(e)}',
-                'soap_response': soap_response
+                'error': f'Error parseando respuesta exitosa: {str(e)}'
             }
 
     def process_cdr(self, cdr_base64, document_name):
         """
-        Procesa el CDR (Constancia de Recepción) de SUNAT
+        Procesa el CDR (Constancia de Recepción) de SUNAT en memoria.
+        Solo el ZIP se retorna en 'cdr_zip_content' para que SUNATIntegration lo guarde;
+        el XML se extrae del ZIP cuando alguien lo solicita (ver artifacts.open_artifact).
         """
         try:
             # Decodificar base64
             cdr_zip_content = base64.b64decode(cdr_base64)
             
-            # Crear directorio CDR si no existe
-            cdr_dir = os.path.join(settings.MEDIA_ROOT, 'cdr')
-            os.makedirs(cdr_dir, exist_ok=True)
-            
-            # Guardar ZIP del CDR
-            cdr_zip_path = os.path.join(cdr_dir, f'R-{document_name}.zip')
-            with open(cdr_zip_path, 'wb') as f:
-                f.write(cdr_zip_content)
-            
             # Extraer y procesar CDR XML
             with zipfile.ZipFile(BytesIO(cdr_zip_content), 'r') as zip_file:
-                # El CDR suele tener el formato R-{document_name}.xml
-                cdr_xml_name = f'R-{document_name}.xml'
+                cdr_xml_name = find_cdr_member(zip_file, document_name)
                 
-                if cdr_xml_name in zip_file.namelist():
-                    cdr_xml_content = zip_file.read(cdr_xml_name).decode('utf-8')
-                    
-                    # Guardar CDR XML
-                    cdr_xml_path = os.path.join(cdr_dir, cdr_xml_name)
-                    with open(cdr_xml_path, 'w', encoding='utf-8') as f:
-                        f.write(cdr_xml_content)
-                    
-                    # Parsear CDR para extraer información
-                    cdr_info = self.parse_cdr_xml(cdr_xml_content)
+                if cdr_xml_name is not None:
+                    # Parsear CDR para extraer información (bytes, sin decodificar)
+                    cdr_info = self.parse_cdr_xml(zip_file.read(cdr_xml_name))
                     
                     return {
                         'cdr_received': True,
-                        'cdr_zip_path': f'cdr/R-{document_name}.zip',
-                        'cdr_xml_path': f'cdr/R-{document_name}.xml',
+                        'cdr_zip_content': cdr_zip_content,
                         'cdr_info': cdr_info,
                         'message': f'CDR recibido y procesado. Estado: {cdr_info.get("response_code", "Unknown")}'
                     }
                 else:
                     return {
                         'cdr_received': True,
-                        'cdr_zip_path': f'cdr/R-{document_name}.zip',
+                        'cdr_zip_content': cdr_zip_content,
                         'error': 'No se encontró el XML del CDR en el archivo ZIP',
                         'available_files': zip_file.namelist()
                     }
@@ -352,57 +581,52 @@ class SUNATSoapClient:
                 'cdr_received': False
             }
 
+    def split_pack_cdr(self, cdr_zip_content):
+        """
+        Separa el CDR de un lote (un R-{comprobante}.xml por documento) en CDR individuales.
+        Retorna {nombre_archivo: {'cdr_zip_content', 'cdr_info'}} con un ZIP propio por
+        comprobante, para guardarlo como su artefacto cdr_zip.
+        """
+        documents = {}
+        with zipfile.ZipFile(BytesIO(cdr_zip_content), 'r') as zip_file:
+            for info in zip_file.infolist():
+                name = info.filename
+                if info.is_dir() or not name.lower().endswith('.xml') or not name.startswith('R-'):
+                    continue
+                cdr_xml = zip_file.read(info)
+                documents[name[2:-4]] = {
+                    'cdr_zip_content': build_zip_bytes(name, cdr_xml),
+                    'cdr_info': self.parse_cdr_xml(cdr_xml),
+                }
+        return documents
+
     def parse_cdr_xml(self, cdr_xml):
         """
-        Parsea el XML del CDR para extraer información relevante
+        Extrae la información relevante del XML del CDR (bytes o texto) en una sola pasada
         """
         try:
             root = ET.fromstring(cdr_xml)
             
-            # Namespaces comunes en CDR
-            namespaces = {
-                'cac': 'urn:oasis:names:specification:ubl:schema:xsd:CommonAggregateComponents-2',
-                'cbc': 'urn:oasis:names:specification:ubl:schema:xsd:CommonBasicComponents-2',
-                'ext': 'urn:oasis:names:specification:ubl:schema:xsd:CommonExtensionComponents-2'
-            }
-            
             cdr_info = {}
+            notes = []
+            # Un solo recorrido del árbol; se toma la primera aparición de cada campo
+            for elem in root.iter():
+                field = CDR_FIELDS.get(elem.tag)
+                if field is None:
+                    continue
+                if field == 'notes':
+                    if elem.text:
+                        notes.append(elem.text)
+                elif field == 'referenced_document':
+                    # Referencia al documento original: cbc:ID dentro de cac:DocumentReference
+                    doc_ref_elem = elem.find(CDR_ID_TAG)
+                    if doc_ref_elem is not None:
+                        cdr_info.setdefault(field, doc_ref_elem.text)
+                else:
+                    cdr_info.setdefault(field, elem.text)
             
-            # ID del CDR
-            id_elem = root.find('.//cbc:ID', namespaces)
-            if id_elem is not None:
-                cdr_info['cdr_id'] = id_elem.text
-            
-            # Código de respuesta
-            response_code_elem = root.find('.//cbc:ResponseCode', namespaces)
-            if response_code_elem is not None:
-                cdr_info['response_code'] = response_code_elem.text
-            
-            # Descripción de respuesta
-            description_elem = root.find('.//cbc:Description', namespaces)
-            if description_elem is not None:
-                cdr_info['description'] = description_elem.text
-            
-            # Fecha de respuesta
-            response_date_elem = root.find('.//cbc:ResponseDate', namespaces)
-            if response_date_elem is not None:
-                cdr_info['response_date'] = response_date_elem.text
-            
-            # Hora de respuesta
-            response_time_elem = root.find('.//cbc:ResponseTime', namespaces)
-            if response_time_elem is not None:
-                cdr_info['response_time'] = response_time_elem.text
-            
-            # Referencia al documento original
-            doc_ref_elem = root.find('.//cac:DocumentReference/cbc:ID', namespaces)
-            if doc_ref_elem is not None:
-                cdr_info['referenced_document'] = doc_ref_elem.text
-            
-            # Notas adicionales
-            notes = root.findall('.//cbc:Note', namespaces)
             if notes:
-                cdr_info['notes'] = [note.text for note in notes if note.text]
-            
+                cdr_info['notes'] = notes
             return cdr_info
             
         except Exception as e:
@@ -410,17 +634,20 @@ class SUNATSoapClient:
                 'parse_error': str(e)
             }
 
-    def validate_before_send(self, xml_path):
+    def validate_before_send(self, xml_path, xml_content=None):
         """
         Valida el XML antes de enviarlo a SUNAT
         """
         try:
-            if not os.path.exists(xml_path):
-                return False, "Archivo XML no encontrado"
-            
-            # Verificar que el XML sea válido
-            with open(xml_path, 'r', encoding='utf-8') as f:
-                xml_content = f.read()
+            if xml_content is None:
+                if not os.path.exists(xml_path):
+                    return False, "Archivo XML no encontrado"
+                
+                # Verificar que el XML sea válido
+                with open(xml_path, 'r', encoding='utf-8') as f:
+                    xml_content = f.read()
+            elif isinstance(xml_content, bytes):
+                xml_content = xml_content.decode('utf-8')
             
             root = ET.fromstring(xml_content)
             
@@ -0,0 +1,328 @@
+# comprobantes/storage.py
+
+import os
+import tempfile
+import threading
+import logging
+from contextlib import contextmanager
+from django.conf import settings
+from django.core.files import File
+from django.core.files.storage import FileSystemStorage, Storage
+from django.utils.deconstruct import deconstructible
+from django.utils.module_loading import import_string
+
+# Backend S3 opcional (MinIO u otro servicio compatible)
+try:
+    import boto3
+    from boto3.s3.transfer import TransferConfig
+    from botocore.exceptions import ClientError
+    BOTO3_AVAILABLE = True
+except ImportError:
+    BOTO3_AVAILABLE = False
+
+# Bloqueo entre procesos de la caché local (no disponible en Windows)
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+
+@deconstructible
+class LocalArtifactStorage(FileSystemStorage):
+    """
+    Almacenamiento local de artefactos bajo MEDIA_ROOT.
+    Las escrituras son atómicas (archivo temporal + rename) y sobrescriben el nombre existente.
+    """
+
+    def __init__(self, location=None, base_url=None, **kwargs):
+        super().__init__(location=location or settings.MEDIA_ROOT,
+                         base_url=base_url or settings.MEDIA_URL, **kwargs)
+
+    def get_available_name(self, name, max_length=None):
+        # Los nombres de artefactos son fijos: se sobrescribe en lugar de renombrar
+        return name
+
+    def _save(self, name, content):
+        full_path = self.path(name)
+        directory = os.path.dirname(full_path)
+        os.makedirs(directory, exist_ok=True)
+
+        fd, temp_path = tempfile.mkstemp(dir=directory, prefix='.tmp-')
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                for chunk in content.chunks():
+                    f.write(chunk)
+            if self.file_permissions_mode is not None:
+                os.chmod(temp_path, self.file_permissions_mode)
+            os.replace(temp_path, full_path)
+        except Exception:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+            raise
+
+        return name
+
+    def move(self, old_name, new_name):
+        """Mueve un artefacto dentro del almacenamiento (rename en el mismo disco)"""
+        new_path = self.path(new_name)
+        os.makedirs(os.path.dirname(new_path), exist_ok=True)
+        os.replace(self.path(old_name), new_path)
+        return new_name
+
+
+class ReadThroughCache:
+    """
+    Caché local LRU de artefactos descargados, acotada por tamaño total en bytes.
+
+    El directorio puede ser compartido por varios procesos (workers de gunicorn, sunat_worker):
+    el estado vive en el propio directorio (la fecha de modificación marca el último uso) y la
+    limpieza recorre el directorio bajo un bloqueo de archivo, de modo que el límite se aplica
+    al total y no por proceso.
+    """
+
+    LOCK_FILENAME = '.lock'
+
+    def __init__(self, directory, max_bytes):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.lock = threading.Lock()
+        os.makedirs(directory, exist_ok=True)
+
+    def _key(self, name, version):
+        safe_name = name.replace('/', '__')
+        return f'{safe_name}@{version}' if version else safe_name
+
+    @contextmanager
+    def _locked(self):
+        """Bloqueo entre hilos y, donde hay fcntl, entre procesos que comparten el directorio"""
+        with self.lock:
+            if fcntl is None:
+                yield
+                return
+            with open(os.path.join(self.directory, self.LOCK_FILENAME), 'a') as lock_file:
+                fcntl.flock(lock_file, fcntl.LOCK_EX)
+                try:
+                    yield
+                finally:
+                    fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def _cached_files(self):
+        """(mtime, tamaño, nombre) de los artefactos en caché"""
+        files = []
+        with os.scandir(self.directory) as entries:
+            for entry in entries:
+                if entry.name.startswith('.') or not entry.is_file():
+                    continue
+                try:
+                    stat = entry.stat()
+                except FileNotFoundError:
+                    continue
+                files.append((stat.st_mtime, stat.st_size, entry.name))
+        return files
+
+    def get(self, name, version=None):
+        """Ruta local del artefacto cacheado o None"""
+        path = os.path.join(self.directory, self._key(name, version))
+        try:
+            os.utime(path)
+        except FileNotFoundError:
+            return None
+        return path
+
+    def put(self, name, version, fileobj_writer):
+        """Guarda en caché lo que escriba fileobj_writer(archivo) y retorna la ruta local"""
+        key = self._key(name, version)
+        fd, temp_path = tempfile.mkstemp(dir=self.directory, prefix='.tmp-')
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                fileobj_writer(f)
+        except Exception:
+            os.remove(temp_path)
+            raise
+        path = os.path.join(self.directory, key)
+        os.replace(temp_path, path)
+        self.evict(keep=key)
+        return path
+
+    def evict(self, keep=None):
+        """Elimina los artefactos usados hace más tiempo hasta quedar dentro de max_bytes"""
+        with self._locked():
+            files = sorted(self._cached_files())
+            total_bytes = sum(size for _, size, _ in files)
+            for _, size, filename in files:
+                if total_bytes <= self.max_bytes:
+                    break
+                if filename == keep:
+                    continue
+                try:
+                    os.remove(os.path.join(self.directory, filename))
+                except FileNotFoundError:
+                    pass
+                total_bytes -= size
+
+    def discard(self, name):
+        """Elimina de la caché todas las versiones de un artefacto"""
+        prefix = self._key(name, None)
+        with self._locked():
+            for _, _, filename in self._cached_files():
+                if filename == prefix or filename.startswith(prefix + '@'):
+                    try:
+                        os.remove(os.path.join(self.directory, filename))
+                    except FileNotFoundError:
+                        pass
+
+
+@deconstructible
+class S3ArtifactStorage(Storage):
+    """
+    Almacenamiento de artefactos en un servicio compatible con S3 (AWS, MinIO, etc.).
+
+    - Archivos grandes se suben en partes (multipart upload)
+    - Las lecturas pasan por una caché local pequeña (read-through). Los blobs
+      direccionados por contenido son inmutables y se sirven desde caché sin consultar;
+      el resto se valida contra el ETag del objeto.
+    """
+
+    IMMUTABLE_PREFIXES = ('blobs/',)
+
+    def __init__(self, **options):
+        if not BOTO3_AVAILABLE:
+            raise ImportError('boto3 es requerido para S3ArtifactStorage (pip install boto3)')
+
+        config = dict(settings.SUNAT_CONFIG.get('S3_STORAGE', {}))
+        config.update(options)
+
+        self.bucket_name = config.get('BUCKET', 'sunat-artifacts')
+        self.prefix = config.get('PREFIX', '').strip('/')
+        self.client = boto3.client(
+            's3',
+            endpoint_url=config.get('ENDPOINT_URL'),
+            aws_access_key_id=config.get('ACCESS_KEY'),
+            aws_secret_access_key=config.get('SECRET_KEY'),
+            region_name=config.get('REGION', 'us-east-1'),
+        )
+        self.transfer_config = TransferConfig(
+            multipart_threshold=config.get('MULTIPART_THRESHOLD', 8 * 1024 * 1024),
+            multipart_chunksize=config.get('MULTIPART_CHUNKSIZE', 8 * 1024 * 1024),
+        )
+        self.cache = ReadThroughCache(
+            config.get('CACHE_DIR', os.path.join(tempfile.gettempdir(), 'sunat-artifact-cache')),
+            config.get('CACHE_MAX_BYTES', 256 * 1024 * 1024),
+        )
+
+    def _key(self, name):
+        name = name.replace('\\', '/').lstrip('/')
+        return f'{self.prefix}/{name}' if self.prefix else name
+
+    def _head(self, name):
+        try:
+            return self.client.head_object(Bucket=self.bucket_name, Key=self._key(name))
+        except ClientError as e:
+            if e.response.get('Error', {}).get('Code') in ('404', 'NoSuchKey', 'NotFound'):
+                return None
+            raise
+
+    def _open(self, name, mode='rb'):
+        if 'w' in mode or 'a' in mode:
+            raise ValueError('S3ArtifactStorage solo permite abrir artefactos para lectura')
+
+        immutable = name.startswith(self.IMMUTABLE_PREFIXES)
+        version = None
+        if not immutable:
+            head = self._head(name)
+            if head is None:
+                raise FileNotFoundError(f'Artefacto no encontrado: {name}')
+            version = head['ETag'].strip('"')
+
+        path = self.cache.get(name, version)
+        if path is not None:
+            try:
+                return File(open(path, 'rb'), name=name)
+            except FileNotFoundError:
+                # Otro proceso lo desalojó de la caché entre get y open
+                pass
+
+        try:
+            path = self.cache.put(name, version, lambda f: self.client.download_fileobj(
+                self.bucket_name, self._key(name), f, Config=self.transfer_config
+            ))
+        except ClientError as e:
+            if e.response.get('Error', {}).get('Code') in ('404', 'NoSuchKey', 'NotFound'):
+                raise FileNotFoundError(f'Artefacto no encontrado: {name}')
+            raise
+
+        return File(open(path, 'rb'), name=name)
+
+    def _save(self, name, content):
+        if hasattr(content, 'seek'):
+            content.seek(0)
+        self.client.upload_fileobj(content, self.bucket_name, self._key(name), Config=self.transfer_config)
+        self.cache.discard(name)
+        return name
+
+    def get_available_name(self, name, max_length=None):
+        # Igual que el almacenamiento local: los nombres de artefactos se sobrescriben
+        return name
+
+    def move(self, old_name, new_name):
+        """Copia del lado del servidor y elimina el original"""
+        self.client.copy(
+            {'Bucket': self.bucket_name, 'Key': self._key(old_name)},
+            self.bucket_name, self._key(new_name), Config=self.transfer_config
+        )
+        self.delete(old_name)
+        return new_name
+
+    def delete(self, name):
+        self.client.delete_object(Bucket=self.bucket_name, Key=self._key(name))
+        self.cache.discard(name)
+
+    def exists(self, name):
+        return self._head(name) is not None
+
+    def size(self, name):
+        head = self._head(name)
+        if head is None:
+            raise FileNotFoundError(f'Artefacto no encontrado: {name}')
+        return head['ContentLength']
+
+    def get_modified_time(self, name):
+        head = self._head(name)
+        if head is None:
+            raise FileNotFoundError(f'Artefacto no encontrado: {name}')
+        return head['LastModified']
+
+    def listdir(self, path):
+        prefix = self._key(path).rstrip('/') + '/' if path else (self.prefix + '/' if self.prefix else '')
+        directories, files = [], []
+        paginator = self.client.get_paginator('list_objects_v2')
+        for page in paginator.paginate(Bucket=self.bucket_name, Prefix=prefix, Delimiter='/'):
+            for common in page.get('CommonPrefixes', []):
+                directories.append(common['Prefix'][len(prefix):].rstrip('/'))
+            for item in page.get('Contents', []):
+                files.append(item['Key'][len(prefix):])
+        return directories, files
+
+    def url(self, name):
+        return self.client.generate_presigned_url(
+            'get_object', Params={'Bucket': self.bucket_name, 'Key': self._key(name)}, ExpiresIn=3600
+        )
+
+
+_storage = None
+_storage_lock = threading.Lock()
+
+
+def get_artifact_storage():
+    """Instancia (única por proceso) del backend configurado en SUNAT_CONFIG['ARTIFACT_STORAGE']"""
+    global _storage
+    if _storage is None:
+        with _storage_lock:
+            if _storage is None:
+                backend = settings.SUNAT_CONFIG.get(
+                    'ARTIFACT_STORAGE', 'comprobantes.storage.LocalArtifactStorage'
+                )
+                _storage = import_string(backend)()
+    return _storage
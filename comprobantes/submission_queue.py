@@ -0,0 +1,234 @@
+# comprobantes/submission_queue.py
+
+import os
+import json
+import socket
+import logging
+import threading
+from collections import Counter
+from contextlib import nullcontext
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from datetime import timedelta
+from django.conf import settings
+from django.db import IntegrityError, close_old_connections, connection, transaction
+from django.db.models import Count, F, Q
+from django.utils import timezone
+
+from .models import Comprobante, SubmissionJob
+from .resilience import Deadline
+from .sunat_integration import SUNATIntegration
+
+logger = logging.getLogger(__name__)
+
+
+def get_queue_config():
+    return settings.SUNAT_CONFIG.get('SUBMISSION_QUEUE', {})
+
+
+def get_worker_id():
+    """Identificador del worker (host:pid) que se registra en los trabajos que toma"""
+    return f"{socket.gethostname()}:{os.getpid()}"
+
+
+def get_active_key(tipo, comprobante_id=None):
+    """Clave única (clave_activa) del trabajo activo de un tipo y comprobante"""
+    return f"{tipo}:{comprobante_id or '-'}"
+
+
+def enqueue_job(tipo, comprobante_id=None):
+    """
+    Encola un trabajo. Si ya hay uno activo (pendiente o en proceso) del mismo tipo y
+    comprobante se retorna ese, de modo que repetir la petición no duplica el envío.
+    El índice único de clave_activa resuelve las peticiones simultáneas: solo un INSERT
+    gana y las demás retornan su trabajo. Retorna (trabajo, creado).
+    """
+    key = get_active_key(tipo, comprobante_id)
+    # El trabajo activo puede terminar entre el INSERT rechazado y la lectura: se reintenta
+    for _ in range(3):
+        existing = SubmissionJob.objects.filter(clave_activa=key).first()
+        if existing is not None:
+            return existing, False
+        try:
+            with transaction.atomic():
+                job = SubmissionJob.objects.create(
+                    tipo=tipo,
+                    comprobante_id=comprobante_id,
+                    max_intentos=get_queue_config().get('MAX_ATTEMPTS', 5),
+                    clave_activa=key,
+                )
+            return job, True
+        except IntegrityError:
+            continue
+    raise IntegrityError(f"No se pudo encolar el trabajo {key}")
+
+
+def enqueue_send_jobs(comprobante_ids):
+    """
+    Encola el envío de varios comprobantes con un solo INSERT; los que ya tienen un trabajo
+    activo (índice único de clave_activa) lo conservan.
+    Retorna ({comprobante_id: job_id}, [ids de comprobantes inexistentes]).
+    """
+    comprobante_ids = list(dict.fromkeys(comprobante_ids))
+    existing_ids = set(Comprobante.objects.filter(id__in=comprobante_ids).values_list('id', flat=True))
+    keys = {get_active_key('ENVIAR', comprobante_id): comprobante_id
+            for comprobante_id in comprobante_ids if comprobante_id in existing_ids}
+    max_attempts = get_queue_config().get('MAX_ATTEMPTS', 5)
+    SubmissionJob.objects.bulk_create([
+        SubmissionJob(tipo='ENVIAR', comprobante_id=comprobante_id, max_intentos=max_attempts, clave_activa=key)
+        for key, comprobante_id in keys.items()
+    ], ignore_conflicts=True)
+    jobs = dict(
+        SubmissionJob.objects.filter(clave_activa__in=keys).values_list('comprobante_id', 'id')
+    )
+    # Un trabajo previo que terminó entre el INSERT y la lectura deja su comprobante sin trabajo
+    for comprobante_id in keys.values():
+        if comprobante_id not in jobs:
+            jobs[comprobante_id] = enqueue_job('ENVIAR', comprobante_id)[0].id
+    missing = [comprobante_id for comprobante_id in comprobante_ids if comprobante_id not in existing_ids]
+    return jobs, missing
+
+
+def claim_jobs(limit, worker_id=None):
+    """
+    Toma hasta limit trabajos disponibles (pendientes con el backoff cumplido, o en proceso
+    con el bloqueo vencido porque su worker murió) y los marca PROCESANDO a nombre del worker.
+
+    La selección usa SELECT ... FOR UPDATE SKIP LOCKED: los workers concurrentes se saltan las
+    filas que otro está tomando en lugar de esperarlas. El UPDATE condicional evita además
+    que dos workers tomen el mismo trabajo en bases sin bloqueo de filas.
+    """
+    worker_id = worker_id or get_worker_id()
+    now = timezone.now()
+    locked_until = now + timedelta(seconds=get_queue_config().get('LEASE', 300))
+    available = Q(estado='PENDIENTE', disponible_desde__lte=now) | Q(estado='PROCESANDO', bloqueado_hasta__lt=now)
+
+    candidates = SubmissionJob.objects.filter(available).order_by('disponible_desde', 'id')
+    # SQLite no bloquea filas y una transacción de lectura que luego escribe choca con los hilos
+    # del worker ("database is locked"): ahí basta el UPDATE condicional
+    lock_rows = connection.features.has_select_for_update_skip_locked
+    with transaction.atomic() if lock_rows else nullcontext():
+        if lock_rows:
+            candidates = candidates.select_for_update(skip_locked=True)
+        ids = list(candidates.values_list('id', flat=True)[:limit])
+        if not ids:
+            return []
+        SubmissionJob.objects.filter(available, id__in=ids).update(
+            estado='PROCESANDO',
+            worker=worker_id,
+            bloqueado_hasta=locked_until,
+            intentos=F('intentos') + 1,
+            fecha_actualizacion=now,
+        )
+
+    return list(SubmissionJob.objects.filter(
+        id__in=ids, worker=worker_id, bloqueado_hasta=locked_until
+    ).order_by('id'))
+
+
+def get_retry_delay(attempt):
+    """Espera (segundos) antes de volver a tomar un trabajo tras su intento número `attempt`"""
+    config = get_queue_config()
+    return min(config.get('RETRY_MAX_DELAY', 300.0), config.get('RETRY_BASE_DELAY', 5.0) * 2 ** (attempt - 1))
+
+
+def execute_job(job, integration):
+    """Ejecuta el trabajo con SUNATIntegration dentro de JOB_DEADLINE y retorna su resultado"""
+    deadline = Deadline(get_queue_config().get('JOB_DEADLINE', 60.0))
+    if job.tipo == 'ENVIAR':
+        return integration.send_comprobante_to_sunat(job.comprobante_id, deadline)
+    if job.tipo == 'REINTENTAR':
+        return integration.retry_failed_comprobante(job.comprobante_id, deadline)
+    if job.tipo == 'CONSULTAR_TICKETS':
+        return dict(integration.check_pending_tickets(), success=True)
+    return {'success': False, 'error': f'Tipo de trabajo desconocido: {job.tipo}'}
+
+
+def finish_job(job, result):
+    """
+    Registra el resultado del intento: COMPLETADO si tuvo éxito, de vuelta a PENDIENTE con
+    backoff si la falla es transitoria y quedan intentos, FALLIDO en otro caso.
+    Solo se actualiza si el trabajo sigue tomado por este worker. Retorna el nuevo estado.
+    """
+    now = timezone.now()
+    fields = {
+        'resultado': json.dumps(result, default=str),
+        'worker': None,
+        'bloqueado_hasta': None,
+        'fecha_actualizacion': now,
+    }
+    if result.get('success'):
+        fields.update(estado='COMPLETADO', ultimo_error=None, fecha_completado=now, clave_activa=None)
+    elif result.get('retryable') and job.intentos < job.max_intentos:
+        fields.update(
+            estado='PENDIENTE',
+            ultimo_error=result.get('error'),
+            disponible_desde=now + timedelta(seconds=get_retry_delay(job.intentos)),
+        )
+    else:
+        fields.update(estado='FALLIDO', ultimo_error=result.get('error'), fecha_completado=now, clave_activa=None)
+
+    updated = SubmissionJob.objects.filter(
+        id=job.id, worker=job.worker, bloqueado_hasta=job.bloqueado_hasta
+    ).update(**fields)
+    if not updated:
+        logger.warning(f"Trabajo {job.id}: el bloqueo venció y otro worker lo retomó; no se registra el resultado")
+    return fields['estado']
+
+
+def run_job(job, integration):
+    """Ejecuta y registra un trabajo en un hilo del worker (con sus propias conexiones a la BD)"""
+    close_old_connections()
+    try:
+        try:
+            result = execute_job(job, integration)
+        except Exception as e:
+            logger.error(f"Error en el trabajo {job.id}: {str(e)}")
+            result = {'success': False, 'error': str(e), 'retryable': True}
+        return finish_job(job, result)
+    finally:
+        close_old_connections()
+
+
+def run_worker(max_workers=None, poll_interval=None, once=False, stop_event=None, on_result=None):
+    """
+    Procesa la cola manteniendo hasta max_workers trabajos en ejecución en paralelo y tomando
+    nuevos a medida que terminan. Con once termina cuando no quedan trabajos disponibles; si
+    no, consulta la cola cada poll_interval segundos hasta que se active stop_event (los
+    trabajos en curso se terminan). on_result(job, estado) se llama por cada trabajo.
+    Retorna {estado: cantidad} de los trabajos procesados.
+    """
+    config = get_queue_config()
+    max_workers = max_workers or config.get('WORKERS', 8)
+    poll_interval = config.get('POLL_INTERVAL', 1.0) if poll_interval is None else poll_interval
+    stop_event = stop_event or threading.Event()
+    worker_id = get_worker_id()
+    integration = SUNATIntegration()
+    summary = Counter()
+    in_flight = {}
+
+    with ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='sunat-worker') as executor:
+        while True:
+            if not stop_event.is_set() and len(in_flight) < max_workers:
+                for job in claim_jobs(max_workers - len(in_flight), worker_id):
+                    in_flight[executor.submit(run_job, job, integration)] = job
+
+            if not in_flight:
+                if once or stop_event.is_set():
+                    break
+                stop_event.wait(poll_interval)
+                continue
+
+            done, _ = wait(in_flight, timeout=poll_interval, return_when=FIRST_COMPLETED)
+            for future in done:
+                job = in_flight.pop(future)
+                estado = future.result()
+                summary[estado] += 1
+                if on_result is not None:
+                    on_result(job, estado)
+
+    return dict(summary)
+
+
+def get_queue_stats():
+    """Trabajos por estado (para el dashboard)"""
+    return dict(SubmissionJob.objects.values_list('estado').annotate(total=Count('id')).order_by())
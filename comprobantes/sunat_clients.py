@@ -0,0 +1,180 @@
+# comprobantes/sunat_clients.py
+
+import os
+import time
+import logging
+import threading
+from django.conf import settings
+
+from .http_sessions import EndpointSessions, get_endpoint_key
+from .resilience import TokenBucket
+from .soap_client import SUNATSoapClient
+
+logger = logging.getLogger(__name__)
+
+PRODUCTION_ENVIRONMENTS = ('produccion', 'production', 'prod')
+
+
+def get_registry_config():
+    return settings.SUNAT_CONFIG.get('CLIENT_REGISTRY', {})
+
+
+def get_service_url(configuration):
+    """URL de billService según el ambiente de la configuración"""
+    if (configuration.environment or '').lower() in PRODUCTION_ENVIRONMENTS:
+        return configuration.production_url
+    return configuration.beta_url
+
+
+def configuration_fingerprint(configuration):
+    """Datos de la configuración que determinan el cliente: si cambian, el cliente se reconstruye"""
+    return (
+        configuration.ruc_emisor,
+        configuration.usuario_sunat,
+        configuration.password_sunat,
+        get_service_url(configuration),
+        configuration.rate_limit,
+    )
+
+
+def build_client(configuration):
+    """
+    Cliente SOAP de larga vida para una configuración: credenciales y URL del emisor,
+    cabecera WS-Security pre-renderizada, pool de conexiones y límite de tasa propios
+    """
+    config = get_registry_config()
+    url = get_service_url(configuration)
+    rate = configuration.rate_limit or config.get('RATE_LIMIT', 20.0)
+
+    return SUNATSoapClient(
+        ruc=configuration.ruc_emisor,
+        usuario=configuration.usuario_sunat,
+        password=configuration.password_sunat,
+        url=url,
+        sessions=EndpointSessions(
+            get_endpoint_key(url),
+            pool_maxsize=config.get('POOL_MAXSIZE', 4),
+            pool_block=False,
+        ),
+        rate_limiter=TokenBucket(
+            rate,
+            burst=rate * config.get('RATE_BURST_FACTOR', 2.0),
+            max_wait=config.get('RATE_MAX_WAIT', 10.0),
+        ),
+    )
+
+
+class ClientEntry:
+    """Cliente registrado para un RUC y la configuración de la que se construyó"""
+
+    def __init__(self, client, configuration_id=None, fingerprint=None):
+        self.client = client
+        self.configuration_id = configuration_id
+        self.fingerprint = fingerprint
+        self.checked_at = time.monotonic()
+
+    def close(self):
+        if self.client.sessions is not None:
+            self.client.sessions.close()
+
+
+_entries = {}
+_entries_pid = None
+_entries_lock = threading.Lock()
+_default_client = None
+
+
+def _reset_after_fork():
+    """Los clientes (y sus sockets) del proceso padre no se comparten después de un fork"""
+    global _entries_pid, _default_client
+    pid = os.getpid()
+    if _entries_pid != pid:
+        _entries.clear()
+        _default_client = None
+        _entries_pid = pid
+
+
+def get_default_client():
+    """Cliente con el endpoint configurado y credenciales de pruebas (emisores sin configuración)"""
+    global _default_client
+    with _entries_lock:
+        _reset_after_fork()
+        if _default_client is None:
+            _default_client = SUNATSoapClient()
+        return _default_client
+
+
+def get_soap_client(ruc_emisor):
+    """
+    Cliente SOAP del emisor, construido una vez a partir de su SUNATConfiguration activa.
+
+    La configuración se vuelve a leer como máximo cada TTL segundos (y de inmediato en este
+    proceso cuando la fila cambia, vía señales); el cliente solo se reconstruye si cambiaron
+    las credenciales, la URL o el límite de tasa. Sin configuración activa se usa el
+    cliente por defecto.
+    """
+    from .models import SUNATConfiguration
+
+    ttl = get_registry_config().get('TTL', 60.0)
+    with _entries_lock:
+        _reset_after_fork()
+        entry = _entries.get(ruc_emisor)
+        if entry is not None and time.monotonic() - entry.checked_at < ttl:
+            return entry.client
+
+    configuration = SUNATConfiguration.objects.filter(
+        ruc_emisor=ruc_emisor, is_active=True
+    ).order_by('-id').first()
+    if configuration is None:
+        client = get_default_client()
+        with _entries_lock:
+            previous = _entries.get(ruc_emisor)
+            _entries[ruc_emisor] = ClientEntry(client)
+        if previous is not None and previous.client is not client:
+            previous.close()
+        return client
+
+    fingerprint = configuration_fingerprint(configuration)
+    with _entries_lock:
+        previous = _entries.get(ruc_emisor)
+        if previous is not None and previous.fingerprint == fingerprint:
+            previous.checked_at = time.monotonic()
+            return previous.client
+        entry = ClientEntry(build_client(configuration), configuration.id, fingerprint)
+        _entries[ruc_emisor] = entry
+
+    logger.info(f"Cliente SUNAT creado para {ruc_emisor} ({configuration.name})")
+    if previous is not None and previous.client is not entry.client:
+        previous.close()
+    return entry.client
+
+
+def invalidate_clients(configuration_id=None, ruc_emisor=None):
+    """
+    Marca para revalidar los clientes de una configuración o RUC: el siguiente envío relee la
+    configuración y reconstruye el cliente solo si cambiaron sus credenciales, URL o límite
+    """
+    invalidated = 0
+    with _entries_lock:
+        for ruc, entry in _entries.items():
+            if ruc == ruc_emisor or (configuration_id is not None and entry.configuration_id == configuration_id):
+                entry.checked_at = float('-inf')
+                invalidated += 1
+    return invalidated
+
+
+def get_client_stats():
+    """Clientes por emisor del proceso: endpoint, conexiones y límite de tasa"""
+    if _entries_pid != os.getpid():
+        return []
+    stats = []
+    for ruc, entry in list(_entries.items()):
+        client = entry.client
+        stats.append({
+            'ruc_emisor': ruc,
+            'configuration_id': entry.configuration_id,
+            'url': client.url,
+            'connections': client.sessions.stats() if client.sessions is not None else None,
+            'rate_limit': client.rate_limiter.stats() if client.rate_limiter is not None else None,
+        })
+    return stats
@@ -0,0 +1,178 @@
+# comprobantes/sunat_faults.py
+
+import re
+import asyncio
+import requests
+from urllib3.exceptions import ProtocolError
+
+from .resilience import CircuitOpenError, ConcurrencyLimitError, RateLimitError
+
+# Cliente HTTP asíncrono opcional: sus errores de transporte se clasifican igual que los de requests
+try:
+    import httpx
+    HTTPX_AVAILABLE = True
+except ImportError:
+    HTTPX_AVAILABLE = False
+
+# Clases de falla
+TRANSIENT = 'transient'      # Falla temporal antes de que SUNAT procese el envío (conexión, SUNAT no disponible): se reintenta
+UNCERTAIN = 'uncertain'      # Sin respuesta tras enviar (timeout de lectura, 5xx de pasarela): SUNAT pudo procesarlo; se verifica con getStatusCdr
+CLIENT_ERROR = 'client'      # Error del envío (credenciales, archivo, excepción 0100-1999): corregir y reenviar
+REJECTION = 'rejection'      # Rechazo definitivo del comprobante (errores 2000-3999)
+
+FAULT_CLASS_LABELS = {
+    TRANSIENT: 'Falla temporal',
+    UNCERTAIN: 'Resultado incierto',
+    CLIENT_ERROR: 'Error de envío',
+    REJECTION: 'Rechazo',
+}
+
+# Catálogo de códigos de retorno de SUNAT (excepciones 0100-1999) que indican
+# que el servicio no pudo atender la solicitud y que puede reintentarse tal cual
+TRANSIENT_FAULT_CODES = frozenset([
+    100,                # El sistema no puede responder su solicitud. Intente nuevamente
+    109,                # El servicio de autenticación no está disponible
+    *range(130, 139),   # No se pudo obtener el ticket / grabar el archivo / encolar el pedido / error en BD
+    200,                # Ocurrió un error en el batch
+    201,                # Llegó un requerimiento nulo al batch
+])
+
+# Rango de códigos de rechazo del comprobante
+REJECTION_CODES = range(2000, 4000)
+
+# Estados HTTP sin SOAP Fault que indican que la solicitud no se atendió (demás 5xx: resultado incierto)
+TRANSIENT_HTTP_STATUSES = frozenset([408, 425, 429, 503])
+
+# faultcode: 'soap-env:Client.0100', 'env:Server.0130', ...; faultstring: '0100', '2017 - ...'
+FAULT_CODE_SUFFIX = re.compile(r'(\d{4})\s*$')
+FAULT_CODE_IN_TEXT = re.compile(r'(?<!\d)(\d{4})(?!\d)')
+FAULT_ELEMENT = re.compile(r'<faultcode>([^<]*)</faultcode>\s*(?:<faultstring[^>]*>([^<]*)</faultstring>)?', re.DOTALL)
+
+# La solicitud ya se envió y se perdió la respuesta: no se reenvía a ciegas
+UNCERTAIN_EXCEPTIONS = (
+    requests.exceptions.ReadTimeout,
+    requests.exceptions.ChunkedEncodingError,
+)
+if HTTPX_AVAILABLE:
+    UNCERTAIN_EXCEPTIONS += (httpx.ReadTimeout, httpx.ReadError, httpx.RemoteProtocolError)
+
+# La solicitud no llegó a SUNAT (conexión, plazo, circuito, cupo)
+TRANSIENT_EXCEPTIONS = (
+    requests.exceptions.Timeout,
+    requests.exceptions.ConnectionError,
+    asyncio.TimeoutError,
+    TimeoutError,
+    ConnectionError,
+    CircuitOpenError,
+    ConcurrencyLimitError,
+    RateLimitError,
+)
+if HTTPX_AVAILABLE:
+    TRANSIENT_EXCEPTIONS += (httpx.TimeoutException, httpx.TransportError)
+
+
+def parse_fault_code(faultcode, faultstring=None):
+    """Código numérico de SUNAT (p. ej. '0100') a partir del faultcode o del faultstring"""
+    match = FAULT_CODE_SUFFIX.search(faultcode or '')
+    if match is None:
+        match = FAULT_CODE_IN_TEXT.search(faultstring or '')
+    return match.group(1) if match else None
+
+
+def classify_fault_code(code):
+    """Clase de falla de un código de retorno de SUNAT"""
+    try:
+        number = int(code)
+    except (TypeError, ValueError):
+        return CLIENT_ERROR
+    if number in TRANSIENT_FAULT_CODES:
+        return TRANSIENT
+    if number in REJECTION_CODES:
+        return REJECTION
+    return CLIENT_ERROR
+
+
+def classify_http_status(status_code):
+    """Clase de falla de una respuesta HTTP distinta de 200 sin SOAP Fault"""
+    if status_code in TRANSIENT_HTTP_STATUSES:
+        return TRANSIENT
+    if status_code >= 500:
+        return UNCERTAIN
+    return CLIENT_ERROR
+
+
+def classify_http_result(status_code, text):
+    """
+    Clase de falla de una respuesta HTTP sin procesar el sobre completo, o None si SUNAT
+    respondió normalmente. Usada por el circuito: un SOAP Fault de negocio (HTTP 500 con
+    código no transitorio) indica que el servicio está sano.
+    """
+    if status_code == 200:
+        return None
+    if isinstance(text, bytes):
+        text = text.decode('utf-8', 'replace')
+    match = FAULT_ELEMENT.search(text or '')
+    code = parse_fault_code(match.group(1), match.group(2)) if match else None
+    if code:
+        return classify_fault_code(code)
+    return classify_http_status(status_code)
+
+
+def classify_exception(exc):
+    """
+    Clase de falla de una excepción durante el envío: incierta si la solicitud ya salió
+    (timeout de lectura, conexión cortada esperando la respuesta), transitoria si no llegó
+    a SUNAT (conexión, timeout de conexión, plazo, circuito)
+    """
+    if isinstance(exc, UNCERTAIN_EXCEPTIONS):
+        return UNCERTAIN
+    if isinstance(exc, requests.exceptions.ConnectionError) and exc.args and isinstance(exc.args[0], ProtocolError):
+        # 'Connection aborted': la conexión se cortó después de enviar la solicitud
+        return UNCERTAIN
+    if isinstance(exc, TRANSIENT_EXCEPTIONS):
+        return TRANSIENT
+    return CLIENT_ERROR
+
+
+def classify_response(response):
+    """
+    Clase de falla de una respuesta del cliente SOAP, o None si fue exitosa.
+    Se usa, en orden: la clase fijada por el cliente (excepciones), el código de
+    SUNAT del SOAP Fault y el estado HTTP.
+    """
+    if response.get('success'):
+        return None
+    if response.get('fault_class'):
+        return response['fault_class']
+    if response.get('fault_code'):
+        return classify_fault_code(response['fault_code'])
+    if response.get('http_status'):
+        return classify_http_status(response['http_status'])
+    return CLIENT_ERROR
+
+
+def is_transient(response):
+    return classify_response(response) == TRANSIENT
+
+
+def is_retryable(response):
+    """Falla transitoria que conviene reintentar ya (no si el circuito del endpoint está abierto)"""
+    return is_transient(response) and not response.get('circuit_open')
+
+
+def is_endpoint_failure(fault_class):
+    """Falla atribuible al endpoint (para el circuito y el limitador), transitoria o incierta"""
+    return fault_class in (TRANSIENT, UNCERTAIN)
+
+
+def is_transient_query(response):
+    """
+    Falla que no dice nada del resultado de una consulta de solo lectura (getStatus,
+    getStatusCdr): también las inciertas, porque repetir la consulta no duplica nada
+    """
+    return classify_response(response) in (TRANSIENT, UNCERTAIN)
+
+
+def is_retryable_query(response):
+    """is_retryable() para consultas de solo lectura (ver is_transient_query)"""
+    return is_transient_query(response) and not response.get('circuit_open')
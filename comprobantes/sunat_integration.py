@@ -1,125 +1,327 @@
 # comprobantes/sunat_integration.py
 
-import os
+import gzip
+import json
+import asyncio
 import logging
+from datetime import timedelta
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from itertools import islice
 from django.conf import settings
-from .soap_client import SUNATSoapClient
-from .models import Comprobante, SUNATResponse
+from django.db import close_old_connections, transaction
+from django.db.models import Count, Q
+from django.utils import timezone
+from .soap_client import CDR_NOT_FOUND_CODES, get_capture_mode
+from .sunat_clients import get_soap_client
+from .models import Comprobante, ComunicacionBaja, ResumenDiario, SUNATPack, SUNATResponse
+from .artifacts import has_artifact, read_artifact, save_artifact
+from .resilience import Deadline, RetryPolicy
+from .utils import SigningError, get_signing_credentials
+from .sunat_faults import (
+    TRANSIENT, UNCERTAIN, REJECTION, classify_fault_code, classify_response, is_retryable,
+    is_retryable_query, is_transient_query
+)
+from .daily_summaries import (
+    boleta_note_filter,
+    build_summary_zip,
+    claim_summary,
+    get_razon_social,
+    group_summary_candidates,
+    is_summary_document,
+    is_summary_enabled,
+    save_summary_cdr,
+    summary_candidates,
+    summary_document_filter,
+)
+from .sunat_packs import build_pack_zip, claim_pack, get_pack_config, group_pack_candidates, pack_candidates
+from .ticket_polling import (
+    claim_due_tickets,
+    get_polling_config,
+    pending_ticket_bajas,
+    pending_ticket_comprobantes,
+    pending_ticket_packs,
+    pending_ticket_resumenes,
+    reschedule_poll,
+    schedule_first_poll,
+)
+from .voided_documents import (
+    MAX_MOTIVO_LENGTH,
+    build_voided_zip,
+    claim_void_summary,
+    claim_voided,
+    get_voiding_config,
+    void_candidates,
+)
 
 logger = logging.getLogger(__name__)
 
+
+def claim_send(comprobante):
+    """
+    Toma el comprobante para sendBill con un UPDATE condicional (GENERADO -> ENVIANDO), como
+    claim_pack y claim_summary: si dos procesos lo envían a la vez, solo uno lo consigue. No
+    se toma si un lote en preparación (sendPack) ya lo tiene asignado. Retorna True si lo tomó.
+    """
+    now = timezone.now()
+    stale_before = now - timedelta(seconds=get_pack_config().get('CLAIM_TIMEOUT', 600))
+    claimed = Comprobante.objects.filter(id=comprobante.id, estado='GENERADO').exclude(
+        pack__estado='PREPARANDO', pack__fecha_creacion__gte=stale_before
+    ).update(estado='ENVIANDO', fecha_actualizacion=now)
+    if claimed:
+        comprobante.estado = 'ENVIANDO'
+    return bool(claimed)
+
+
+def release_send(comprobante):
+    """Devuelve a GENERADO un comprobante tomado con claim_send que no llegó a enviarse"""
+    Comprobante.objects.filter(id=comprobante.id, estado='ENVIANDO').update(
+        estado='GENERADO', fecha_actualizacion=timezone.now()
+    )
+    comprobante.estado = 'GENERADO'
+
+
 class SUNATIntegration:
     """Clase para manejar la integración completa con SUNAT"""
     
-    def __init__(self):
-        self.soap_client = SUNATSoapClient()
+    def __init__(self, soap_client=None):
+        # Cliente fijo para todos los envíos (p. ej. el stub local); por defecto, el del emisor
+        self.soap_client = soap_client
+        self.retry_policy = RetryPolicy()
+    
+    def get_soap_client(self, comprobante):
+        """Cliente SOAP del emisor del comprobante (registro de clientes por SUNATConfiguration)"""
+        if self.soap_client is not None:
+            return self.soap_client
+        return get_soap_client(comprobante.ruc_emisor)
     
-    def send_comprobante_to_sunat(self, comprobante_id):
+    def send_comprobante_to_sunat(self, comprobante_id, deadline=None):
         """
-        Envía un comprobante completo a SUNAT y procesa la respuesta
+        Envía un comprobante completo a SUNAT y procesa la respuesta.
+        deadline (Deadline o segundos) es el plazo total del llamador para envío y reintentos;
+        por defecto, el plazo de la política de reintentos.
         """
         try:
             # Obtener comprobante
             comprobante = Comprobante.objects.get(id=comprobante_id)
-            
-            if comprobante.estado != 'GENERADO':
-                return {
-                    'success': False,
-                    'error': f'El comprobante debe estar en estado GENERADO, actual: {comprobante.estado}'
-                }
-            
-            # Verificar archivos
-            if not comprobante.xml_file or not comprobante.zip_file:
-                return {
-                    'success': False,
-                    'error': 'El comprobante no tiene archivos XML y ZIP generados'
-                }
-            
-            xml_filename = os.path.basename(str(comprobante.xml_file))
-            zip_filename = os.path.basename(str(comprobante.zip_file))
+        except Comprobante.DoesNotExist:
+            return {
+                'success': False,
+                'error': f'Comprobante con ID {comprobante_id} no encontrado'
+            }
+        return self.send_comprobante(comprobante, deadline)
+    
+    def send_comprobante(self, comprobante, deadline=None):
+        """Envía un comprobante ya cargado (ver send_comprobante_to_sunat)"""
+        deadline = Deadline.coerce(deadline, default=self.retry_policy.deadline)
+        try:
+            prepared = self._prepare_send(comprobante)
+            if 'error' in prepared:
+                return prepared
             
             logger.info(f"Enviando comprobante {comprobante} a SUNAT")
             
-            # Validar antes de enviar
-            xml_path = os.path.join(settings.MEDIA_ROOT, str(comprobante.xml_file))
-            is_valid, validation_message = self.soap_client.validate_before_send(xml_path)
-            
-            if not is_valid:
-                comprobante.estado = 'ERROR_VALIDACION'
-                comprobante.errores = validation_message
-                comprobante.save()
-                
-                return {
-                    'success': False,
-                    'error': f'Validación fallida: {validation_message}'
-                }
-            
             # Determinar método de envío según tipo de comprobante
-            if comprobante.tipo_comprobante in ['01', '03', '07', '08']:  # Facturas, Boletas, NC, ND
-                response = self.soap_client.send_bill(xml_filename, zip_filename)
-            else:
-                response = self.soap_client.send_summary(xml_filename, zip_filename)
-            
-            # Guardar respuesta en base de datos
-            sunat_response = SUNATResponse.objects.create(
-                comprobante=comprobante,
-                soap_method='sendBill' if comprobante.tipo_comprobante in ['01', '03', '07', '08'] else 'sendSummary',
-                success=response.get('success', False),
-                response_data=response,
-                soap_response=response.get('soap_response', ''),
-                ticket=response.get('ticket'),
-                cdr_zip_path=response.get('cdr_zip_path'),
-                cdr_xml_path=response.get('cdr_xml_path')
-            )
-            
-            # Actualizar estado del comprobante
-            if response.get('success'):
-                if response.get('ticket'):
-                    # Es un resumen, necesita consulta posterior
-                    comprobante.estado = 'ENVIADO_PENDIENTE'
-                    comprobante.ticket_sunat = response.get('ticket')
-                elif response.get('cdr_received'):
-                    # CDR recibido directamente
-                    comprobante.estado = 'ACEPTADO'
-                    comprobante.cdr_zip_path = response.get('cdr_zip_path')
-                    comprobante.cdr_xml_path = response.get('cdr_xml_path')
-                else:
-                    comprobante.estado = 'ENVIADO'
+            soap_client = self.get_soap_client(comprobante)
+            if prepared['soap_method'] == 'sendBill':
+                send = soap_client.send_bill
             else:
-                comprobante.estado = 'RECHAZADO'
-                comprobante.errores = response.get('error', 'Error desconocido')
+                send = soap_client.send_summary
             
-            comprobante.sunat_response = sunat_response
-            comprobante.save()
+            # Las fallas transitorias se reintentan con backoff; cada intento arma un cuerpo nuevo
+            response, attempts = self.retry_policy.call(
+                lambda: send(prepared['xml_filename'], prepared['zip_filename'],
+                             zip_content=prepared['zip_content'], deadline=deadline),
+                is_retryable,
+                deadline
+            )
+            response['attempts'] = attempts
             
-            logger.info(f"Comprobante {comprobante} enviado a SUNAT. Estado: {comprobante.estado}")
+            # La respuesta, el CDR y el nuevo estado se guardan juntos (no durante la llamada a SUNAT)
+            with transaction.atomic():
+                return self._apply_send_response(comprobante, prepared['soap_method'], response)
             
+        except Exception as e:
+            logger.error(f"Error enviando comprobante {comprobante.id} a SUNAT: {str(e)}")
             return {
-                'success': response.get('success', False),
-                'comprobante_id': comprobante.id,
-                'estado': comprobante.estado,
-                'message': response.get('message', ''),
-                'ticket': response.get('ticket'),
-                'cdr_info': response.get('cdr_info'),
-                'sunat_response_id': sunat_response.id
+                'success': False,
+                'error': str(e)
+            }
+    
+    def _prepare_send(self, comprobante):
+        """
+        Verifica el estado, lee y valida los artefactos del comprobante y lo toma para el envío
+        (claim_send). Retorna los datos del envío, o un dict con 'error' si no se puede enviar.
+        """
+        if comprobante.estado != 'GENERADO':
+            return {
+                'success': False,
+                'error': f'El comprobante debe estar en estado GENERADO, actual: {comprobante.estado}'
+            }
+        
+        if is_summary_enabled() and is_summary_document(comprobante):
+            # Las boletas no van por sendBill: las informa el resumen diario (send_summaries)
+            return {
+                'success': False,
+                'error': 'Las boletas se informan a SUNAT en el resumen diario',
+                'resumen_diario': True
+            }
+        
+        # Verificar archivos
+        if not has_artifact(comprobante, 'xml') or not has_artifact(comprobante, 'zip'):
+            return {
+                'success': False,
+                'error': 'El comprobante no tiene archivos XML y ZIP generados'
             }
+        
+        # Validar antes de enviar (los artefactos se leen desde el almacenamiento configurado)
+        try:
+            xml_content = read_artifact(comprobante, 'xml')
+            zip_content = read_artifact(comprobante, 'zip')
+        except FileNotFoundError as e:
+            zip_content = None
+            is_valid, validation_message = False, f"Archivo no encontrado: {str(e)}"
+        else:
+            is_valid, validation_message = self.get_soap_client(comprobante).validate_before_send(None, xml_content=xml_content)
+        
+        if not is_valid:
+            comprobante.estado = 'ERROR_VALIDACION'
+            comprobante.errores = validation_message
+            comprobante.save()
             
-        except Comprobante.DoesNotExist:
             return {
                 'success': False,
-                'error': f'Comprobante con ID {comprobante_id} no encontrado'
+                'error': f'Validación fallida: {validation_message}'
             }
-        except Exception as e:
-            logger.error(f"Error enviando comprobante {comprobante_id} a SUNAT: {str(e)}")
+        
+        # Solo un proceso envía el comprobante: el que lo pasa de GENERADO a ENVIANDO
+        if not claim_send(comprobante):
             return {
                 'success': False,
-                'error': str(e)
+                'error': 'El comprobante ya está siendo enviado o fue tomado por otro proceso'
             }
+        
+        return {
+            # Facturas, NC, ND (y boletas si el resumen diario está desactivado) van por sendBill
+            'soap_method': 'sendBill' if comprobante.tipo_comprobante in ['01', '03', '07', '08'] else 'sendSummary',
+            'xml_filename': comprobante.get_xml_filename(),
+            'zip_filename': comprobante.get_zip_filename(),
+            'zip_content': zip_content,
+        }
     
-    def check_ticket_status(self, comprobante_id):
+    def _apply_send_response(self, comprobante, soap_method, response):
+        """Guarda la respuesta de SUNAT, actualiza el estado del comprobante y arma el resultado"""
+        self._store_cdr(comprobante, response)
+        
+        # Guardar respuesta en base de datos
+        sunat_response = self._create_sunat_response(comprobante, soap_method, response, response.get('ticket'))
+        
+        # Actualizar estado del comprobante
+        fault_class = classify_response(response)
+        if response.get('success'):
+            comprobante.fecha_envio_sunat = timezone.now()
+            if response.get('ticket'):
+                # Es un resumen, necesita consulta posterior
+                comprobante.estado = 'ENVIADO_PENDIENTE'
+                comprobante.ticket_sunat = response.get('ticket')
+                schedule_first_poll(comprobante)
+            elif response.get('cdr_received'):
+                # CDR recibido directamente: su código indica si SUNAT aceptó o rechazó el comprobante
+                cdr_info = response.get('cdr_info') or {}
+                if classify_fault_code(cdr_info.get('response_code')) == REJECTION:
+                    comprobante.estado = 'RECHAZADO'
+                    comprobante.errores = cdr_info.get('description')
+                else:
+                    comprobante.estado = 'ACEPTADO'
+                    comprobante.errores = None
+                comprobante.cdr_zip_path = response.get('cdr_zip_path')
+                comprobante.cdr_xml_path = response.get('cdr_xml_path')
+            else:
+                comprobante.estado = 'ENVIADO'
+        elif fault_class == TRANSIENT:
+            # SUNAT no llegó a procesarlo: sigue listo para reenviarse
+            comprobante.estado = 'GENERADO'
+            comprobante.errores = response.get('error', 'Error desconocido')
+        elif fault_class == UNCERTAIN:
+            # SUNAT pudo haberlo procesado: no se reenvía, el CDR se recupera con getStatusCdr (reconcile_cdr)
+            comprobante.estado = 'ENVIADO'
+            comprobante.fecha_envio_sunat = timezone.now()
+            comprobante.errores = f"Sin respuesta de SUNAT: {response.get('error', 'Error desconocido')}"
+        elif fault_class == REJECTION:
+            comprobante.estado = 'RECHAZADO'
+            comprobante.errores = response.get('error', 'Error desconocido')
+        else:
+            # Excepción del envío (credenciales, archivo, etc.): se corrige y se reenvía
+            comprobante.estado = 'ERROR'
+            comprobante.errores = response.get('error', 'Error desconocido')
+        
+        comprobante.sunat_response = sunat_response
+        comprobante.save()
+        
+        logger.info(f"Comprobante {comprobante} enviado a SUNAT. Estado: {comprobante.estado}")
+        
+        rejected = comprobante.estado == 'RECHAZADO'
+        return {
+            'success': response.get('success', False) and not rejected,
+            'comprobante_id': comprobante.id,
+            'estado': comprobante.estado,
+            'message': response.get('message', ''),
+            'error': comprobante.errores if rejected else response.get('error'),
+            'ticket': response.get('ticket'),
+            'cdr_info': response.get('cdr_info'),
+            'fault_class': fault_class,
+            'retryable': fault_class == TRANSIENT,
+            'attempts': response.get('attempts', 1),
+            'sunat_response_id': sunat_response.id
+        }
+    
+    def _create_sunat_response(self, comprobante, soap_method, response, ticket):
+        """Registra la respuesta de SUNAT del comprobante (ver _build_sunat_response)"""
+        sunat_response = self._build_sunat_response(comprobante, soap_method, response, ticket)
+        sunat_response.save()
+        return sunat_response
+    
+    def _build_sunat_response(self, comprobante, soap_method, response, ticket):
+        """
+        Respuesta de SUNAT sin guardar: resultado en JSON compacto, código y descripción
+        (del CDR o del Fault) y, solo si SUNAT_SOAP_CAPTURE lo habilita, el sobre crudo con gzip.
+        """
+        raw = response.pop('soap_response', None)
+        success = response.get('success', False)
+        cdr_info = response.get('cdr_info') or {}
+        
+        capture = get_capture_mode()
+        soap_capture = None
+        if raw and (capture == 'all' or (capture == 'errors' and not success)):
+            soap_capture = gzip.compress(raw.encode('utf-8') if isinstance(raw, str) else raw)
+        
+        return SUNATResponse(
+            comprobante=comprobante,
+            soap_method=soap_method,
+            success=success,
+            response_data=json.dumps(response, separators=(',', ':'), ensure_ascii=False, default=str),
+            soap_capture=soap_capture,
+            ticket=ticket,
+            response_code=cdr_info.get('response_code') or response.get('fault_code'),
+            response_description=cdr_info.get('description') or response.get('fault_string') or response.get('error'),
+            cdr_zip_path=response.get('cdr_zip_path'),
+            cdr_xml_path=response.get('cdr_xml_path')
+        )
+    
+    def _store_cdr(self, comprobante, response):
         """
-        Consulta el estado de un ticket en SUNAT
+        Guarda el CDR recibido en la respuesta como artefacto del comprobante.
+        Solo se escribe el ZIP; el XML se extrae de él al descargarlo o exportarlo.
+        """
+        cdr_zip_content = response.pop('cdr_zip_content', None)
+        
+        if cdr_zip_content is not None:
+            response['cdr_zip_path'] = save_artifact(comprobante, 'cdr_zip', cdr_zip_content)
+    
+    def check_ticket_status(self, comprobante_id, deadline=None):
         """
+        Consulta el estado de un ticket en SUNAT (dentro del plazo deadline, ver send_comprobante_to_sunat)
+        """
+        deadline = Deadline.coerce(deadline, default=self.retry_policy.deadline)
         try:
             comprobante = Comprobante.objects.get(id=comprobante_id)
             
@@ -131,41 +333,57 @@ class SUNATIntegration:
             
             logger.info(f"Consultando estado de ticket {comprobante.ticket_sunat}")
             
-            # Consultar estado en SUNAT
-            response = self.soap_client.get_status(comprobante.ticket_sunat)
+            # Consultar estado en SUNAT (con reintentos ante fallas transitorias)
+            soap_client = self.get_soap_client(comprobante)
+            response, attempts = self.retry_policy.call(
+                lambda: soap_client.get_status(comprobante.ticket_sunat, deadline=deadline), is_retryable_query, deadline
+            )
+            response['attempts'] = attempts
+            self._store_cdr(comprobante, response)
             
             # Guardar respuesta
-            sunat_response = SUNATResponse.objects.create(
-                comprobante=comprobante,
-                soap_method='getStatus',
-                success=response.get('success', False),
-                response_data=response,
-                soap_response=response.get('soap_response', ''),
-                ticket=comprobante.ticket_sunat,
-                cdr_zip_path=response.get('cdr_zip_path'),
-                cdr_xml_path=response.get('cdr_xml_path')
-            )
+            sunat_response = self._create_sunat_response(comprobante, 'getStatus', response, comprobante.ticket_sunat)
             
             # Actualizar estado del comprobante
+            stale = False
             if response.get('success') and response.get('cdr_received'):
-                comprobante.estado = 'ACEPTADO'
+                cdr_info = response.get('cdr_info') or {}
+                if classify_fault_code(cdr_info.get('response_code')) == REJECTION:
+                    comprobante.estado = 'RECHAZADO'
+                    comprobante.errores = cdr_info.get('description')
+                else:
+                    comprobante.estado = 'ACEPTADO'
+                    comprobante.errores = None
                 comprobante.cdr_zip_path = response.get('cdr_zip_path')
                 comprobante.cdr_xml_path = response.get('cdr_xml_path')
+                comprobante.next_poll_at = None
             elif response.get('success'):
                 comprobante.estado = 'PROCESANDO'
+                stale = reschedule_poll(comprobante, comprobante.fecha_envio_sunat)
+            elif is_transient_query(response):
+                # El ticket sigue pendiente: se volverá a consultar
+                comprobante.errores = response.get('error', 'Error desconocido')
+                stale = reschedule_poll(comprobante, comprobante.fecha_envio_sunat)
             else:
                 comprobante.estado = 'RECHAZADO'
                 comprobante.errores = response.get('error', 'Error desconocido')
+                comprobante.next_poll_at = None
+            if stale:
+                comprobante.estado = 'TICKET_VENCIDO'
+                comprobante.errores = f'Ticket {comprobante.ticket_sunat} sin respuesta de SUNAT'
             
             comprobante.save()
             
+            rejected = comprobante.estado == 'RECHAZADO'
             return {
-                'success': response.get('success', False),
+                'success': response.get('success', False) and not rejected,
                 'comprobante_id': comprobante.id,
                 'estado': comprobante.estado,
+                'error': comprobante.errores if rejected else response.get('error'),
                 'ticket': comprobante.ticket_sunat,
                 'cdr_info': response.get('cdr_info'),
                 'message': response.get('message', ''),
+                'retryable': is_transient_query(response),
                 'sunat_response_id': sunat_response.id
             }
             
@@ -218,26 +436,32 @@ class SUNATIntegration:
                 'error': str(e)
             }
     
-    def retry_failed_comprobante(self, comprobante_id):
+    def retry_failed_comprobante(self, comprobante_id, deadline=None):
         """
         Reintenta el envío de un comprobante que falló
         """
         try:
             comprobante = Comprobante.objects.get(id=comprobante_id)
             
-            if comprobante.estado not in ['RECHAZADO', 'ERROR_VALIDACION']:
+            if comprobante.estado not in ['RECHAZADO', 'ERROR', 'ERROR_VALIDACION']:
                 return {
                     'success': False,
                     'error': f'El comprobante no está en estado de error. Estado actual: {comprobante.estado}'
                 }
             
-            # Resetear estado y errores
+            # Resetear estado y errores; se suelta del resumen o lote que falló (y de su ticket)
+            # para que el próximo resumen diario o lote pueda volver a tomarlo
             comprobante.estado = 'GENERADO'
             comprobante.errores = None
+            comprobante.resumen = None
+            comprobante.pack = None
+            comprobante.ticket_sunat = None
+            comprobante.next_poll_at = None
+            comprobante.poll_attempts = 0
             comprobante.save()
             
             # Reintentar envío
-            return self.send_comprobante_to_sunat(comprobante_id)
+            return self.send_comprobante_to_sunat(comprobante_id, deadline)
             
         except Comprobante.DoesNotExist:
             return {
@@ -250,23 +474,69 @@ class SUNATIntegration:
                 'error': str(e)
             }
     
-    def bulk_send_comprobantes(self, comprobante_ids):
+    def iter_bulk_send(self, comprobante_ids, max_workers=None, deadline=None):
         """
-        Envía múltiples comprobantes a SUNAT
+        Envía múltiples comprobantes con hasta max_workers envíos simultáneos (BULK_SEND
+        MAX_WORKERS) y genera el resultado de cada uno a medida que termina.
+
+        Los comprobantes se cargan con una sola consulta (in_bulk) y cada envío guarda su
+        resultado en su propia transacción, por lo que una falla no afecta a los demás. Con
+        deadline, el plazo es para todo el lote: los comprobantes que no alcanzan a enviarse
+        quedan sin tocar para otro intento. Si el consumidor deja de iterar, los envíos que
+        aún no empezaron se cancelan.
         """
-        results = []
+        max_workers = max_workers or settings.SUNAT_CONFIG.get('BULK_SEND', {}).get('MAX_WORKERS', 8)
+        deadline = Deadline.coerce(deadline)
+        comprobante_ids = list(dict.fromkeys(comprobante_ids))
+        comprobantes = Comprobante.objects.in_bulk(comprobante_ids)
         
         for comprobante_id in comprobante_ids:
-            try:
-                result = self.send_comprobante_to_sunat(comprobante_id)
-                result['comprobante_id'] = comprobante_id
-                results.append(result)
-            except Exception as e:
-                results.append({
+            if comprobante_id not in comprobantes:
+                yield {
                     'comprobante_id': comprobante_id,
                     'success': False,
-                    'error': str(e)
-                })
+                    'error': f'Comprobante con ID {comprobante_id} no encontrado'
+                }
+        
+        def send_one(comprobante):
+            try:
+                if deadline is not None and deadline.exhausted():
+                    result = {
+                        'success': False,
+                        'error': 'Plazo agotado; no se envió',
+                        'retryable': True
+                    }
+                else:
+                    result = self.send_comprobante(comprobante, deadline)
+            except Exception as e:
+                result = {'success': False, 'error': str(e)}
+            finally:
+                # Cada hilo usa su propia conexión a la base de datos
+                close_old_connections()
+            result['comprobante_id'] = comprobante.id
+            return result
+        
+        executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='sunat-bulk')
+        try:
+            futures = [
+                executor.submit(send_one, comprobantes[comprobante_id])
+                for comprobante_id in comprobante_ids if comprobante_id in comprobantes
+            ]
+            for future in as_completed(futures):
+                yield future.result()
+        finally:
+            executor.shutdown(wait=True, cancel_futures=True)
+    
+    def bulk_send_comprobantes(self, comprobante_ids, deadline=None, max_workers=None):
+        """
+        Envía múltiples comprobantes a SUNAT en paralelo (ver iter_bulk_send) y retorna el
+        resumen con los resultados en el orden de comprobante_ids
+        """
+        order = {comprobante_id: position for position, comprobante_id in enumerate(comprobante_ids)}
+        results = sorted(
+            self.iter_bulk_send(comprobante_ids, max_workers, deadline),
+            key=lambda result: order.get(result['comprobante_id'], len(order))
+        )
         
         # Estadísticas
         successful = sum(1 for r in results if r.get('success'))
@@ -279,28 +549,1079 @@ class SUNATIntegration:
             'results': results
         }
     
-    def check_pending_tickets(self):
+    def bulk_send_comprobantes_async(self, comprobante_ids, max_concurrency=None, batch_size=500, deadline=None):
+        """
+        Envía múltiples comprobantes con el cliente asíncrono, manteniendo hasta
+        max_concurrency llamadas SOAP en vuelo desde un solo proceso.
+
+        Las consultas a la base de datos se hacen fuera del event loop: por cada lote se
+        preparan los envíos, se envían en paralelo y luego se guardan las respuestas, cada
+        una en su propia transacción. Como en iter_bulk_send, deadline es el plazo de todo el
+        envío: los comprobantes que no alcanzan a enviarse quedan sin tocar para otro intento.
+        """
+        from .async_soap_client import AsyncSUNATSoapClient
+        
+        batch_deadline = Deadline.coerce(deadline)
+        results = []
+        comprobante_ids = list(comprobante_ids)
+        
+        for start in range(0, len(comprobante_ids), batch_size):
+            batch_ids = comprobante_ids[start:start + batch_size]
+            comprobantes = Comprobante.objects.in_bulk(batch_ids)
+            
+            pending = []
+            for comprobante_id in batch_ids:
+                comprobante = comprobantes.get(comprobante_id)
+                if comprobante is None:
+                    results.append({
+                        'comprobante_id': comprobante_id,
+                        'success': False,
+                        'error': f'Comprobante con ID {comprobante_id} no encontrado'
+                    })
+                    continue
+                try:
+                    prepared = self._prepare_send(comprobante)
+                except Exception as e:
+                    prepared = {'success': False, 'error': str(e)}
+                if 'error' in prepared:
+                    prepared['comprobante_id'] = comprobante_id
+                    results.append(prepared)
+                else:
+                    pending.append((comprobante, prepared))
+            
+            if not pending:
+                continue
+            
+            # Clientes por emisor resueltos antes del event loop (consultan la base de datos)
+            soap_clients = [self.get_soap_client(comprobante) for comprobante, _ in pending]
+            
+            async def send_one(client, p, soap_client):
+                if batch_deadline is not None and batch_deadline.exhausted():
+                    return None
+                send_deadline = Deadline.coerce(batch_deadline, default=self.retry_policy.deadline)
+                send = client.send_bill if p['soap_method'] == 'sendBill' else client.send_summary
+                response, attempts = await self.retry_policy.acall(
+                    lambda: send(p['xml_filename'], p['zip_filename'], p['zip_content'],
+                                 soap_client=soap_client, deadline=send_deadline),
+                    is_retryable,
+                    send_deadline
+                )
+                response['attempts'] = attempts
+                return response
+            
+            async def send_batch():
+                async with AsyncSUNATSoapClient(soap_clients[0], max_concurrency=max_concurrency) as client:
+                    return await asyncio.gather(*(
+                        send_one(client, p, soap_client) for (_, p), soap_client in zip(pending, soap_clients)
+                    ))
+            
+            responses = asyncio.run(send_batch())
+            
+            for (comprobante, prepared), response in zip(pending, responses):
+                if response is None:
+                    release_send(comprobante)
+                    results.append({
+                        'comprobante_id': comprobante.id,
+                        'success': False,
+                        'error': 'Plazo agotado; no se envió',
+                        'retryable': True
+                    })
+                    continue
+                try:
+                    # Igual que en send_comprobante: respuesta, CDR y estado se guardan juntos
+                    with transaction.atomic():
+                        results.append(self._apply_send_response(comprobante, prepared['soap_method'], response))
+                except Exception as e:
+                    logger.error(f"Error guardando respuesta de {comprobante}: {str(e)}")
+                    results.append({
+                        'comprobante_id': comprobante.id,
+                        'success': False,
+                        'error': str(e)
+                    })
+        
+        successful = sum(1 for r in results if r.get('success'))
+        
+        return {
+            'total_processed': len(results),
+            'successful': successful,
+            'failed': len(results) - successful,
+            'results': results
+        }
+    
+    def send_pack(self, ruc_emisor, comprobante_ids, max_bytes=None, deadline=None):
+        """
+        Envía en un solo ZIP (sendPack) los comprobantes indicados de un emisor.
+        SUNAT responde un ticket para todo el lote; el resultado de cada comprobante se
+        obtiene después con check_pack_status.
+        """
+        pack, comprobantes = claim_pack(ruc_emisor, comprobante_ids)
+        if not comprobantes:
+            pack.estado = 'ERROR'
+            pack.errores = 'Ningún comprobante disponible para el lote'
+            pack.save(update_fields=['estado', 'errores'])
+            return {
+                'success': False,
+                'pack_id': pack.id,
+                'error': pack.errores
+            }
+        
+        soap_client = self.get_soap_client(comprobantes[0])
+        zip_content, included, errors = build_pack_zip(
+            comprobantes, max_bytes,
+            validate=lambda xml_content: soap_client.validate_before_send(None, xml_content=xml_content)
+        )
+        
+        # Los inválidos quedan con su error; los que no entraron por tamaño vuelven a estar disponibles
+        included_ids = {comprobante.id for comprobante in included}
+        for comprobante in comprobantes:
+            if comprobante.id in errors:
+                comprobante.estado = 'ERROR_VALIDACION'
+                comprobante.errores = errors[comprobante.id]
+                comprobante.pack = None
+                comprobante.save(update_fields=['estado', 'errores', 'pack', 'fecha_actualizacion'])
+        Comprobante.objects.filter(pack=pack).exclude(id__in=included_ids).update(pack=None)
+        
+        pack.total_comprobantes = len(included)
+        if not included:
+            pack.estado = 'ERROR'
+            pack.errores = 'Ningún comprobante del lote pasó la validación'
+            pack.save(update_fields=['estado', 'errores', 'total_comprobantes'])
+            return {
+                'success': False,
+                'pack_id': pack.id,
+                'error': pack.errores,
+                'errors': errors
+            }
+        
+        logger.info(f"Enviando lote {pack.nombre_archivo} ({len(included)} comprobantes) a SUNAT")
+        deadline = Deadline.coerce(deadline, default=self.retry_policy.deadline)
+        response, attempts = self.retry_policy.call(
+            lambda: soap_client.send_pack(pack.get_zip_filename(), zip_content=zip_content, deadline=deadline),
+            is_retryable,
+            deadline
+        )
+        response['attempts'] = attempts
+        
+        result = self._apply_pack_response(pack, included, response)
+        result['errors'] = errors
+        return result
+    
+    def _apply_pack_response(self, pack, comprobantes, response):
+        """Guarda la respuesta de sendPack y actualiza el estado del lote y de sus comprobantes"""
+        fault_class = classify_response(response)
+        now = timezone.now()
+        ids = [comprobante.id for comprobante in comprobantes]
+        
+        response_data = dict(response, pack_id=pack.id, pack=pack.nombre_archivo)
+        raw = response_data.pop('soap_response', None)
+        sunat_responses = []
+        for comprobante in comprobantes:
+            data = dict(response_data, soap_response=raw)
+            sunat_responses.append(
+                self._build_sunat_response(comprobante, 'sendPack', data, response.get('ticket'))
+            )
+        SUNATResponse.objects.bulk_create(sunat_responses, batch_size=500)
+        
+        members = Comprobante.objects.filter(id__in=ids, pack=pack)
+        if response.get('success') and response.get('ticket'):
+            pack.estado = 'ENVIADO_PENDIENTE'
+            pack.ticket = response['ticket']
+            pack.fecha_envio = now
+            schedule_first_poll(pack, now)
+            members.update(estado='ENVIADO_PENDIENTE', ticket_sunat=pack.ticket,
+                           fecha_envio_sunat=now, fecha_actualizacion=now)
+        elif fault_class == UNCERTAIN:
+            # SUNAT pudo haber recibido el lote: no se reenvía, el CDR de cada comprobante se
+            # recupera con getStatusCdr (reconcile_cdr); los que SUNAT no tenga vuelven a GENERADO
+            pack.estado = 'SIN_RESPUESTA'
+            pack.errores = f"Sin respuesta de SUNAT: {response.get('error', 'Error desconocido')}"
+            pack.fecha_envio = now
+            members.update(estado='ENVIADO', errores=pack.errores, fecha_envio_sunat=now,
+                           fecha_actualizacion=now)
+        else:
+            error = response.get('error', 'Error desconocido')
+            pack.estado = 'ERROR'
+            pack.errores = error
+            if fault_class == TRANSIENT:
+                # SUNAT no recibió el lote: los comprobantes quedan disponibles para otro envío
+                members.update(pack=None, errores=error, fecha_actualizacion=now)
+            else:
+                members.update(estado='RECHAZADO' if fault_class == REJECTION else 'ERROR',
+                               errores=error, fecha_actualizacion=now)
+        pack.save()
+        
+        logger.info(f"Lote {pack.nombre_archivo} enviado a SUNAT. Estado: {pack.estado}")
+        
+        return {
+            'success': response.get('success', False),
+            'pack_id': pack.id,
+            'pack': pack.nombre_archivo,
+            'estado': pack.estado,
+            'ticket': pack.ticket,
+            'comprobante_ids': ids,
+            'message': response.get('message', ''),
+            'error': response.get('error'),
+            'fault_class': fault_class,
+            'retryable': fault_class == TRANSIENT,
+            'attempts': response.get('attempts', 1)
+        }
+    
+    def send_pending_packs(self, ruc_emisor=None, max_documents=None, max_bytes=None):
+        """
+        Agrupa los comprobantes GENERADO admitidos por sendPack por emisor, hasta
+        max_documents por lote, y envía cada lote. Los que no entran por tamaño quedan
+        disponibles para la siguiente ejecución.
+        """
+        groups = group_pack_candidates(pack_candidates(ruc_emisor), max_documents)
+        results = []
+        for ruc, comprobante_ids in groups:
+            try:
+                results.append(self.send_pack(ruc, comprobante_ids, max_bytes))
+            except Exception as e:
+                logger.error(f"Error enviando lote de {ruc}: {str(e)}")
+                results.append({
+                    'success': False,
+                    'ruc_emisor': ruc,
+                    'error': str(e)
+                })
+        
+        successful = [r for r in results if r.get('success')]
+        return {
+            'total_packs': len(results),
+            'successful': len(successful),
+            'failed': len(results) - len(successful),
+            'comprobantes_sent': sum(len(r['comprobante_ids']) for r in successful),
+            'results': results
+        }
+    
+    def check_pack_status(self, pack_id, deadline=None):
+        """
+        Consulta el ticket de un lote y reparte el resultado: el CDR del lote trae un
+        R-{comprobante}.xml por documento, que se guarda como el CDR de cada comprobante.
+        """
+        try:
+            pack = SUNATPack.objects.get(id=pack_id)
+            if not pack.ticket:
+                return {
+                    'success': False,
+                    'pack_id': pack.id,
+                    'error': 'El lote no tiene ticket asignado'
+                }
+            
+            comprobantes = list(pack.comprobantes.filter(estado='ENVIADO_PENDIENTE').order_by('id'))
+            soap_client = self.get_soap_client(comprobantes[0]) if comprobantes else get_soap_client(pack.ruc_emisor)
+            
+            logger.info(f"Consultando estado del lote {pack.nombre_archivo} (ticket {pack.ticket})")
+            deadline = Deadline.coerce(deadline, default=self.retry_policy.deadline)
+            response, attempts = self.retry_policy.call(
+                lambda: soap_client.get_status(pack.ticket, deadline=deadline), is_retryable_query, deadline
+            )
+            response['attempts'] = attempts
+            cdr_zip_content = response.pop('cdr_zip_content', None)
+            fault_class = classify_response(response)
+            now = timezone.now()
+            
+            if response.get('success') and cdr_zip_content is not None:
+                documents = soap_client.split_pack_cdr(cdr_zip_content)
+                sunat_responses = []
+                for comprobante in comprobantes:
+                    document = documents.get(comprobante.nombre_archivo)
+                    data = dict(response, pack_id=pack.id)
+                    if document is None:
+                        comprobante.estado = 'ERROR'
+                        comprobante.errores = 'El CDR del lote no incluye el comprobante'
+                        data.update(success=False, error=comprobante.errores, cdr_info=None)
+                    else:
+                        cdr_info = document['cdr_info']
+                        save_artifact(comprobante, 'cdr_zip', document['cdr_zip_content'])
+                        data.update(cdr_info=cdr_info, cdr_zip_path=comprobante.cdr_zip_path)
+                        if classify_fault_code(cdr_info.get('response_code')) == REJECTION:
+                            comprobante.estado = 'RECHAZADO'
+                            comprobante.errores = cdr_info.get('description')
+                        else:
+                            comprobante.estado = 'ACEPTADO'
+                    comprobante.fecha_respuesta_sunat = now
+                    comprobante.fecha_actualizacion = now
+                    sunat_responses.append(self._build_sunat_response(comprobante, 'getStatus', data, pack.ticket))
+                
+                Comprobante.objects.bulk_update(
+                    comprobantes,
+                    ['estado', 'errores', 'cdr_zip_path', 'fecha_respuesta_sunat', 'fecha_actualizacion'],
+                    batch_size=500
+                )
+                SUNATResponse.objects.bulk_create(sunat_responses, batch_size=500)
+                pack.estado = 'PROCESADO'
+                pack.fecha_respuesta = now
+                pack.next_poll_at = None
+                pack.save(update_fields=['estado', 'fecha_respuesta', 'next_poll_at'])
+            elif response.get('success') or is_transient_query(response):
+                # En proceso (statusCode 98) o SUNAT no disponible: se volverá a consultar con backoff
+                if reschedule_poll(pack, pack.fecha_envio, now):
+                    pack.estado = 'TICKET_VENCIDO'
+                    pack.errores = f'Ticket {pack.ticket} sin respuesta de SUNAT'
+                    pack.comprobantes.filter(estado='ENVIADO_PENDIENTE').update(
+                        estado='TICKET_VENCIDO', errores=pack.errores, fecha_actualizacion=now
+                    )
+                pack.save(update_fields=['estado', 'errores', 'next_poll_at', 'poll_attempts'])
+            else:
+                error = response.get('error', 'Error desconocido')
+                SUNATResponse.objects.bulk_create([
+                    self._build_sunat_response(comprobante, 'getStatus', dict(response), pack.ticket)
+                    for comprobante in comprobantes
+                ], batch_size=500)
+                pack.comprobantes.filter(estado='ENVIADO_PENDIENTE').update(
+                    estado='RECHAZADO' if fault_class == REJECTION else 'ERROR',
+                    errores=error, fecha_actualizacion=now
+                )
+                pack.estado = 'ERROR'
+                pack.errores = error
+                pack.next_poll_at = None
+                pack.save(update_fields=['estado', 'errores', 'next_poll_at'])
+            
+            estados = dict(
+                pack.comprobantes.order_by().values_list('estado').annotate(total=Count('id'))
+            )
+            return {
+                'success': response.get('success', False),
+                'pack_id': pack.id,
+                'pack': pack.nombre_archivo,
+                'estado': pack.estado,
+                'ticket': pack.ticket,
+                'status_code': response.get('status_code'),
+                'comprobantes_por_estado': estados,
+                'message': response.get('message', ''),
+                'error': response.get('error'),
+                'attempts': attempts
+            }
+            
+        except SUNATPack.DoesNotExist:
+            return {
+                'success': False,
+                'error': f'Lote con ID {pack_id} no encontrado'
+            }
+        except Exception as e:
+            logger.error(f"Error consultando lote {pack_id}: {str(e)}")
+            return {
+                'success': False,
+                'pack_id': pack_id,
+                'error': str(e)
+            }
+    
+    def send_daily_summary(self, ruc_emisor, fecha, comprobante_ids, deadline=None):
         """
-        Verifica todos los comprobantes pendientes de respuesta
+        Informa en un resumen diario (RC) las boletas indicadas de un emisor y fecha de emisión
+        con una sola llamada sendSummary. SUNAT responde un ticket; el resultado se obtiene
+        después con check_summary_status y aplica a todos los comprobantes del resumen.
         """
-        pending_comprobantes = Comprobante.objects.filter(
-            estado='ENVIADO_PENDIENTE',
-            ticket_sunat__isnull=False
+        # Sin certificado no se toman los comprobantes: SUNAT rechaza el resumen sin firma
+        signing_error = self._signing_error()
+        if signing_error:
+            logger.error(f"Resumen de {ruc_emisor} ({fecha}) no enviado: {signing_error}")
+            return {
+                'success': False,
+                'ruc_emisor': ruc_emisor,
+                'fecha_emision': fecha.isoformat(),
+                'error': signing_error
+            }
+        
+        resumen, comprobantes = claim_summary(ruc_emisor, fecha, comprobante_ids)
+        if not comprobantes:
+            resumen.estado = 'ERROR'
+            resumen.errores = 'Ningún comprobante disponible para el resumen'
+            resumen.save(update_fields=['estado', 'errores'])
+            return {
+                'success': False,
+                'resumen_id': resumen.id,
+                'error': resumen.errores
+            }
+        
+        _, zip_content = build_summary_zip(resumen, comprobantes, get_razon_social(ruc_emisor))
+        soap_client = self.get_soap_client(resumen)
+        
+        logger.info(f"Enviando resumen {resumen.nombre_archivo} ({len(comprobantes)} comprobantes) a SUNAT")
+        deadline = Deadline.coerce(deadline, default=self.retry_policy.deadline)
+        response, attempts = self.retry_policy.call(
+            lambda: soap_client.send_summary(resumen.get_xml_filename(), resumen.get_zip_filename(),
+                                             zip_content=zip_content, deadline=deadline),
+            is_retryable,
+            deadline
         )
+        response['attempts'] = attempts
+        
+        return self._apply_summary_response(resumen, comprobantes, response)
+    
+    def _signing_error(self):
+        """Motivo por el que no se pueden firmar resúmenes y bajas, o None si el certificado carga"""
+        try:
+            get_signing_credentials()
+        except SigningError as e:
+            return f'No se puede firmar el documento: {str(e)}'
+        return None
+    
+    def _apply_summary_response(self, resumen, comprobantes, response):
+        """Guarda la respuesta de sendSummary y actualiza el resumen y sus comprobantes en bloque"""
+        fault_class = classify_response(response)
+        now = timezone.now()
+        ids = [comprobante.id for comprobante in comprobantes]
+        
+        response_data = dict(response, resumen_id=resumen.id, resumen=resumen.nombre_archivo)
+        raw = response_data.pop('soap_response', None)
+        SUNATResponse.objects.bulk_create([
+            self._build_sunat_response(comprobante, 'sendSummary', dict(response_data, soap_response=raw),
+                                       response.get('ticket'))
+            for comprobante in comprobantes
+        ], batch_size=500)
+        
+        members = Comprobante.objects.filter(id__in=ids, resumen=resumen)
+        if response.get('success') and response.get('ticket'):
+            resumen.estado = 'ENVIADO_PENDIENTE'
+            resumen.ticket = response['ticket']
+            resumen.fecha_envio = now
+            schedule_first_poll(resumen, now)
+            members.update(estado='ENVIADO_PENDIENTE', ticket_sunat=resumen.ticket,
+                           fecha_envio_sunat=now, fecha_actualizacion=now)
+        elif fault_class == UNCERTAIN:
+            # SUNAT pudo haber recibido el resumen y emitido un ticket: no se arma otro con las mismas
+            # boletas hasta verificarlo (reconcile_summary con el ticket, o sin él si no lo registró)
+            resumen.estado = 'SIN_RESPUESTA'
+            resumen.errores = (
+                f"Resumen sin respuesta de SUNAT, verificar antes de reenviarlo: "
+                f"{response.get('error', 'Error desconocido')}"
+            )
+            resumen.fecha_envio = now
+            members.update(estado='ENVIADO', errores=resumen.errores, fecha_envio_sunat=now,
+                           fecha_actualizacion=now)
+        else:
+            error = response.get('error', 'Error desconocido')
+            resumen.estado = 'ERROR'
+            resumen.errores = error
+            if fault_class == TRANSIENT:
+                # SUNAT no recibió el resumen: los comprobantes quedan disponibles para otro
+                members.update(resumen=None, errores=error, fecha_actualizacion=now)
+            else:
+                members.update(estado='RECHAZADO' if fault_class == REJECTION else 'ERROR',
+                               errores=error, fecha_actualizacion=now)
+        resumen.save()
+        
+        logger.info(f"Resumen {resumen.nombre_archivo} enviado a SUNAT. Estado: {resumen.estado}")
+        
+        return {
+            'success': response.get('success', False),
+            'resumen_id': resumen.id,
+            'resumen': resumen.nombre_archivo,
+            'fecha_emision': resumen.fecha_emision.isoformat(),
+            'estado': resumen.estado,
+            'ticket': resumen.ticket,
+            'comprobante_ids': ids,
+            'message': response.get('message', ''),
+            'error': response.get('error'),
+            'fault_class': fault_class,
+            'retryable': fault_class == TRANSIENT,
+            'attempts': response.get('attempts', 1)
+        }
+    
+    def reconcile_summary(self, resumen_id, ticket=None):
+        """
+        Resuelve un resumen SIN_RESPUESTA una vez verificado en SUNAT: con el ticket que SUNAT le
+        asignó, queda ENVIADO_PENDIENTE y se consulta como cualquier otro; sin ticket (SUNAT no lo
+        registró), el resumen queda ERROR y sus boletas vuelven a GENERADO para el próximo resumen.
+        """
+        with transaction.atomic():
+            resumen = ResumenDiario.objects.select_for_update().filter(id=resumen_id).first()
+            if resumen is None:
+                return {
+                    'success': False,
+                    'error': f'Resumen con ID {resumen_id} no encontrado'
+                }
+            if resumen.estado != 'SIN_RESPUESTA':
+                return {
+                    'success': False,
+                    'resumen_id': resumen.id,
+                    'error': f'El resumen no está sin respuesta de SUNAT. Estado actual: {resumen.estado}'
+                }
+            
+            now = timezone.now()
+            members = resumen.comprobantes.filter(estado='ENVIADO')
+            if ticket:
+                resumen.estado = 'ENVIADO_PENDIENTE'
+                resumen.ticket = ticket
+                resumen.errores = None
+                schedule_first_poll(resumen, now)
+                members.update(estado='ENVIADO_PENDIENTE', ticket_sunat=ticket, errores=None,
+                               fecha_actualizacion=now)
+            else:
+                resumen.estado = 'ERROR'
+                resumen.errores = 'SUNAT no registró el resumen'
+                members.update(estado='GENERADO', resumen=None, errores=None, fecha_actualizacion=now)
+            resumen.save()
         
+        logger.info(f"Resumen {resumen.nombre_archivo} conciliado: {resumen.estado}")
+        return {
+            'success': True,
+            'resumen_id': resumen.id,
+            'resumen': resumen.nombre_archivo,
+            'estado': resumen.estado,
+            'ticket': resumen.ticket
+        }
+    
+    def send_daily_summaries(self, fecha=None, ruc_emisor=None, max_lines=None):
+        """
+        Agrupa las boletas GENERADO por emisor y fecha de emisión (la indicada o, sin fecha,
+        todas hasta hoy) en resúmenes de hasta max_lines comprobantes y envía cada uno.
+        """
+        groups = group_summary_candidates(summary_candidates(fecha, ruc_emisor), max_lines)
         results = []
+        for ruc, fecha_emision, comprobante_ids in groups:
+            try:
+                results.append(self.send_daily_summary(ruc, fecha_emision, comprobante_ids))
+            except Exception as e:
+                logger.error(f"Error enviando resumen de {ruc} ({fecha_emision}): {str(e)}")
+                results.append({
+                    'success': False,
+                    'ruc_emisor': ruc,
+                    'fecha_emision': fecha_emision.isoformat(),
+                    'error': str(e)
+                })
         
-        for comprobante in pending_comprobantes:
+        successful = [r for r in results if r.get('success')]
+        return {
+            'total_summaries': len(results),
+            'successful': len(successful),
+            'failed': len(results) - len(successful),
+            'comprobantes_sent': sum(len(r['comprobante_ids']) for r in successful),
+            'results': results
+        }
+    
+    def check_summary_status(self, resumen_id, deadline=None):
+        """
+        Consulta el ticket de un resumen diario. El CDR es uno para todo el resumen: se guarda
+        una vez y su código (aceptado o rechazado) se aplica en bloque a los comprobantes.
+        """
+        try:
+            resumen = ResumenDiario.objects.get(id=resumen_id)
+            if resumen.condicion == '3':
+                # Resumen de anulación de boletas: se aplica como una baja
+                return self._check_voided_ticket(resumen, deadline)
+            if not resumen.ticket:
+                return {
+                    'success': False,
+                    'resumen_id': resumen.id,
+                    'error': 'El resumen no tiene ticket asignado'
+                }
+            
+            soap_client = self.get_soap_client(resumen)
+            logger.info(f"Consultando estado del resumen {resumen.nombre_archivo} (ticket {resumen.ticket})")
+            deadline = Deadline.coerce(deadline, default=self.retry_policy.deadline)
+            response, attempts = self.retry_policy.call(
+                lambda: soap_client.get_status(resumen.ticket, deadline=deadline), is_retryable_query, deadline
+            )
+            response['attempts'] = attempts
+            cdr_zip_content = response.pop('cdr_zip_content', None)
+            fault_class = classify_response(response)
+            now = timezone.now()
+            pending = resumen.comprobantes.filter(estado='ENVIADO_PENDIENTE')
+            
+            if response.get('success') and cdr_zip_content is not None:
+                cdr_info = response.get('cdr_info') or {}
+                if classify_fault_code(cdr_info.get('response_code')) == REJECTION:
+                    estado, errores = 'RECHAZADO', cdr_info.get('description')
+                else:
+                    estado, errores = 'ACEPTADO', None
+                resumen.cdr_zip_path = save_summary_cdr(resumen, cdr_zip_content)
+                response['cdr_zip_path'] = resumen.cdr_zip_path
+                
+                data = dict(response, resumen_id=resumen.id)
+                SUNATResponse.objects.bulk_create([
+                    self._build_sunat_response(comprobante, 'getStatus', dict(data), resumen.ticket)
+                    for comprobante in pending.only('id')
+                ], batch_size=500)
+                pending.update(estado=estado, errores=errores, cdr_zip_path=resumen.cdr_zip_path,
+                               fecha_respuesta_sunat=now, fecha_actualizacion=now)
+                resumen.estado = estado
+                resumen.errores = errores
+                resumen.fecha_respuesta = now
+                resumen.next_poll_at = None
+            elif response.get('success') or is_transient_query(response):
+                # En proceso (statusCode 98) o SUNAT no disponible: se volverá a consultar con backoff
+                if reschedule_poll(resumen, resumen.fecha_envio, now):
+                    resumen.estado = 'TICKET_VENCIDO'
+                    resumen.errores = f'Ticket {resumen.ticket} sin respuesta de SUNAT'
+                    pending.update(estado='TICKET_VENCIDO', errores=resumen.errores, fecha_actualizacion=now)
+            else:
+                error = response.get('error', 'Error desconocido')
+                SUNATResponse.objects.bulk_create([
+                    self._build_sunat_response(comprobante, 'getStatus', dict(response), resumen.ticket)
+                    for comprobante in pending.only('id')
+                ], batch_size=500)
+                pending.update(estado='RECHAZADO' if fault_class == REJECTION else 'ERROR',
+                               errores=error, fecha_actualizacion=now)
+                resumen.estado = 'ERROR'
+                resumen.errores = error
+                resumen.next_poll_at = None
+            resumen.save()
+            
+            estados = dict(
+                resumen.comprobantes.order_by().values_list('estado').annotate(total=Count('id'))
+            )
+            return {
+                'success': response.get('success', False),
+                'resumen_id': resumen.id,
+                'resumen': resumen.nombre_archivo,
+                'estado': resumen.estado,
+                'ticket': resumen.ticket,
+                'status_code': response.get('status_code'),
+                'cdr_info': response.get('cdr_info'),
+                'comprobantes_por_estado': estados,
+                'message': response.get('message', ''),
+                'error': response.get('error'),
+                'retryable': is_transient_query(response),
+                'attempts': attempts
+            }
+            
+        except ResumenDiario.DoesNotExist:
+            return {
+                'success': False,
+                'error': f'Resumen con ID {resumen_id} no encontrado'
+            }
+        except Exception as e:
+            logger.error(f"Error consultando resumen {resumen_id}: {str(e)}")
+            return {
+                'success': False,
+                'resumen_id': resumen_id,
+                'error': str(e)
+            }
+    
+    def void_comprobantes(self, comprobante_ids, motivo, deadline=None, max_lines=None):
+        """
+        Da de baja en bloque los comprobantes indicados. Los agrupa por emisor y fecha de
+        emisión en envíos de hasta max_lines (VOIDING MAX_LINES) comprobantes: las facturas y sus
+        notas en comunicaciones de baja (RA) y las boletas en resúmenes diarios con condición 3.
+        Cada envío es una llamada sendSummary cuyo ticket consulta check_pending_tickets.
+        Los comprobantes que no se pueden anular se reportan en 'rechazados' con el motivo.
+        """
+        motivo = (motivo or '').strip()[:MAX_MOTIVO_LENGTH]
+        deadline = Deadline.coerce(deadline, default=self.retry_policy.deadline)
+        comprobante_ids = list(dict.fromkeys(comprobante_ids))
+        max_lines = max_lines or get_voiding_config().get('MAX_LINES', 500)
+        
+        # Las notas de boletas se anulan en un resumen con la referencia a la boleta, que no se guarda
+        candidates = void_candidates(comprobante_ids).exclude(boleta_note_filter())
+        groups = [
+            (claim_void_summary, group)
+            for group in group_summary_candidates(candidates.filter(summary_document_filter()), max_lines)
+        ] + [
+            (claim_voided, group)
+            for group in group_summary_candidates(candidates.exclude(summary_document_filter()), max_lines)
+        ]
+        eligible = {comprobante_id for _, (_, _, ids) in groups for comprobante_id in ids}
+        rechazados = self._void_rejections([i for i in comprobante_ids if i not in eligible])
+        
+        results = []
+        for claim, (ruc, fecha_emision, ids) in groups:
             try:
-                result = self.check_ticket_status(comprobante.id)
-                results.append(result)
+                results.append(self.send_voided(claim, ruc, fecha_emision, ids, motivo, deadline))
             except Exception as e:
+                logger.error(f"Error enviando baja de {ruc} ({fecha_emision}): {str(e)}")
                 results.append({
-                    'comprobante_id': comprobante.id,
                     'success': False,
+                    'ruc_emisor': ruc,
+                    'fecha_emision': fecha_emision.isoformat(),
                     'error': str(e)
                 })
         
+        successful = [r for r in results if r.get('success')]
+        return {
+            'success': bool(results) and len(successful) == len(results),
+            'total_envios': len(results),
+            'successful': len(successful),
+            'failed': len(results) - len(successful),
+            'comprobantes_enviados': sum(len(r['comprobante_ids']) for r in successful),
+            'rechazados': rechazados,
+            'retryable': any(r.get('retryable') for r in results),
+            'results': results
+        }
+    
+    def _void_rejections(self, comprobante_ids):
+        """{id: motivo} de los comprobantes indicados que no se pueden dar de baja"""
+        if not comprobante_ids:
+            return {}
+        found = {
+            comprobante_id: (estado, tipo, serie)
+            for comprobante_id, estado, tipo, serie in Comprobante.objects.filter(
+                id__in=comprobante_ids
+            ).values_list('id', 'estado', 'tipo_comprobante', 'serie')
+        }
+        rechazados = {}
+        for comprobante_id in comprobante_ids:
+            estado, tipo, serie = found.get(comprobante_id, (None, None, ''))
+            if estado is None:
+                rechazados[comprobante_id] = 'Comprobante no encontrado'
+            elif tipo in ('07', '08') and serie.upper().startswith('B'):
+                rechazados[comprobante_id] = (
+                    'Las notas de boletas no se pueden dar de baja: falta la referencia a la boleta'
+                )
+            elif estado == 'ACEPTADO':
+                rechazados[comprobante_id] = 'Fuera del plazo para comunicar la baja'
+            else:
+                rechazados[comprobante_id] = f'Solo se dan de baja comprobantes ACEPTADO, actual: {estado}'
+        return rechazados
+    
+    def send_voided(self, claim, ruc_emisor, fecha, comprobante_ids, motivo, deadline=None):
+        """
+        Arma y envía con sendSummary una baja de un emisor y fecha: claim es claim_voided (RA) o
+        claim_void_summary (RC con condición 3)
+        """
+        # Sin certificado no se toman los comprobantes: SUNAT rechaza la baja sin firma
+        signing_error = self._signing_error()
+        if signing_error:
+            logger.error(f"Baja de {ruc_emisor} ({fecha}) no enviada: {signing_error}")
+            return {
+                'success': False,
+                'ruc_emisor': ruc_emisor,
+                'fecha_emision': fecha.isoformat(),
+                'error': signing_error
+            }
+        
+        documento, comprobantes = claim(ruc_emisor, fecha, comprobante_ids, motivo)
+        id_key = 'resumen_id' if isinstance(documento, ResumenDiario) else 'baja_id'
+        if not comprobantes:
+            documento.estado = 'ERROR'
+            documento.errores = 'Ningún comprobante disponible para la baja'
+            documento.save(update_fields=['estado', 'errores'])
+            return {
+                'success': False,
+                id_key: documento.id,
+                'error': documento.errores
+            }
+        
+        _, zip_content = build_voided_zip(documento, comprobantes, get_razon_social(ruc_emisor))
+        soap_client = self.get_soap_client(documento)
+        
+        logger.info(f"Enviando baja {documento.nombre_archivo} ({len(comprobantes)} comprobantes) a SUNAT")
+        deadline = Deadline.coerce(deadline, default=self.retry_policy.deadline)
+        response, attempts = self.retry_policy.call(
+            lambda: soap_client.send_summary(documento.get_xml_filename(), documento.get_zip_filename(),
+                                             zip_content=zip_content, deadline=deadline),
+            is_retryable,
+            deadline
+        )
+        response['attempts'] = attempts
+        
+        return self._apply_voided_response(documento, comprobantes, response)
+    
+    def _apply_voided_response(self, documento, comprobantes, response):
+        """
+        Guarda la respuesta de sendSummary de una baja. Con ticket, los comprobantes siguen
+        BAJA_PENDIENTE con el ticket de la baja; si no, vuelven a ACEPTADO con el error.
+        """
+        fault_class = classify_response(response)
+        now = timezone.now()
+        ids = [comprobante.id for comprobante in comprobantes]
+        id_key = 'resumen_id' if isinstance(documento, ResumenDiario) else 'baja_id'
+        
+        response_data = dict(response, **{id_key: documento.id}, baja=documento.nombre_archivo)
+        raw = response_data.pop('soap_response', None)
+        SUNATResponse.objects.bulk_create([
+            self._build_sunat_response(comprobante, 'sendSummary', dict(response_data, soap_response=raw),
+                                       response.get('ticket'))
+            for comprobante in comprobantes
+        ], batch_size=500)
+        
+        members = documento.comprobantes.filter(id__in=ids, estado='BAJA_PENDIENTE')
+        if response.get('success') and response.get('ticket'):
+            documento.estado = 'ENVIADO_PENDIENTE'
+            documento.ticket = response['ticket']
+            documento.fecha_envio = now
+            schedule_first_poll(documento, now)
+            members.update(ticket_sunat=documento.ticket, fecha_actualizacion=now)
+        else:
+            # SUNAT no registró la baja (o no se sabe): los comprobantes siguen vigentes
+            error = response.get('error', 'Error desconocido')
+            documento.estado = 'ERROR'
+            documento.errores = error
+            if fault_class == UNCERTAIN:
+                error = f'Baja sin respuesta de SUNAT, verificar antes de repetirla: {error}'
+            else:
+                error = f'Baja no enviada: {error}'
+            members.update(estado='ACEPTADO', errores=error, fecha_actualizacion=now)
+        documento.save()
+        
+        logger.info(f"Baja {documento.nombre_archivo} enviada a SUNAT. Estado: {documento.estado}")
+        
+        return {
+            'success': response.get('success', False),
+            id_key: documento.id,
+            'baja': documento.nombre_archivo,
+            'fecha_emision': documento.fecha_emision.isoformat(),
+            'estado': documento.estado,
+            'ticket': documento.ticket,
+            'comprobante_ids': ids,
+            'message': response.get('message', ''),
+            'error': response.get('error'),
+            'fault_class': fault_class,
+            'retryable': fault_class == TRANSIENT,
+            'attempts': response.get('attempts', 1)
+        }
+    
+    def check_voided_status(self, baja_id, deadline=None):
+        """Consulta el ticket de una comunicación de baja (ver _check_voided_ticket)"""
+        try:
+            baja = ComunicacionBaja.objects.get(id=baja_id)
+        except ComunicacionBaja.DoesNotExist:
+            return {
+                'success': False,
+                'error': f'Comunicación de baja con ID {baja_id} no encontrada'
+            }
+        return self._check_voided_ticket(baja, deadline)
+    
+    def _check_voided_ticket(self, documento, deadline=None):
+        """
+        Consulta el ticket de una baja (ComunicacionBaja o ResumenDiario con condición 3) y
+        aplica el resultado en bloque: si SUNAT la acepta los comprobantes quedan ANULADO; si la
+        rechaza o el ticket vence vuelven a ACEPTADO con el motivo. El CDR de la baja se guarda
+        una vez en el documento (el CDR original de cada comprobante no se reemplaza).
+        """
+        id_key = 'resumen_id' if isinstance(documento, ResumenDiario) else 'baja_id'
+        try:
+            if not documento.ticket:
+                return {
+                    'success': False,
+                    id_key: documento.id,
+                    'error': 'La baja no tiene ticket asignado'
+                }
+            
+            soap_client = self.get_soap_client(documento)
+            logger.info(f"Consultando estado de la baja {documento.nombre_archivo} (ticket {documento.ticket})")
+            deadline = Deadline.coerce(deadline, default=self.retry_policy.deadline)
+            response, attempts = self.retry_policy.call(
+                lambda: soap_client.get_status(documento.ticket, deadline=deadline), is_retryable_query, deadline
+            )
+            response['attempts'] = attempts
+            cdr_zip_content = response.pop('cdr_zip_content', None)
+            fault_class = classify_response(response)
+            now = timezone.now()
+            pending = documento.comprobantes.filter(estado='BAJA_PENDIENTE')
+            
+            if response.get('success') and cdr_zip_content is not None:
+                cdr_info = response.get('cdr_info') or {}
+                documento.cdr_zip_path = save_summary_cdr(documento, cdr_zip_content, folder='bajas')
+                response['cdr_zip_path'] = documento.cdr_zip_path
+                SUNATResponse.objects.bulk_create([
+                    self._build_sunat_response(comprobante, 'getStatus', dict(response, **{id_key: documento.id}),
+                                               documento.ticket)
+                    for comprobante in pending.only('id')
+                ], batch_size=500)
+                if classify_fault_code(cdr_info.get('response_code')) == REJECTION:
+                    documento.estado = 'RECHAZADO'
+                    documento.errores = cdr_info.get('description')
+                    pending.update(estado='ACEPTADO', errores=f'Baja rechazada: {documento.errores}',
+                                   fecha_actualizacion=now)
+                else:
+                    documento.estado = 'ACEPTADO'
+                    documento.errores = None
+                    pending.update(estado='ANULADO', errores=None, fecha_actualizacion=now)
+                documento.fecha_respuesta = now
+                documento.next_poll_at = None
+            elif response.get('success') or is_transient_query(response):
+                # En proceso (statusCode 98) o SUNAT no disponible: se volverá a consultar con backoff
+                if reschedule_poll(documento, documento.fecha_envio, now):
+                    documento.estado = 'TICKET_VENCIDO'
+                    documento.errores = f'Ticket {documento.ticket} sin respuesta de SUNAT'
+                    pending.update(estado='ACEPTADO', fecha_actualizacion=now,
+                                   errores=f'{documento.errores}: verificar la baja en SUNAT antes de repetirla')
+            else:
+                error = response.get('error', 'Error desconocido')
+                SUNATResponse.objects.bulk_create([
+                    self._build_sunat_response(comprobante, 'getStatus', dict(response), documento.ticket)
+                    for comprobante in pending.only('id')
+                ], batch_size=500)
+                pending.update(estado='ACEPTADO', errores=f'Baja rechazada: {error}', fecha_actualizacion=now)
+                documento.estado = 'ERROR'
+                documento.errores = error
+                documento.next_poll_at = None
+            documento.save()
+            
+            estados = dict(
+                documento.comprobantes.order_by().values_list('estado').annotate(total=Count('id'))
+            )
+            return {
+                'success': response.get('success', False),
+                id_key: documento.id,
+                'baja': documento.nombre_archivo,
+                'estado': documento.estado,
+                'ticket': documento.ticket,
+                'status_code': response.get('status_code'),
+                'cdr_info': response.get('cdr_info'),
+                'comprobantes_por_estado': estados,
+                'message': response.get('message', ''),
+                'error': response.get('error'),
+                'retryable': is_transient_query(response),
+                'attempts': attempts
+            }
+            
+        except Exception as e:
+            logger.error(f"Error consultando baja {documento.nombre_archivo}: {str(e)}")
+            return {
+                'success': False,
+                id_key: documento.id,
+                'error': str(e)
+            }
+    
+    def reconcile_candidates(self, estados=('ENVIANDO', 'ENVIADO', 'ERROR', 'GENERADO'), ruc_emisor=None, desde=None):
+        """
+        Comprobantes sin CDR cuyo envío pudo haber llegado a SUNAT: ENVIADO (sin constancia),
+        ERROR, ENVIANDO por más de SENDING_GRACE segundos (envío interrumpido) y, si se incluye,
+        GENERADO con un sendBill previo (falla transitoria)
+        """
+        filtro = Q(estado__in=[estado for estado in estados if estado not in ('GENERADO', 'ENVIANDO')])
+        if 'GENERADO' in estados:
+            filtro |= Q(estado='GENERADO', sunat_responses__soap_method='sendBill')
+        if 'ENVIANDO' in estados:
+            grace = settings.SUNAT_CONFIG.get('CDR_RECONCILE', {}).get('SENDING_GRACE', 300)
+            filtro |= Q(estado='ENVIANDO', fecha_actualizacion__lt=timezone.now() - timedelta(seconds=grace))
+        # Las boletas informadas en un resumen no tienen CDR propio: se concilian con reconcile_summary
+        queryset = Comprobante.objects.filter(filtro, cdr_zip_path__isnull=True, resumen__isnull=True).distinct()
+        if ruc_emisor:
+            queryset = queryset.filter(ruc_emisor=ruc_emisor)
+        if desde:
+            queryset = queryset.filter(fecha_creacion__gte=desde)
+        return queryset
+    
+    def reconcile_cdrs(self, queryset, max_workers=None, limit=None, batch_size=500):
+        """
+        Recupera con getStatusCdr (solo lectura) el CDR de los comprobantes indicados, con
+        hasta max_workers consultas en paralelo (como máximo limit comprobantes). Las consultas van en hilos; las respuestas
+        se guardan en el hilo que llama, lote por lote.
+
+        - Con CDR: se guarda la constancia y el comprobante queda ACEPTADO o RECHAZADO.
+        - SUNAT no tiene el comprobante: vuelve a GENERADO para reenviarse.
+        - Falla de la consulta: el comprobante no cambia.
+        """
+        max_workers = max_workers or settings.SUNAT_CONFIG.get('CDR_RECONCILE', {}).get('WORKERS', 8)
+        summary = {'checked': 0, 'recovered': 0, 'not_found': 0, 'failed': 0, 'results': []}
+        
+        def query(comprobante, soap_client):
+            return soap_client.get_status_cdr(
+                comprobante.ruc_emisor, comprobante.tipo_comprobante, comprobante.serie, comprobante.numero
+            )
+        
+        # Se leen los ids primero: las respuestas se guardan mientras se recorre la lista
+        ids = queryset.order_by('id').values_list('id', flat=True)
+        ids = iter(list(ids[:limit] if limit else ids))
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            while True:
+                batch_ids = list(islice(ids, batch_size))
+                if not batch_ids:
+                    break
+                comprobantes = Comprobante.objects.in_bulk(batch_ids)
+                batch = [comprobantes[comprobante_id] for comprobante_id in batch_ids if comprobante_id in comprobantes]
+                # Los clientes por emisor se resuelven aquí: consultan la base de datos
+                futures = [
+                    executor.submit(query, comprobante, self.get_soap_client(comprobante))
+                    for comprobante in batch
+                ]
+                for comprobante, future in zip(batch, futures):
+                    try:
+                        response = future.result()
+                    except Exception as e:
+                        response = {'success': False, 'error': str(e)}
+                    result = self._apply_status_cdr_response(comprobante, response)
+                    summary['checked'] += 1
+                    summary[result['outcome']] += 1
+                    summary['results'].append(result)
+        
+        return summary
+    
+    def _apply_status_cdr_response(self, comprobante, response):
+        """Guarda el resultado de getStatusCdr de un comprobante y actualiza su estado"""
+        estado_anterior = comprobante.estado
+        
+        if response.get('success') and response.get('cdr_received') and response.get('cdr_zip_content'):
+            self._store_cdr(comprobante, response)
+            cdr_info = response.get('cdr_info') or {}
+            if classify_fault_code(cdr_info.get('response_code')) == REJECTION:
+                comprobante.estado = 'RECHAZADO'
+                comprobante.errores = cdr_info.get('description')
+            else:
+                comprobante.estado = 'ACEPTADO'
+                comprobante.errores = None
+            comprobante.cdr_zip_path = response.get('cdr_zip_path')
+            comprobante.fecha_respuesta_sunat = timezone.now()
+            outcome = 'recovered'
+        elif response.get('success') and response.get('status_code') in CDR_NOT_FOUND_CODES:
+            # SUNAT no recibió el comprobante: se puede reenviar sin riesgo de duplicado, suelto o en otro lote
+            comprobante.estado = 'GENERADO'
+            comprobante.errores = response.get('status_message')
+            comprobante.pack = None
+            outcome = 'not_found'
+        else:
+            outcome = 'failed'
+        
+        sunat_response = self._create_sunat_response(comprobante, 'getStatusCdr', response, None)
+        if outcome != 'failed':
+            comprobante.save()
+        
+        logger.info(f"CDR de {comprobante}: {outcome} ({estado_anterior} -> {comprobante.estado})")
+        
+        return {
+            'comprobante_id': comprobante.id,
+            'outcome': outcome,
+            'estado_anterior': estado_anterior,
+            'estado': comprobante.estado,
+            'status_code': response.get('status_code'),
+            'cdr_info': response.get('cdr_info'),
+            'error': response.get('error'),
+            'sunat_response_id': sunat_response.id
+        }
+    
+    def check_pending_tickets(self, batch_size=None, max_workers=None):
+        """
+        Consulta los tickets de comprobantes y lotes pendientes cuya próxima consulta ya venció
+        (next_poll_at); los demás esperan su turno según el backoff de ticket_polling.
+
+        Los tickets vencidos se toman en lotes de batch_size (TICKET_POLLING BATCH_SIZE) y se
+        consultan con hasta max_workers llamadas en paralelo, hasta que no quede ninguno vencido.
+        Los comprobantes enviados en lote, resumen o baja se consultan una sola vez por ticket.
+        """
+        config = get_polling_config()
+        batch_size = batch_size or config.get('BATCH_SIZE', 100)
+        max_workers = max_workers or config.get('WORKERS', 8)
+        
+        def check(kind, object_id):
+            try:
+                if kind == 'pack':
+                    return self.check_pack_status(object_id)
+                if kind == 'resumen':
+                    return self.check_summary_status(object_id)
+                if kind == 'baja':
+                    return self.check_voided_status(object_id)
+                return self.check_ticket_status(object_id)
+            except Exception as e:
+                return {'comprobante_id': object_id, 'success': False, 'error': str(e)}
+            finally:
+                # Cada hilo usa su propia conexión a la base de datos
+                close_old_connections()
+        
+        results = []
+        with ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='sunat-tickets') as executor:
+            while True:
+                claimed = [('pack', pack_id) for pack_id in claim_due_tickets(pending_ticket_packs(), batch_size)]
+                claimed += [
+                    ('resumen', resumen_id)
+                    for resumen_id in claim_due_tickets(pending_ticket_resumenes(), batch_size - len(claimed))
+                ]
+                claimed += [
+                    ('baja', baja_id)
+                    for baja_id in claim_due_tickets(pending_ticket_bajas(), batch_size - len(claimed))
+                ]
+                claimed += [
+                    ('comprobante', comprobante_id)
+                    for comprobante_id in claim_due_tickets(pending_ticket_comprobantes(), batch_size - len(claimed))
+                ]
+                if not claimed:
+                    break
+                results.extend(executor.map(lambda item: check(*item), claimed))
+        
         return {
             'total_checked': len(results),
             'results': results
@@ -0,0 +1,114 @@
+# comprobantes/sunat_packs.py
+
+import logging
+import zipfile
+from datetime import timedelta
+from io import BytesIO
+from django.conf import settings
+from django.db.models import Q
+from django.utils import timezone
+
+from .artifacts import read_artifact
+from .daily_summaries import is_summary_enabled, summary_document_filter
+from .models import Comprobante, SUNATPack
+from .utils import get_zip_compresslevel
+
+logger = logging.getLogger(__name__)
+
+
+def get_pack_config():
+    return settings.SUNAT_CONFIG.get('SEND_PACK', {})
+
+
+def pack_candidates(ruc_emisor=None):
+    """
+    Comprobantes que pueden ir en un lote: GENERADO, de un tipo admitido por sendPack y sin
+    lote asignado (o asignado a un lote que quedó en PREPARANDO más de CLAIM_TIMEOUT segundos)
+    """
+    config = get_pack_config()
+    stale_before = timezone.now() - timedelta(seconds=config.get('CLAIM_TIMEOUT', 600))
+    queryset = Comprobante.objects.filter(
+        estado='GENERADO',
+        tipo_comprobante__in=config.get('TIPOS', ['01', '07', '08']),
+    ).filter(
+        Q(pack__isnull=True) | Q(pack__estado='PREPARANDO', pack__fecha_creacion__lt=stale_before)
+    )
+    if is_summary_enabled():
+        # Las boletas se informan en el resumen diario
+        queryset = queryset.exclude(summary_document_filter())
+    if ruc_emisor:
+        queryset = queryset.filter(ruc_emisor=ruc_emisor)
+    return queryset
+
+
+def group_pack_candidates(queryset, max_documents=None):
+    """
+    Agrupa los candidatos por emisor en listas de ids de hasta max_documents comprobantes.
+    Retorna [(ruc_emisor, [ids]), ...] en orden de creación.
+    """
+    max_documents = max_documents or get_pack_config().get('MAX_DOCUMENTS', 500)
+    groups = []
+    current = {}
+    rows = queryset.order_by('ruc_emisor', 'id').values_list('ruc_emisor', 'id')
+    for ruc_emisor, comprobante_id in rows.iterator(chunk_size=2000):
+        ids = current.setdefault(ruc_emisor, [])
+        ids.append(comprobante_id)
+        if len(ids) >= max_documents:
+            groups.append((ruc_emisor, current.pop(ruc_emisor)))
+    groups.extend(current.items())
+    return groups
+
+
+def claim_pack(ruc_emisor, comprobante_ids):
+    """
+    Crea el lote y le asigna los comprobantes que siguen disponibles. La asignación es un
+    UPDATE condicional, por lo que dos procesos no pueden tomar el mismo comprobante.
+    Retorna (lote, comprobantes asignados).
+    """
+    pack = SUNATPack.objects.create(ruc_emisor=ruc_emisor)
+    fecha = timezone.localdate(pack.fecha_creacion) if timezone.is_aware(pack.fecha_creacion) \
+        else pack.fecha_creacion.date()
+    # El id hace único el correlativo del día sin contar lotes previos
+    pack.nombre_archivo = f"{ruc_emisor}-LT-{fecha:%Y%m%d}-{pack.id}"
+
+    claimed = pack_candidates(ruc_emisor).filter(id__in=comprobante_ids).update(pack=pack)
+    comprobantes = list(Comprobante.objects.filter(pack=pack, estado='GENERADO').order_by('id'))
+    pack.total_comprobantes = len(comprobantes)
+    pack.save(update_fields=['nombre_archivo', 'total_comprobantes'])
+    logger.info(f"Lote {pack.nombre_archivo}: {claimed} comprobantes asignados")
+    return pack, comprobantes
+
+
+def build_pack_zip(comprobantes, max_bytes=None, validate=None):
+    """
+    ZIP del lote con el XML de cada comprobante, hasta max_bytes comprimidos.
+    validate(xml_content) -> (is_valid, mensaje) se aplica a cada XML antes de incluirlo.
+    Retorna (contenido del ZIP, comprobantes incluidos, {id: error} de los que no se pudieron
+    leer o no pasaron la validación). Los que no entran por tamaño no se incluyen ni se
+    reportan: quedan para otro lote.
+    """
+    max_bytes = max_bytes or get_pack_config().get('MAX_BYTES', 5 * 1024 * 1024)
+    buffer = BytesIO()
+    included = []
+    errors = {}
+
+    with zipfile.ZipFile(buffer, 'w', zipfile.ZIP_DEFLATED) as zf:
+        for comprobante in comprobantes:
+            try:
+                xml_content = read_artifact(comprobante, 'xml')
+            except FileNotFoundError as e:
+                errors[comprobante.id] = f"Archivo no encontrado: {str(e)}"
+                continue
+            if validate is not None:
+                is_valid, validation_message = validate(xml_content)
+                if not is_valid:
+                    errors[comprobante.id] = validation_message
+                    continue
+            # Se estima el tamaño comprimido antes de escribir para no pasar del límite
+            if included and buffer.tell() + len(xml_content) // 4 > max_bytes:
+                break
+            zf.writestr(comprobante.get_xml_filename(), xml_content,
+                        compresslevel=get_zip_compresslevel(len(xml_content)))
+            included.append(comprobante)
+
+    return buffer.getvalue(), included, errors
@@ -0,0 +1,428 @@
+# comprobantes/sunat_stub.py
+
+import re
+import json
+import math
+import time
+import base64
+import hashlib
+import random
+import logging
+import zipfile
+import threading
+import xml.etree.ElementTree as ET
+from io import BytesIO
+from datetime import datetime, timedelta
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+# Firma de los CDR con una llave de prueba (opcional: sin cryptography van sin SignatureValue real)
+try:
+    from cryptography import x509
+    from cryptography.x509.oid import NameOID
+    from cryptography.hazmat.primitives import hashes, serialization
+    from cryptography.hazmat.primitives.asymmetric import rsa, padding
+    CRYPTO_AVAILABLE = True
+except ImportError:
+    CRYPTO_AVAILABLE = False
+
+logger = logging.getLogger(__name__)
+
+SOAP_NS = 'http://schemas.xmlsoap.org/soap/envelope/'
+EXT_NS = 'urn:oasis:names:specification:ubl:schema:xsd:CommonExtensionComponents-2'
+DS_NS = 'http://www.w3.org/2000/09/xmldsig#'
+SUNAT_RUC = '20131312955'
+
+BILL_METHODS = ('sendBill', 'sendSummary', 'getStatus', 'sendPack', 'getStatusCdr')
+
+# Mensajes del catálogo de códigos de retorno usados por el stub
+FAULT_MESSAGES = {
+    '0100': 'El sistema no puede responder su solicitud. Intente nuevamente o comuníquese con su Administrador',
+    '0109': 'El sistema no puede responder su solicitud. (El servicio de autenticación no está disponible)',
+    '0130': 'El sistema no puede responder su solicitud. (No se pudo obtener el ticket de proceso)',
+    '0135': 'El sistema no puede responder su solicitud. (No se pudo encolar el pedido)',
+    '0138': 'El sistema no puede responder su solicitud. (Error en Base de Datos)',
+    '0127': 'El ticket no existe',
+    '0011': 'El comprobante de pago electrónico no existe',
+    '0151': 'El nombre del archivo ZIP es incorrecto',
+    '0156': 'El archivo ZIP esta corrupto',
+    '0157': 'El archivo ZIP no contiene comprobantes',
+    '0161': 'El nombre del archivo XML no coincide con el nombre del archivo ZIP',
+    '2017': 'El numero de documento de identidad del receptor debe ser RUC',
+    '2335': 'El documento electrónico ingresado ha sido alterado',
+}
+
+ZIP_NAME_PATTERN = re.compile(r'^(\d{11})-(\w{2})-([\w-]+)\.zip$')
+
+FAULT_TEMPLATE = (
+    '<soap-env:Envelope xmlns:soap-env="http://schemas.xmlsoap.org/soap/envelope/">'
+    '<soap-env:Body><soap-env:Fault>'
+    '<faultcode>soap-env:Client.{code}</faultcode>'
+    '<faultstring>{message}</faultstring>'
+    '</soap-env:Fault></soap-env:Body></soap-env:Envelope>'
+)
+
+RESPONSE_TEMPLATE = (
+    '<soap-env:Envelope xmlns:soap-env="http://schemas.xmlsoap.org/soap/envelope/">'
+    '<soap-env:Header/><soap-env:Body>'
+    '<br:{method}Response xmlns:br="http://service.sunat.gob.pe">{content}</br:{method}Response>'
+    '</soap-env:Body></soap-env:Envelope>'
+)
+
+CDR_TEMPLATE = '''<?xml version="1.0" encoding="UTF-8"?>
+<ar:ApplicationResponse xmlns:ar="urn:oasis:names:specification:ubl:schema:xsd:ApplicationResponse-2" xmlns:cac="urn:oasis:names:specification:ubl:schema:xsd:CommonAggregateComponents-2" xmlns:cbc="urn:oasis:names:specification:ubl:schema:xsd:CommonBasicComponents-2" xmlns:ds="http://www.w3.org/2000/09/xmldsig#" xmlns:ext="urn:oasis:names:specification:ubl:schema:xsd:CommonExtensionComponents-2"><ext:UBLExtensions><ext:UBLExtension><ext:ExtensionContent>{signature}</ext:ExtensionContent></ext:UBLExtension></ext:UBLExtensions><cbc:UBLVersionID>2.0</cbc:UBLVersionID><cbc:CustomizationID>1.0</cbc:CustomizationID><cbc:ID>{cdr_id}</cbc:ID><cbc:IssueDate>{date}</cbc:IssueDate><cbc:IssueTime>{time}</cbc:IssueTime><cbc:ResponseDate>{date}</cbc:ResponseDate><cbc:ResponseTime>{time}</cbc:ResponseTime><cac:Signature><cbc:ID>SignSUNAT</cbc:ID><cac:SignatoryParty><cac:PartyIdentification><cbc:ID>{sunat_ruc}</cbc:ID></cac:PartyIdentification><cac:PartyName><cbc:Name>SUNAT</cbc:Name></cac:PartyName></cac:SignatoryParty><cac:DigitalSignatureAttachment><cac:ExternalReference><cbc:URI>#SignSUNAT</cbc:URI></cac:ExternalReference></cac:DigitalSignatureAttachment></cac:Signature><cac:SenderParty><cac:PartyIdentification><cbc:ID>{sunat_ruc}</cbc:ID></cac:PartyIdentification></cac:SenderParty><cac:ReceiverParty><cac:PartyIdentification><cbc:ID>6-{ruc}</cbc:ID></cac:PartyIdentification></cac:ReceiverParty><cac:DocumentResponse><cac:Response><cbc:ReferenceID>{document_id}</cbc:ReferenceID><cbc:ResponseCode>{response_code}</cbc:ResponseCode><cbc:Description>{description}</cbc:Description></cac:Response><cac:DocumentReference><cbc:ID>{document_id}</cbc:ID></cac:DocumentReference><cac:RecipientParty><cac:PartyIdentification><cbc:ID>6-{ruc}</cbc:ID></cac:PartyIdentification></cac:RecipientParty></cac:DocumentResponse></ar:ApplicationResponse>'''
+
+SIGNED_INFO_TEMPLATE = (
+    '<ds:SignedInfo xmlns:ds="http://www.w3.org/2000/09/xmldsig#">'
+    '<ds:CanonicalizationMethod Algorithm="http://www.w3.org/2010/xml-c14n2"/>'
+    '<ds:SignatureMethod Algorithm="http://www.w3.org/2001/04/xmldsig-more#rsa-sha256"/>'
+    '<ds:Reference URI=""><ds:Transforms>'
+    '<ds:Transform Algorithm="http://www.w3.org/2000/09/xmldsig#enveloped-signature"/>'
+    '<ds:Transform Algorithm="http://www.w3.org/2010/xml-c14n2"/>'
+    '</ds:Transforms><ds:DigestMethod Algorithm="http://www.w3.org/2001/04/xmlenc#sha256"/>'
+    '<ds:DigestValue>{digest}</ds:DigestValue></ds:Reference></ds:SignedInfo>'
+)
+
+
+def parse_distribution(spec):
+    """
+    Convierte una especificación de distribución en una función que retorna segundos:
+    'fixed:0.2', 'uniform:0.1:0.5', 'lognormal:<mediana>:<sigma>', 'exp:<media>'.
+    Un número solo equivale a 'fixed:<número>'.
+    """
+    parts = str(spec).split(':')
+    kind, args = parts[0], parts[1:]
+    try:
+        if len(parts) == 1:
+            value = float(kind)
+            return lambda rng: value
+        args = [float(a) for a in args]
+        if kind == 'fixed':
+            return lambda rng: args[0]
+        if kind == 'uniform':
+            return lambda rng: rng.uniform(args[0], args[1])
+        if kind == 'lognormal':
+            mu = math.log(args[0])
+            return lambda rng: rng.lognormvariate(mu, args[1])
+        if kind == 'exp':
+            return lambda rng: rng.expovariate(1 / args[0])
+    except (ValueError, IndexError):
+        pass
+    raise ValueError(f'Distribución no válida: {spec}')
+
+
+def is_signed(xml_content):
+    """True si algún ext:ExtensionContent del documento contiene un ds:Signature"""
+    try:
+        root = ET.fromstring(xml_content)
+    except ET.ParseError:
+        return False
+    return root.find(f'.//{{{EXT_NS}}}ExtensionContent/{{{DS_NS}}}Signature') is not None
+
+
+class CDRSigner:
+    """Firma enveloped (RSA-SHA256) de los CDR con una llave y certificado de prueba generados al iniciar"""
+
+    def __init__(self):
+        self.key = None
+        self.certificate = ''
+        if not CRYPTO_AVAILABLE:
+            logger.warning("cryptography no está instalado: los CDR del stub no llevarán firma real")
+            return
+
+        self.key = rsa.generate_private_key(public_exponent=65537, key_size=2048)
+        name = x509.Name([x509.NameAttribute(NameOID.COMMON_NAME, 'SUNAT STUB - CERTIFICADO DE PRUEBA')])
+        now = datetime.utcnow()
+        certificate = (
+            x509.CertificateBuilder()
+            .subject_name(name)
+            .issuer_name(name)
+            .public_key(self.key.public_key())
+            .serial_number(x509.random_serial_number())
+            .not_valid_before(now - timedelta(days=1))
+            .not_valid_after(now + timedelta(days=365))
+            .sign(self.key, hashes.SHA256())
+        )
+        self.certificate = base64.b64encode(certificate.public_bytes(serialization.Encoding.DER)).decode('ascii')
+
+    def sign(self, unsigned_xml):
+        """Retorna el bloque <ds:Signature> del documento (renderizado con la firma vacía)"""
+        canonical = ET.canonicalize(unsigned_xml)
+        digest = base64.b64encode(hashlib.sha256(canonical.encode('utf-8')).digest()).decode('ascii')
+        signed_info = SIGNED_INFO_TEMPLATE.format(digest=digest)
+
+        if self.key is not None:
+            signature_value = base64.b64encode(self.key.sign(
+                ET.canonicalize(signed_info).encode('utf-8'), padding.PKCS1v15(), hashes.SHA256()
+            )).decode('ascii')
+        else:
+            signature_value = ''
+
+        return (
+            f'<ds:Signature Id="SignSUNAT">{signed_info}'
+            f'<ds:SignatureValue>{signature_value}</ds:SignatureValue>'
+            f'<ds:KeyInfo><ds:X509Data><ds:X509Certificate>{self.certificate}</ds:X509Certificate>'
+            f'</ds:X509Data></ds:KeyInfo></ds:Signature>'
+        )
+
+
+class SUNATStub:
+    """
+    Simulación local de billService de SUNAT (sendBill, sendSummary, sendPack, getStatus) y de
+    getStatusCdr de billConsultService.
+
+    Responde sobres SOAP y CDR (ZIP con ApplicationResponse firmado) con el mismo formato
+    que SUNAT, con latencia, fallas transitorias, errores HTTP y rechazos configurables.
+    Los resúmenes y packs retornan un ticket que getStatus resuelve después de ticket_delay.
+    Con lost_rate, sendBill, sendSummary y sendPack procesan el envío pero responden HTTP 504
+    (respuesta perdida): el CDR de sendBill se puede recuperar después con getStatusCdr y el
+    ticket de un resumen o lote queda registrado en tickets. Con reject_in_cdr, los rechazos de
+    sendBill llegan como CDR con el código de rechazo en lugar de SOAP Fault. Los documentos sin
+    ds:Signature en su ext:ExtensionContent (por ejemplo, un resumen sin firmar) se rechazan
+    siempre con el código 2335.
+    """
+
+    def __init__(self, latency='fixed:0', fault_rate=0.0, fault_codes=('0100',), http_error_rate=0.0,
+                 reject_rate=0.0, reject_codes=('2017',), ticket_delay='fixed:2', seed=None, lost_rate=0.0,
+                 reject_in_cdr=False):
+        self.latency = parse_distribution(latency)
+        self.ticket_delay = parse_distribution(ticket_delay)
+        self.fault_rate = fault_rate
+        self.fault_codes = list(fault_codes)
+        self.http_error_rate = http_error_rate
+        self.reject_rate = reject_rate
+        self.reject_codes = list(reject_codes)
+        self.lost_rate = lost_rate
+        self.reject_in_cdr = reject_in_cdr
+        self.rng = random.Random(seed)
+        self.lock = threading.Lock()
+        self.signer = CDRSigner()
+        self.tickets = {}
+        # Código de respuesta del CDR de cada comprobante procesado (para getStatusCdr)
+        self.documents = {}
+        self.stats = {method: 0 for method in BILL_METHODS}
+        self.stats.update({'faults': 0, 'http_errors': 0, 'rejections': 0, 'accepted': 0, 'lost': 0,
+                           'unsigned': 0})
+
+    def random(self):
+        with self.lock:
+            return self.rng.random()
+
+    def choice(self, values):
+        with self.lock:
+            return self.rng.choice(values)
+
+    def count(self, key):
+        with self.lock:
+            self.stats[key] += 1
+
+    def handle(self, body):
+        """Procesa una petición a billService. Retorna (estado HTTP, cuerpo)"""
+        with self.lock:
+            delay = self.latency(self.rng)
+        if delay > 0:
+            time.sleep(delay)
+
+        try:
+            root = ET.fromstring(body)
+        except ET.ParseError:
+            return 500, self.fault('0100', 'Mensaje SOAP mal formado')
+
+        operation = root.find(f'{{{SOAP_NS}}}Body/*')
+        method = operation.tag.rsplit('}', 1)[-1] if operation is not None else None
+        if method not in BILL_METHODS:
+            return 500, self.fault('0100', f'Operación no soportada: {method}')
+        self.count(method)
+
+        if self.http_error_rate and self.random() < self.http_error_rate:
+            self.count('http_errors')
+            return 503, b'Service Unavailable'
+        if self.fault_rate and self.random() < self.fault_rate:
+            self.count('faults')
+            return 500, self.fault(self.choice(self.fault_codes))
+
+        if method == 'getStatus':
+            return self.get_status(operation.findtext('ticket', ''))
+        if method == 'getStatusCdr':
+            return self.get_status_cdr('-'.join(operation.findtext(field, '') for field in (
+                'rucComprobante', 'tipoComprobante', 'serieComprobante', 'numeroComprobante'
+            )))
+
+        file_name = operation.findtext('fileName', '')
+        try:
+            zip_content = base64.b64decode(operation.findtext('contentFile', ''), validate=True)
+            with zipfile.ZipFile(BytesIO(zip_content)) as zf:
+                xml_names = [name for name in zf.namelist() if name.lower().endswith('.xml')]
+                unsigned = [name for name in xml_names if not is_signed(zf.read(name))]
+        except (ValueError, zipfile.BadZipFile):
+            return 500, self.fault('0156')
+        if not ZIP_NAME_PATTERN.match(file_name):
+            return 500, self.fault('0151')
+        if not xml_names:
+            return 500, self.fault('0157')
+        if unsigned:
+            self.count('unsigned')
+            return 500, self.fault('2335', f'{FAULT_MESSAGES["2335"]}: {unsigned[0]} no contiene firma digital')
+
+        if method == 'sendBill':
+            if xml_names[0][:-4] != file_name[:-4]:
+                return 500, self.fault('0161')
+            if self.reject_rate and self.random() < self.reject_rate:
+                self.count('rejections')
+                code = self.choice(self.reject_codes)
+                self.record(file_name[:-4], code)
+                if self.reject_in_cdr:
+                    cdr = self.build_cdr_zip(file_name[:-4], [xml_names[0][:-4]], response_code=code)
+                    return 200, self.response(method, f'<applicationResponse>{cdr}</applicationResponse>')
+                return 500, self.fault(code)
+            self.count('accepted')
+            self.record(file_name[:-4], '0')
+            if self.lost_rate and self.random() < self.lost_rate:
+                self.count('lost')
+                return 504, b'Gateway Timeout'
+            cdr = self.build_cdr_zip(file_name[:-4], [xml_names[0][:-4]])
+            return 200, self.response(method, f'<applicationResponse>{cdr}</applicationResponse>')
+
+        # sendSummary / sendPack: procesamiento asíncrono con ticket
+        with self.lock:
+            ticket = str(int(time.time() * 1000)) + str(self.rng.randint(100, 999))
+            ready_at = time.monotonic() + self.ticket_delay(self.rng)
+            self.tickets[ticket] = (ready_at, file_name[:-4], [name[:-4] for name in xml_names])
+        if self.lost_rate and self.random() < self.lost_rate:
+            self.count('lost')
+            return 504, b'Gateway Timeout'
+        return 200, self.response(method, f'<ticket>{ticket}</ticket>')
+
+    def get_status(self, ticket):
+        with self.lock:
+            entry = self.tickets.get(ticket)
+        if entry is None:
+            return 500, self.fault('0127')
+
+        ready_at, file_base, documents = entry
+        if time.monotonic() < ready_at:
+            # 98: en proceso
+            return 200, self.response('getStatus', '<status><statusCode>98</statusCode></status>')
+
+        if self.reject_rate and self.random() < self.reject_rate:
+            self.count('rejections')
+            code = self.choice(self.reject_codes)
+            for document_name in documents:
+                self.record(document_name, code)
+            cdr = self.build_cdr_zip(file_base, documents, response_code=code)
+            return 200, self.response(
+                'getStatus', f'<status><content>{cdr}</content><statusCode>99</statusCode></status>'
+            )
+        self.count('accepted')
+        for document_name in documents:
+            self.record(document_name, '0')
+        cdr = self.build_cdr_zip(file_base, documents)
+        return 200, self.response('getStatus', f'<status><content>{cdr}</content><statusCode>0</statusCode></status>')
+
+    def record(self, document_name, response_code):
+        with self.lock:
+            self.documents[document_name] = response_code
+
+    def get_status_cdr(self, document_name):
+        """getStatusCdr: CDR del comprobante si fue procesado, o 0011 si SUNAT no lo tiene"""
+        with self.lock:
+            response_code = self.documents.get(document_name)
+        if response_code is None:
+            return 200, self.response('getStatusCdr', (
+                '<statusCdr><statusCode>0011</statusCode>'
+                f'<statusMessage>{FAULT_MESSAGES["0011"]}</statusMessage></statusCdr>'
+            ))
+        cdr = self.build_cdr_zip(document_name, [document_name], response_code=response_code)
+        return 200, self.response('getStatusCdr', (
+            f'<statusCdr><content>{cdr}</content><statusCode>0004</statusCode>'
+            '<statusMessage>La constancia existe</statusMessage></statusCdr>'
+        ))
+
+    def fault(self, code, message=None):
+        message = message or FAULT_MESSAGES.get(code, f'Error {code}')
+        return FAULT_TEMPLATE.format(code=code, message=message).encode('utf-8')
+
+    def response(self, method, content):
+        return RESPONSE_TEMPLATE.format(method=method, content=content).encode('utf-8')
+
+    def build_cdr_xml(self, document_name, response_code='0'):
+        """ApplicationResponse firmado para un comprobante ('<ruc>-<tipo>-<serie>-<numero>')"""
+        ruc, _, document_id = document_name.split('-', 2)
+        now = datetime.now()
+        if response_code == '0':
+            description = f'El comprobante {document_id}, ha sido aceptado'
+        else:
+            description = FAULT_MESSAGES.get(response_code, f'Error {response_code}')
+        values = {
+            'cdr_id': str(int(time.time() * 1000)),
+            'date': now.strftime('%Y-%m-%d'),
+            'time': now.strftime('%H:%M:%S'),
+            'sunat_ruc': SUNAT_RUC,
+            'ruc': ruc,
+            'document_id': document_id,
+            'response_code': response_code,
+            'description': description,
+        }
+        unsigned = CDR_TEMPLATE.format(signature='', **values)
+        return CDR_TEMPLATE.format(signature=self.signer.sign(unsigned), **values)
+
+    def build_cdr_zip(self, file_base, documents, response_code='0'):
+        """ZIP R-<archivo>.zip con un R-<comprobante>.xml por documento, en base64"""
+        buffer = BytesIO()
+        with zipfile.ZipFile(buffer, 'w', zipfile.ZIP_DEFLATED) as zf:
+            zf.writestr('dummy/', '')
+            for document_name in documents:
+                zf.writestr(f'R-{document_name}.xml', self.build_cdr_xml(document_name, response_code))
+        return base64.b64encode(buffer.getvalue()).decode('ascii')
+
+
+class StubRequestHandler(BaseHTTPRequestHandler):
+    """POST <cualquier ruta>: billService; GET /stats: contadores del stub"""
+
+    protocol_version = 'HTTP/1.1'
+    # Cabeceras y cuerpo van en escrituras separadas: sin TCP_NODELAY cada respuesta espera el ACK diferido
+    disable_nagle_algorithm = True
+
+    def do_POST(self):
+        body = self.rfile.read(int(self.headers.get('Content-Length') or 0))
+        status_code, content = self.server.stub.handle(body)
+        self.reply(status_code, content, 'text/xml; charset=utf-8')
+
+    def do_GET(self):
+        if self.path.rstrip('/') != '/stats':
+            self.reply(404, b'Not Found', 'text/plain')
+            return
+        with self.server.stub.lock:
+            content = json.dumps(self.server.stub.stats).encode('utf-8')
+        self.reply(200, content, 'application/json')
+
+    def reply(self, status_code, content, content_type):
+        self.send_response(status_code)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(content)))
+        self.end_headers()
+        self.wfile.write(content)
+
+    def log_message(self, format, *args):
+        logger.debug(format % args)
+
+
+class StubServer(ThreadingHTTPServer):
+    daemon_threads = True
+    request_queue_size = 1024
+
+    def __init__(self, address, stub):
+        super().__init__(address, StubRequestHandler)
+        self.stub = stub
+
+    @property
+    def url(self):
+        host, port = self.server_address[:2]
+        return f'http://{host}:{port}/ol-ti-itcpfegem-beta/billService'
+
+
+def start_stub_server(host='127.0.0.1', port=0, **options):
+    """Inicia el stub en un hilo de fondo (port=0: puerto libre). Retorna el servidor; usar server.url"""
+    server = StubServer((host, port), SUNATStub(**options))
+    thread = threading.Thread(target=server.serve_forever, name='sunat-stub', daemon=True)
+    thread.start()
+    return server
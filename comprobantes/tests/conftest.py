@@ -0,0 +1,139 @@
+import os
+import copy
+import base64
+import hashlib
+
+import pytest
+
+from comprobantes import storage
+
+
+@pytest.fixture(autouse=True)
+def sunat_config(settings, tmp_path):
+    """
+    SUNAT_CONFIG propio de cada prueba (copia profunda: las pruebas pueden modificar los
+    bloques anidados) y archivos en tmp_path. Retorna el diccionario para ajustarlo.
+    """
+    config = copy.deepcopy(settings.SUNAT_CONFIG)
+    settings.MEDIA_ROOT = str(tmp_path / 'media')
+    config['XML_OUTPUT_DIR'] = str(tmp_path / 'media' / 'xml')
+    config['ZIP_OUTPUT_DIR'] = str(tmp_path / 'media' / 'zip')
+    config['S3_STORAGE']['CACHE_DIR'] = str(tmp_path / 'cache')
+    os.makedirs(config['XML_OUTPUT_DIR'])
+    os.makedirs(config['ZIP_OUTPUT_DIR'])
+    settings.SUNAT_CONFIG = config
+    storage._storage = None
+    yield config
+    storage._storage = None
+
+
+def comprobante_payload(tipo='01', serie='F001', numero='1', fecha_emision='2025-01-05'):
+    """Cuerpo de /api/v1/convert/ para una factura (01) o boleta (03) de un ítem"""
+    if tipo == '03':
+        cliente = {'tipoDoc': '1', 'numeroDoc': '12345678', 'razonSocial': 'CLIENTE DE PRUEBA'}
+    else:
+        cliente = {'tipoDoc': '6', 'numeroDoc': '20605145648', 'razonSocial': 'CLIENTE DE MUESTRA SAC'}
+    cliente.update(ubigeo='130101', direccion='AV. PRINCIPAL 123 - TRUJILLO', departamento='LA LIBERTAD',
+                   provincia='TRUJILLO', distrito='TRUJILLO', codigoPais='PE')
+    return {
+        'serie': serie, 'numero': numero, 'fechaEmision': fecha_emision, 'horaEmision': '10:00:00',
+        'tipoDocumento': tipo, 'moneda': 'PEN', 'formaPago': 'Contado',
+        'totalGravado': 156.78, 'totalIGV': 28.22, 'totalPrecioVenta': 185.0, 'totalImportePagar': 185.0,
+        'emisor': {
+            'ruc': '20607599727', 'razonSocial': 'EMPRESA DE PRUEBA S.A.C.', 'nombreComercial': 'EMPRESA DE PRUEBA',
+            'ubigeo': '140101', 'direccion': 'AV. LOS OLIVOS 123', 'departamento': 'LAMBAYEQUE',
+            'provincia': 'LAMBAYEQUE', 'distrito': 'LAMBAYEQUE', 'codigoPais': 'PE',
+        },
+        'cliente': cliente,
+        'items': [{
+            'id': '1', 'cantidad': 1, 'unidadMedida': 'NIU', 'descripcion': 'PRODUCTO DE PRUEBA',
+            'valorUnitario': 156.78, 'precioVentaUnitario': 185.0, 'valorTotal': 156.78, 'igv': 28.22,
+            'codigoProducto': '195', 'codigoProductoSUNAT': '195', 'codigoTipoPrecio': '01',
+            'tipoAfectacionIGV': '10', 'porcentajeIGV': 18, 'codigoTributo': '1000', 'nombreTributo': 'IGV',
+            'tipoTributo': 'VAT', 'unspsc': '10191509',
+        }],
+    }
+
+
+@pytest.fixture
+def make_comprobante(db, client):
+    """Crea comprobantes con /api/v1/convert/ (XML y ZIP guardados) y retorna el Comprobante"""
+    from comprobantes.models import Comprobante
+
+    numbers = iter(range(1, 100000))
+
+    def make(tipo='01', serie=None, **payload):
+        body = comprobante_payload(tipo, serie or ('B001' if tipo == '03' else 'F001'), str(next(numbers)))
+        body.update(payload)
+        response = client.post('/api/v1/convert/', body, content_type='application/json')
+        assert response.status_code in (200, 201), response.content
+        return Comprobante.objects.get(id=response.json()['comprobante_id'])
+
+    return make
+
+
+@pytest.fixture
+def sunat_stub():
+    """Inicia stubs de SUNAT (start_stub_server) con las opciones dadas; se detienen al terminar"""
+    from comprobantes.sunat_stub import start_stub_server
+
+    servers = []
+
+    def start(**options):
+        server = start_stub_server(**options)
+        servers.append(server)
+        return server
+
+    yield start
+    for server in servers:
+        server.shutdown()
+        server.server_close()
+
+
+@pytest.fixture
+def stub_integration(sunat_stub):
+    """SUNATIntegration contra un stub nuevo: retorna (integración, servidor)"""
+    from comprobantes.soap_client import SUNATSoapClient
+    from comprobantes.sunat_integration import SUNATIntegration
+
+    def make(**options):
+        server = sunat_stub(**options)
+        client = SUNATSoapClient(url=server.url, consult_url=server.url)
+        return SUNATIntegration(soap_client=client), server
+
+    return make
+
+
+@pytest.fixture
+def verify_signature():
+    """
+    Verifica la firma enveloped de un XML como lo haría SUNAT: digest del documento sin la firma
+    y RSA-SHA256 de SignedInfo con el certificado de KeyInfo
+    """
+    from cryptography import x509
+    from cryptography.hazmat.primitives import hashes
+    from cryptography.hazmat.primitives.asymmetric import padding
+    from lxml import etree
+
+    from comprobantes.utils import DS_NS
+
+    def verify(xml_content):
+        root = etree.fromstring(xml_content.encode('utf-8') if isinstance(xml_content, str) else xml_content)
+        signature = root.find(f'.//{{{DS_NS}}}Signature')
+        assert signature is not None and signature.get('Id') == 'SignatureSP'
+        signed_info = signature.find(f'{{{DS_NS}}}SignedInfo')
+        digest_value = signed_info.findtext(f'.//{{{DS_NS}}}DigestValue')
+        signature_value = base64.b64decode(signature.findtext(f'{{{DS_NS}}}SignatureValue'))
+        certificate = x509.load_der_x509_certificate(
+            base64.b64decode(signature.findtext(f'.//{{{DS_NS}}}X509Certificate'))
+        )
+
+        certificate.public_key().verify(
+            signature_value, etree.tostring(signed_info, method='c14n', exclusive=True),
+            padding.PKCS1v15(), hashes.SHA256()
+        )
+        signature.getparent().remove(signature)
+        digest = hashlib.sha256(etree.tostring(root, method='c14n', exclusive=True)).digest()
+        assert base64.b64encode(digest).decode('ascii') == digest_value
+
+    return verify
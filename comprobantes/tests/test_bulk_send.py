@@ -0,0 +1,15 @@
+from comprobantes.models import SUNATResponse
+from comprobantes.resilience import Deadline
+from comprobantes.sunat_integration import SUNATIntegration
+
+
+def test_async_bulk_send_skips_sends_after_deadline(make_comprobante):
+    comprobante = make_comprobante()
+
+    result = SUNATIntegration().bulk_send_comprobantes_async([comprobante.id], deadline=Deadline(0))
+
+    assert result['failed'] == 1
+    assert result['results'][0]['retryable']
+    comprobante.refresh_from_db()
+    assert comprobante.estado == 'GENERADO'
+    assert not SUNATResponse.objects.filter(comprobante=comprobante).exists()
@@ -0,0 +1,161 @@
+from datetime import date
+
+import pytest
+from django.utils import timezone
+
+from comprobantes.daily_summaries import (
+    MAX_CORRELATIVO, claim_summary, group_summary_candidates, summary_candidates
+)
+from comprobantes.models import CorrelativoDiario, ResumenDiario
+from comprobantes.tests.conftest import comprobante_payload
+from comprobantes.utils import EXT_NS, firmar_xml_content
+
+SUMMARY_XML = f'''<?xml version="1.0" encoding="UTF-8"?>
+<SummaryDocuments xmlns="urn:sunat:names:specification:ubl:peru:schema:xsd:SummaryDocuments-1" xmlns:ext="{EXT_NS}">
+  <ext:UBLExtensions>
+    <ext:UBLExtension>
+      <ext:ExtensionContent/>
+    </ext:UBLExtension>
+  </ext:UBLExtensions>
+  <ID>RC-20250105-1</ID>
+</SummaryDocuments>'''
+
+
+def test_summary_is_signed_with_configured_certificate(verify_signature):
+    signed = firmar_xml_content(SUMMARY_XML)
+
+    verify_signature(signed)
+
+
+def test_candidates_are_grouped_by_issue_date(make_comprobante):
+    first = make_comprobante('03', fechaEmision='2025-01-05')
+    second = make_comprobante('03', fechaEmision='2025-01-06')
+
+    groups = group_summary_candidates(summary_candidates())
+
+    assert [(fecha, ids) for _, fecha, ids in groups] == [
+        (date(2025, 1, 5), [first.id]), (date(2025, 1, 6), [second.id])
+    ]
+    assert list(summary_candidates(date(2025, 1, 6)).values_list('id', flat=True)) == [second.id]
+
+
+def test_boleta_notes_are_not_summarized(make_comprobante):
+    boleta = make_comprobante('03')
+    make_comprobante('07', serie='B001')
+
+    assert list(summary_candidates().values_list('id', flat=True)) == [boleta.id]
+
+
+def test_summary_without_certificate_claims_nothing(make_comprobante, stub_integration, sunat_config, tmp_path):
+    integration, server = stub_integration()
+    boleta = make_comprobante('03')
+    sunat_config['SIGNING']['CERT_PATH'] = str(tmp_path / 'no-existe.pfx')
+
+    result = integration.send_daily_summaries()
+
+    assert result['failed'] == 1
+    assert 'Certificado de firma no encontrado' in result['results'][0]['error']
+    assert not ResumenDiario.objects.exists()
+    boleta.refresh_from_db()
+    assert boleta.estado == 'GENERADO' and boleta.resumen_id is None
+    assert server.stub.stats['sendSummary'] == 0
+
+
+def test_summary_is_accepted(make_comprobante, stub_integration):
+    integration, server = stub_integration(ticket_delay='fixed:0')
+    boletas = [make_comprobante('03', fechaEmision='2025-01-05') for _ in range(3)]
+
+    result = integration.send_daily_summaries()
+
+    assert result['successful'] == 1
+    resumen = ResumenDiario.objects.get()
+    assert resumen.fecha_emision == date(2025, 1, 5)
+    status = integration.check_summary_status(resumen.id)
+    assert status['success'], status
+    for boleta in boletas:
+        boleta.refresh_from_db()
+        assert boleta.estado == 'ACEPTADO'
+
+
+def test_rejected_summary_member_is_summarized_again(make_comprobante, stub_integration):
+    integration, server = stub_integration(reject_rate=1.0, reject_codes=('2017',), ticket_delay='fixed:0')
+    boleta = make_comprobante('03', fechaEmision='2025-01-05')
+    integration.send_daily_summaries()
+    integration.check_summary_status(ResumenDiario.objects.get().id)
+    boleta.refresh_from_db()
+    assert boleta.estado == 'RECHAZADO'
+
+    result = integration.retry_failed_comprobante(boleta.id)
+
+    assert result.get('resumen_diario')
+    boleta.refresh_from_db()
+    assert boleta.estado == 'GENERADO'
+    assert boleta.resumen_id is None and boleta.ticket_sunat is None
+    assert list(summary_candidates().values_list('id', flat=True)) == [boleta.id]
+    server.stub.reject_rate = 0.0
+    assert integration.send_daily_summaries()['successful'] == 1
+    assert ResumenDiario.objects.count() == 2
+
+
+def test_unanswered_summary_is_not_resent(make_comprobante, stub_integration):
+    integration, server = stub_integration(lost_rate=1.0, ticket_delay='fixed:0')
+    boleta = make_comprobante('03', fechaEmision='2025-01-05')
+
+    result = integration.send_daily_summaries()
+
+    assert not result['results'][0]['retryable']
+    resumen = ResumenDiario.objects.get()
+    assert resumen.estado == 'SIN_RESPUESTA'
+    boleta.refresh_from_db()
+    assert boleta.estado == 'ENVIADO' and boleta.resumen_id == resumen.id
+    assert not summary_candidates().exists()
+    assert not integration.reconcile_candidates().exists()
+
+    ticket = next(iter(server.stub.tickets))
+    assert integration.reconcile_summary(resumen.id, ticket)['estado'] == 'ENVIADO_PENDIENTE'
+    assert integration.check_summary_status(resumen.id)['success']
+    boleta.refresh_from_db()
+    assert boleta.estado == 'ACEPTADO'
+    assert server.stub.stats['sendSummary'] == 1
+
+
+def test_unregistered_summary_releases_its_boletas(make_comprobante, stub_integration):
+    integration, server = stub_integration(lost_rate=1.0)
+    boleta = make_comprobante('03', fechaEmision='2025-01-05')
+    integration.send_daily_summaries()
+    resumen = ResumenDiario.objects.get()
+
+    assert integration.reconcile_summary(resumen.id)['estado'] == 'ERROR'
+
+    boleta.refresh_from_db()
+    assert boleta.estado == 'GENERADO' and boleta.resumen_id is None
+    assert list(summary_candidates().values_list('id', flat=True)) == [boleta.id]
+
+
+def test_summary_correlativo_is_per_emisor_and_day(make_comprobante):
+    first = make_comprobante('03', fechaEmision='2025-01-05')
+    second = make_comprobante('03', fechaEmision='2025-01-05')
+    other = make_comprobante('03', fechaEmision='2025-01-05',
+                             emisor=dict(comprobante_payload()['emisor'], ruc='20999999991'))
+    today = f"{timezone.localdate():%Y%m%d}"
+
+    names = [claim_summary(boleta.ruc_emisor, date(2025, 1, 5), [boleta.id])[0].nombre_archivo
+             for boleta in (first, second, other)]
+    empty, _ = claim_summary(first.ruc_emisor, date(2025, 1, 5), [first.id])
+
+    assert names == [f'{first.ruc_emisor}-RC-{today}-1', f'{first.ruc_emisor}-RC-{today}-2',
+                     f'{other.ruc_emisor}-RC-{today}-1']
+    assert empty.nombre_archivo == '' and empty.total_comprobantes == 0
+
+
+def test_summary_correlativo_is_limited_to_five_digits(make_comprobante):
+    boleta = make_comprobante('03', fechaEmision='2025-01-05')
+    CorrelativoDiario.objects.create(ruc_emisor=boleta.ruc_emisor, tipo='RC', fecha=timezone.localdate(),
+                                     ultimo=MAX_CORRELATIVO)
+
+    with pytest.raises(ValueError):
+        claim_summary(boleta.ruc_emisor, date(2025, 1, 5), [boleta.id])
+
+    boleta.refresh_from_db()
+    assert boleta.resumen_id is None
+    assert not ResumenDiario.objects.exists()
@@ -0,0 +1,73 @@
+import gzip
+
+import pytest
+
+from comprobantes.artifacts import read_artifact
+from comprobantes.downloads import parse_range
+
+
+def get_xml(client, comprobante, **headers):
+    return client.get(f'/api/v1/xml/{comprobante.get_xml_filename()}/', **headers)
+
+
+def body(response):
+    return b''.join(response.streaming_content) if response.streaming else response.content
+
+
+def test_full_download_streams_the_file(client, make_comprobante):
+    comprobante = make_comprobante()
+    response = get_xml(client, comprobante)
+
+    assert response.status_code == 200
+    assert response.streaming
+    assert body(response) == read_artifact(comprobante, 'xml')
+    assert response['ETag'] == f'"{comprobante.xml_sha256}"'
+
+
+def test_range_and_suffix_range(client, make_comprobante):
+    comprobante = make_comprobante()
+    content = read_artifact(comprobante, 'xml')
+
+    response = get_xml(client, comprobante, HTTP_RANGE='bytes=5-14')
+    assert response.status_code == 206
+    assert response['Content-Range'] == f'bytes 5-14/{len(content)}'
+    assert body(response) == content[5:15]
+
+    response = get_xml(client, comprobante, HTTP_RANGE='bytes=-20')
+    assert response.status_code == 206
+    assert body(response) == content[-20:]
+
+    response = get_xml(client, comprobante, HTTP_RANGE=f'bytes={len(content)}-')
+    assert response.status_code == 416
+    assert response['Content-Range'] == f'bytes */{len(content)}'
+
+
+def test_gzip_and_not_modified(client, make_comprobante):
+    comprobante = make_comprobante()
+    response = get_xml(client, comprobante, HTTP_ACCEPT_ENCODING='gzip')
+
+    assert response['Content-Encoding'] == 'gzip'
+    assert gzip.decompress(body(response)) == read_artifact(comprobante, 'xml')
+
+    response = get_xml(client, comprobante, HTTP_ACCEPT_ENCODING='gzip', HTTP_IF_NONE_MATCH=response['ETag'])
+    assert response.status_code == 304
+
+
+def test_parse_range_on_empty_file():
+    with pytest.raises(ValueError):
+        parse_range('bytes=-10', 0)
+    with pytest.raises(ValueError):
+        parse_range('bytes=0-', 0)
+    assert parse_range('bytes=-10', 5) == (0, 4)
+
+
+def test_non_xml_artifact_hashes_and_serves_the_same_file(rf, make_comprobante):
+    from comprobantes.downloads import artifact_download_response
+
+    comprobante = make_comprobante()
+    content = read_artifact(comprobante, 'zip')
+
+    response = artifact_download_response(rf.get('/', HTTP_RANGE='bytes=0-9'), comprobante, 'zip',
+                                          'a.zip', 'application/zip')
+    assert response.status_code == 206
+    assert body(response) == content[:10]
@@ -0,0 +1,31 @@
+import io
+import zipfile
+
+from comprobantes.artifacts import read_artifact
+from comprobantes.exports import stream_export_zip
+from comprobantes.models import Comprobante
+
+
+def test_export_reads_xml_from_stored_zip(make_comprobante):
+    first = make_comprobante()
+    second = make_comprobante()
+    # Sin ZIP guardado el XML se toma del archivo suelto
+    Comprobante.objects.filter(id=second.id).update(zip_file=None)
+
+    archive = b''.join(stream_export_zip(Comprobante.objects.filter(id__in=[first.id, second.id]).order_by('id')))
+
+    with zipfile.ZipFile(io.BytesIO(archive)) as zf:
+        assert zf.testzip() is None
+        assert zf.namelist() == [f'xml/{first.nombre_archivo}.xml', f'xml/{second.nombre_archivo}.xml']
+        assert zf.read(f'xml/{first.nombre_archivo}.xml') == read_artifact(first, 'xml')
+        assert zf.read(f'xml/{second.nombre_archivo}.xml') == read_artifact(second, 'xml')
+
+
+def test_export_lists_missing_artifacts(make_comprobante):
+    comprobante = make_comprobante()
+    Comprobante.objects.filter(id=comprobante.id).update(zip_file=None, xml_file='xml/no-existe.xml')
+
+    archive = b''.join(stream_export_zip(Comprobante.objects.filter(id=comprobante.id)))
+
+    with zipfile.ZipFile(io.BytesIO(archive)) as zf:
+        assert zf.read('faltantes.txt').decode() == f'{comprobante.nombre_archivo}.xml\n'
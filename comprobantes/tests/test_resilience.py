@@ -0,0 +1,65 @@
+import time
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from comprobantes.resilience import Deadline, get_endpoint_guard
+from comprobantes.soap_client import SUNATSoapClient
+
+
+class SlowHandler(BaseHTTPRequestHandler):
+    """Responde después de un segundo: más que el timeout recortado de las pruebas"""
+
+    def do_POST(self):
+        self.rfile.read(int(self.headers.get('Content-Length', 0)))
+        time.sleep(1.0)
+        try:
+            self.send_response(200)
+            self.end_headers()
+        except OSError:
+            pass
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def slow_url():
+    server = ThreadingHTTPServer(('127.0.0.1', 0), SlowHandler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield f'http://127.0.0.1:{server.server_address[1]}/billService'
+    server.shutdown()
+    server.server_close()
+
+
+def test_exhausted_deadline_does_not_touch_guard(sunat_config, slow_url):
+    sunat_config['CIRCUIT_BREAKER'] = {'FAILURE_THRESHOLD': 2}
+    client = SUNATSoapClient(url=slow_url)
+
+    for _ in range(5):
+        result = client.get_status('123', deadline=Deadline(0))
+        assert not result['success']
+
+    stats = get_endpoint_guard(slow_url).stats()
+    assert stats['circuit']['state'] == 'closed'
+    assert stats['calls']['failures'] == 0
+    assert stats['concurrency']['in_flight'] == 0
+
+
+def test_shortened_timeout_is_not_an_endpoint_failure(sunat_config, slow_url):
+    sunat_config['CIRCUIT_BREAKER'] = {'FAILURE_THRESHOLD': 1}
+    sunat_config['TIMEOUTS'] = {'CONNECT': 5.0, 'READ': 30.0, 'MIN_BUDGET': 0.1}
+    client = SUNATSoapClient(url=slow_url)
+    guard = get_endpoint_guard(slow_url)
+    limit = guard.stats()['concurrency']['limit']
+
+    result = client.get_status('123', deadline=Deadline(0.3))
+
+    assert not result['success']
+    stats = guard.stats()
+    assert stats['circuit']['state'] == 'closed'
+    assert stats['calls']['failures'] == 0
+    assert stats['calls']['abandoned'] == 1
+    assert stats['concurrency']['limit'] == limit
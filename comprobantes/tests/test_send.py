@@ -0,0 +1,61 @@
+from comprobantes.models import Comprobante, SUNATResponse
+from comprobantes.sunat_integration import claim_send
+
+
+def test_lost_send_bill_response_is_reconciled_not_resent(make_comprobante, stub_integration):
+    integration, server = stub_integration(lost_rate=1.0)
+    comprobante = make_comprobante()
+
+    result = integration.send_comprobante_to_sunat(comprobante.id)
+
+    assert not result['success']
+    assert not result['retryable']
+    assert result['estado'] == 'ENVIADO'
+    assert server.stub.stats['sendBill'] == 1
+
+    summary = integration.reconcile_cdrs(integration.reconcile_candidates())
+
+    assert summary['recovered'] == 1
+    comprobante.refresh_from_db()
+    assert comprobante.estado == 'ACEPTADO'
+    assert comprobante.cdr_zip_path
+    assert server.stub.stats['sendBill'] == 1
+    assert SUNATResponse.objects.filter(comprobante=comprobante, soap_method='getStatusCdr').exists()
+
+
+def test_send_bill_rejected_in_cdr(make_comprobante, stub_integration):
+    integration, server = stub_integration(reject_rate=1.0, reject_codes=['2017'], reject_in_cdr=True)
+    comprobante = make_comprobante()
+
+    result = integration.send_comprobante_to_sunat(comprobante.id)
+
+    assert not result['success']
+    assert result['estado'] == 'RECHAZADO'
+    assert result['cdr_info']['response_code'] == '2017'
+    comprobante.refresh_from_db()
+    assert comprobante.estado == 'RECHAZADO'
+    assert comprobante.cdr_zip_path
+
+
+def test_send_bill_is_claimed_once(make_comprobante, stub_integration):
+    integration, server = stub_integration()
+    comprobante = make_comprobante()
+    stale_copy = Comprobante.objects.get(id=comprobante.id)
+
+    first = integration.send_comprobante(comprobante)
+    second = integration.send_comprobante(stale_copy)
+
+    assert first['estado'] == 'ACEPTADO'
+    assert not second['success']
+    assert server.stub.stats['sendBill'] == 1
+
+
+def test_interrupted_send_is_reconciled_after_grace(make_comprobante, stub_integration, sunat_config):
+    integration, server = stub_integration()
+    comprobante = make_comprobante()
+    assert claim_send(comprobante)
+    assert not claim_send(Comprobante.objects.get(id=comprobante.id))
+
+    assert not integration.reconcile_candidates().filter(id=comprobante.id).exists()
+    sunat_config['CDR_RECONCILE']['SENDING_GRACE'] = -1
+    assert integration.reconcile_candidates().filter(id=comprobante.id).exists()
@@ -0,0 +1,124 @@
+import os
+import uuid
+
+import pytest
+from django.core.files.base import ContentFile
+
+from comprobantes.storage import ReadThroughCache
+
+boto3 = pytest.importorskip('boto3')
+
+
+@pytest.fixture(scope='module')
+def s3_endpoint():
+    """
+    Servicio S3 local para S3ArtifactStorage. Con SUNAT_TEST_S3_ENDPOINT_URL se usa ese
+    servicio (p. ej. MinIO: docker run -p 9000:9000 minio/minio server /data); si no, un
+    servidor moto en proceso.
+    """
+    endpoint = os.environ.get('SUNAT_TEST_S3_ENDPOINT_URL')
+    if endpoint:
+        yield {
+            'ENDPOINT_URL': endpoint,
+            'ACCESS_KEY': os.environ.get('SUNAT_TEST_S3_ACCESS_KEY', 'minioadmin'),
+            'SECRET_KEY': os.environ.get('SUNAT_TEST_S3_SECRET_KEY', 'minioadmin'),
+        }
+        return
+
+    moto_server = pytest.importorskip('moto.server')
+    server = moto_server.ThreadedMotoServer(ip_address='127.0.0.1', port=0, verbose=False)
+    server.start()
+    host, port = server.get_host_and_port()
+    yield {'ENDPOINT_URL': f'http://{host}:{port}', 'ACCESS_KEY': 'test', 'SECRET_KEY': 'test'}
+    server.stop()
+
+
+@pytest.fixture
+def s3_storage(s3_endpoint, sunat_config):
+    from comprobantes.storage import S3ArtifactStorage
+
+    bucket = f'sunat-test-{uuid.uuid4().hex[:12]}'
+    options = dict(s3_endpoint, BUCKET=bucket, REGION='us-east-1',
+                   MULTIPART_THRESHOLD=5 * 1024 * 1024, MULTIPART_CHUNKSIZE=5 * 1024 * 1024)
+    storage = S3ArtifactStorage(**options)
+    storage.client.create_bucket(Bucket=bucket)
+    return storage
+
+
+def test_s3_roundtrip(s3_storage):
+    name = s3_storage.save('xml/20123456789-01-F001-1.xml', ContentFile(b'<Invoice/>'))
+
+    assert s3_storage.exists(name)
+    assert s3_storage.size(name) == len(b'<Invoice/>')
+    with s3_storage.open(name) as f:
+        assert f.read() == b'<Invoice/>'
+
+    s3_storage.delete(name)
+    assert not s3_storage.exists(name)
+    with pytest.raises(FileNotFoundError):
+        s3_storage.open(name)
+
+
+def test_s3_overwrite_invalidates_cache(s3_storage):
+    s3_storage.save('zip/a.zip', ContentFile(b'v1'))
+    with s3_storage.open('zip/a.zip') as f:
+        assert f.read() == b'v1'
+
+    s3_storage.save('zip/a.zip', ContentFile(b'v2'))
+    with s3_storage.open('zip/a.zip') as f:
+        assert f.read() == b'v2'
+
+
+def test_s3_multipart_upload(s3_storage):
+    content = os.urandom(11 * 1024 * 1024)
+    s3_storage.save('packs/big.bin', ContentFile(content))
+
+    head = s3_storage.client.head_object(Bucket=s3_storage.bucket_name, Key='packs/big.bin')
+    # ETag de una subida multipart: <md5>-<cantidad de partes>
+    assert head['ETag'].strip('"').endswith('-3')
+    with s3_storage.open('packs/big.bin') as f:
+        assert f.read() == content
+
+
+def test_s3_immutable_blob_served_from_cache(s3_storage):
+    name = 'blobs/ab/cd/abcd'
+    s3_storage.save(name, ContentFile(b'blob'))
+    with s3_storage.open(name) as f:
+        assert f.read() == b'blob'
+
+    # Sin el objeto en S3 el blob se sigue leyendo de la caché local
+    s3_storage.client.delete_object(Bucket=s3_storage.bucket_name, Key=name)
+    with s3_storage.open(name) as f:
+        assert f.read() == b'blob'
+
+
+def test_read_through_cache_limit_is_shared_between_processes(tmp_path):
+    directory = tmp_path / 'shared'
+    # Dos instancias sobre el mismo directorio simulan dos procesos
+    first = ReadThroughCache(str(directory), max_bytes=250)
+    second = ReadThroughCache(str(directory), max_bytes=250)
+
+    first.put('a', None, lambda f: f.write(b'a' * 100))
+    second.put('b', None, lambda f: f.write(b'b' * 100))
+    os.utime(directory / 'a', (1, 1))
+    os.utime(directory / 'b', (2, 2))
+    first.put('c', None, lambda f: f.write(b'c' * 100))
+
+    # Se desaloja el de uso más antiguo aunque lo haya escrito la otra instancia
+    assert first.get('a') is None
+    assert second.get('b') is not None
+    assert second.get('c') is not None
+    assert sum(entry.stat().st_size for entry in os.scandir(directory) if not entry.name.startswith('.')) <= 250
+
+
+def test_read_through_cache_discard_removes_every_version(tmp_path):
+    cache = ReadThroughCache(str(tmp_path / 'shared'), max_bytes=1024)
+    cache.put('xml/a.xml', 'v1', lambda f: f.write(b'1'))
+    cache.put('xml/a.xml', 'v2', lambda f: f.write(b'2'))
+    cache.put('xml/ab.xml', None, lambda f: f.write(b'3'))
+
+    ReadThroughCache(str(tmp_path / 'shared'), max_bytes=1024).discard('xml/a.xml')
+
+    assert cache.get('xml/a.xml', 'v1') is None
+    assert cache.get('xml/a.xml', 'v2') is None
+    assert cache.get('xml/ab.xml') is not None
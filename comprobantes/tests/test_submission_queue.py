@@ -0,0 +1,42 @@
+import pytest
+from django.db import IntegrityError, transaction
+
+from comprobantes.models import SubmissionJob
+from comprobantes.submission_queue import enqueue_job, enqueue_send_jobs, finish_job
+
+
+@pytest.mark.parametrize('url', ['/api/v1/send-to-sunat/{id}/', '/api/v1/retry-sunat/{id}/',
+                                 '/api/v1/check-pending-tickets/'])
+def test_enqueue_views_reject_get(client, make_comprobante, url):
+    comprobante = make_comprobante()
+
+    assert client.get(url.format(id=comprobante.id)).status_code == 405
+    assert not SubmissionJob.objects.exists()
+    assert client.post(url.format(id=comprobante.id)).status_code == 202
+
+
+def test_one_active_job_per_comprobante(make_comprobante):
+    comprobante = make_comprobante()
+
+    job, created = enqueue_job('ENVIAR', comprobante.id)
+    again, created_again = enqueue_job('ENVIAR', comprobante.id)
+    jobs, missing = enqueue_send_jobs([comprobante.id, 999999])
+
+    assert created and not created_again
+    assert again.id == job.id
+    assert jobs == {comprobante.id: job.id}
+    assert missing == [999999]
+    with pytest.raises(IntegrityError), transaction.atomic():
+        SubmissionJob.objects.create(tipo='ENVIAR', comprobante=comprobante, clave_activa=job.clave_activa)
+
+
+def test_finished_job_frees_its_key(make_comprobante):
+    comprobante = make_comprobante()
+    job, _ = enqueue_job('ENVIAR', comprobante.id)
+
+    assert finish_job(job, {'success': True}) == 'COMPLETADO'
+    new_job, created = enqueue_job('ENVIAR', comprobante.id)
+
+    assert created and new_job.id != job.id
+    job.refresh_from_db()
+    assert job.clave_activa is None
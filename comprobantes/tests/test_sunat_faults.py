@@ -0,0 +1,30 @@
+import requests
+from urllib3.exceptions import ProtocolError
+
+from comprobantes.resilience import DeadlineExceeded
+from comprobantes.sunat_faults import (
+    CLIENT_ERROR, TRANSIENT, UNCERTAIN, classify_exception, classify_response, is_retryable, is_retryable_query
+)
+
+
+def test_lost_responses_are_uncertain():
+    assert classify_exception(requests.exceptions.ReadTimeout()) == UNCERTAIN
+    assert classify_exception(requests.exceptions.ConnectionError(ProtocolError('Connection aborted.'))) == UNCERTAIN
+    assert classify_response({'success': False, 'http_status': 504}) == UNCERTAIN
+    assert classify_response({'success': False, 'http_status': 502}) == UNCERTAIN
+
+
+def test_unsent_requests_are_transient():
+    assert classify_exception(requests.exceptions.ConnectTimeout()) == TRANSIENT
+    assert classify_exception(requests.exceptions.ConnectionError('Max retries exceeded')) == TRANSIENT
+    assert classify_exception(DeadlineExceeded()) == TRANSIENT
+    assert classify_response({'success': False, 'http_status': 503}) == TRANSIENT
+    assert classify_response({'success': False, 'fault_code': '0100'}) == TRANSIENT
+    assert classify_response({'success': False, 'http_status': 404}) == CLIENT_ERROR
+
+
+def test_only_queries_retry_uncertain_failures():
+    response = {'success': False, 'fault_class': UNCERTAIN}
+    assert not is_retryable(response)
+    assert is_retryable_query(response)
+    assert not is_retryable_query(dict(response, circuit_open=True))
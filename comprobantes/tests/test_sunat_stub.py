@@ -0,0 +1,128 @@
+from datetime import date
+
+from django.utils import timezone
+
+from comprobantes.daily_summaries import build_summary_xml, claim_summary
+from comprobantes.models import Comprobante, ComunicacionBaja, SUNATPack
+from comprobantes.resilience import get_endpoint_guard
+from comprobantes.soap_client import SUNATSoapClient
+from comprobantes.sunat_packs import pack_candidates
+from comprobantes.utils import build_zip_bytes, firmar_xml_content
+
+
+def test_send_bill_is_accepted(make_comprobante, stub_integration):
+    integration, server = stub_integration()
+    factura = make_comprobante('01')
+
+    result = integration.send_comprobante_to_sunat(factura.id)
+
+    assert result['success'], result
+    factura.refresh_from_db()
+    assert factura.estado == 'ACEPTADO'
+    assert factura.cdr_zip_path
+    assert server.stub.stats['sendBill'] == 1
+
+
+def test_transient_faults_are_retried(make_comprobante, stub_integration, sunat_config):
+    sunat_config['RETRY'].update(MAX_ATTEMPTS=3, BASE_DELAY=0.01, MAX_DELAY=0.01)
+    integration, server = stub_integration(fault_rate=1.0, fault_codes=['0100'])
+    factura = make_comprobante('01')
+
+    result = integration.send_comprobante_to_sunat(factura.id)
+
+    assert not result['success']
+    assert result['retryable']
+    assert server.stub.stats['sendBill'] == 3
+    factura.refresh_from_db()
+    assert factura.estado == 'GENERADO'
+
+
+def test_circuit_opens_after_failures(make_comprobante, stub_integration, sunat_config):
+    sunat_config['RETRY'].update(MAX_ATTEMPTS=1)
+    sunat_config['CIRCUIT_BREAKER'].update(FAILURE_THRESHOLD=2, RESET_TIMEOUT=60.0)
+    integration, server = stub_integration(http_error_rate=1.0)
+    facturas = [make_comprobante('01') for _ in range(4)]
+
+    results = [integration.send_comprobante_to_sunat(factura.id) for factura in facturas]
+
+    assert not any(result['success'] for result in results)
+    assert server.stub.stats['sendBill'] == 2
+    assert get_endpoint_guard(server.url).stats()['circuit']['state'] == 'open'
+
+
+def test_pack_is_accepted(make_comprobante, stub_integration):
+    integration, server = stub_integration(ticket_delay='fixed:0')
+    facturas = [make_comprobante('01') for _ in range(3)]
+
+    result = integration.send_pack(facturas[0].ruc_emisor, [factura.id for factura in facturas])
+
+    assert result['success'], result
+    assert server.stub.stats['sendPack'] == 1
+    assert integration.check_pack_status(result['pack_id'])['success']
+    assert SUNATPack.objects.get(id=result['pack_id']).comprobantes.count() == 3
+    assert set(Comprobante.objects.values_list('estado', flat=True)) == {'ACEPTADO'}
+
+
+def test_unsigned_summary_is_rejected(make_comprobante, sunat_stub):
+    server = sunat_stub()
+    client = SUNATSoapClient(url=server.url, consult_url=server.url)
+    boleta = make_comprobante('03', fechaEmision='2025-01-05')
+    resumen, comprobantes = claim_summary(boleta.ruc_emisor, date(2025, 1, 5), [boleta.id])
+    xml_content = build_summary_xml(resumen, comprobantes)
+
+    unsigned = client.send_summary(resumen.get_xml_filename(), resumen.get_zip_filename(),
+                                   zip_content=build_zip_bytes(resumen.get_xml_filename(), xml_content))
+    signed = client.send_summary(resumen.get_xml_filename(), resumen.get_zip_filename(),
+                                 zip_content=build_zip_bytes(resumen.get_xml_filename(),
+                                                             firmar_xml_content(xml_content)))
+
+    assert not unsigned['success']
+    assert unsigned['fault_code'] == '2335'
+    assert server.stub.stats['unsigned'] == 1
+    assert signed['success'] and signed['ticket']
+
+
+def test_voided_document_is_accepted(make_comprobante, stub_integration):
+    integration, server = stub_integration(ticket_delay='fixed:0')
+    factura = make_comprobante('01', fechaEmision=timezone.localdate().isoformat())
+    assert integration.send_comprobante_to_sunat(factura.id)['success']
+
+    result = integration.void_comprobantes([factura.id], 'ERROR EN RUC')
+
+    assert result['success'], result
+    assert integration.check_voided_status(ComunicacionBaja.objects.get().id)['success']
+    factura.refresh_from_db()
+    assert factura.estado == 'ANULADO'
+    assert server.stub.stats['sendSummary'] == 1
+    assert server.stub.stats['unsigned'] == 0
+
+
+def test_unanswered_pack_is_reconciled_not_resent(make_comprobante, stub_integration):
+    integration, server = stub_integration(lost_rate=1.0, ticket_delay='fixed:0')
+    facturas = [make_comprobante('01') for _ in range(2)]
+
+    result = integration.send_pack(facturas[0].ruc_emisor, [factura.id for factura in facturas])
+
+    assert not result['retryable']
+    assert SUNATPack.objects.get(id=result['pack_id']).estado == 'SIN_RESPUESTA'
+    assert set(Comprobante.objects.values_list('estado', flat=True)) == {'ENVIADO'}
+    # SUNAT procesa el lote aunque la respuesta se haya perdido
+    server.stub.get_status(next(iter(server.stub.tickets)))
+
+    summary = integration.reconcile_cdrs(integration.reconcile_candidates())
+
+    assert summary['recovered'] == 2
+    assert set(Comprobante.objects.values_list('estado', flat=True)) == {'ACEPTADO'}
+    assert server.stub.stats['sendPack'] == 1
+
+
+def test_unanswered_pack_not_received_is_packed_again(make_comprobante, stub_integration):
+    integration, server = stub_integration(lost_rate=1.0)
+    facturas = [make_comprobante('01') for _ in range(2)]
+    integration.send_pack(facturas[0].ruc_emisor, [factura.id for factura in facturas])
+
+    summary = integration.reconcile_cdrs(integration.reconcile_candidates())
+
+    assert summary['not_found'] == 2
+    assert set(Comprobante.objects.values_list('estado', flat=True)) == {'GENERADO'}
+    assert set(pack_candidates().values_list('id', flat=True)) == {factura.id for factura in facturas}
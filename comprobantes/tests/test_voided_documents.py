@@ -0,0 +1,75 @@
+from datetime import timedelta
+
+from django.utils import timezone
+
+from comprobantes.models import Comprobante, ComunicacionBaja
+from comprobantes.voided_documents import build_voided_zip, claim_voided
+
+
+def accepted_invoice(make_comprobante, integration, **payload):
+    """Factura emitida hoy (o en la fecha indicada) y aceptada por el stub"""
+    payload.setdefault('fechaEmision', timezone.localdate().isoformat())
+    comprobante = make_comprobante('01', **payload)
+    assert integration.send_comprobante_to_sunat(comprobante.id)['success']
+    comprobante.refresh_from_db()
+    return comprobante
+
+
+def test_voided_document_is_signed(make_comprobante, stub_integration, verify_signature):
+    integration, server = stub_integration()
+    factura = accepted_invoice(make_comprobante, integration)
+
+    baja, comprobantes = claim_voided(factura.ruc_emisor, factura.fecha_emision, [factura.id], 'ERROR EN RUC')
+    xml_content, _ = build_voided_zip(baja, comprobantes)
+
+    verify_signature(xml_content)
+    assert f'<cbc:ReferenceDate>{factura.fecha_emision:%Y-%m-%d}</cbc:ReferenceDate>' in xml_content
+
+
+def test_voiding_window_uses_issue_date(make_comprobante, stub_integration, sunat_config):
+    integration, server = stub_integration()
+    issued = timezone.localdate() - timedelta(days=sunat_config['VOIDING'].get('MAX_DAYS', 7) + 1)
+    factura = accepted_invoice(make_comprobante, integration, fechaEmision=issued.isoformat())
+
+    result = integration.void_comprobantes([factura.id], 'ERROR EN RUC')
+
+    assert result['rechazados'] == {factura.id: 'Fuera del plazo para comunicar la baja'}
+    assert server.stub.stats['sendSummary'] == 0
+
+
+def test_boleta_notes_are_not_voided(make_comprobante, stub_integration):
+    integration, server = stub_integration()
+    nota = make_comprobante('07', serie='B001', fechaEmision=timezone.localdate().isoformat())
+    Comprobante.objects.filter(id=nota.id).update(estado='ACEPTADO')
+
+    result = integration.void_comprobantes([nota.id], 'ERROR EN MONTO')
+
+    assert 'referencia a la boleta' in result['rechazados'][nota.id]
+    assert Comprobante.objects.get(id=nota.id).estado == 'ACEPTADO'
+
+
+def test_void_without_certificate_claims_nothing(make_comprobante, stub_integration, sunat_config, tmp_path):
+    integration, server = stub_integration()
+    factura = accepted_invoice(make_comprobante, integration)
+    sunat_config['SIGNING']['CERT_PATH'] = str(tmp_path / 'no-existe.pfx')
+
+    result = integration.void_comprobantes([factura.id], 'ERROR EN RUC')
+
+    assert not result['success']
+    assert 'Certificado de firma no encontrado' in result['results'][0]['error']
+    assert not ComunicacionBaja.objects.exists()
+    factura.refresh_from_db()
+    assert factura.estado == 'ACEPTADO' and factura.baja_id is None
+
+
+def test_voided_correlativo_is_per_emisor_and_day(make_comprobante, stub_integration):
+    integration, server = stub_integration()
+    facturas = [accepted_invoice(make_comprobante, integration) for _ in range(2)]
+    today = f"{timezone.localdate():%Y%m%d}"
+
+    names = [claim_voided(factura.ruc_emisor, factura.fecha_emision, [factura.id], 'ERROR EN RUC')[0].nombre_archivo
+             for factura in facturas]
+    empty, _ = claim_voided(facturas[0].ruc_emisor, facturas[0].fecha_emision, [facturas[0].id], 'ERROR EN RUC')
+
+    assert names == [f'{facturas[0].ruc_emisor}-RA-{today}-1', f'{facturas[0].ruc_emisor}-RA-{today}-2']
+    assert empty.nombre_archivo == ''
@@ -0,0 +1,114 @@
+# comprobantes/ticket_polling.py
+
+import random
+import logging
+from datetime import timedelta
+from django.conf import settings
+from django.db.models import F, Min, Q
+from django.utils import timezone
+
+from .models import Comprobante, ComunicacionBaja, ResumenDiario, SUNATPack
+
+logger = logging.getLogger(__name__)
+
+# Estados de comprobantes con ticket por consultar (PROCESANDO: SUNAT respondió "en proceso")
+POLLING_ESTADOS = ('ENVIADO_PENDIENTE', 'PROCESANDO')
+
+
+def get_polling_config():
+    return settings.SUNAT_CONFIG.get('TICKET_POLLING', {})
+
+
+def poll_delay(attempts):
+    """
+    Espera (segundos) antes de la siguiente consulta de un ticket con `attempts` consultas sin
+    resultado: FIRST_DELAY (tiempo típico de proceso de SUNAT) la primera vez, luego crece por
+    FACTOR hasta MAX_DELAY, con ±JITTER para no consultar sincronizados
+    """
+    config = get_polling_config()
+    delay = min(config.get('MAX_DELAY', 1800.0), config.get('FIRST_DELAY', 10.0) * config.get('FACTOR', 2.0) ** attempts)
+    jitter = config.get('JITTER', 0.1)
+    return delay * random.uniform(1 - jitter, 1 + jitter)
+
+
+def schedule_first_poll(ticket_owner, now=None):
+    """Programa la primera consulta de un ticket recién recibido (comprobante o lote, sin guardar)"""
+    now = now or timezone.now()
+    ticket_owner.poll_attempts = 0
+    ticket_owner.next_poll_at = now + timedelta(seconds=poll_delay(0))
+
+
+def reschedule_poll(ticket_owner, sent_at, now=None):
+    """
+    Tras una consulta sin resultado (en proceso o falla transitoria) programa la siguiente con
+    backoff. Retorna True si el ticket superó STALE_AFTER segundos desde el envío: deja de
+    consultarse y el llamador lo marca TICKET_VENCIDO.
+    """
+    now = now or timezone.now()
+    ticket_owner.poll_attempts += 1
+    if sent_at is not None and (now - sent_at).total_seconds() > get_polling_config().get('STALE_AFTER', 172800):
+        ticket_owner.next_poll_at = None
+        return True
+    ticket_owner.next_poll_at = now + timedelta(seconds=poll_delay(ticket_owner.poll_attempts))
+    return False
+
+
+def pending_ticket_comprobantes():
+    """Comprobantes con ticket propio por consultar (los de lotes y resúmenes se consultan por su ticket)"""
+    return Comprobante.objects.filter(
+        estado__in=POLLING_ESTADOS, ticket_sunat__isnull=False, pack__isnull=True, resumen__isnull=True
+    )
+
+
+def pending_ticket_packs():
+    return SUNATPack.objects.filter(estado='ENVIADO_PENDIENTE', ticket__isnull=False)
+
+
+def pending_ticket_resumenes():
+    return ResumenDiario.objects.filter(estado='ENVIADO_PENDIENTE', ticket__isnull=False)
+
+
+def pending_ticket_bajas():
+    return ComunicacionBaja.objects.filter(estado='ENVIADO_PENDIENTE', ticket__isnull=False)
+
+
+def due_filter(now):
+    # Sin next_poll_at: tickets recibidos antes del programador, se consultan de inmediato
+    return Q(next_poll_at__isnull=True) | Q(next_poll_at__lte=now)
+
+
+def claim_due_tickets(queryset, limit):
+    """
+    Toma hasta limit tickets vencidos del queryset, los más atrasados primero (índice
+    estado + next_poll_at), y mueve su next_poll_at a LEASE segundos para que otro proceso
+    no los consulte a la vez. Retorna los ids tomados; la consulta reprograma cada uno.
+    """
+    if limit <= 0:
+        return []
+    now = timezone.now()
+    ids = list(
+        queryset.filter(due_filter(now))
+        .order_by(F('next_poll_at').asc(nulls_first=True), 'id')
+        .values_list('id', flat=True)[:limit]
+    )
+    if not ids:
+        return []
+    leased_until = now + timedelta(seconds=get_polling_config().get('LEASE', 120))
+    queryset.filter(due_filter(now), id__in=ids).update(next_poll_at=leased_until)
+    return list(queryset.filter(id__in=ids, next_poll_at=leased_until).values_list('id', flat=True))
+
+
+def next_due_in():
+    """Segundos hasta la próxima consulta programada (0 si ya hay vencidas), o None si no hay tickets"""
+    now = timezone.now()
+    earliest = []
+    for queryset in (pending_ticket_packs(), pending_ticket_resumenes(), pending_ticket_bajas(),
+                     pending_ticket_comprobantes()):
+        if queryset.filter(next_poll_at__isnull=True).exists():
+            return 0.0
+        value = queryset.aggregate(next_poll_at=Min('next_poll_at'))['next_poll_at']
+        if value is not None:
+            earliest.append(value)
+    if not earliest:
+        return None
+    return max((min(earliest) - now).total_seconds(), 0.0)
@@ -8,6 +8,7 @@ urlpatterns = [
     path('validate/', views.validate_comprobante, name='validate'),
     path('convert/', views.convert_to_xml, name='convert'),
     path('xml/<str:nombre_xml>/', views.get_xml_file, name='get_xml'),
+    path('export/<str:ruc_emisor>/', views.export_artifacts_zip, name='export_zip'),
     
     # Endpoints SUNAT
     path('send-to-sunat/<int:comprobante_id>/', views.send_to_sunat, name='send_to_sunat'),
@@ -15,7 +16,10 @@ urlpatterns = [
     path('comprobante-status/<int:comprobante_id>/', views.get_comprobante_status, name='comprobante_status'),
     path('retry-sunat/<int:comprobante_id>/', views.retry_sunat_send, name='retry_sunat'),
     path('bulk-send-sunat/', views.bulk_send_to_sunat, name='bulk_send_sunat'),
+    path('bulk-send-sunat/stream/', views.bulk_send_to_sunat_stream, name='bulk_send_sunat_stream'),
+    path('void-sunat/', views.void_comprobantes, name='void_comprobantes'),
     path('check-pending-tickets/', views.check_pending_tickets, name='check_pending_tickets'),
+    path('jobs/<int:job_id>/', views.get_submission_job, name='get_submission_job'),
     path('cdr/<int:comprobante_id>/', views.get_cdr_file, name='get_cdr'),
     path('sunat-dashboard/', views.sunat_dashboard, name='sunat_dashboard'),
 ]
\ No newline at end of file
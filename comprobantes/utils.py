@@ -1,7 +1,10 @@
 # comprobantes/utils.py - Archivo COMPLETO corregido
 
 import os
+import base64
+import hashlib
 import zipfile
+from io import BytesIO
 from datetime import datetime, date, time
 from decimal import Decimal
 from django.conf import settings
@@ -334,10 +337,65 @@ def validate_xml_structure(xml_content):
         }
 
 
-def create_zip_file(xml_path, zip_path):
+def get_zip_compresslevel(size):
+    """
+    Determina el nivel de compresión ZIP según la política de SUNAT_CONFIG['ZIP_COMPRESSION'].
+    
+    - 'fixed': usa siempre LEVEL (None = nivel por defecto de zlib)
+    - 'size': usa el primer nivel de SIZE_LEVELS cuyo límite cubra el tamaño del XML
+    """
+    policy = settings.SUNAT_CONFIG.get('ZIP_COMPRESSION', {})
+    
+    if policy.get('POLICY', 'fixed') == 'size':
+        for max_size, level in policy.get('SIZE_LEVELS', []):
+            if max_size is None or size <= max_size:
+                return level
+    
+    return policy.get('LEVEL')
+
+
+def build_zip_bytes(xml_filename, xml_content, compresslevel=None, date_time=None):
+    """
+    Crear en memoria el ZIP con el XML (requerido por SUNAT).
+    Con date_time fijo el ZIP es reproducible byte a byte.
+    """
+    if isinstance(xml_content, str):
+        xml_content = xml_content.encode('utf-8')
+    if compresslevel is None:
+        compresslevel = get_zip_compresslevel(len(xml_content))
+    
+    buffer = BytesIO()
+    with zipfile.ZipFile(buffer, 'w', zipfile.ZIP_DEFLATED, compresslevel=compresslevel) as zipf:
+        if date_time is not None:
+            info = zipfile.ZipInfo(xml_filename, date_time=date_time)
+            info.compress_type = zipfile.ZIP_DEFLATED
+            info.external_attr = 0o600 << 16
+            zipf.writestr(info, xml_content, compresslevel=compresslevel)
+        else:
+            zipf.writestr(xml_filename, xml_content)
+    return buffer.getvalue()
+
+
+def find_cdr_member(zip_file, document_name):
+    """
+    Nombre del XML del CDR dentro de su ZIP: R-{document_name}.xml o, si no está
+    (p. ej. respuestas de getStatus consultadas por ticket), el primer XML del archivo.
+    Retorna None si el ZIP no contiene ningún XML.
+    """
+    names = zip_file.namelist()
+    expected = f'R-{document_name}.xml'
+    if expected in names:
+        return expected
+    return next((name for name in names if name.lower().endswith('.xml')), None)
+
+
+def create_zip_file(xml_path, zip_path, compresslevel=None):
     """Crear archivo ZIP con el XML (requerido por SUNAT)"""
     try:
-        with zipfile.ZipFile(zip_path, 'w', zipfile.ZIP_DEFLATED) as zipf:
+        if compresslevel is None:
+            compresslevel = get_zip_compresslevel(os.path.getsize(xml_path))
+        
+        with zipfile.ZipFile(zip_path, 'w', zipfile.ZIP_DEFLATED, compresslevel=compresslevel) as zipf:
             xml_filename = os.path.basename(xml_path)
             zipf.write(xml_path, xml_filename)
         return True
@@ -374,7 +432,8 @@ def validar_ruc_sunat(ruc):
 try:
     from cryptography.hazmat.primitives.serialization import pkcs12
     from cryptography.hazmat.backends import default_backend
-    from cryptography.hazmat.primitives import serialization
+    from cryptography.hazmat.primitives import hashes, serialization
+    from cryptography.hazmat.primitives.asymmetric import padding
     SIGNING_AVAILABLE = True
     
     def firmar_xml_ubl(xml_path, pfx_path, pfx_password):
@@ -408,4 +467,93 @@ except ImportError:
         with open(signed_path, 'wb') as f:
             f.write(xml_data)
         
-        return xml_data
\ No newline at end of file
+        return xml_data
+
+
+class SigningError(Exception):
+    """No se pudo firmar un documento (sin librerías, sin certificado o XML sin ExtensionContent)"""
+
+
+DS_NS = 'http://www.w3.org/2000/09/xmldsig#'
+EXT_NS = 'urn:oasis:names:specification:ubl:schema:xsd:CommonExtensionComponents-2'
+EXC_C14N = 'http://www.w3.org/2001/10/xml-exc-c14n#'
+SIGNATURE_ID = 'SignatureSP'
+
+_signing_credentials = {}
+
+
+def get_signing_credentials():
+    """
+    Llave privada y certificado (DER) del PFX de SUNAT_CONFIG['SIGNING'], leídos una vez por
+    archivo y fecha de modificación. Lanza SigningError si no se pueden cargar.
+    """
+    if not SIGNING_AVAILABLE or not LXML_AVAILABLE:
+        raise SigningError('Se requieren cryptography y lxml para firmar documentos')
+    signing = settings.SUNAT_CONFIG.get('SIGNING', {})
+    cert_path = signing.get('CERT_PATH')
+    password = signing.get('CERT_PASSWORD') or ''
+    try:
+        key = (cert_path, password, os.path.getmtime(cert_path))
+    except (TypeError, OSError):
+        raise SigningError(f'Certificado de firma no encontrado: {cert_path}')
+
+    credentials = _signing_credentials.get(key)
+    if credentials is None:
+        try:
+            with open(cert_path, 'rb') as f:
+                private_key, certificate, _ = pkcs12.load_key_and_certificates(
+                    f.read(), password.encode('utf-8')
+                )
+        except (OSError, ValueError) as e:
+            raise SigningError(f'No se pudo leer el certificado {cert_path}: {e}')
+        if private_key is None or certificate is None:
+            raise SigningError(f'El certificado {cert_path} no contiene llave privada y certificado')
+        credentials = (private_key, certificate.public_bytes(serialization.Encoding.DER))
+        _signing_credentials.clear()
+        _signing_credentials[key] = credentials
+    return credentials
+
+
+def firmar_xml_content(xml_content):
+    """
+    Firma un XML UBL generado en el servidor (resúmenes y bajas) con el certificado de
+    SUNAT_CONFIG['SIGNING']: firma XML-DSig enveloped (RSA-SHA256, C14N exclusiva) con
+    Id="SignatureSP" dentro del ext:ExtensionContent vacío, como la referencia el cac:Signature.
+    Lanza SigningError si no se puede firmar: SUNAT rechaza los documentos sin firma.
+    """
+    private_key, certificate = get_signing_credentials()
+    try:
+        root = LET.fromstring(xml_content.encode('utf-8'))
+    except LET.XMLSyntaxError as e:
+        raise SigningError(f'XML mal formado: {e}')
+    slots = [element for element in root.iter(f'{{{EXT_NS}}}ExtensionContent') if len(element) == 0]
+    if not slots:
+        raise SigningError('El XML no tiene un ext:ExtensionContent vacío para la firma')
+
+    # Transformación enveloped: el digest es el del documento sin la firma
+    digest = hashlib.sha256(LET.tostring(root, method='c14n', exclusive=True)).digest()
+
+    def ds(parent, tag, text=None, **attributes):
+        element = LET.SubElement(parent, f'{{{DS_NS}}}{tag}', attributes, nsmap={'ds': DS_NS})
+        element.text = text
+        return element
+
+    signature = ds(slots[-1], 'Signature', Id=SIGNATURE_ID)
+    signed_info = ds(signature, 'SignedInfo')
+    ds(signed_info, 'CanonicalizationMethod', Algorithm=EXC_C14N)
+    ds(signed_info, 'SignatureMethod', Algorithm='http://www.w3.org/2001/04/xmldsig-more#rsa-sha256')
+    reference = ds(signed_info, 'Reference', URI='')
+    transforms = ds(reference, 'Transforms')
+    ds(transforms, 'Transform', Algorithm='http://www.w3.org/2000/09/xmldsig#enveloped-signature')
+    ds(transforms, 'Transform', Algorithm=EXC_C14N)
+    ds(reference, 'DigestMethod', Algorithm='http://www.w3.org/2001/04/xmlenc#sha256')
+    ds(reference, 'DigestValue', base64.b64encode(digest).decode('ascii'))
+
+    signature_value = private_key.sign(
+        LET.tostring(signed_info, method='c14n', exclusive=True), padding.PKCS1v15(), hashes.SHA256()
+    )
+    ds(signature, 'SignatureValue', base64.b64encode(signature_value).decode('ascii'))
+    x509_data = ds(ds(signature, 'KeyInfo'), 'X509Data')
+    ds(x509_data, 'X509Certificate', base64.b64encode(certificate).decode('ascii'))
+
+    return '<?xml version="1.0" encoding="UTF-8"?>\n' + LET.tostring(root, encoding='unicode')
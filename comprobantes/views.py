@@ -3,8 +3,13 @@
 import os
 import traceback
 from django.conf import settings
-from django.http import FileResponse, Http404
+from datetime import datetime, timedelta
+from django.http import FileResponse, Http404, StreamingHttpResponse
+from django.utils import timezone
+from django.utils.dateparse import parse_date
+from django.db.models import Count
 from django.shortcuts import render
+from django.urls import reverse
 from rest_framework.decorators import api_view, parser_classes
 from rest_framework.parsers import JSONParser
 from rest_framework.response import Response
@@ -15,14 +20,30 @@ import logging
 from .serializers import (
     ComprobanteInputSerializer, 
 )
-from .models import Comprobante, DetalleComprobante
+from .models import Comprobante, DetalleComprobante, SubmissionJob
 from .utils import (
     validate_comprobante_data,
     generate_ubl_xml,
-    create_zip_file,
+    build_zip_bytes,
     validate_xml_structure,
     SIGNING_AVAILABLE
 )
+from .artifacts import (
+    save_artifact,
+    has_artifact,
+    open_artifact,
+    find_comprobante_by_filename,
+    get_artifact_filename,
+)
+from .storage import get_artifact_storage
+from .lazy_artifacts import is_lazy_enabled, persist_lazy_artifact, discard_lazy_artifact
+from .downloads import artifact_download_response
+from .exports import stream_export_zip
+from .http_sessions import get_connection_stats
+from .resilience import Deadline, get_guard_stats, get_timeout_config
+from .sunat_integration import SUNATIntegration
+from .submission_queue import enqueue_job, enqueue_send_jobs, get_queue_stats
+from .sunat_clients import get_client_stats
 
 if SIGNING_AVAILABLE:
     from .utils import firmar_xml_ubl
@@ -63,6 +84,7 @@ def validate_comprobante(request):
                     total_gravado=data['totalGravado'],
                     total_igv=data['totalIGV'],
                     total=data['totalImportePagar'],
+                    fecha_emision=data.get('fechaEmision') or timezone.localdate(),
                     estado='VALIDADO'
                 )
                 for item_data in data['items']:
@@ -130,9 +152,13 @@ def convert_to_xml(request):
                     'total_gravado': serializer.validated_data['totalGravado'],
                     'total_igv': serializer.validated_data['totalIGV'],
                     'total': serializer.validated_data['totalImportePagar'],
+                    'fecha_emision': serializer.validated_data.get('fechaEmision') or timezone.localdate(),
                     'estado': 'PENDIENTE'
                 }
             )
+            if not created:
+                # El XML se vuelve a generar con la fecha de emisión recibida
+                comprobante.fecha_emision = serializer.validated_data.get('fechaEmision') or comprobante.fecha_emision
             print(f"📋 Comprobante {'creado' if created else 'encontrado'} con ID: {comprobante.id}")
         except Exception as db_error:
             print(f"❌ Error de base de datos: {str(db_error)}")
@@ -201,34 +227,36 @@ def convert_to_xml(request):
         except Exception as signing_error:
             print(f"⚠️  Error en firma digital (continuando sin firma): {str(signing_error)}")
             xml_firmado = xml_content
-        try:
-            xml_filename = comprobante.get_xml_filename()
-            xml_path = os.path.join(settings.SUNAT_CONFIG['XML_OUTPUT_DIR'], xml_filename)
-            with open(xml_path, 'w', encoding='utf-8') as f:
-                f.write(xml_firmado)
-            print(f"📁 XML guardado: {xml_filename}")
-        except Exception as file_error:
-            print(f"❌ Error al guardar XML: {str(file_error)}")
-            return Response({
-                'success': False,
-                'message': 'Error al guardar archivo XML',
-                'errors': [str(file_error)]
-            }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
-        try:
-            zip_filename = comprobante.get_zip_filename()
-            zip_path = os.path.join(settings.SUNAT_CONFIG['ZIP_OUTPUT_DIR'], zip_filename)
-            if create_zip_file(xml_path, zip_path):
+        xml_filename = comprobante.get_xml_filename()
+        zip_filename = comprobante.get_zip_filename()
+        xml_bytes = xml_firmado.encode('utf-8')
+        lazy = None
+        if is_lazy_enabled(comprobante.tipo_comprobante):
+            try:
+                lazy = persist_lazy_artifact(comprobante, serializer.validated_data, xml_bytes)
+                if lazy is not None:
+                    print(f"🪶 Payload guardado, XML/ZIP se regenerarán bajo demanda: {xml_filename}")
+            except Exception as lazy_error:
+                print(f"⚠️  Error en modo diferido (se guardarán los archivos): {str(lazy_error)}")
+        if lazy is None:
+            try:
+                save_artifact(comprobante, 'xml', xml_bytes)
+                discard_lazy_artifact(comprobante)
+                print(f"📁 XML guardado: {xml_filename}")
+            except Exception as file_error:
+                print(f"❌ Error al guardar XML: {str(file_error)}")
+                return Response({
+                    'success': False,
+                    'message': 'Error al guardar archivo XML',
+                    'errors': [str(file_error)]
+                }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+            try:
+                save_artifact(comprobante, 'zip', build_zip_bytes(xml_filename, xml_bytes))
                 print(f"📦 ZIP creado: {zip_filename}")
-            else:
-                print("⚠️  Error al crear ZIP (continuando)")
+            except Exception as zip_error:
+                print(f"⚠️  Error al crear ZIP: {str(zip_error)}")
                 zip_filename = None
-        except Exception as zip_error:
-            print(f"⚠️  Error al crear ZIP: {str(zip_error)}")
-            zip_filename = None
         try:
-            comprobante.xml_file = f'xml/{xml_filename}'
-            if zip_filename:
-                comprobante.zip_file = f'zip/{zip_filename}'
             comprobante.estado = 'GENERADO'
             comprobante.errores = None
             comprobante.save()
@@ -255,13 +283,22 @@ def convert_to_xml(request):
 def get_xml_file(request, nombre_xml):
     """Endpoint para obtener archivo XML por nombre"""
     try:
-        xml_path = os.path.join(settings.SUNAT_CONFIG['XML_OUTPUT_DIR'], nombre_xml)
-        if not os.path.exists(xml_path):
-            print(f"❌ Archivo XML no encontrado: {xml_path}")
+        # Resolver la ruta desde el comprobante (layout plano o particionado)
+        # Los XML de meses cerrados se leen desde el pack mensual
+        comprobante = find_comprobante_by_filename(nombre_xml)
+        try:
+            if comprobante is not None and has_artifact(comprobante, 'xml') and comprobante.get_xml_filename() == nombre_xml:
+                # ETag, 304, Range, gzip y offload al proxy
+                response = artifact_download_response(request, comprobante, 'xml', nombre_xml, 'application/xml')
+                print(f"📄 Sirviendo archivo XML: {nombre_xml} ({response.status_code})")
+                return response
+            xml_file = get_artifact_storage().open(f'xml/{os.path.basename(nombre_xml)}', 'rb')
+        except FileNotFoundError:
+            print(f"❌ Archivo XML no encontrado: {nombre_xml}")
             raise Http404("Archivo XML no encontrado")
         print(f"📄 Sirviendo archivo XML: {nombre_xml}")
         response = FileResponse(
-            open(xml_path, 'rb'),
+            xml_file,
             content_type='application/xml'
         )
         response['Content-Disposition'] = f'attachment; filename="{nombre_xml}"'
@@ -297,7 +334,8 @@ def health_check(request):
             'database': 'OK',
             'xml_directory': 'OK' if xml_dir_exists else 'CREATED',
             'zip_directory': 'OK' if zip_dir_exists else 'CREATED',
-            'signing_available': SIGNING_AVAILABLE
+            'signing_available': SIGNING_AVAILABLE,
+            'sunat_connections': get_connection_stats()
         }
         return Response({
             'success': True,
@@ -315,34 +353,285 @@ def health_check(request):
             'error': str(e)
         }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
-@api_view(['GET', 'POST'])
+def get_request_deadline(request):
+    """Plazo de la petición para llamar a SUNAT: SUNAT_API_DEADLINE, o menos si el cliente envía X-Request-Timeout"""
+    seconds = get_timeout_config().get('API_DEADLINE', 25.0)
+    try:
+        requested = float(request.headers.get('X-Request-Timeout', ''))
+    except ValueError:
+        requested = 0
+    if requested > 0:
+        seconds = min(seconds, requested)
+    return Deadline(seconds)
+
+def sunat_result_response(result, deadline):
+    """Respuesta HTTP de un resultado de SUNATIntegration: las fallas transitorias se devuelven de inmediato con 503 (504 si se agotó el plazo)"""
+    if result.get('success') or not result.get('retryable'):
+        return Response(result, status=status.HTTP_200_OK)
+    if deadline.exhausted():
+        return Response(result, status=status.HTTP_504_GATEWAY_TIMEOUT)
+    return Response(result, status=status.HTTP_503_SERVICE_UNAVAILABLE)
+
+def job_accepted_response(request, job, created):
+    """202 con el trabajo encolado (o el que ya estaba activo) y la URL para consultar su estado"""
+    return Response({
+        'success': True,
+        'job_id': job.id,
+        'tipo': job.tipo,
+        'estado': job.estado,
+        'comprobante_id': job.comprobante_id,
+        'encolado': created,
+        'status_url': request.build_absolute_uri(reverse('comprobantes:get_submission_job', args=[job.id]))
+    }, status=status.HTTP_202_ACCEPTED)
+
+@api_view(['POST'])
 def send_to_sunat(request, comprobante_id):
-    return Response({"ok": True, "msg": "send_to_sunat placeholder"})
+    """Encola el envío del comprobante a SUNAT (lo ejecuta el comando sunat_worker)"""
+    if not Comprobante.objects.filter(id=comprobante_id).exists():
+        return Response({
+            'success': False,
+            'error': f'Comprobante con ID {comprobante_id} no encontrado'
+        }, status=status.HTTP_404_NOT_FOUND)
+    job, created = enqueue_job('ENVIAR', comprobante_id)
+    print(f"📤 Envío a SUNAT del comprobante {comprobante_id} encolado: trabajo {job.id}")
+    return job_accepted_response(request, job, created)
 
 @api_view(['GET'])
 def check_sunat_status(request, comprobante_id):
-    return Response({"ok": True, "msg": "check_sunat_status placeholder"})
+    """Consulta el ticket del comprobante en SUNAT dentro del plazo de la petición"""
+    if not Comprobante.objects.filter(id=comprobante_id).exists():
+        return Response({
+            'success': False,
+            'error': f'Comprobante con ID {comprobante_id} no encontrado'
+        }, status=status.HTTP_404_NOT_FOUND)
+    deadline = get_request_deadline(request)
+    result = SUNATIntegration().check_ticket_status(comprobante_id, deadline)
+    return sunat_result_response(result, deadline)
 
 @api_view(['GET'])
 def get_comprobante_status(request, comprobante_id):
     return Response({"ok": True, "msg": "get_comprobante_status placeholder"})
 
-@api_view(['GET'])
+@api_view(['POST'])
 def retry_sunat_send(request, comprobante_id):
-    return Response({"ok": True, "msg": "retry_sunat_send placeholder"})
+    """Encola el reenvío de un comprobante con error"""
+    if not Comprobante.objects.filter(id=comprobante_id).exists():
+        return Response({
+            'success': False,
+            'error': f'Comprobante con ID {comprobante_id} no encontrado'
+        }, status=status.HTTP_404_NOT_FOUND)
+    job, created = enqueue_job('REINTENTAR', comprobante_id)
+    print(f"🔁 Reenvío a SUNAT del comprobante {comprobante_id} encolado: trabajo {job.id}")
+    return job_accepted_response(request, job, created)
+
+def parse_comprobante_ids(request):
+    """IDs de {"comprobante_ids": [1, 2, ...]} del cuerpo, o (None, respuesta 400)"""
+    comprobante_ids = request.data.get('comprobante_ids')
+    if not isinstance(comprobante_ids, list) or not comprobante_ids:
+        return None, Response({
+            'success': False,
+            'error': 'comprobante_ids debe ser una lista no vacía de IDs'
+        }, status=status.HTTP_400_BAD_REQUEST)
+    try:
+        return [int(comprobante_id) for comprobante_id in comprobante_ids], None
+    except (TypeError, ValueError):
+        return None, Response({
+            'success': False,
+            'error': 'comprobante_ids solo puede contener IDs numéricos'
+        }, status=status.HTTP_400_BAD_REQUEST)
 
 @api_view(['POST'])
 def bulk_send_to_sunat(request):
-    return Response({"ok": True, "msg": "bulk_send_to_sunat placeholder"})
+    """Encola el envío de varios comprobantes: {"comprobante_ids": [1, 2, ...]}"""
+    comprobante_ids, error_response = parse_comprobante_ids(request)
+    if error_response is not None:
+        return error_response
 
-@api_view(['GET'])
+    jobs, missing = enqueue_send_jobs(comprobante_ids)
+    print(f"📤 Envío masivo encolado: {len(jobs)} trabajos, {len(missing)} comprobantes no encontrados")
+    return Response({
+        'success': True,
+        'total_encolados': len(jobs),
+        'jobs': {str(comprobante_id): job_id for comprobante_id, job_id in jobs.items()},
+        'no_encontrados': missing
+    }, status=status.HTTP_202_ACCEPTED)
+
+@api_view(['POST'])
+def bulk_send_to_sunat_stream(request):
+    """
+    Envía varios comprobantes en esta misma petición, en paralelo, y devuelve el resultado de
+    cada uno como una línea NDJSON a medida que termina; la última línea es el resumen
+    """
+    comprobante_ids, error_response = parse_comprobante_ids(request)
+    if error_response is not None:
+        return error_response
+
+    def ndjson_lines():
+        successful = failed = 0
+        for result in SUNATIntegration().iter_bulk_send(comprobante_ids):
+            if result.get('success'):
+                successful += 1
+            else:
+                failed += 1
+            yield json.dumps(result, default=str) + '\n'
+        print(f"📤 Envío masivo: {successful} exitosos, {failed} fallidos")
+        yield json.dumps({'resumen': {
+            'total_processed': successful + failed,
+            'successful': successful,
+            'failed': failed
+        }}) + '\n'
+
+    return StreamingHttpResponse(ndjson_lines(), content_type='application/x-ndjson')
+
+@api_view(['POST'])
+def void_comprobantes(request):
+    """
+    Da de baja comprobantes aceptados: {"comprobante_ids": [1, 2, ...], "motivo": "..."}.
+    Se agrupan por emisor y fecha en comunicaciones de baja (RA) o resúmenes de anulación (RC);
+    los tickets los consulta check_pending_tickets.
+    """
+    comprobante_ids, error_response = parse_comprobante_ids(request)
+    if error_response is not None:
+        return error_response
+    motivo = str(request.data.get('motivo') or '').strip()
+    if not motivo:
+        return Response({
+            'success': False,
+            'error': 'motivo es requerido para dar de baja comprobantes'
+        }, status=status.HTTP_400_BAD_REQUEST)
+
+    deadline = get_request_deadline(request)
+    result = SUNATIntegration().void_comprobantes(comprobante_ids, motivo, deadline)
+    print(f"🗑️ Baja de comprobantes: {result['comprobantes_enviados']} enviados en {result['successful']}/"
+          f"{result['total_envios']} envíos, {len(result['rechazados'])} no anulables")
+    return sunat_result_response(result, deadline)
+
+@api_view(['POST'])
 def check_pending_tickets(request):
-    return Response({"ok": True, "msg": "check_pending_tickets placeholder"})
+    """Encola la consulta de todos los tickets pendientes"""
+    job, created = enqueue_job('CONSULTAR_TICKETS')
+    return job_accepted_response(request, job, created)
+
+@api_view(['GET'])
+def get_submission_job(request, job_id):
+    """Estado de un trabajo encolado: intentos, último error y resultado del último intento"""
+    try:
+        job = SubmissionJob.objects.get(id=job_id)
+    except SubmissionJob.DoesNotExist:
+        return Response({
+            'success': False,
+            'error': f'Trabajo con ID {job_id} no encontrado'
+        }, status=status.HTTP_404_NOT_FOUND)
+    return Response({
+        'success': True,
+        'job_id': job.id,
+        'tipo': job.tipo,
+        'estado': job.estado,
+        'comprobante_id': job.comprobante_id,
+        'intentos': job.intentos,
+        'max_intentos': job.max_intentos,
+        'disponible_desde': job.disponible_desde.isoformat(),
+        'ultimo_error': job.ultimo_error,
+        'resultado': json.loads(job.resultado) if job.resultado else None,
+        'fecha_creacion': job.fecha_creacion.isoformat(),
+        'fecha_completado': job.fecha_completado.isoformat() if job.fecha_completado else None
+    }, status=status.HTTP_200_OK)
 
 @api_view(['GET'])
 def get_cdr_file(request, comprobante_id):
-    return Response({"ok": True, "msg": "get_cdr_file placeholder"})
+    """Endpoint para descargar el CDR (ZIP, o XML con ?formato=xml) de un comprobante"""
+    try:
+        comprobante = Comprobante.objects.get(id=comprobante_id)
+        kind = 'cdr_xml' if request.GET.get('formato') == 'xml' else 'cdr_zip'
+        if not has_artifact(comprobante, kind):
+            raise Http404("CDR no disponible")
+        try:
+            cdr_file = open_artifact(comprobante, kind)
+        except FileNotFoundError:
+            raise Http404("CDR no encontrado")
+        filename = get_artifact_filename(comprobante, kind)
+        print(f"📄 Sirviendo CDR: {filename}")
+        response = FileResponse(
+            cdr_file,
+            content_type='application/xml' if kind == 'cdr_xml' else 'application/zip'
+        )
+        response['Content-Disposition'] = f'attachment; filename="{filename}"'
+        return response
+    except (Comprobante.DoesNotExist, Http404):
+        return Response({
+            'success': False,
+            'message': 'CDR no encontrado'
+        }, status=status.HTTP_404_NOT_FOUND)
+    except Exception as e:
+        print(f"❌ Error al obtener CDR: {str(e)}")
+        return Response({
+            'success': False,
+            'message': 'Error interno del servidor'
+        }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+@api_view(['GET'])
+def export_artifacts_zip(request, ruc_emisor):
+    """
+    Endpoint para descargar en un solo ZIP los XML y CDR de un emisor en un rango de fechas.
+    Parámetros: desde, hasta (YYYY-MM-DD, inclusive), tipo (opcional), incluir=xml,cdr
+    """
+    desde = parse_date(request.GET.get('desde', '') or '')
+    hasta = parse_date(request.GET.get('hasta', '') or '')
+    incluir = [parte for parte in request.GET.get('incluir', 'xml,cdr').split(',') if parte]
+    errors = []
+    if desde is None or hasta is None:
+        errors.append('Los parámetros desde y hasta son obligatorios (YYYY-MM-DD)')
+    elif desde > hasta:
+        errors.append('La fecha desde no puede ser posterior a hasta')
+    if not incluir or any(parte not in ('xml', 'cdr') for parte in incluir):
+        errors.append('incluir solo acepta xml y/o cdr')
+    if errors:
+        return Response({
+            'success': False,
+            'message': 'Parámetros inválidos',
+            'errors': errors
+        }, status=status.HTTP_400_BAD_REQUEST)
+
+    queryset = Comprobante.objects.filter(
+        ruc_emisor=ruc_emisor,
+        fecha_creacion__gte=timezone.make_aware(datetime.combine(desde, datetime.min.time())),
+        fecha_creacion__lt=timezone.make_aware(datetime.combine(hasta + timedelta(days=1), datetime.min.time())),
+    ).select_related('lazy_artifact').order_by('fecha_creacion', 'id')
+    if request.GET.get('tipo'):
+        queryset = queryset.filter(tipo_comprobante=request.GET['tipo'])
+
+    filename = f'{ruc_emisor}_{desde:%Y%m%d}_{hasta:%Y%m%d}.zip'
+    print(f"📦 Exportando artefactos de {ruc_emisor} ({desde} a {hasta}): {', '.join(incluir)}")
+    response = StreamingHttpResponse(
+        (chunk for chunk in stream_export_zip(queryset, incluir) if chunk),
+        content_type='application/zip'
+    )
+    response['Content-Disposition'] = f'attachment; filename="{filename}"'
+    return response
 
 @api_view(['GET'])
 def sunat_dashboard(request):
-    return Response({"ok": True, "msg": "sunat_dashboard placeholder"})
\ No newline at end of file
+    """
+    Estado de la integración con SUNAT: comprobantes por estado y, por endpoint, el circuito,
+    el límite adaptativo de concurrencia y las conexiones, y los clientes por emisor
+    (métricas del proceso que atiende)
+    """
+    try:
+        estados = dict(
+            Comprobante.objects.order_by().values_list('estado').annotate(total=Count('id'))
+        )
+        return Response({
+            'success': True,
+            'comprobantes_por_estado': estados,
+            'endpoints': get_guard_stats(),
+            'connections': get_connection_stats(),
+            'clients': get_client_stats(),
+            'jobs': get_queue_stats(),
+            'pid': os.getpid()
+        }, status=status.HTTP_200_OK)
+    except Exception as e:
+        print(f"❌ Error en dashboard SUNAT: {str(e)}")
+        return Response({
+            'success': False,
+            'message': 'Error interno del servidor'
+        }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
\ No newline at end of file
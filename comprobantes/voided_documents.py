@@ -0,0 +1,128 @@
+# comprobantes/voided_documents.py
+
+import logging
+from datetime import timedelta
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from .daily_summaries import LINE_FIELDS, build_summary_header, build_summary_xml, document_name
+from .models import Comprobante, ComunicacionBaja, ResumenDiario
+from .utils import build_zip_bytes, escape_xml, firmar_xml_content
+
+logger = logging.getLogger(__name__)
+
+VOIDED_NS = 'urn:sunat:names:specification:ubl:peru:schema:xsd:VoidedDocuments-1'
+
+# VoidReasonDescription admite hasta 100 caracteres
+MAX_MOTIVO_LENGTH = 100
+
+
+def get_voiding_config():
+    return settings.SUNAT_CONFIG.get('VOIDING', {})
+
+
+def voidable_since():
+    """Fecha de emisión más antigua que SUNAT todavía permite dar de baja (MAX_DAYS)"""
+    return timezone.localdate() - timedelta(days=get_voiding_config().get('MAX_DAYS', 7))
+
+
+def void_candidates(comprobante_ids):
+    """
+    Comprobantes indicados que se pueden dar de baja: ACEPTADO y emitidos dentro del plazo, o
+    BAJA_PENDIENTE de una baja que quedó en PREPARANDO más de CLAIM_TIMEOUT segundos
+    """
+    stale_before = timezone.now() - timedelta(seconds=get_voiding_config().get('CLAIM_TIMEOUT', 600))
+    stale = Q(baja__estado='PREPARANDO', baja__fecha_creacion__lt=stale_before) | Q(
+        resumen__condicion='3', resumen__estado='PREPARANDO', resumen__fecha_creacion__lt=stale_before
+    )
+    return Comprobante.objects.filter(
+        Q(estado='ACEPTADO') | Q(Q(estado='BAJA_PENDIENTE') & stale),
+        id__in=comprobante_ids,
+        fecha_emision__gte=voidable_since(),
+    )
+
+
+def _claim_members(comprobante_ids, motivo, **owner):
+    """
+    Marca BAJA_PENDIENTE los comprobantes que siguen disponibles y los asigna a su baja con un
+    UPDATE condicional (dos peticiones no pueden anular el mismo comprobante)
+    """
+    return void_candidates(comprobante_ids).update(
+        estado='BAJA_PENDIENTE', motivo_baja=motivo, fecha_actualizacion=timezone.now(), **owner
+    )
+
+
+def claim_voided(ruc_emisor, fecha, comprobante_ids, motivo):
+    """
+    Crea la comunicación de baja y le asigna los comprobantes disponibles, en una transacción
+    con su correlativo RA. Retorna (baja, comprobantes asignados, solo con los campos de LINE_FIELDS).
+    """
+    with transaction.atomic():
+        baja = ComunicacionBaja.objects.create(ruc_emisor=ruc_emisor, fecha_emision=fecha)
+        claimed = _claim_members(comprobante_ids, motivo, baja=baja)
+        comprobantes = list(
+            Comprobante.objects.filter(baja=baja, estado='BAJA_PENDIENTE')
+            .only(*LINE_FIELDS, 'motivo_baja').order_by('id')
+        )
+        if comprobantes:
+            baja.nombre_archivo = document_name(ruc_emisor, 'RA', baja)
+        baja.total_comprobantes = len(comprobantes)
+        baja.save(update_fields=['nombre_archivo', 'total_comprobantes'])
+    logger.info(f"Baja {baja.nombre_archivo}: {claimed} comprobantes asignados")
+    return baja, comprobantes
+
+
+def claim_void_summary(ruc_emisor, fecha, comprobante_ids, motivo):
+    """
+    Crea un resumen diario con condición 3 (anular) para boletas y le asigna los comprobantes
+    disponibles. Comparte la serie de correlativos RC del emisor con los resúmenes de informe.
+    Retorna (resumen, comprobantes asignados).
+    """
+    with transaction.atomic():
+        resumen = ResumenDiario.objects.create(ruc_emisor=ruc_emisor, fecha_emision=fecha, condicion='3')
+        claimed = _claim_members(comprobante_ids, motivo, resumen=resumen)
+        comprobantes = list(
+            Comprobante.objects.filter(resumen=resumen, estado='BAJA_PENDIENTE').only(*LINE_FIELDS).order_by('id')
+        )
+        if comprobantes:
+            resumen.nombre_archivo = document_name(ruc_emisor, 'RC', resumen)
+        resumen.total_comprobantes = len(comprobantes)
+        resumen.save(update_fields=['nombre_archivo', 'total_comprobantes'])
+    logger.info(f"Resumen de baja {resumen.nombre_archivo}: {claimed} comprobantes asignados")
+    return resumen, comprobantes
+
+
+def build_voided_line(line_id, comprobante):
+    return f'''
+  <sac:VoidedDocumentsLine>
+    <cbc:LineID>{line_id}</cbc:LineID>
+    <cbc:DocumentTypeCode>{comprobante.tipo_comprobante}</cbc:DocumentTypeCode>
+    <sac:DocumentSerialID>{escape_xml(comprobante.serie)}</sac:DocumentSerialID>
+    <sac:DocumentNumberID>{escape_xml(comprobante.numero)}</sac:DocumentNumberID>
+    <sac:VoidReasonDescription>{escape_xml(comprobante.motivo_baja)}</sac:VoidReasonDescription>
+  </sac:VoidedDocumentsLine>'''
+
+
+def build_voided_xml(baja, comprobantes, razon_social='', issue_date=None):
+    """XML VoidedDocuments (UBL 2.0, personalización 1.0) sin firmar: una línea por comprobante"""
+    parts = [build_summary_header('VoidedDocuments', VOIDED_NS, '1.0', baja, razon_social, issue_date)]
+    parts.extend(build_voided_line(line_id, comprobante) for line_id, comprobante in enumerate(comprobantes, 1))
+    parts.append('''
+</VoidedDocuments>''')
+    return ''.join(parts)
+
+
+def build_voided_zip(baja, comprobantes, razon_social=''):
+    """
+    XML firmado con el certificado configurado y ZIP de la baja: VoidedDocuments para una
+    ComunicacionBaja, SummaryDocuments con condición 3 para un ResumenDiario de anulación.
+    Retorna (xml, contenido del ZIP); lanza SigningError si no se puede firmar.
+    """
+    if isinstance(baja, ResumenDiario):
+        xml_content = build_summary_xml(baja, comprobantes, razon_social)
+    else:
+        xml_content = build_voided_xml(baja, comprobantes, razon_social)
+    xml_content = firmar_xml_content(xml_content)
+    return xml_content, build_zip_bytes(baja.get_xml_filename(), xml_content)
@@ -3,7 +3,7 @@ Django settings for sunat_api project.
 """
 
 from pathlib import Path
-from decouple import config
+from decouple import config, Csv
 import os
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
@@ -139,9 +139,177 @@ CORS_ALLOWED_ORIGINS = [
 SUNAT_CONFIG = {
     'XML_OUTPUT_DIR': os.path.join(BASE_DIR, 'media', 'xml'),
     'ZIP_OUTPUT_DIR': os.path.join(BASE_DIR, 'media', 'zip'),
+    # Endpoint de billService (SUNAT beta por defecto; ver el comando sunat_stub para pruebas locales)
+    'BILL_SERVICE_URL': config(
+        'SUNAT_BILL_SERVICE_URL', default='https://e-beta.sunat.gob.pe/ol-ti-itcpfegem-beta/billService'
+    ),
+    # Endpoint de billConsultService (getStatusCdr: recuperar CDR de comprobantes ya enviados)
+    'CONSULT_SERVICE_URL': config(
+        'SUNAT_CONSULT_SERVICE_URL', default='https://e-factura.sunat.gob.pe/ol-it-wsconscpegem/billConsultService'
+    ),
     'UBL_VERSION': '2.1',
     'COUNTRY_CODE': 'PE',
     'AGENCY_NAME': 'PE:SUNAT',
+    # Layout de artefactos XML/ZIP: 'flat' (un solo directorio) o 'sharded' (ruc/yyyy/mm/hash)
+    'ARTIFACT_LAYOUT': config('SUNAT_ARTIFACT_LAYOUT', default='sharded'),
+    'ARTIFACT_SHARD_PREFIX_LENGTH': 2,
+    # Almacén de artefactos: 'files' (un archivo por nombre) o 'cas' (blobs por SHA-256, deduplicados)
+    'ARTIFACT_STORE': config('SUNAT_ARTIFACT_STORE', default='files'),
+    # Backend de almacenamiento (Storage de Django) para todos los artefactos
+    'ARTIFACT_STORAGE': config('SUNAT_ARTIFACT_STORAGE', default='comprobantes.storage.LocalArtifactStorage'),
+    # Opciones de comprobantes.storage.S3ArtifactStorage (AWS S3, MinIO u otro compatible)
+    'S3_STORAGE': {
+        'BUCKET': config('SUNAT_S3_BUCKET', default='sunat-artifacts'),
+        'PREFIX': config('SUNAT_S3_PREFIX', default=''),
+        'ENDPOINT_URL': config('SUNAT_S3_ENDPOINT_URL', default=None),
+        'ACCESS_KEY': config('SUNAT_S3_ACCESS_KEY', default=None),
+        'SECRET_KEY': config('SUNAT_S3_SECRET_KEY', default=None),
+        'REGION': config('SUNAT_S3_REGION', default='us-east-1'),
+        'MULTIPART_THRESHOLD': 8 * 1024 * 1024,
+        'MULTIPART_CHUNKSIZE': 8 * 1024 * 1024,
+        'CACHE_DIR': config('SUNAT_S3_CACHE_DIR', default=os.path.join(BASE_DIR, 'media', '.cache')),
+        'CACHE_MAX_BYTES': config('SUNAT_S3_CACHE_MAX_BYTES', default=256 * 1024 * 1024, cast=int),
+    },
+    # Materialización diferida: para estos tipos de comprobante (p. ej. '03' boletas) solo se guarda
+    # el payload canónico y la firma; el XML/ZIP se regenera al descargarlo, enviarlo o auditarlo
+    'LAZY_ARTIFACTS': {
+        'TIPOS': config('SUNAT_LAZY_ARTIFACT_TIPOS', default='', cast=Csv()),
+        'CACHE_MAX_BYTES': config('SUNAT_LAZY_CACHE_MAX_BYTES', default=32 * 1024 * 1024, cast=int),
+    },
+    # Descarga de XML: delegar el envío del archivo al proxy ('nginx' -> X-Accel-Redirect,
+    # 'apache' -> X-Sendfile) y comprimir con gzip para clientes que lo acepten
+    'XML_DOWNLOAD': {
+        'SENDFILE': config('SUNAT_XML_SENDFILE', default=''),
+        'SENDFILE_PREFIX': config('SUNAT_XML_SENDFILE_PREFIX', default='/protected-media/'),
+        'GZIP': config('SUNAT_XML_GZIP', default=True, cast=bool),
+    },
+    # Conexiones HTTP keep-alive hacia SUNAT (un pool por proceso y por endpoint)
+    'HTTP_POOL': {
+        'POOL_MAXSIZE': config('SUNAT_HTTP_POOL_MAXSIZE', default=10, cast=int),
+        'POOL_BLOCK': config('SUNAT_HTTP_POOL_BLOCK', default=False, cast=bool),
+    },
+    # Clientes SOAP por emisor (SUNATConfiguration): relectura de la configuración cada TTL segundos,
+    # pool de conexiones y límite de tasa (peticiones/s; ráfaga = RATE_LIMIT * RATE_BURST_FACTOR) por cliente
+    'CLIENT_REGISTRY': {
+        'TTL': config('SUNAT_CLIENT_TTL', default=60.0, cast=float),
+        'POOL_MAXSIZE': config('SUNAT_CLIENT_POOL_MAXSIZE', default=4, cast=int),
+        'RATE_LIMIT': config('SUNAT_CLIENT_RATE_LIMIT', default=20.0, cast=float),
+        'RATE_BURST_FACTOR': config('SUNAT_CLIENT_RATE_BURST_FACTOR', default=2.0, cast=float),
+        'RATE_MAX_WAIT': config('SUNAT_CLIENT_RATE_MAX_WAIT', default=10.0, cast=float),
+    },
+    # Envío en lotes (sendPack): tipos admitidos, comprobantes y tamaño máximo del ZIP por lote;
+    # CLAIM_TIMEOUT libera los comprobantes de lotes que quedaron sin enviar (p. ej. proceso caído)
+    'SEND_PACK': {
+        'TIPOS': config('SUNAT_PACK_TIPOS', default='01,07,08', cast=Csv()),
+        'MAX_DOCUMENTS': config('SUNAT_PACK_MAX_DOCUMENTS', default=500, cast=int),
+        'MAX_BYTES': config('SUNAT_PACK_MAX_BYTES', default=5 * 1024 * 1024, cast=int),
+        'CLAIM_TIMEOUT': config('SUNAT_PACK_CLAIM_TIMEOUT', default=600, cast=int),
+    },
+    # Resumen diario (RC): las boletas (03) y sus notas (serie B) se informan en resúmenes por emisor
+    # y fecha de emisión de hasta MAX_LINES comprobantes, no con sendBill. CLAIM_TIMEOUT libera los
+    # comprobantes de resúmenes que quedaron sin enviar (p. ej. proceso caído)
+    'DAILY_SUMMARY': {
+        'ENABLED': config('SUNAT_DAILY_SUMMARY_ENABLED', default=True, cast=bool),
+        'MAX_LINES': config('SUNAT_DAILY_SUMMARY_MAX_LINES', default=500, cast=int),
+        'CLAIM_TIMEOUT': config('SUNAT_DAILY_SUMMARY_CLAIM_TIMEOUT', default=600, cast=int),
+    },
+    # Bajas (void-sunat/): facturas y sus notas en comunicaciones de baja (RA), boletas en resúmenes
+    # con condición 3; hasta MAX_LINES comprobantes por envío y con fecha de emisión de hace MAX_DAYS días o menos
+    'VOIDING': {
+        'MAX_LINES': config('SUNAT_VOIDING_MAX_LINES', default=500, cast=int),
+        'MAX_DAYS': config('SUNAT_VOIDING_MAX_DAYS', default=7, cast=int),
+        'CLAIM_TIMEOUT': config('SUNAT_VOIDING_CLAIM_TIMEOUT', default=600, cast=int),
+    },
+    # Certificado para firmar los documentos que arma el servidor (resúmenes y bajas)
+    'SIGNING': {
+        'CERT_PATH': config('SUNAT_CERT_PATH', default=os.path.join(BASE_DIR, 'CERTIFICADO.pfx')),
+        'CERT_PASSWORD': config('SUNAT_CERT_PASSWORD', default='prueba123'),
+    },
+    # Consulta de tickets (resúmenes y lotes) con backoff por ticket: la primera consulta a los
+    # FIRST_DELAY segundos del envío y luego cada vez más espaciadas (FACTOR) hasta MAX_DELAY;
+    # tras STALE_AFTER segundos sin respuesta el ticket pasa a TICKET_VENCIDO
+    'TICKET_POLLING': {
+        'FIRST_DELAY': config('SUNAT_TICKET_FIRST_DELAY', default=10.0, cast=float),
+        'FACTOR': config('SUNAT_TICKET_BACKOFF_FACTOR', default=2.0, cast=float),
+        'MAX_DELAY': config('SUNAT_TICKET_MAX_DELAY', default=1800.0, cast=float),
+        'JITTER': config('SUNAT_TICKET_JITTER', default=0.1, cast=float),
+        'STALE_AFTER': config('SUNAT_TICKET_STALE_AFTER', default=172800, cast=int),
+        'LEASE': config('SUNAT_TICKET_LEASE', default=120, cast=int),
+        'BATCH_SIZE': config('SUNAT_TICKET_BATCH_SIZE', default=100, cast=int),
+        'WORKERS': config('SUNAT_TICKET_WORKERS', default=8, cast=int),
+    },
+    # Recuperación de CDR (comando reconcile_cdr): consultas getStatusCdr en paralelo
+    'CDR_RECONCILE': {
+        'WORKERS': config('SUNAT_CDR_RECONCILE_WORKERS', default=8, cast=int),
+        # Segundos tras los cuales un comprobante ENVIANDO se da por interrumpido y se concilia
+        'SENDING_GRACE': config('SUNAT_CDR_RECONCILE_SENDING_GRACE', default=300, cast=float),
+    },
+    # Envío masivo síncrono (bulk-send-sunat/stream/): envíos simultáneos como máximo
+    'BULK_SEND': {
+        'MAX_WORKERS': config('SUNAT_BULK_MAX_WORKERS', default=8, cast=int),
+    },
+    # Cola de trabajos SUNAT (outbox) procesada por el comando sunat_worker. LEASE: segundos que un
+    # worker retiene un trabajo antes de que otro pueda retomarlo (debe superar JOB_DEADLINE)
+    'SUBMISSION_QUEUE': {
+        'WORKERS': config('SUNAT_WORKER_THREADS', default=8, cast=int),
+        'POLL_INTERVAL': config('SUNAT_WORKER_POLL_INTERVAL', default=1.0, cast=float),
+        'LEASE': config('SUNAT_JOB_LEASE', default=300, cast=int),
+        'JOB_DEADLINE': config('SUNAT_JOB_DEADLINE', default=60.0, cast=float),
+        'MAX_ATTEMPTS': config('SUNAT_JOB_MAX_ATTEMPTS', default=5, cast=int),
+        'RETRY_BASE_DELAY': config('SUNAT_JOB_RETRY_BASE_DELAY', default=5.0, cast=float),
+        'RETRY_MAX_DELAY': config('SUNAT_JOB_RETRY_MAX_DELAY', default=300.0, cast=float),
+    },
+    # Cliente SOAP asíncrono (requiere httpx; HTTP/2 requiere además h2)
+    'ASYNC_CLIENT': {
+        'MAX_CONCURRENCY': config('SUNAT_ASYNC_MAX_CONCURRENCY', default=100, cast=int),
+        'MAX_CONNECTIONS': config('SUNAT_ASYNC_MAX_CONNECTIONS', default=100, cast=int),
+        'TIMEOUT': config('SUNAT_ASYNC_TIMEOUT', default=30, cast=float),
+        'HTTP2': config('SUNAT_ASYNC_HTTP2', default=False, cast=bool),
+    },
+    # Reintentos ante fallas transitorias de SUNAT (backoff exponencial con jitter)
+    'RETRY': {
+        'MAX_ATTEMPTS': config('SUNAT_RETRY_MAX_ATTEMPTS', default=4, cast=int),
+        'BASE_DELAY': config('SUNAT_RETRY_BASE_DELAY', default=0.5, cast=float),
+        'MAX_DELAY': config('SUNAT_RETRY_MAX_DELAY', default=8.0, cast=float),
+        'DEADLINE': config('SUNAT_RETRY_DEADLINE', default=60.0, cast=float),
+    },
+    # Timeouts por llamada (conexión/lectura) y plazo total de las peticiones de la API que
+    # llaman a SUNAT; se recortan al plazo restante del llamador (Deadline)
+    'TIMEOUTS': {
+        'CONNECT': config('SUNAT_CONNECT_TIMEOUT', default=5.0, cast=float),
+        'READ': config('SUNAT_READ_TIMEOUT', default=30.0, cast=float),
+        'MIN_BUDGET': config('SUNAT_MIN_CALL_BUDGET', default=0.5, cast=float),
+        'API_DEADLINE': config('SUNAT_API_DEADLINE', default=25.0, cast=float),
+    },
+    # Circuito por endpoint: se abre tras N fallas transitorias consecutivas
+    'CIRCUIT_BREAKER': {
+        'FAILURE_THRESHOLD': config('SUNAT_CB_FAILURE_THRESHOLD', default=5, cast=int),
+        'RESET_TIMEOUT': config('SUNAT_CB_RESET_TIMEOUT', default=30.0, cast=float),
+        'HALF_OPEN_MAX_CALLS': config('SUNAT_CB_HALF_OPEN_MAX_CALLS', default=1, cast=int),
+    },
+    # Límite adaptativo (AIMD) de llamadas en vuelo por endpoint
+    'CONCURRENCY_LIMIT': {
+        'INITIAL': config('SUNAT_LIMIT_INITIAL', default=10, cast=int),
+        'MIN': config('SUNAT_LIMIT_MIN', default=1, cast=int),
+        'MAX': config('SUNAT_LIMIT_MAX', default=50, cast=int),
+        'LATENCY_THRESHOLD': config('SUNAT_LIMIT_LATENCY_THRESHOLD', default=5.0, cast=float),
+        'BACKOFF_RATIO': config('SUNAT_LIMIT_BACKOFF_RATIO', default=0.5, cast=float),
+        'COOLDOWN': config('SUNAT_LIMIT_COOLDOWN', default=1.0, cast=float),
+        'QUEUE_TIMEOUT': config('SUNAT_LIMIT_QUEUE_TIMEOUT', default=10.0, cast=float),
+    },
+    # Captura de sobres SOAP crudos (gzip) en SUNATResponse para depuración: 'off', 'errors' o 'all'
+    'SOAP_CAPTURE': config('SUNAT_SOAP_CAPTURE', default='off'),
+    # Política de compresión ZIP: 'size' elige el nivel según el tamaño del XML,
+    # 'fixed' usa LEVEL en todos los casos (None = nivel por defecto de zlib)
+    'ZIP_COMPRESSION': {
+        'POLICY': config('SUNAT_ZIP_POLICY', default='size'),
+        'LEVEL': config('SUNAT_ZIP_LEVEL', default=None, cast=lambda v: int(v) if v not in (None, '') else None),
+        'SIZE_LEVELS': [
+            (64 * 1024, 1),        # XML pequeños: compresión rápida
+            (1024 * 1024, 6),      # XML medianos: nivel por defecto
+            (None, 9),             # XML grandes: máxima compresión
+        ],
+    },
 }
 
 # Create directories if they don't exist
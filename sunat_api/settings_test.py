@@ -0,0 +1,25 @@
+"""
+Configuración para la suite de pruebas (pytest): SQLite en memoria y archivos en un
+directorio temporal, sin MySQL ni el media/ del proyecto.
+"""
+
+import copy
+import tempfile
+
+from .settings import *  # noqa: F401,F403
+
+DATABASES = {
+    'default': {
+        'ENGINE': 'django.db.backends.sqlite3',
+        'NAME': ':memory:',
+    }
+}
+
+MEDIA_ROOT = tempfile.mkdtemp(prefix='sunat-tests-')
+
+SUNAT_CONFIG = copy.deepcopy(SUNAT_CONFIG)  # noqa: F405
+SUNAT_CONFIG['XML_OUTPUT_DIR'] = os.path.join(MEDIA_ROOT, 'xml')  # noqa: F405
+SUNAT_CONFIG['ZIP_OUTPUT_DIR'] = os.path.join(MEDIA_ROOT, 'zip')  # noqa: F405
+SUNAT_CONFIG['S3_STORAGE']['CACHE_DIR'] = os.path.join(MEDIA_ROOT, '.cache')  # noqa: F405
+os.makedirs(SUNAT_CONFIG['XML_OUTPUT_DIR'], exist_ok=True)  # noqa: F405
+os.makedirs(SUNAT_CONFIG['ZIP_OUTPUT_DIR'], exist_ok=True)  # noqa: F405